@@ -7,8 +7,10 @@ import colorama
 import datetime
 import json
 import os
+import queue
 import subprocess
 import tempfile
+import threading
 import time
 
 from azure.cli.core.commands.client_factory import get_mgmt_service_client, get_subscription_id
@@ -31,6 +33,8 @@ from azext_aks_preview._consts import (
     CONST_PERISCOPE_RELEASE_TAG,
     CONST_PERISCOPE_IMAGE_VERSION,
     CONST_PERISCOPE_NAMESPACE,
+    CONST_PERISCOPE_DIAGNOSTIC_PREFIX,
+    CONST_PERISCOPE_DIAGNOSTICS_TIMEOUT_IN_SECONDS,
 )
 
 from azext_aks_preview._helpers import which, print_or_merge_credentials
@@ -406,83 +410,108 @@ def _display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-m
 
     network_config_array = []
     network_status_array = []
-    apds_created = False
-
-    max_retry = 10
-    for retry in range(0, max_retry):
-        if not apds_created:
-            apd = subprocess.check_output(
-                ["kubectl", "--kubeconfig", temp_kubeconfig_path, "get",
-                    "apd", "-n", CONST_PERISCOPE_NAMESPACE, "--no-headers"],
-                universal_newlines=True
-            )
-            apd_lines = apd.splitlines()
-            if apd_lines and 'No resources found' in apd_lines[0]:
-                apd_lines.pop(0)
-
-            print("Got {} diagnostic results for {} ready nodes{}\r".format(len(apd_lines),
-                                                                            len(ready_nodes),
-                                                                            '.' * retry), end='')
-            if len(apd_lines) < len(ready_nodes):
-                time.sleep(3)
-            else:
-                apds_created = True
-                print()
-        else:
-            for node_name in ready_nodes:
-                if ready_nodes[node_name]:
-                    continue
-                apdName = "aks-periscope-diagnostic-" + node_name
-                try:
-                    network_config = subprocess.check_output(
-                        ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-                         "get", "apd", apdName, "-n",
-                         CONST_PERISCOPE_NAMESPACE, "-o=jsonpath={.spec.networkconfig}"],
-                        universal_newlines=True)
-                    logger.debug('Dns status for node %s is %s',
-                                 node_name, network_config)
-                    network_status = subprocess.check_output(
-                        ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-                         "get", "apd", apdName, "-n",
-                         CONST_PERISCOPE_NAMESPACE, "-o=jsonpath={.spec.networkoutbound}"],
-                        universal_newlines=True)
-                    logger.debug('Network status for node %s is %s',
-                                 node_name, network_status)
-
-                    if not network_config or not network_status:
-                        print("The diagnostics information for node {} is not ready yet. "
-                              "Will try again in 10 seconds.".format(node_name))
-                        time.sleep(10)
-                        break
-
-                    network_config_array += json.loads(
-                        '[' + network_config + ']')
-                    network_status_object = json.loads(network_status)
-                    network_status_array += _format_diag_status(
-                        network_status_object)
-                    ready_nodes[node_name] = True
-                except subprocess.CalledProcessError as err:
-                    raise CLIError(err.output)
+    pending_nodes = set(ready_nodes)
+
+    print("Waiting for the diagnostic results of {} ready nodes...".format(len(ready_nodes)))
+    for apd in _watch_diagnostics(temp_kubeconfig_path, CONST_PERISCOPE_DIAGNOSTICS_TIMEOUT_IN_SECONDS):
+        apd_name = apd.get("metadata", {}).get("name", "")
+        node_name = apd_name[len(CONST_PERISCOPE_DIAGNOSTIC_PREFIX):]
+        if not apd_name.startswith(CONST_PERISCOPE_DIAGNOSTIC_PREFIX) or node_name not in pending_nodes:
+            continue
+        spec = apd.get("spec") or {}
+        network_config = spec.get("networkconfig")
+        network_status = spec.get("networkoutbound")
+        logger.debug('Dns status for node %s is %s', node_name, network_config)
+        logger.debug('Network status for node %s is %s', node_name, network_status)
+        # periscope creates the resource first and fills in the results once the node is analyzed
+        if not network_config or not network_status:
+            continue
+
+        node_network_config = json.loads('[' + network_config + ']')
+        node_network_status = _format_diag_status(json.loads(network_status))
+        network_config_array += node_network_config
+        network_status_array += node_network_status
+        pending_nodes.discard(node_name)
 
-    print()
-    if network_config_array:
-        print("Below are the network configuration for each node: ")
         print()
-        print(tabulate(network_config_array, headers="keys", tablefmt='simple'))
+        print("Got diagnostic results for node {} ({}/{}):".format(
+            _format_bright(node_name), len(ready_nodes) - len(pending_nodes), len(ready_nodes)))
         print()
-    else:
+        print(tabulate(node_network_config, headers="keys", tablefmt='simple'))
+        print()
+        print(tabulate(node_network_status, headers="keys", tablefmt='simple'))
+        if not pending_nodes:
+            break
+
+    print()
+    if pending_nodes:
+        logger.warning("The diagnostics information for nodes %s is not ready yet. "
+                       "Please run 'az aks kanalyze' command later to get the analysis results.",
+                       ", ".join(sorted(pending_nodes)))
+    if not network_config_array:
         logger.warning("Could not get network config. "
                        "Please run 'az aks kanalyze' command later to get the analysis results.")
-
-    if network_status_array:
-        print("Below are the network connectivity results for each node:")
-        print()
-        print(tabulate(network_status_array, headers="keys", tablefmt='simple'))
-    else:
+    if not network_status_array:
         logger.warning("Could not get networking status. "
                        "Please run 'az aks kanalyze' command later to get the analysis results.")
 
 
+def _watch_diagnostics(temp_kubeconfig_path, timeout):
+    """Yields the periscope diagnostic resources as they are listed, created and updated, until the
+    caller stops iterating or timeout seconds have passed. All of them come from a single watch."""
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        ["kubectl", "--kubeconfig", temp_kubeconfig_path, "get", "apd", "-n", CONST_PERISCOPE_NAMESPACE,
+         "--watch", "-o", "json"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    events = queue.Queue()
+    reader = threading.Thread(target=_read_json_stream, args=(process.stdout, events), daemon=True)
+    reader.start()
+
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                apd = events.get(timeout=remaining)
+            except queue.Empty:
+                return
+            if apd is None:
+                break
+            yield apd
+    finally:
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+
+    if process.returncode:
+        raise CLIError(process.stderr.read())
+
+
+def _read_json_stream(stream, events):
+    # kubectl writes every object of the watch as an indented JSON document, one after the other
+    decoder = json.JSONDecoder()
+    buffer = ""
+    try:
+        for line in stream:
+            buffer += line
+            while True:
+                buffer = buffer.lstrip()
+                try:
+                    obj, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                buffer = buffer[end:]
+                if obj.get("kind") == "List":
+                    for item in obj.get("items", []):
+                        events.put(item)
+                else:
+                    events.put(obj)
+    finally:
+        events.put(None)
+
+
 def _cloud_storage_account_service_factory(cli_ctx, kwargs):
     from azure.cli.core.profiles import ResourceType, get_sdk
     t_cloud_storage_account = get_sdk(
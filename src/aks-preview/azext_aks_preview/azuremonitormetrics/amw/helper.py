@@ -24,11 +24,19 @@ def get_amw_region(cmd, azure_monitor_workspace_resource_id):
         raise ex
 
 
-def get_azure_monitor_workspace_resource(cmd, cluster_subscription, cluster_region, raw_parameters):
+def get_azure_monitor_workspace_resource(cmd, cluster_subscription, cluster_region, raw_parameters, lookups=None):
     azure_monitor_workspace_resource_id = raw_parameters.get("azure_monitor_workspace_resource_id")
     if not azure_monitor_workspace_resource_id:
-        azure_monitor_workspace_resource_id, azure_monitor_workspace_location = create_default_mac(cmd, cluster_subscription, cluster_region)
+        key = ("default_workspace", cluster_subscription, cluster_region.lower())
+
+        def lookup():
+            return create_default_mac(cmd, cluster_subscription, cluster_region)
     else:
         azure_monitor_workspace_resource_id = sanitize_resource_id(azure_monitor_workspace_resource_id)
-        azure_monitor_workspace_location = get_amw_region(cmd, azure_monitor_workspace_resource_id)
+        key = ("workspace_region", azure_monitor_workspace_resource_id)
+
+        def lookup():
+            return azure_monitor_workspace_resource_id, get_amw_region(cmd, azure_monitor_workspace_resource_id)
+    # clusters enabled in the same call share the lookup of their workspace
+    azure_monitor_workspace_resource_id, azure_monitor_workspace_location = lookups.get(key, lookup) if lookups else lookup()
     return azure_monitor_workspace_resource_id, azure_monitor_workspace_location.lower()
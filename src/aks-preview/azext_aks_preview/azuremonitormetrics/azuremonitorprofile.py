@@ -2,6 +2,7 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import functools
 from azext_aks_preview.azuremonitormetrics.addonput import addon_put
 from azext_aks_preview.azuremonitormetrics.amg.link import link_grafana_instance
 from azext_aks_preview.azuremonitormetrics.amw.helper import get_azure_monitor_workspace_resource
@@ -9,7 +10,7 @@ from azext_aks_preview.azuremonitormetrics.dc.dce_api import create_dce
 from azext_aks_preview.azuremonitormetrics.dc.dcr_api import create_dcr
 from azext_aks_preview.azuremonitormetrics.dc.dcra_api import create_dcra
 from azext_aks_preview.azuremonitormetrics.dc.delete import delete_dc_objects_if_prometheus_enabled, get_dc_objects_list
-from azext_aks_preview.azuremonitormetrics.helper import check_azuremonitormetrics_profile, rp_registrations
+from azext_aks_preview.azuremonitormetrics.helper import SharedLookups, check_azuremonitormetrics_profile, rp_registrations, run_in_parallel
 from azext_aks_preview.azuremonitormetrics.recordingrules.create import create_rules
 from azext_aks_preview.azuremonitormetrics.recordingrules.delete import delete_rules
 from knack.util import CLIError
@@ -24,20 +25,35 @@ def link_azure_monitor_profile_artifacts(
         cluster_name,
         cluster_region,
         raw_parameters,
-        create_flow
+        create_flow,
+        lookups=None
 ):
     # MAC creation if required
-    azure_monitor_workspace_resource_id, azure_monitor_workspace_location = get_azure_monitor_workspace_resource(cmd, cluster_subscription, cluster_region, raw_parameters)
-    # DCE creation
-    dce_resource_id = create_dce(cmd, cluster_subscription, cluster_resource_group_name, cluster_name, azure_monitor_workspace_location)
-    # DCR creation
-    dcr_resource_id = create_dcr(cmd, azure_monitor_workspace_location, azure_monitor_workspace_resource_id, cluster_subscription, cluster_resource_group_name, cluster_name, dce_resource_id)
-    # DCRA creation
-    create_dcra(cmd, cluster_region, cluster_subscription, cluster_resource_group_name, cluster_name, dcr_resource_id)
-    # Link grafana
-    link_grafana_instance(cmd, raw_parameters, azure_monitor_workspace_resource_id)
-    # create recording rules and alerts
-    create_rules(cmd, cluster_subscription, cluster_resource_group_name, cluster_name, azure_monitor_workspace_resource_id, azure_monitor_workspace_location, raw_parameters)
+    azure_monitor_workspace_resource_id, azure_monitor_workspace_location = get_azure_monitor_workspace_resource(cmd, cluster_subscription, cluster_region, raw_parameters, lookups)
+
+    def create_data_collection_objects():
+        # DCE creation
+        dce_resource_id = create_dce(cmd, cluster_subscription, cluster_resource_group_name, cluster_name, azure_monitor_workspace_location)
+        # DCR creation
+        dcr_resource_id = create_dcr(cmd, azure_monitor_workspace_location, azure_monitor_workspace_resource_id, cluster_subscription, cluster_resource_group_name, cluster_name, dce_resource_id)
+        # DCRA creation
+        create_dcra(cmd, cluster_region, cluster_subscription, cluster_resource_group_name, cluster_name, dcr_resource_id)
+
+    # The DC* objects are created in order since each refers to the previous one, while the grafana link
+    # and the recording rules only need the workspace, so the three are set up concurrently
+    def link_grafana():
+        if lookups:
+            # the grafana instance is linked to the workspace, once for all the clusters sharing it
+            return lookups.get(("grafana_link", azure_monitor_workspace_resource_id), lambda: link_grafana_instance(cmd, raw_parameters, azure_monitor_workspace_resource_id))
+        return link_grafana_instance(cmd, raw_parameters, azure_monitor_workspace_resource_id)
+
+    run_in_parallel(
+        create_data_collection_objects,
+        # Link grafana
+        link_grafana,
+        # create recording rules and alerts
+        lambda: create_rules(cmd, cluster_subscription, cluster_resource_group_name, cluster_name, azure_monitor_workspace_resource_id, azure_monitor_workspace_location, raw_parameters, lookups)
+    )
     # if aks cluster create flow -> do a PUT on the AKS cluster to enable the addon
     if create_flow:
         addon_put(cmd, cluster_subscription, cluster_resource_group_name, cluster_name)
@@ -64,6 +80,24 @@ def ensure_azure_monitor_profile_prerequisites(
     remove_azuremonitormetrics,
     create_flow=False
 ):
+    if remove_azuremonitormetrics:
+        check_azure_monitor_profile_cloud(cmd, raw_parameters)
+        unlink_azure_monitor_profile_artifacts(
+            cmd,
+            cluster_subscription,
+            cluster_resource_group_name,
+            cluster_name
+        )
+    else:
+        ensure_azure_monitor_profile_prerequisites_for_clusters(
+            cmd,
+            [(cluster_subscription, cluster_resource_group_name, cluster_name, cluster_region)],
+            raw_parameters,
+            create_flow
+        )
+
+
+def check_azure_monitor_profile_cloud(cmd, raw_parameters):
     cloud_name = cmd.cli_ctx.cloud.name
     if cloud_name.lower() == 'azurechinacloud':
         raise CLIError("Azure China Cloud is not supported for the Azure Monitor Metrics addon")
@@ -73,19 +107,25 @@ def ensure_azure_monitor_profile_prerequisites(
         if grafana_resource_id:
             raise InvalidArgumentValueError("Azure US Government cloud does not support Azure Managed Grarfana yet. Please follow this documenation for enabling it via the public cloud : aka.ms/ama-grafana-link-ff")
 
-    if remove_azuremonitormetrics:
-        unlink_azure_monitor_profile_artifacts(
-            cmd,
-            cluster_subscription,
-            cluster_resource_group_name,
-            cluster_name
-        )
-    else:
+
+# pylint: disable=line-too-long
+def ensure_azure_monitor_profile_prerequisites_for_clusters(cmd, clusters, raw_parameters, create_flow=False):
+    """Set up the Azure Monitor metrics resources of many clusters in one call.
+
+    clusters is a list of (subscription, resource group, name, region) tuples. The clusters are set up
+    concurrently, and the resource provider registrations, the workspace, its recording rules and the
+    grafana link are looked up once and shared by the clusters that use them. The first error raised for
+    any cluster is raised once all of them are done.
+    """
+    check_azure_monitor_profile_cloud(cmd, raw_parameters)
+    lookups = SharedLookups()
+
+    def enable(cluster_subscription, cluster_resource_group_name, cluster_name, cluster_region):
         # Check if already onboarded
         if create_flow is False:
             check_azuremonitormetrics_profile(cmd, cluster_subscription, cluster_resource_group_name, cluster_name)
         # Do RP registrations if required
-        rp_registrations(cmd, cluster_subscription)
+        lookups.get(("rp_registrations", cluster_subscription), lambda: rp_registrations(cmd, cluster_subscription))
         link_azure_monitor_profile_artifacts(
             cmd,
             cluster_subscription,
@@ -93,5 +133,8 @@ def ensure_azure_monitor_profile_prerequisites(
             cluster_name,
             cluster_region,
             raw_parameters,
-            create_flow
+            create_flow,
+            lookups
         )
+
+    run_in_parallel(*[functools.partial(enable, *cluster) for cluster in clusters])
@@ -17,6 +17,13 @@ RP_API = "2021-04-01"
 ALERTS_API = "2023-01-01-preview"
 RP_LOCATION_API = "2022-01-01"
 
+# ARM PUTs that don't depend on each other are sent concurrently, and throttled (429) or
+# conflicting (409) requests are retried with a backoff that follows the Retry-After header
+MAX_PARALLEL_ARM_REQUESTS = 4
+ARM_REQUEST_MAX_RETRIES = 5
+ARM_REQUEST_RETRY_BASE_DELAY_IN_SECONDS = 2
+ARM_REQUEST_RETRY_MAX_DELAY_IN_SECONDS = 60
+
 
 MapToClosestMACRegion = {
     "australiacentral": "eastus",
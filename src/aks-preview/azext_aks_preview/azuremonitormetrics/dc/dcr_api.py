@@ -9,6 +9,7 @@ from azext_aks_preview.azuremonitormetrics.constants import (
     DC_TYPE,
     DC_API
 )
+from azext_aks_preview.azuremonitormetrics.helper import send_arm_request
 from knack.util import CLIError
 
 
@@ -22,7 +23,6 @@ def get_default_dcr_name(cmd, mac_region, cluster_name):
 
 # pylint: disable=too-many-locals,too-many-branches,too-many-statements,line-too-long
 def create_dcr(cmd, mac_region, azure_monitor_workspace_resource_id, cluster_subscription, cluster_resource_group_name, cluster_name, dce_resource_id):
-    from azure.cli.core.util import send_raw_request
     dcr_name = get_default_dcr_name(cmd, mac_region, cluster_name)
     dcr_resource_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.Insights/dataCollectionRules/{2}".format(
         cluster_subscription,
@@ -42,7 +42,7 @@ def create_dcr(cmd, mac_region, azure_monitor_workspace_resource_id, cluster_sub
     dcr_url = f"{armendpoint}{dcr_resource_id}?api-version={DC_API}"
     try:
         headers = ['User-Agent=azuremonitormetrics.create_dcr']
-        send_raw_request(cmd.cli_ctx, "PUT",
+        send_arm_request(cmd, "PUT",
                          dcr_url, body=dcr_creation_body, headers=headers)
         return dcr_resource_id
     except CLIError as error:
@@ -5,11 +5,11 @@
 import json
 from azext_aks_preview.azuremonitormetrics.constants import DC_API
 from azext_aks_preview.azuremonitormetrics.dc.defaults import get_default_dcra_name
+from azext_aks_preview.azuremonitormetrics.helper import send_arm_request
 from knack.util import CLIError
 
 
 def create_dcra(cmd, cluster_region, cluster_subscription, cluster_resource_group_name, cluster_name, dcr_resource_id):
-    from azure.cli.core.util import send_raw_request
     cluster_resource_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.ContainerService/managedClusters/{2}".format(
         cluster_subscription,
         cluster_resource_group_name,
@@ -31,7 +31,7 @@ def create_dcra(cmd, cluster_region, cluster_subscription, cluster_resource_grou
     association_url = f"{armendpoint}{cluster_resource_id}/providers/Microsoft.Insights/dataCollectionRuleAssociations/{dcra_name}?api-version={DC_API}"
     try:
         headers = ['User-Agent=azuremonitormetrics.create_dcra']
-        send_raw_request(cmd.cli_ctx, "PUT", association_url,
+        send_arm_request(cmd, "PUT", association_url,
                          body=association_body, headers=headers)
         return dcra_resource_id
     except CLIError as error:
@@ -3,15 +3,27 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from knack.log import get_logger
 from knack.util import CLIError
 from azure.cli.core.azclierror import (
     UnknownError
 )
 from azext_aks_preview.azuremonitormetrics.constants import (
     RP_API,
-    AKS_CLUSTER_API
+    AKS_CLUSTER_API,
+    ARM_REQUEST_MAX_RETRIES,
+    ARM_REQUEST_RETRY_BASE_DELAY_IN_SECONDS,
+    ARM_REQUEST_RETRY_MAX_DELAY_IN_SECONDS,
+    MAX_PARALLEL_ARM_REQUESTS
 )
 
+logger = get_logger(__name__)
+
 
 def sanitize_resource_id(resource_id):
     resource_id = resource_id.strip()
@@ -22,6 +34,65 @@ def sanitize_resource_id(resource_id):
     return resource_id.lower()
 
 
+def _get_retry_delay(error, attempt):
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), ARM_REQUEST_RETRY_MAX_DELAY_IN_SECONDS)
+        except ValueError:
+            pass
+    # full jitter, so that the requests throttled together don't all come back at the same time
+    return random.uniform(0, min(ARM_REQUEST_RETRY_BASE_DELAY_IN_SECONDS * 2 ** attempt, ARM_REQUEST_RETRY_MAX_DELAY_IN_SECONDS))
+
+
+def _is_retriable(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    return response.status_code in (409, 429) or response.status_code >= 500
+
+
+def send_arm_request(cmd, method, url, body=None, headers=None):
+    from azure.cli.core.util import send_raw_request
+    for attempt in range(ARM_REQUEST_MAX_RETRIES):
+        try:
+            return send_raw_request(cmd.cli_ctx, method, url, body=body, headers=headers)
+        # send_raw_request raises connection errors and timeouts as they are
+        except (CLIError, requests.RequestException) as e:
+            if not _is_retriable(e) or attempt == ARM_REQUEST_MAX_RETRIES - 1:
+                raise
+            delay = _get_retry_delay(e, attempt)
+            logger.info("%s %s failed, retrying in %.1f seconds: %s", method, url, delay, e)
+            time.sleep(delay)
+
+
+def run_in_parallel(*tasks):
+    """Runs the given functions concurrently and returns their results in the same order.
+    The first error raised by any of them is raised once all of them are done."""
+    with ThreadPoolExecutor(max_workers=min(len(tasks), MAX_PARALLEL_ARM_REQUESTS) or 1) as executor:
+        futures = [executor.submit(task) for task in tasks]
+    return [future.result() for future in futures]
+
+
+class SharedLookups:
+    """Results of the lookups shared by the clusters enabled in the same call, such as their workspace and its
+    recording rules. Each lookup runs once per key, even when several clusters request it at the same time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._results = {}
+
+    def get(self, key, lookup):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._results:
+                self._results[key] = lookup()
+            return self._results[key]
+
+
 def post_request(cmd, subscription_id, rp_name, headers):
     from azure.cli.core.util import send_raw_request
     armendpoint = cmd.cli_ctx.cloud.endpoints.resource_manager
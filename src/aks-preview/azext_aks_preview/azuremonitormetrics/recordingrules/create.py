@@ -2,25 +2,24 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import functools
 import json
 from azext_aks_preview.azuremonitormetrics.constants import ALERTS_API, RULES_API
-from knack.util import CLIError
+from azext_aks_preview.azuremonitormetrics.helper import run_in_parallel, send_arm_request
 
 
 # pylint: disable=line-too-long
 def get_recording_rules_template(cmd, azure_monitor_workspace_resource_id):
-    from azure.cli.core.util import send_raw_request
-    headers = ['User-Agent=azuremonitormetrics.get_recording_rules_template']
     armendpoint = cmd.cli_ctx.cloud.endpoints.resource_manager
     url = f"{armendpoint}{azure_monitor_workspace_resource_id}/providers/microsoft.alertsManagement/alertRuleRecommendations?api-version={ALERTS_API}"
-    r = send_raw_request(cmd.cli_ctx, "GET", url, headers=headers)
+    headers = ['User-Agent=azuremonitormetrics.get_recording_rules_template']
+    r = send_arm_request(cmd, "GET", url, headers=headers)
     data = json.loads(r.text)
     return data['value']
 
 
 # pylint: disable=line-too-long
 def put_rules(cmd, default_rule_group_id, default_rule_group_name, mac_region, azure_monitor_workspace_resource_id, cluster_name, default_rules_template, url, enable_rules, i):
-    from azure.cli.core.util import send_raw_request
     body = json.dumps({
         "id": default_rule_group_id,
         "name": default_rule_group_name,
@@ -36,76 +35,44 @@ def put_rules(cmd, default_rule_group_id, default_rule_group_name, mac_region, a
             "rules": default_rules_template[i]["properties"]["rulesArmTemplate"]["resources"][0]["properties"]["rules"]
         }
     })
-    for _ in range(3):
-        try:
-            headers = ['User-Agent=azuremonitormetrics.put_rules.' + default_rule_group_name]
-            send_raw_request(cmd.cli_ctx, "PUT", url,
-                             body=body, headers=headers)
-            break
-        except CLIError as e:
-            error = e
-    else:
-        raise error
+    headers = ['User-Agent=azuremonitormetrics.put_rules.' + default_rule_group_name]
+    send_arm_request(cmd, "PUT", url, body=body, headers=headers)
 
 
 # pylint: disable=line-too-long
-def create_rules(cmd, cluster_subscription, cluster_resource_group_name, cluster_name, azure_monitor_workspace_resource_id, mac_region, raw_parameters):
+def create_rules(cmd, cluster_subscription, cluster_resource_group_name, cluster_name, azure_monitor_workspace_resource_id, mac_region, raw_parameters, lookups=None):
     # with urllib.request.urlopen("https://defaultrulessc.blob.core.windows.net/defaultrules/ManagedPrometheusDefaultRecordingRules.json") as url:
     #     default_rules_template = json.loads(url.read().decode())
-    default_rules_template = get_recording_rules_template(cmd, azure_monitor_workspace_resource_id)
-    default_rule_group_name = "NodeRecordingRulesRuleGroup-{0}".format(cluster_name)
-    default_rule_group_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.AlertsManagement/prometheusRuleGroups/{2}".format(
-        cluster_subscription,
-        cluster_resource_group_name,
-        default_rule_group_name
-    )
-    url = "{0}{1}?api-version={2}".format(
-        cmd.cli_ctx.cloud.endpoints.resource_manager,
-        default_rule_group_id,
-        RULES_API
-    )
-    put_rules(cmd, default_rule_group_id, default_rule_group_name, mac_region, azure_monitor_workspace_resource_id, cluster_name, default_rules_template, url, True, 0)
-
-    default_rule_group_name = "KubernetesRecordingRulesRuleGroup-{0}".format(cluster_name)
-    default_rule_group_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.AlertsManagement/prometheusRuleGroups/{2}".format(
-        cluster_subscription,
-        cluster_resource_group_name,
-        default_rule_group_name
-    )
-    url = "{0}{1}?api-version={2}".format(
-        cmd.cli_ctx.cloud.endpoints.resource_manager,
-        default_rule_group_id,
-        RULES_API
-    )
-    put_rules(cmd, default_rule_group_id, default_rule_group_name, mac_region, azure_monitor_workspace_resource_id, cluster_name, default_rules_template, url, True, 1)
+    if lookups:
+        # the recommended rules only depend on the workspace, so clusters enabled in the same call share them
+        default_rules_template = lookups.get(("recording_rules_template", azure_monitor_workspace_resource_id),
+                                             lambda: get_recording_rules_template(cmd, azure_monitor_workspace_resource_id))
+    else:
+        default_rules_template = get_recording_rules_template(cmd, azure_monitor_workspace_resource_id)
 
     enable_windows_recording_rules = raw_parameters.get("enable_windows_recording_rules")
 
     if enable_windows_recording_rules is not True:
         enable_windows_recording_rules = False
 
-    default_rule_group_name = "NodeRecordingRulesRuleGroup-Win-{0}".format(cluster_name)
-    default_rule_group_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.AlertsManagement/prometheusRuleGroups/{2}".format(
-        cluster_subscription,
-        cluster_resource_group_name,
-        default_rule_group_name
-    )
-    url = "{0}{1}?api-version={2}".format(
-        cmd.cli_ctx.cloud.endpoints.resource_manager,
-        default_rule_group_id,
-        RULES_API
-    )
-    put_rules(cmd, default_rule_group_id, default_rule_group_name, mac_region, azure_monitor_workspace_resource_id, cluster_name, default_rules_template, url, enable_windows_recording_rules, 2)
-
-    default_rule_group_name = "NodeAndKubernetesRecordingRulesRuleGroup-Win-{0}".format(cluster_name)
-    default_rule_group_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.AlertsManagement/prometheusRuleGroups/{2}".format(
-        cluster_subscription,
-        cluster_resource_group_name,
-        default_rule_group_name
-    )
-    url = "{0}{1}?api-version={2}".format(
-        cmd.cli_ctx.cloud.endpoints.resource_manager,
-        default_rule_group_id,
-        RULES_API
-    )
-    put_rules(cmd, default_rule_group_id, default_rule_group_name, mac_region, azure_monitor_workspace_resource_id, cluster_name, default_rules_template, url, enable_windows_recording_rules, 3)
+    rule_groups = [
+        ("NodeRecordingRulesRuleGroup-{0}".format(cluster_name), True),
+        ("KubernetesRecordingRulesRuleGroup-{0}".format(cluster_name), True),
+        ("NodeRecordingRulesRuleGroup-Win-{0}".format(cluster_name), enable_windows_recording_rules),
+        ("NodeAndKubernetesRecordingRulesRuleGroup-Win-{0}".format(cluster_name), enable_windows_recording_rules),
+    ]
+    tasks = []
+    for i, (default_rule_group_name, enable_rules) in enumerate(rule_groups):
+        default_rule_group_id = "/subscriptions/{0}/resourceGroups/{1}/providers/Microsoft.AlertsManagement/prometheusRuleGroups/{2}".format(
+            cluster_subscription,
+            cluster_resource_group_name,
+            default_rule_group_name
+        )
+        url = "{0}{1}?api-version={2}".format(
+            cmd.cli_ctx.cloud.endpoints.resource_manager,
+            default_rule_group_id,
+            RULES_API
+        )
+        tasks.append(functools.partial(put_rules, cmd, default_rule_group_id, default_rule_group_name, mac_region, azure_monitor_workspace_resource_id, cluster_name, default_rules_template, url, enable_rules, i))
+    # the rule groups are independent resources, so they're created concurrently
+    run_in_parallel(*tasks)
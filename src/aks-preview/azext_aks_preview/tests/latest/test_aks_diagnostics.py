@@ -3,7 +3,12 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import io
+import json
+import queue
 import unittest
+from unittest import mock
+
 import azext_aks_preview.aks_diagnostics as commands
 
 
@@ -27,5 +32,47 @@ class TestGenerateContainerName(unittest.TestCase):
         self.assertEqual(expected_container_name, trim_container_name)
 
 
+class TestWatchDiagnostics(unittest.TestCase):
+    def _apd(self, node_name, network_config=None):
+        apd = {"kind": "Diagnostic", "metadata": {"name": "aks-periscope-diagnostic-" + node_name}, "spec": {}}
+        if network_config:
+            apd["spec"] = {"networkconfig": network_config, "networkoutbound": '[{"Status": "Connected"}]'}
+        return apd
+
+    def test_read_json_stream(self):
+        stream = io.StringIO(json.dumps(self._apd("node1"), indent=4) + "\n" +
+                             json.dumps({"kind": "List", "items": [self._apd("node2")]}, indent=4) + "\n")
+        events = queue.Queue()
+        commands._read_json_stream(stream, events)
+        self.assertEqual(events.get_nowait()["metadata"]["name"], "aks-periscope-diagnostic-node1")
+        self.assertEqual(events.get_nowait()["metadata"]["name"], "aks-periscope-diagnostic-node2")
+        self.assertIsNone(events.get_nowait())
+
+    @mock.patch("azext_aks_preview.aks_diagnostics.subprocess.check_output")
+    @mock.patch("azext_aks_preview.aks_diagnostics.subprocess.Popen")
+    @mock.patch("azext_aks_preview.aks_diagnostics.which", return_value="kubectl")
+    def test_display_diagnostics_report_waits_for_results(self, _, mock_popen, mock_check_output):
+        mock_check_output.return_value = "node1   Ready   agent\nnode2   Ready   agent\n"
+        updates = [self._apd("node1"), self._apd("node2", '{"Hostname": "node2"}'),
+                   self._apd("node1", '{"Hostname": "node1"}'), self._apd("node3", '{"Hostname": "node3"}')]
+        process = mock_popen.return_value
+        process.stdout = io.StringIO("".join(json.dumps(apd, indent=4) + "\n" for apd in updates))
+        process.poll.return_value = None
+
+        with mock.patch("builtins.print") as mock_print:
+            commands._display_diagnostics_report("kubeconfig")
+
+        # a single watch is used for all the nodes, and stopped once every node has its results
+        mock_popen.assert_called_once()
+        self.assertIn("--watch", mock_popen.call_args[0][0])
+        process.terminate.assert_called_once()
+        output = "\n".join(str(arg) for call in mock_print.call_args_list for arg in call[0])
+        # results are shown in the order they arrive
+        self.assertLess(output.index("node2"), output.index("(1/2)"))
+        self.assertLess(output.index("(1/2)"), output.index("node1"))
+        self.assertLess(output.index("node1"), output.index("(2/2)"))
+        self.assertNotIn("node3", output)
+
+
 if __name__ == "__main__":
     unittest.main()
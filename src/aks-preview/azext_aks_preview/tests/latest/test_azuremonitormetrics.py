@@ -0,0 +1,142 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from azure.cli.core.azclierror import HTTPError
+from azext_aks_preview.azuremonitormetrics import azuremonitorprofile, helper
+from azext_aks_preview.azuremonitormetrics.recordingrules import create
+
+
+def _http_error(status_code, headers=None):
+    response = mock.Mock(status_code=status_code, headers=headers or {})
+    return HTTPError("error", response)
+
+
+class TestSendArmRequest(unittest.TestCase):
+    def setUp(self):
+        self.cmd = mock.Mock()
+
+    @mock.patch("azext_aks_preview.azuremonitormetrics.helper.time.sleep")
+    @mock.patch("azure.cli.core.util.send_raw_request")
+    def test_retries_throttled_and_conflicting_requests(self, mock_send, mock_sleep):
+        mock_send.side_effect = [_http_error(429, {"Retry-After": "7"}), _http_error(409), "response"]
+
+        self.assertEqual(helper.send_arm_request(self.cmd, "PUT", "https://arm/resource", body="{}"), "response")
+
+        self.assertEqual(mock_send.call_count, 3)
+        # the Retry-After header is honored, and the backoff is used otherwise
+        self.assertEqual(mock_sleep.call_args_list[0], mock.call(7.0))
+        self.assertLessEqual(mock_sleep.call_args_list[1][0][0], 2 * helper.ARM_REQUEST_RETRY_BASE_DELAY_IN_SECONDS)
+
+    @mock.patch("azext_aks_preview.azuremonitormetrics.helper.time.sleep")
+    @mock.patch("azure.cli.core.util.send_raw_request")
+    def test_retries_connection_failures(self, mock_send, mock_sleep):
+        mock_send.side_effect = [requests.ConnectionError("reset"), requests.Timeout("timeout"), "response"]
+
+        self.assertEqual(helper.send_arm_request(self.cmd, "GET", "https://arm/resource"), "response")
+
+        self.assertEqual(mock_send.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @mock.patch("azext_aks_preview.azuremonitormetrics.helper.time.sleep")
+    @mock.patch("azure.cli.core.util.send_raw_request")
+    def test_does_not_retry_client_errors(self, mock_send, mock_sleep):
+        mock_send.side_effect = _http_error(400)
+
+        self.assertRaises(HTTPError, helper.send_arm_request, self.cmd, "PUT", "https://arm/resource")
+
+        mock_send.assert_called_once()
+        mock_sleep.assert_not_called()
+
+
+class TestCreateRules(unittest.TestCase):
+    @mock.patch("azure.cli.core.util.send_raw_request")
+    def test_rule_groups_are_created_concurrently(self, mock_send):
+        cmd = mock.Mock()
+        cmd.cli_ctx.cloud.endpoints.resource_manager = "https://arm"
+        template = [{"properties": {"rulesArmTemplate": {"resources": [{"properties": {"rules": [i]}}]}}}
+                    for i in range(4)]
+        all_puts_started = threading.Barrier(4, timeout=10)
+
+        def send_raw_request(cli_ctx, method, url, body=None, headers=None):
+            if method == "GET":
+                return mock.Mock(text=json.dumps({"value": template}))
+            # fails unless the four rule groups are created at the same time
+            all_puts_started.wait()
+            return mock.Mock()
+        mock_send.side_effect = send_raw_request
+
+        create.create_rules(cmd, "sub", "rg", "cluster", "/subscriptions/sub/amw-for-rules-test", "eastus",
+                            {"enable_windows_recording_rules": True})
+
+        methods = [call[0][1] for call in mock_send.call_args_list]
+        self.assertEqual(methods.count("GET"), 1)
+        self.assertEqual(methods.count("PUT"), 4)
+        bodies = [json.loads(call[1]["body"]) for call in mock_send.call_args_list if call[0][1] == "PUT"]
+        self.assertEqual(sorted(body["properties"]["rules"][0] for body in bodies), [0, 1, 2, 3])
+
+
+class TestEnsureAzureMonitorProfilePrerequisitesForClusters(unittest.TestCase):
+    @mock.patch("azext_aks_preview.azuremonitormetrics.recordingrules.create.send_arm_request")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.recordingrules.create.get_recording_rules_template")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.amw.helper.create_default_mac")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.link_grafana_instance")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.create_dcra")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.create_dcr")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.create_dce")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.rp_registrations")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.check_azuremonitormetrics_profile")
+    def test_clusters_share_the_workspace_lookups(self, mock_check, mock_rp_registrations, mock_dce, mock_dcr,
+                                                  mock_dcra, mock_link_grafana, mock_default_mac, mock_template,
+                                                  mock_put):
+        cmd = mock.Mock()
+        cmd.cli_ctx.cloud.name = "AzureCloud"
+        cmd.cli_ctx.cloud.endpoints.resource_manager = "https://arm"
+        mock_default_mac.return_value = ("/subscriptions/sub/amw", "EastUS")
+        mock_template.return_value = [{"properties": {"rulesArmTemplate": {"resources": [{"properties": {"rules": []}}]}}}] * 4
+        clusters = [("sub", "rg", "cluster1", "eastus"), ("sub", "rg", "cluster2", "eastus")]
+
+        azuremonitorprofile.ensure_azure_monitor_profile_prerequisites_for_clusters(cmd, clusters, {})
+
+        self.assertEqual(mock_check.call_count, 2)
+        mock_rp_registrations.assert_called_once_with(cmd, "sub")
+        mock_default_mac.assert_called_once_with(cmd, "sub", "eastus")
+        mock_template.assert_called_once_with(cmd, "/subscriptions/sub/amw")
+        mock_link_grafana.assert_called_once()
+        # the data collection objects and the recording rules are still set up for every cluster
+        self.assertEqual(sorted(call[0][3] for call in mock_dce.call_args_list), ["cluster1", "cluster2"])
+        self.assertEqual(mock_dcra.call_count, 2)
+        self.assertEqual(mock_put.call_count, 8)
+        self.assertEqual(mock_dce.call_args[0][4], "eastus")
+
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.link_azure_monitor_profile_artifacts")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.rp_registrations")
+    @mock.patch("azext_aks_preview.azuremonitormetrics.azuremonitorprofile.check_azuremonitormetrics_profile")
+    def test_first_error_is_raised_after_all_clusters(self, mock_check, mock_rp_registrations, mock_link):
+        cmd = mock.Mock()
+        cmd.cli_ctx.cloud.name = "AzureCloud"
+        mock_link.side_effect = lambda cmd, sub, rg, name, *args: self._fail_for(name, "cluster1")
+        clusters = [("sub1", "rg", "cluster1", "eastus"), ("sub2", "rg", "cluster2", "eastus")]
+
+        with self.assertRaisesRegex(ValueError, "cluster1"):
+            azuremonitorprofile.ensure_azure_monitor_profile_prerequisites_for_clusters(cmd, clusters, {})
+
+        self.assertEqual(mock_link.call_count, 2)
+        self.assertEqual(sorted(call[0][1] for call in mock_rp_registrations.call_args_list), ["sub1", "sub2"])
+
+    @staticmethod
+    def _fail_for(name, failing_name):
+        if name == failing_name:
+            raise ValueError(name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,13 +4,13 @@
 # --------------------------------------------------------------------------------------------
 
 import os
-import re
 import json
 import shlex
 import hashlib
 from collections import defaultdict
 
 from knack.log import get_logger
+from knack.util import CLIError
 
 import azext_alias
 from azext_alias import telemetry
@@ -19,23 +19,29 @@ from azext_alias._const import (
     ALIAS_FILE_NAME,
     ALIAS_HASH_FILE_NAME,
     COLLIDED_ALIAS_FILE_NAME,
+    RESERVED_COMMAND_INDEX_FILE_NAME,
+    ALIAS_SNAPSHOT_FILE_NAME,
     CONFIG_PARSING_ERROR,
     DEBUG_MSG,
     COLLISION_CHECK_LEVEL_DEPTH,
     POS_ARG_DEBUG_MSG
 )
-from azext_alias.argument import build_pos_args_table, render_template
+from azext_alias.argument import build_pos_args_table, render_template, get_placeholders
 from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
     get_config_parser,
-    build_tab_completion_table
+    build_tab_completion_table,
+    build_reserved_command_index,
+    get_command_table_fingerprint
 )
 
 
 GLOBAL_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_FILE_NAME)
 GLOBAL_ALIAS_HASH_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_HASH_FILE_NAME)
 GLOBAL_COLLIDED_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, COLLIDED_ALIAS_FILE_NAME)
+GLOBAL_RESERVED_COMMAND_INDEX_PATH = os.path.join(GLOBAL_CONFIG_DIR, RESERVED_COMMAND_INDEX_FILE_NAME)
+GLOBAL_ALIAS_SNAPSHOT_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_SNAPSHOT_FILE_NAME)
 
 logger = get_logger(__name__)
 
@@ -46,10 +52,39 @@ class AliasManager(object):
         self.alias_table = get_config_parser()
         self.kwargs = kwargs
         self.collided_alias = defaultdict(list)
+        self.reserved_command_index = None
         self.alias_config_str = ''
         self.alias_config_hash = ''
-        self.load_alias_table()
-        self.load_alias_hash()
+        self.compiled_alias_table = {}
+        # Skip parsing the alias config file if the compiled alias table from a previous run is still up-to-date
+        self.alias_snapshot_loaded = self.load_alias_snapshot()
+        if not self.alias_snapshot_loaded:
+            self.load_alias_table()
+            self.load_alias_hash()
+            self.compiled_alias_table = AliasManager.compile_alias_table(self.alias_table)
+
+    def load_alias_snapshot(self):
+        """
+        Load the compiled alias table and the collided aliases from the alias snapshot file,
+        if the alias config file has not been changed since the snapshot was written.
+
+        Returns:
+            True if the alias snapshot has been loaded.
+        """
+        try:
+            with open(GLOBAL_ALIAS_SNAPSHOT_PATH, 'r') as alias_snapshot_file:
+                alias_snapshot = json.loads(alias_snapshot_file.read())
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+        if alias_snapshot.get('fingerprint') != AliasManager.get_alias_config_fingerprint():
+            return False
+
+        self.compiled_alias_table = alias_snapshot['aliases']
+        self.collided_alias = alias_snapshot['collided_alias']
+        self.alias_config_hash = alias_snapshot['hash']
+        telemetry.set_number_of_aliases_registered(len(self.compiled_alias_table))
+        return True
 
     def load_alias_table(self):
         """
@@ -123,12 +158,14 @@ class AliasManager(object):
             AliasManager.write_alias_config_hash(empty_hash=True)
             return args
 
-        # Only load the entire command table if it detects changes in the alias config
-        if self.detect_alias_config_change():
+        # Only load the entire command table if it detects changes in the alias config,
+        # the collided aliases are part of the alias snapshot
+        if not self.alias_snapshot_loaded and self.detect_alias_config_change():
             self.load_full_command_table()
-            self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
+            self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections(),
+                                                                     reserved_command_index=self.reserved_command_index)
             build_tab_completion_table(self.alias_table)
-        else:
+        elif not self.alias_snapshot_loaded:
             self.load_collided_alias()
 
         transformed_commands = []
@@ -145,15 +182,16 @@ class AliasManager(object):
                 continue
 
             full_alias = self.get_full_alias(alias)
+            compiled_alias = self.compiled_alias_table.get(full_alias)
 
-            if self.alias_table.has_option(full_alias, 'command'):
-                cmd_derived_from_alias = self.alias_table.get(full_alias, 'command')
+            if compiled_alias and compiled_alias['command'] is not None:
+                cmd_derived_from_alias = compiled_alias['command']
                 telemetry.set_alias_hit(full_alias)
             else:
                 transformed_commands.append(alias)
                 continue
 
-            pos_args_table = build_pos_args_table(full_alias, args, alias_index)
+            pos_args_table = build_pos_args_table(full_alias, args, alias_index, compiled_alias['placeholders'])
             if pos_args_table:
                 logger.debug(POS_ARG_DEBUG_MSG, full_alias, cmd_derived_from_alias, pos_args_table)
                 transformed_commands += render_template(cmd_derived_from_alias, pos_args_table)
@@ -163,7 +201,10 @@ class AliasManager(object):
                     next(alias_iter)
             else:
                 logger.debug(DEBUG_MSG, full_alias, cmd_derived_from_alias)
-                transformed_commands += shlex.split(cmd_derived_from_alias)
+                if compiled_alias['tokens'] is not None:
+                    transformed_commands += compiled_alias['tokens']
+                else:
+                    transformed_commands += shlex.split(cmd_derived_from_alias)
 
         return self.post_transform(transformed_commands)
 
@@ -177,18 +218,32 @@ class AliasManager(object):
         Returns:
             The full alias (with the placeholders, if any).
         """
-        if query in self.alias_table.sections():
+        if query in self.compiled_alias_table:
             return query
 
-        return next((section for section in self.alias_table.sections() if section.split()[0] == query), '')
+        return next((alias for alias in self.compiled_alias_table if alias.split()[0] == query), '')
 
     def load_full_command_table(self):
         """
-        Perform a full load of the command table to get all the reserved command words.
+        Get all the reserved command words. The reserved command index persisted by a previous run is reused
+        as long as the installed CLI and extensions have not changed; otherwise, perform a full load of the
+        command table and persist a new index.
         """
+        fingerprint = get_command_table_fingerprint()
+        reserved_command_index = AliasManager.load_reserved_command_index(fingerprint)
+        if reserved_command_index:
+            if not azext_alias.cached_reserved_commands:
+                azext_alias.cached_reserved_commands = reserved_command_index['commands']
+            self.reserved_command_index = reserved_command_index['levels']
+            return
+
         load_cmd_tbl_func = self.kwargs.get('load_cmd_tbl_func', lambda _: {})
         cache_reserved_commands(load_cmd_tbl_func)
         telemetry.set_full_command_table_loaded()
+        self.reserved_command_index = build_reserved_command_index(azext_alias.cached_reserved_commands)
+        if azext_alias.cached_reserved_commands:
+            AliasManager.write_reserved_command_index(fingerprint, azext_alias.cached_reserved_commands,
+                                                      self.reserved_command_index)
 
     def post_transform(self, args):
         """
@@ -208,8 +263,11 @@ class AliasManager(object):
             else:
                 post_transform_commands.append(os.path.expandvars(arg))
 
-        AliasManager.write_alias_config_hash(self.alias_config_hash)
-        AliasManager.write_collided_alias(self.collided_alias)
+        # Nothing has changed since the alias snapshot was written
+        if not self.alias_snapshot_loaded:
+            AliasManager.write_alias_config_hash(self.alias_config_hash)
+            AliasManager.write_collided_alias(self.collided_alias)
+            AliasManager.write_alias_snapshot(self.compiled_alias_table, self.collided_alias, self.alias_config_hash)
 
         return post_transform_commands
 
@@ -226,7 +284,7 @@ class AliasManager(object):
         return not self.alias_table.sections() and self.alias_config_str
 
     @staticmethod
-    def build_collision_table(aliases, levels=COLLISION_CHECK_LEVEL_DEPTH):
+    def build_collision_table(aliases, levels=COLLISION_CHECK_LEVEL_DEPTH, reserved_command_index=None):
         """
         Build the collision table according to the alias configuration file against the entire command table.
 
@@ -244,21 +302,91 @@ class AliasManager(object):
 
         Args:
             levels: the amount of levels we tranverse through the command table tree.
+            reserved_command_index: the reserved command index (see build_reserved_command_index in util.py).
+                Built from the cached reserved commands if not provided.
         """
+        if reserved_command_index is None:
+            reserved_command_index = build_reserved_command_index(azext_alias.cached_reserved_commands, levels)
+
         collided_alias = defaultdict(list)
         for alias in aliases:
             # Only care about the first word in the alias because alias
             # cannot have spaces (unless they have positional arguments)
             word = alias.split()[0]
-            for level in range(1, levels + 1):
-                collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
-                if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
-                        and level not in collided_alias[word]:
+            for level in reserved_command_index.get(word.lower(), []):
+                if level <= levels and level not in collided_alias[word]:
                     collided_alias[word].append(level)
 
         telemetry.set_collided_aliases(list(collided_alias.keys()))
         return collided_alias
 
+    @staticmethod
+    def compile_alias_table(alias_table):
+        """
+        Compile the alias table into a dictionary that can be stored in the alias snapshot file.
+        Alias commands without positional arguments are tokenized ahead of time.
+
+        For example:
+        {
+            'ac': {'command': 'account', 'placeholders': [], 'tokens': ['account']},
+            'grp {{ 0 }}': {'command': 'group show -n {{ 0 }}', 'placeholders': ['_0'], 'tokens': None}
+        }
+
+        Args:
+            alias_table: The alias table to compile.
+
+        Returns:
+            The compiled alias table.
+        """
+        compiled_alias_table = {}
+        for alias in alias_table.sections():
+            command = alias_table.get(alias, 'command') if alias_table.has_option(alias, 'command') else None
+            # Malformed aliases are left to transform() so that their errors surface only when they are used
+            try:
+                placeholders = get_placeholders(alias, check_duplicates=True)
+            except CLIError:
+                placeholders = None
+            try:
+                tokens = shlex.split(command) if command is not None and placeholders == [] else None
+            except ValueError:
+                tokens = None
+            compiled_alias_table[alias] = {'command': command, 'placeholders': placeholders, 'tokens': tokens}
+        return compiled_alias_table
+
+    @staticmethod
+    def get_alias_config_fingerprint():
+        """
+        Get the sizes and modification times of the alias config file and the alias hash file,
+        which change whenever the alias configuration is modified.
+        """
+        fingerprint = []
+        for path in [GLOBAL_ALIAS_PATH, GLOBAL_ALIAS_HASH_PATH]:
+            try:
+                stat = os.stat(path)
+                fingerprint.append([stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                fingerprint.append(None)
+        return fingerprint
+
+    @staticmethod
+    def write_alias_snapshot(compiled_alias_table, collided_alias, alias_config_hash):
+        """
+        Write the compiled alias table and the collided aliases into the alias snapshot file.
+        """
+        temp_path = '{}.{}.tmp'.format(GLOBAL_ALIAS_SNAPSHOT_PATH, os.getpid())
+        try:
+            with open(temp_path, 'w') as alias_snapshot_file:
+                alias_snapshot_file.write(json.dumps({
+                    'fingerprint': AliasManager.get_alias_config_fingerprint(),
+                    'hash': alias_config_hash,
+                    'aliases': compiled_alias_table,
+                    'collided_alias': collided_alias
+                }))
+            os.replace(temp_path, GLOBAL_ALIAS_SNAPSHOT_PATH)
+        except OSError as exception:
+            # The snapshot is only an optimization, the next run will parse the alias config file again
+            logger.debug('Alias Manager: Failed to write the alias snapshot: %s', exception)
+
     @staticmethod
     def write_alias_config_hash(alias_config_hash='', empty_hash=False):
         """
@@ -282,6 +410,41 @@ class AliasManager(object):
             collided_alias_file.truncate()
             collided_alias_file.write(json.dumps(collided_alias_dict))
 
+    @staticmethod
+    def load_reserved_command_index(fingerprint):
+        """
+        Load the reserved command index persisted by a previous run.
+
+        Args:
+            fingerprint: The fingerprint of the installed CLI and extensions.
+
+        Returns:
+            A dictionary with the reserved commands and their index, or None if there is no index
+            for the given fingerprint.
+        """
+        try:
+            with open(GLOBAL_RESERVED_COMMAND_INDEX_PATH, 'r') as reserved_command_index_file:
+                reserved_command_index = json.loads(reserved_command_index_file.read())
+        except Exception:  # pylint: disable=broad-except
+            return None
+        if reserved_command_index.get('fingerprint') != fingerprint:
+            return None
+        return reserved_command_index
+
+    @staticmethod
+    def write_reserved_command_index(fingerprint, reserved_commands, reserved_command_index):
+        """
+        Write the reserved commands and their index into the reserved command index file.
+        """
+        temp_path = '{}.{}.tmp'.format(GLOBAL_RESERVED_COMMAND_INDEX_PATH, os.getpid())
+        with open(temp_path, 'w') as reserved_command_index_file:
+            reserved_command_index_file.write(json.dumps({
+                'fingerprint': fingerprint,
+                'commands': reserved_commands,
+                'levels': reserved_command_index
+            }))
+        os.replace(temp_path, GLOBAL_RESERVED_COMMAND_INDEX_PATH)
+
     @staticmethod
     def process_exception_message(exception):
         """
@@ -8,6 +8,8 @@
 import os
 import sys
 import shlex
+import shutil
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 from six.moves import configparser
@@ -150,11 +152,18 @@ class TestAlias(unittest.TestCase):
     def setUp(self):
         azext_alias.alias.AliasManager.write_alias_config_hash = Mock()
         azext_alias.alias.AliasManager.write_collided_alias = Mock()
-        self.patcher = patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS)
-        self.patcher.start()
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.patchers = []
+        self.patchers.append(patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS))
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_RESERVED_COMMAND_INDEX_PATH', os.path.join(self.mock_config_dir, 'alias_reserved_command_index')))
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_SNAPSHOT_PATH', os.path.join(self.mock_config_dir, 'alias_snapshot')))
+        for patcher in self.patchers:
+            patcher.start()
 
     def tearDown(self):
-        self.patcher.stop()
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
 
     def test_build_empty_collision_table(self):
         alias_manager = self.get_alias_manager(DEFAULT_MOCK_ALIAS_STRING)
@@ -166,6 +175,33 @@ class TestAlias(unittest.TestCase):
         test_case = azext_alias.alias.AliasManager.build_collision_table(alias_manager.alias_table.sections(), levels=2)
         self.assertDictEqual({'account': [1, 2], 'dns': [2], 'list-locations': [2]}, test_case)
 
+    def test_build_collision_table_with_index(self):
+        alias_manager = self.get_alias_manager(COLLISION_MOCK_ALIAS_STRING)
+        reserved_command_index = {'account': [1, 3], 'dns': [2]}
+        test_case = azext_alias.alias.AliasManager.build_collision_table(alias_manager.alias_table.sections(), levels=2, reserved_command_index=reserved_command_index)
+        self.assertDictEqual({'account': [1], 'dns': [2]}, test_case)
+
+    @patch('azext_alias.alias.get_command_table_fingerprint', Mock(return_value='fingerprint'))
+    def test_load_full_command_table_reuses_index(self):
+        load_cmd_tbl_func = Mock(return_value={command: None for command in TEST_RESERVED_COMMANDS})
+        with patch('azext_alias.cached_reserved_commands', []):
+            alias_manager = MockAliasManager(load_cmd_tbl_func=load_cmd_tbl_func)
+            alias_manager.load_full_command_table()
+            self.assertEqual(1, load_cmd_tbl_func.call_count)
+
+        with patch('azext_alias.cached_reserved_commands', []):
+            alias_manager = MockAliasManager(load_cmd_tbl_func=load_cmd_tbl_func)
+            alias_manager.load_full_command_table()
+            self.assertEqual(1, load_cmd_tbl_func.call_count)
+            self.assertEqual(TEST_RESERVED_COMMANDS, azext_alias.cached_reserved_commands)
+            self.assertEqual([1, 2], alias_manager.reserved_command_index['account'])
+
+        with patch('azext_alias.cached_reserved_commands', []), \
+                patch('azext_alias.alias.get_command_table_fingerprint', Mock(return_value='new-fingerprint')):
+            alias_manager = MockAliasManager(load_cmd_tbl_func=load_cmd_tbl_func)
+            alias_manager.load_full_command_table()
+            self.assertEqual(2, load_cmd_tbl_func.call_count)
+
     def test_non_parse_error(self):
         alias_manager = self.get_alias_manager()
         self.assertFalse(alias_manager.parse_error())
@@ -197,8 +233,59 @@ class TestAlias(unittest.TestCase):
         self.assertEqual(shlex.split(value[1]), alias_manager.post_transform(shlex.split(value[0])))
 
 
+class TestAliasSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.alias_path = os.path.join(self.mock_config_dir, 'alias')
+        self.patchers = []
+        for name in ['GLOBAL_ALIAS_PATH', 'GLOBAL_ALIAS_HASH_PATH', 'GLOBAL_COLLIDED_ALIAS_PATH', 'GLOBAL_RESERVED_COMMAND_INDEX_PATH', 'GLOBAL_ALIAS_SNAPSHOT_PATH']:
+            self.patchers.append(patch('azext_alias.alias.' + name, os.path.join(self.mock_config_dir, name.lower())))
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_PATH', self.alias_path))
+        self.patchers.append(patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, 'alias_tab_completion')))
+        self.patchers.append(patch('azext_alias.alias.get_command_table_fingerprint', Mock(return_value='fingerprint')))
+        self.patchers.append(patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS))
+        for patcher in self.patchers:
+            patcher.start()
+        with open(self.alias_path, 'w') as f:
+            f.write('[ac]\ncommand = account\n\n[grp {{ 0 }}]\ncommand = group show -n {{ 0 }}\n\n[account]\ncommand = group\n')
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def test_alias_snapshot(self):
+        alias_manager = azext_alias.alias.AliasManager()
+        self.assertFalse(alias_manager.alias_snapshot_loaded)
+        self.assertEqual(['account', 'list'], alias_manager.transform(['ac', 'list']))
+
+        alias_manager = azext_alias.alias.AliasManager()
+        self.assertTrue(alias_manager.alias_snapshot_loaded)
+        self.assertEqual([], alias_manager.alias_table.sections())
+        self.assertEqual(['account', 'list'], alias_manager.transform(['ac', 'list']))
+        self.assertEqual(['group', 'show', '-n', 'test-group'], alias_manager.transform(['grp', 'test-group']))
+        self.assertEqual(['account', 'list'], alias_manager.transform(['account', 'list']))
+
+        with open(self.alias_path, 'a') as f:
+            f.write('\n[ls]\ncommand = list\n')
+        alias_manager = azext_alias.alias.AliasManager()
+        self.assertFalse(alias_manager.alias_snapshot_loaded)
+        self.assertEqual(['account', 'list'], alias_manager.transform(['ac', 'ls']))
+
+    def test_compile_alias_table(self):
+        alias_table = configparser.ConfigParser(interpolation=None)
+        alias_table.read_string(DEFAULT_MOCK_ALIAS_STRING)
+        compiled_alias_table = azext_alias.alias.AliasManager.compile_alias_table(alias_table)
+        self.assertDictEqual({'command': 'list -otable', 'placeholders': [], 'tokens': ['list', '-otable']}, compiled_alias_table['ls'])
+        self.assertDictEqual({'command': 'iot {{ 0 }}test {{ 1 }}test', 'placeholders': ['_0', '_1'], 'tokens': None}, compiled_alias_table['pos-arg-1 {{ 0 }} {{ 1 }}'])
+
+
 class MockAliasManager(azext_alias.alias.AliasManager):
 
+    def load_alias_snapshot(self):
+        return False
+
     def load_alias_table(self):
 
         self.alias_config_str = self.kwargs.get('mock_alias_str', '')
@@ -11,7 +11,7 @@ import tempfile
 import unittest
 from unittest import mock
 
-from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser
+from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser, build_reserved_command_index
 from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME
 from azext_alias.tests._const import TEST_RESERVED_COMMANDS
 
@@ -61,6 +61,19 @@ class TestUtil(unittest.TestCase):
             'account list-locations': ['']
         }, tab_completion_table)
 
+    def test_build_reserved_command_index(self):
+        self.assertDictEqual({
+            'account': [1, 2],
+            'list-locations': [2],
+            'network': [1],
+            'dns': [2],
+            'storage': [1],
+            'create': [3],
+            'group': [1],
+            'delete': [2]
+        }, build_reserved_command_index(TEST_RESERVED_COMMANDS))
+        self.assertDictEqual({'account': [1]}, build_reserved_command_index(['account list-locations'], levels=1))
+
 
 if __name__ == '__main__':
     unittest.main()
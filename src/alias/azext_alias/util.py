@@ -5,10 +5,12 @@
 
 # pylint: disable=wrong-import-order,import-error,relative-import
 
+import os
 import re
 import sys
 import json
 import shlex
+import hashlib
 from collections import defaultdict
 from six.moves import configparser
 from six.moves.urllib.parse import urlparse
@@ -79,6 +81,54 @@ def cache_reserved_commands(load_cmd_tbl_func):
         azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
 
 
+def build_reserved_command_index(reserved_commands, levels=COLLISION_CHECK_LEVEL_DEPTH):
+    """
+    Index the words of the reserved commands by the command levels they appear in, so that
+    collision checks become dictionary lookups instead of scans over the entire command table.
+
+    For example, ['account list', 'storage account create'] is indexed as:
+    {
+        "account": [1, 2],
+        "list": [2],
+        "storage": [1],
+        "create": [3]
+    }
+
+    Args:
+        reserved_commands: The list of reserved commands.
+        levels: The amount of levels to index.
+
+    Returns:
+        The reserved command index.
+    """
+    reserved_command_index = defaultdict(set)
+    for reserved_command in reserved_commands:
+        for level, word in enumerate(reserved_command.lower().split()[:levels], 1):
+            reserved_command_index[word].add(level)
+    return {word: sorted(word_levels) for word, word_levels in reserved_command_index.items()}
+
+
+def get_command_table_fingerprint():
+    """
+    Get a fingerprint of the installed CLI version and extensions. The fingerprint only changes
+    when the CLI is upgraded or an extension is added, removed or updated.
+
+    Returns:
+        The SHA1 hex digest of the installed CLI version and extension directories.
+    """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core.extension import EXTENSIONS_DIR, EXTENSIONS_SYS_DIR, DEV_EXTENSION_SOURCES
+
+    fingerprint = [core_version]
+    for extension_dir in [EXTENSIONS_DIR, EXTENSIONS_SYS_DIR] + list(DEV_EXTENSION_SOURCES or []):
+        if not os.path.isdir(extension_dir):
+            continue
+        for extension_name in sorted(os.listdir(extension_dir)):
+            extension_path = os.path.join(extension_dir, extension_name)
+            fingerprint.append('{}:{}'.format(extension_path, os.stat(extension_path).st_mtime))
+    return hashlib.sha1('\n'.join(fingerprint).encode('utf-8')).hexdigest()
+
+
 def remove_pos_arg_placeholders(alias_command):
     """
     Remove positional argument placeholders from alias_command.
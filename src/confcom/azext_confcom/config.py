@@ -203,3 +203,11 @@ SIGNALS = {
     "SIGSYS": 31,
     "SIGUNUSED": 31
 }
+
+# maximum number of images pulled or read from tarballs at the same time
+MAX_PARALLEL_IMAGE_PULLS = 4
+# memory set aside for each dmverity-vhd process hashing the layers of an image,
+# used to decide how many images can be hashed at the same time
+LAYER_HASH_MEMORY_BYTES = 2 * 1024 * 1024 * 1024
+# size of the on-disk cache of layer hashes kept between runs, about 200 bytes per layer
+LAYER_HASH_CACHE_MAX_SIZE_BYTES = 16 * 1024 * 1024
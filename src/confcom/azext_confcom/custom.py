@@ -106,11 +106,13 @@ def acipolicygen_confcom(
     if not isinstance(container_group_policies, list):
         container_group_policies = [container_group_policies]
 
-    for count, policy in enumerate(container_group_policies):
-        policy.populate_policy_content_for_all_images(
-            individual_image=bool(image_name), tar_mapping=tar_mapping
-        )
+    # pull and hash the images of all the container groups together, so that
+    # images shared between them are only processed once
+    security_policy.populate_policy_content_for_all_policies(
+        container_group_policies, individual_image=bool(image_name), tar_mapping=tar_mapping
+    )
 
+    for count, policy in enumerate(container_group_policies):
         if validate_sidecar:
             exit_code = validate_sidecar_in_policy(policy, output_type == security_policy.OutputType.PRETTY_PRINT)
         elif diff:
@@ -0,0 +1,135 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import List, Optional
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+_DIGEST_REGEX = re.compile(r"^sha256:[0-9a-f]{64}$")
+_ROOT_HASH_REGEX = re.compile(r"^[0-9a-f]{64}$")
+
+
+def get_default_cache_dir() -> str:
+    config_dir = os.getenv("AZURE_CONFIG_DIR") or os.path.expanduser(os.path.join("~", ".azure"))
+    return os.path.join(config_dir, "confcom", "layer_hashes")
+
+
+class LayerHashCache:
+    """dm-verity root hashes of image layers, kept on disk between runs.
+
+    Entries are keyed by the digest of the uncompressed layer (its diff id), so
+    images sharing base layers share their entries whatever their name or tag.
+    Every entry records the dmverity-vhd binary it was computed with and a
+    checksum of its content, and entries that don't match are ignored. The least
+    recently used entries are removed once the cache grows over max_size_bytes.
+    """
+
+    def __init__(self, cache_dir: str, tool_id: str, max_size_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.tool_id = tool_id
+        self.max_size_bytes = max_size_bytes
+
+    def get_layer_hashes(self, layer_digests: List[str]) -> Optional[List[str]]:
+        # only useful if every layer is cached, since dmverity-vhd hashes whole images
+        root_hashes = []
+        for layer_digest in layer_digests:
+            root_hash = self._load(layer_digest)
+            if root_hash is None:
+                return None
+            root_hashes.append(root_hash)
+        return root_hashes
+
+    def save_layer_hashes(self, layer_digests: List[str], root_hashes: List[str]) -> None:
+        if len(layer_digests) != len(root_hashes):
+            return
+        for layer_digest, root_hash in zip(layer_digests, root_hashes):
+            if _DIGEST_REGEX.match(layer_digest) and _ROOT_HASH_REGEX.match(root_hash):
+                self._save(layer_digest, root_hash)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total_size = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".json"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_size += stat.st_size
+        except OSError:
+            return
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def _get_entry_path(self, layer_digest: str) -> str:
+        return os.path.join(self.cache_dir, layer_digest.replace(":", "-") + ".json")
+
+    def _get_checksum(self, layer_digest: str, root_hash: str) -> str:
+        return hashlib.sha256(f"{self.tool_id}\n{layer_digest}\n{root_hash}".encode("utf-8")).hexdigest()
+
+    def _load(self, layer_digest: str) -> Optional[str]:
+        if not _DIGEST_REGEX.match(layer_digest):
+            return None
+        path = self._get_entry_path(layer_digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.info("Ignoring unreadable layer hash cache entry %s: %s", path, e)
+            return None
+
+        if not isinstance(entry, dict):
+            return None
+        root_hash = entry.get("rootHash")
+        if (
+            entry.get("tool") != self.tool_id
+            or not isinstance(root_hash, str)
+            or not _ROOT_HASH_REGEX.match(root_hash)
+            or entry.get("checksum") != self._get_checksum(layer_digest, root_hash)
+        ):
+            return None
+        try:
+            # mark the entry as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return root_hash
+
+    def _save(self, layer_digest: str, root_hash: str) -> None:
+        entry = {
+            "tool": self.tool_id,
+            "rootHash": root_hash,
+            "checksum": self._get_checksum(layer_digest, root_hash),
+        }
+        temp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self._get_entry_path(layer_digest))
+        except OSError as e:
+            logger.info("Could not save the layer hash of %s: %s", layer_digest, e)
+            if temp_path and os.path.isfile(temp_path):
+                os.remove(temp_path)
@@ -7,6 +7,7 @@ import base64
 import binascii
 import json
 import os
+from typing import Optional
 from tarfile import TarFile
 from azext_confcom.errors import (
     eprint,
@@ -87,6 +88,22 @@ def load_tar_mapping_from_file(path: str) -> dict:
     return raw_json
 
 
+def get_available_memory() -> Optional[int]:
+    # MemAvailable accounts for the page cache that can be reclaimed, which is
+    # what matters for processes we're about to start
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
 def map_image_from_tar(image_name: str, tar: TarFile, tar_location: str):
     tar_dir = os.path.dirname(tar_location)
     # grab all files in the folder and only take the one that's named with hex values and a json extension
@@ -129,5 +146,6 @@ def map_image_from_tar(image_name: str, tar: TarFile, tar_location: str):
     image_info = image_info_raw.get("config")
     # importing the constant from config.py gives a circular dependency error
     image_info["Architecture"] = image_info_raw.get("architecture")
+    image_info["RootFS"] = image_info_raw.get("rootfs")
 
     return image_info
@@ -14,6 +14,9 @@ import platform
 import requests
 from knack.log import get_logger
 from azext_confcom.errors import eprint
+from azext_confcom import config
+from azext_confcom import tool_cache
+from azext_confcom.layer_hash_cache import LayerHashCache, get_default_cache_dir
 
 
 host_os = platform.system()
@@ -30,8 +33,6 @@ class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
         dir_path = os.path.dirname(os.path.realpath(__file__))
 
         bin_folder = os.path.join(dir_path, "bin")
-        if not os.path.exists(bin_folder):
-            os.makedirs(bin_folder)
 
         # get the most recent release artifacts from github
         r = requests.get("https://api.github.com/repos/microsoft/hcsshim/releases")
@@ -47,13 +48,18 @@ class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
                         exe_flag = True
                     else:
                         bin_flag = True
-                    # get the download url for the dmverity-vhd file
+                    # get the download url and, for the releases that publish it, the digest of the file
                     exe_url = asset["browser_download_url"]
-                    # download the file
-                    r = requests.get(exe_url)
-                    # save the file to the bin folder
-                    with open(os.path.join(bin_folder, asset["name"]), "wb") as f:
-                        f.write(r.content)
+                    digest = asset.get("digest") or ""
+                    sha256 = digest[len("sha256:"):] if digest.startswith("sha256:") else None
+                    # download the file to the bin folder, unless this release of it is already there
+                    tool_cache.get_cached_tool(
+                        os.path.join(bin_folder, asset["name"]),
+                        release["tag_name"],
+                        lambda file_path, url=exe_url, sha256=sha256: tool_cache.download_file(
+                            url, file_path, sha256
+                        ),
+                    )
             if bin_flag and exe_flag:
                 break
 
@@ -87,14 +93,28 @@ class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
             st = os.stat(self.policy_bin)
             os.chmod(self.policy_bin, st.st_mode | stat.S_IXUSR)
 
+        # layer hashes from previous runs, only reused with the same binary
+        self.layer_hash_cache = LayerHashCache(
+            get_default_cache_dir(),
+            tool_cache.get_file_sha256(str(self.policy_bin)),
+            config.LAYER_HASH_CACHE_MAX_SIZE_BYTES,
+        )
+
     def get_policy_image_layers(
-        self, image: str, tag: str, tar_location: str = ""
+        self, image: str, tag: str, tar_location: str = "", layer_digests: List[str] = None
     ) -> List[str]:
         image_name = f"{image}:{tag}"
         # populate layer info
         if self.layer_cache.get(image_name):
             return self.layer_cache.get(image_name)
 
+        # skip hashing if all of the layers were hashed before, by this or another image
+        if layer_digests:
+            cached_layers = self.layer_hash_cache.get_layer_hashes(layer_digests)
+            if cached_layers is not None:
+                self.layer_cache[image_name] = cached_layers
+                return cached_layers
+
         policy_bin_str = str(self.policy_bin)
 
         arg_list = [
@@ -137,4 +157,6 @@ class SecurityPolicyProxy:  # pylint: disable=too-few-public-methods
 
         # cache output layers
         self.layer_cache[image_name] = output
+        if layer_digests:
+            self.layer_hash_cache.save_layer_hashes(layer_digests, output)
         return output
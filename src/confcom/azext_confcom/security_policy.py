@@ -3,9 +3,11 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import os
 import json
 import warnings
 import copy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, List, Dict, Tuple
 from enum import Enum, auto
 import docker
@@ -57,7 +59,6 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
         disable_stdio: bool = False,
     ) -> None:
         self._docker_client = None
-        self._rootfs_proxy = None
         self._policy_str = None
         self._policy_str_pp = None
         self._disable_stdio = disable_stdio
@@ -139,12 +140,6 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
 
         return self._docker_client
 
-    def _get_rootfs_proxy(self) -> SecurityPolicyProxy:
-        if not self._rootfs_proxy:
-            self._rootfs_proxy = SecurityPolicyProxy()
-
-        return self._rootfs_proxy
-
     def _close_docker_client(self) -> None:
         if self._docker_client:
             self._get_docker_client().close()
@@ -350,135 +345,95 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
             return pretty_print_func(policy)
         return print_func(policy)
 
-    # pylint: disable=R0914, R0915
     def populate_policy_content_for_all_images(
         self, individual_image=False, tar_mapping=None
     ) -> None:
-        # suppress warning which will break the progress bar
-        warnings.filterwarnings(
-            action="ignore", message="unclosed", category=ResourceWarning
+        populate_policy_content_for_all_policies(
+            [self], individual_image=individual_image, tar_mapping=tar_mapping
         )
 
-        tar_location = ""
-        if isinstance(tar_mapping, str):
-            tar_location = tar_mapping
-        proxy = self._get_rootfs_proxy()
-        container_images = self.get_images()
-
-        # total tasks to complete is number of images to pull and get layers
-        # (i.e. total images * 2 tasks)
-        _TOTAL = 2 * len(container_images)
-
-        with tqdm(
-            total=_TOTAL,
-            desc="Pulling and hashing images...",
-            unit="percent",
-            colour="green",
-            leave=True,
-        ) as progress:
-            # make a message queue so we don't interrupt the printing of the
-            # progress bar
-            message_queue = []
-            # populate regular container images(s)
-            for image in container_images:
-                image.parse_all_parameters_and_variables(AciPolicy.all_params, AciPolicy.all_vars)
-                image_name = f"{image.base}:{image.tag}"
-                image_info, tar = get_image_info(progress, message_queue, tar_mapping, image)
-
-                # verify and populate the working directory property
-                if not image.get_working_dir() and image_info:
-                    workingDir = image_info.get("WorkingDir")
-                    image.set_working_dir(
-                        workingDir if workingDir else config.DEFAULT_WORKING_DIR
-                    )
+    # pylint: disable=R0912, R0914, R0915
+    def _populate_image_from_image_info(
+        self, image: ContainerImage, image_info: Dict, individual_image: bool
+    ) -> None:
+        # verify and populate the working directory property
+        if not image.get_working_dir() and image_info:
+            workingDir = image_info.get("WorkingDir")
+            image.set_working_dir(
+                workingDir if workingDir else config.DEFAULT_WORKING_DIR
+            )
 
-                if (
-                    isinstance(image, UserContainerImage) or individual_image
-                ) and image_info:
-                    # verify and populate the startup command
-                    if not image.get_command():
-                        # precondition: image_info exists. this is shown by the
-                        # "and image_info" earlier
-                        command = image_info.get("Cmd")
-
-                        # since we don't have an entrypoint field,
-                        # it needs to be added to the front of the command
-                        # array
-                        entrypoint = image_info.get("Entrypoint")
-                        if entrypoint and command:
-                            command = entrypoint + command
-                        elif entrypoint and not command:
-                            command = entrypoint
-                        image.set_command(command)
-
-                    # merge envs for user container image
-                    envs = image_info.get("Env")
-                    env_names = [
-                        env_var[
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE
-                        ].split("=")[0]
-                        for env_var in image.get_environment_rules()
-                    ]
-
-                    for env in envs:
-                        name, value = env.split("=", 1)
-                        # when user set environment variables conflict with the ones read from image, always
-                        # keep user set environment variables
-                        if name not in env_names:
-                            image.get_environment_rules().append(
-                                {
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE: f"{name}={value}",
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_STRATEGY: "string",
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_REQUIRED: False,
-                                }
-                            )
-
-                    # merge signals for user container image
-                    signals = image_info.get("StopSignal")
-                    if signals:
-                        image.set_signals(signals)
-
-                    if (deepdiff.DeepDiff(image.get_user(), config.DEFAULT_USER, ignore_order=True) == {}
-                            and image_info.get("User") != ""):
-                        # valid values are in the form "user", "user:group", "uid", "uid:gid", "user:gid", "uid:group"
-                        # where each entry is either a string or an unsigned integer
-                        # "" means any user (use default)
-                        # TO-DO figure out why groups is a list
-                        user = copy.deepcopy(config.DEFAULT_USER)
-                        parts = image_info.get("User").split(":", 1)
-
-                        strategy = ["name", "name"]
-                        if parts[0].isdigit():
-                            strategy[0] = "id"
-                        user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_USER_IDNAME] = {
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[0],
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[0]
+        if (
+            isinstance(image, UserContainerImage) or individual_image
+        ) and image_info:
+            # verify and populate the startup command
+            if not image.get_command():
+                # precondition: image_info exists. this is shown by the
+                # "and image_info" earlier
+                command = image_info.get("Cmd")
+
+                # since we don't have an entrypoint field,
+                # it needs to be added to the front of the command
+                # array
+                entrypoint = image_info.get("Entrypoint")
+                if entrypoint and command:
+                    command = entrypoint + command
+                elif entrypoint and not command:
+                    command = entrypoint
+                image.set_command(command)
+
+            # merge envs for user container image
+            envs = image_info.get("Env")
+            env_names = [
+                env_var[
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE
+                ].split("=")[0]
+                for env_var in image.get_environment_rules()
+            ]
+
+            for env in envs:
+                name, value = env.split("=", 1)
+                # when user set environment variables conflict with the ones read from image, always
+                # keep user set environment variables
+                if name not in env_names:
+                    image.get_environment_rules().append(
+                        {
+                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE: f"{name}={value}",
+                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_STRATEGY: "string",
+                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_REQUIRED: False,
                         }
-                        if len(parts) == 2:
-                            # group also specified
-                            if parts[1].isdigit():
-                                strategy[1] = "id"
-                            user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_GROUP_IDNAMES][0] = {
-                                config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[1],
-                                config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[1]
-                            }
-                        image.set_user(user)
-
-                # populate tar location
-                if isinstance(tar_mapping, dict):
-                    tar_location = get_tar_location_from_mapping(tar_mapping, image_name)
-                # populate layer info
-                image.set_layers(proxy.get_policy_image_layers(
-                    image.base, image.tag, tar_location=tar_location if tar else ""
-                ))
-
-                progress.update()
-            progress.close()
-            self.close()
+                    )
 
-            # unload the message queue
-            for message in message_queue:
-                logger.warning(message)
+            # merge signals for user container image
+            signals = image_info.get("StopSignal")
+            if signals:
+                image.set_signals(signals)
+
+            if (deepdiff.DeepDiff(image.get_user(), config.DEFAULT_USER, ignore_order=True) == {}
+                    and image_info.get("User") != ""):
+                # valid values are in the form "user", "user:group", "uid", "uid:gid", "user:gid", "uid:group"
+                # where each entry is either a string or an unsigned integer
+                # "" means any user (use default)
+                # TO-DO figure out why groups is a list
+                user = copy.deepcopy(config.DEFAULT_USER)
+                parts = image_info.get("User").split(":", 1)
+
+                strategy = ["name", "name"]
+                if parts[0].isdigit():
+                    strategy[0] = "id"
+                user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_USER_IDNAME] = {
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[0],
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[0]
+                }
+                if len(parts) == 2:
+                    # group also specified
+                    if parts[1].isdigit():
+                        strategy[1] = "id"
+                    user[config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_GROUP_IDNAMES][0] = {
+                        config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_PATTERN: parts[1],
+                        config.POLICY_FIELD_CONTAINERS_ELEMENTS_USER_STRATEGY: strategy[1]
+                    }
+                image.set_user(user)
 
     def get_images(self) -> List[ContainerImage]:
         return self._images
@@ -488,6 +443,108 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
         return client.images.pull(image.base, image.tag)
 
 
+def get_layer_hash_parallelism() -> int:
+    # each dmverity-vhd process can take a lot of memory for big layers, so
+    # only as many run at the same time as the available memory allows
+    cpu_count = os.cpu_count() or 1
+    available_memory = os_util.get_available_memory()
+    if available_memory is None:
+        return max(1, min(cpu_count, 4))
+    return max(1, min(cpu_count, available_memory // config.LAYER_HASH_MEMORY_BYTES))
+
+
+# pylint: disable=R0914
+def populate_policy_content_for_all_policies(
+    policies: List[AciPolicy], individual_image=False, tar_mapping=None
+) -> None:
+    # suppress warning which will break the progress bar
+    warnings.filterwarnings(
+        action="ignore", message="unclosed", category=ResourceWarning
+    )
+
+    # the same image is often used by several containers and container groups,
+    # so every image is only pulled and hashed once
+    unique_images = {}
+    for policy in policies:
+        for image in policy.get_images():
+            image.parse_all_parameters_and_variables(AciPolicy.all_params, AciPolicy.all_vars)
+            unique_images.setdefault(f"{image.base}:{image.tag}", image)
+
+    proxy = SecurityPolicyProxy()
+
+    def get_tar_location(image_name: str) -> str:
+        if isinstance(tar_mapping, dict):
+            return get_tar_location_from_mapping(tar_mapping, image_name)
+        return tar_mapping if isinstance(tar_mapping, str) else ""
+
+    # total tasks to complete is number of images to pull and get layers
+    # (i.e. total images * 2 tasks)
+    _TOTAL = 2 * len(unique_images)
+
+    with tqdm(
+        total=_TOTAL,
+        desc="Pulling and hashing images...",
+        unit="percent",
+        colour="green",
+        leave=True,
+    ) as progress:
+        # make a message queue so we don't interrupt the printing of the
+        # progress bar
+        message_queue = []
+        image_infos = {}
+        image_layers = {}
+        pull_executor = ThreadPoolExecutor(max_workers=config.MAX_PARALLEL_IMAGE_PULLS)
+        hash_executor = ThreadPoolExecutor(max_workers=get_layer_hash_parallelism())
+        pull_futures = {
+            pull_executor.submit(get_image_info, progress, message_queue, tar_mapping, image): image_name
+            for image_name, image in unique_images.items()
+        }
+        hash_futures = {}
+        try:
+            # the layers of each image are hashed as soon as it's available,
+            # while the other images are still being pulled
+            for pull_future in as_completed(pull_futures):
+                image_name = pull_futures[pull_future]
+                image = unique_images[image_name]
+                image_info, tar, layer_digests = pull_future.result()
+                image_infos[image_name] = image_info
+                hash_futures[hash_executor.submit(
+                    proxy.get_policy_image_layers,
+                    image.base,
+                    image.tag,
+                    tar_location=get_tar_location(image_name) if tar else "",
+                    layer_digests=layer_digests,
+                )] = image_name
+
+            for hash_future in as_completed(hash_futures):
+                image_layers[hash_futures[hash_future]] = hash_future.result()
+                progress.update()
+        except BaseException:
+            # don't start pulling or hashing the remaining images after a failure
+            for future in list(pull_futures) + list(hash_futures):
+                future.cancel()
+            raise
+        finally:
+            pull_executor.shutdown()
+            hash_executor.shutdown()
+
+        for policy in policies:
+            for image in policy.get_images():
+                image_name = f"{image.base}:{image.tag}"
+                image_info = image_infos[image_name]
+                policy._populate_image_from_image_info(  # pylint: disable=protected-access
+                    image, image_info, individual_image
+                )
+                # populate layer info
+                image.set_layers(copy.deepcopy(image_layers[image_name]))
+            policy.close()
+        progress.close()
+
+        # unload the message queue
+        for message in message_queue:
+            logger.warning(message)
+
+
 def load_policy_from_arm_template_str(
     template_data: str,
     parameter_data: str,
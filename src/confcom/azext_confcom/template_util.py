@@ -7,6 +7,7 @@ import re
 import json
 import copy
 import tarfile
+import threading
 from typing import Any, Tuple, Dict, List
 from hashlib import sha256
 import deepdiff
@@ -23,6 +24,7 @@ from azext_confcom import config
 # make this global so it can be used in multiple functions
 PARAMETER_AND_VARIABLE_REGEX = r"\[(?:parameters|variables)\(\s*'([^\.\/]+?)'\s*\)\]"
 WHOLE_PARAMETER_AND_VARIABLE = r"(\s*\[\s*(parameters|variables))(\(\s*'([^\.\/]+?)'\s*\)\])"
+_TAR_LOCK = threading.Lock()
 
 
 class DockerClient:
@@ -76,7 +78,9 @@ def get_image_info(progress, message_queue, tar_mapping, image):
         tar_location = get_tar_location_from_mapping(tar_mapping, image_name)
         # if we have a tar location, we can try to get the image info
         if tar_location:
-            with tarfile.open(tar_location) as tar:
+            # images are read concurrently, but reading a tarball extracts its
+            # manifest.json next to it, so only one is read at a time
+            with _TAR_LOCK, tarfile.open(tar_location) as tar:
                 # get all the info out of the tarfile
                 image_info = os_util.map_image_from_tar(
                     image_name, tar, tar_location
@@ -145,7 +149,13 @@ def get_image_info(progress, message_queue, tar_mapping, image):
             + f"Only {config.ACI_FIELD_CONTAINERS_ARCHITECTURE_VALUE} is supported by Confidential ACI"
         )
 
-    return image_info, tar
+    # the digests of the uncompressed layers identify the layers whose hashes are cached
+    if raw_image:
+        layer_digests = raw_image.attrs.get("RootFS", {}).get("Layers")
+    else:
+        layer_digests = (image_info.get("RootFS") or {}).get("diff_ids")
+
+    return image_info, tar, layer_digests
 
 
 def get_tar_location_from_mapping(tar_mapping: Any, image_name: str) -> str:
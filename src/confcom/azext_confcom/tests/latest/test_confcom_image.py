@@ -158,3 +158,43 @@ class PolicyGeneratingImageCleanRoom(unittest.TestCase):
             deepdiff.DeepDiff(regular_image_json, clean_room_json, ignore_order=True),
             {},
         )
+
+
+class PolicyGeneratingImagePipeline(unittest.TestCase):
+    custom_json = """
+        {
+            "version": "1.0",
+            "containers": [
+                {
+                    "containerImage": "python:3.6.14-slim-buster",
+                    "environmentVariables": [],
+                    "command": ["python3"]
+                },
+                {
+                    "containerImage": "%s",
+                    "environmentVariables": [],
+                    "command": ["python3"]
+                }
+            ]
+        }
+        """
+
+    def test_images_shared_between_policies_are_processed_once(self):
+        from unittest import mock
+        from azext_confcom.security_policy import populate_policy_content_for_all_policies
+
+        policies = [
+            load_policy_from_str(self.custom_json % "python:3.6.14-slim-buster"),
+            load_policy_from_str(self.custom_json % "alpine:3.16"),
+        ]
+        image_info = {"WorkingDir": "/app", "Env": [], "User": ""}
+        with mock.patch("azext_confcom.security_policy.get_image_info", return_value=(image_info, False, None)) \
+                as get_image_info, mock.patch("azext_confcom.security_policy.SecurityPolicyProxy") as proxy:
+            proxy.return_value.get_policy_image_layers.side_effect = lambda image, tag, tar_location, layer_digests: [image]
+            populate_policy_content_for_all_policies(policies)
+
+        self.assertEqual(get_image_info.call_count, 2)
+        self.assertEqual(proxy.return_value.get_policy_image_layers.call_count, 2)
+        layers = [[image.get_layers() for image in policy.get_images()] for policy in policies]
+        self.assertEqual(layers, [[["python"], ["python"]], [["python"], ["alpine"]]])
+        self.assertEqual(policies[1].get_images()[1].get_working_dir(), "/app")
@@ -0,0 +1,57 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+import unittest
+
+from azext_confcom.layer_hash_cache import LayerHashCache
+
+BASE_LAYER = "sha256:" + "a" * 64
+APP_LAYER = "sha256:" + "b" * 64
+NEW_APP_LAYER = "sha256:" + "c" * 64
+
+
+class LayerHashCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cache_dir = os.path.join(self.temp_dir.name, "layer_hashes")
+
+    def test_layers_are_shared_between_images(self):
+        cache = LayerHashCache(self.cache_dir, "tool", 1024 * 1024)
+        cache.save_layer_hashes([BASE_LAYER, APP_LAYER], ["1" * 64, "2" * 64])
+
+        self.assertEqual(cache.get_layer_hashes([BASE_LAYER, APP_LAYER]), ["1" * 64, "2" * 64])
+        self.assertEqual(cache.get_layer_hashes([BASE_LAYER]), ["1" * 64])
+        self.assertIsNone(cache.get_layer_hashes([BASE_LAYER, NEW_APP_LAYER]))
+        # hashes computed by another version of dmverity-vhd aren't reused
+        self.assertIsNone(LayerHashCache(self.cache_dir, "other tool", 1024 * 1024).get_layer_hashes([BASE_LAYER]))
+
+    def test_invalid_entries_are_ignored(self):
+        cache = LayerHashCache(self.cache_dir, "tool", 1024 * 1024)
+        cache.save_layer_hashes([BASE_LAYER, APP_LAYER], ["1" * 64, "not a hash"])
+        self.assertIsNone(cache.get_layer_hashes([APP_LAYER]))
+
+        entry_path = os.path.join(self.cache_dir, BASE_LAYER.replace(":", "-") + ".json")
+        with open(entry_path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["rootHash"] = "3" * 64
+        with open(entry_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        self.assertIsNone(cache.get_layer_hashes([BASE_LAYER]))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = LayerHashCache(self.cache_dir, "tool", 1024 * 1024)
+        cache.save_layer_hashes([BASE_LAYER, APP_LAYER], ["1" * 64, "2" * 64])
+        entry_size = os.path.getsize(os.path.join(self.cache_dir, BASE_LAYER.replace(":", "-") + ".json"))
+        os.utime(os.path.join(self.cache_dir, BASE_LAYER.replace(":", "-") + ".json"), (0, 0))
+
+        cache.max_size_bytes = 2 * entry_size
+        cache.save_layer_hashes([NEW_APP_LAYER], ["3" * 64])
+
+        self.assertIsNone(cache.get_layer_hashes([BASE_LAYER]))
+        self.assertEqual(cache.get_layer_hashes([APP_LAYER, NEW_APP_LAYER]), ["2" * 64, "3" * 64])
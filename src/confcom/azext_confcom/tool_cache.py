@@ -0,0 +1,214 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Downloads the dmverity-vhd binaries into the bin folder. The folder keeps a manifest.json with the release,
+# size and sha256 of every binary, so that binaries already downloaded are found with a stat, and a .lock file
+# so that concurrent builds or az processes don't download the same file at the same time. Interrupted
+# downloads resume from their .part file when the file has not changed since, as told by the ETag kept next to
+# it, and the .part file only replaces the binary once complete and verified.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Optional
+
+import requests
+from knack.log import get_logger
+from azext_confcom.errors import AccContainerError
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+LOCK_FILE_NAME = ".lock"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRY_COUNT = 4
+DOWNLOAD_TIMEOUT_IN_SECONDS = 60
+LOCK_TIMEOUT_IN_SECONDS = 600
+LOCK_POLL_INTERVAL_IN_SECONDS = 0.5
+STALE_LOCK_AGE_IN_SECONDS = 900
+
+
+def get_cached_tool(destination: str, version: str, install: Callable[[str], None]) -> str:
+    cache_folder = os.path.dirname(destination)
+    if _is_installed(cache_folder, destination, version):
+        return destination
+
+    os.makedirs(cache_folder, exist_ok=True)
+    with _FolderLock(cache_folder):
+        # another process may have installed it while we were waiting for the lock
+        if not _is_installed(cache_folder, destination, version):
+            install(destination)
+            _record_installed(cache_folder, destination, version)
+    return destination
+
+
+def download_file(url: str, file_path: str, sha256: Optional[str] = None) -> None:
+    part_path = file_path + ".part"
+    for attempt in range(DOWNLOAD_RETRY_COUNT):
+        try:
+            _download_to_part_file(url, part_path)
+            break
+        except requests.RequestException as e:
+            status_code = e.response.status_code if e.response is not None else None
+            retriable = status_code is None or status_code >= 500 or status_code == 429
+            if not retriable or attempt == DOWNLOAD_RETRY_COUNT - 1:
+                raise AccContainerError(f"Failed to download {url}: {e}") from e
+            delay = 2 ** attempt
+            logger.info("Failed to download %s, retrying in %d seconds: %s", url, delay, e)
+            time.sleep(delay)
+
+    if sha256:
+        actual_sha256 = get_file_sha256(part_path)
+        if actual_sha256.lower() != sha256.lower():
+            os.remove(part_path)
+            _write_etag(part_path + ".etag", None)
+            raise AccContainerError(
+                f"The file downloaded from {url} has sha256 {actual_sha256} instead of the expected {sha256}"
+            )
+    os.replace(part_path, file_path)
+    _write_etag(part_path + ".etag", None)
+
+
+def get_file_sha256(file_path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _download_to_part_file(url: str, part_path: str) -> None:
+    # the ETag of the file the .part file comes from is kept next to it, so that a .part file left by the
+    # download of another release of the binary is never completed with the bytes of this one
+    etag_path = part_path + ".etag"
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    etag = _read_etag(etag_path) if offset else None
+    # the size and range of compressed responses wouldn't match the file, so it's requested as is
+    headers = {"Accept-Encoding": "identity"}
+    if offset and etag:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = etag
+    else:
+        offset = 0
+    with requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT_IN_SECONDS) as r:
+        if r.status_code == 416 and offset:
+            # the part file is already complete, or belongs to another file and has to be downloaded again
+            if r.headers.get("Content-Range") == f"bytes */{offset}" and r.headers.get("ETag") == etag:
+                return
+            os.remove(part_path)
+            _download_to_part_file(url, part_path)
+            return
+        r.raise_for_status()
+        if offset and r.status_code == 206 and r.headers.get("ETag") != etag:
+            # the file changed and the server ignored If-Range, the range doesn't continue the part file
+            os.remove(part_path)
+            _download_to_part_file(url, part_path)
+            return
+        if offset and r.status_code != 206:
+            offset = 0
+        if not offset:
+            _write_etag(etag_path, r.headers.get("ETag"))
+        expected_size = r.headers.get("Content-Length")
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in r.iter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+            received_size = f.tell() - offset
+    if expected_size is not None and received_size != int(expected_size):
+        raise requests.ConnectionError(
+            f"The connection was closed after {received_size} of {expected_size} bytes"
+        )
+
+
+def _read_etag(etag_path: str) -> Optional[str]:
+    try:
+        with open(etag_path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_etag(etag_path: str, etag: Optional[str]) -> None:
+    # files without an ETag can't be told apart, so their downloads are only ever started over
+    if etag:
+        with open(etag_path, "w", encoding="utf-8") as f:
+            f.write(etag)
+    elif os.path.isfile(etag_path):
+        os.remove(etag_path)
+
+
+def _is_installed(cache_folder: str, destination: str, version: str) -> bool:
+    entry = _read_manifest(cache_folder).get(os.path.basename(destination))
+    if not entry or entry.get("version") != version:
+        return False
+    try:
+        return os.stat(destination).st_size == entry.get("size")
+    except OSError:
+        return False
+
+
+def _record_installed(cache_folder: str, destination: str, version: str) -> None:
+    manifest = _read_manifest(cache_folder)
+    manifest[os.path.basename(destination)] = {
+        "version": version,
+        "size": os.path.getsize(destination),
+        "sha256": get_file_sha256(destination),
+    }
+    fd, temp_path = tempfile.mkstemp(dir=cache_folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, os.path.join(cache_folder, MANIFEST_FILE_NAME))
+    except OSError:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _read_manifest(cache_folder: str) -> dict:
+    try:
+        with open(os.path.join(cache_folder, MANIFEST_FILE_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.info("Could not read the manifest of %s, its binaries will be downloaded again: %s", cache_folder, e)
+        return {}
+
+
+class _FolderLock:  # pylint: disable=too-few-public-methods
+    def __init__(self, cache_folder: str):
+        self.lock_path = os.path.join(cache_folder, LOCK_FILE_NAME)
+
+    def __enter__(self):
+        deadline = time.time() + LOCK_TIMEOUT_IN_SECONDS
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode("ascii"))
+                os.close(fd)
+                return self
+            except FileExistsError:
+                pass
+            try:
+                # the process holding the lock most likely died without releasing it
+                if time.time() - os.path.getmtime(self.lock_path) > STALE_LOCK_AGE_IN_SECONDS:
+                    os.remove(self.lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise AccContainerError(
+                    f"Timed out waiting for another process to release {self.lock_path}. "
+                    "If no other process is downloading the binaries, delete the file and try again."
+                )
+            time.sleep(LOCK_POLL_INTERVAL_IN_SECONDS)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
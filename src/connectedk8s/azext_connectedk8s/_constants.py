@@ -181,6 +181,9 @@ Diagnoser_Check = "diagnoser_check"
 MSI_Cert_Check = "msi_cert_check"
 Agent_Version_Check = "agent_version_check"
 Arc_Agent_State_Check = "arc_agent_state_check"
+Arc_Agent_Logs_Max_Parallel_Downloads = 8
+Arc_Agent_Logs_Chunk_Size = 64 * 1024
+Troubleshoot_Max_Parallel_Snapshots = 4
 # Diagnoser files name
 Arc_Agents_Logs = "arc_agents_logs"
 Arc_Deployment_Logs = "arc_deployment_logs"
@@ -234,4 +237,6 @@ CSP_Storage_Url_Mooncake = "https://k8sconnectcsp.blob.core.chinacloudapi.cn"
 CSP_Storage_Url_Fairfax = "https://k8sconnectcsp.azureedge.us"
 HELM_STORAGE_URL = "https://k8connecthelm.azureedge.net"
 HELM_VERSION = 'v3.6.3'
+# kubectl is installed with 'az aks install-cli', which installs its latest version
+Kubectl_Client_Version = 'latest'
 Download_And_Install_Kubectl_Fault_Type = "Failed to download and install kubectl"
@@ -130,4 +130,6 @@ helps['connectedk8s troubleshoot'] = """
   examples:
   - name: Perform diagnostic checks on an Arc enabled Kubernetes cluster.
     text: az connectedk8s troubleshoot -n clusterName -g resourceGroupName
+  - name: Perform diagnostic checks, saving only the last 10000 lines of each Arc agent container log gzip compressed.
+    text: az connectedk8s troubleshoot -n clusterName -g resourceGroupName --log-tail-lines 10000 --compress-logs
 """
@@ -12,7 +12,7 @@ from azure.cli.core.commands.validators import get_default_location_from_resourc
 from azext_connectedk8s._constants import Distribution_Enum_Values, Infrastructure_Enum_Values, Feature_Values, AHB_Enum_Values
 from knack.arguments import (CLIArgumentType, CaseInsensitiveList)
 
-from._validators import validate_private_link_properties
+from._validators import validate_private_link_properties, validate_agent_log_limits
 
 features_types = CLIArgumentType(
     nargs='+',
@@ -117,3 +117,6 @@ def load_arguments(self, _):
         c.argument('cluster_name', options_list=['--name', '-n'], help='The name of the connected cluster.')
         c.argument('kube_config', options_list=['--kube-config'], help='Path to the kube config file.')
         c.argument('kube_context', options_list=['--kube-context'], help='Kubconfig context from current machine.')
+        c.argument('log_tail_lines', options_list=['--log-tail-lines'], type=int, arg_group='Agent Logs', validator=validate_agent_log_limits, help='Number of lines to save from the end of each Arc agent container log. By default, the whole log is saved.')
+        c.argument('max_log_size', options_list=['--max-log-size'], type=int, arg_group='Agent Logs', help='Maximum size in MB to save of each Arc agent container log. By default, the whole log is saved.')
+        c.argument('compress_logs', options_list=['--compress-logs'], arg_type=get_three_state_flag(), arg_group='Agent Logs', help='Save the Arc agent container logs gzip compressed.')
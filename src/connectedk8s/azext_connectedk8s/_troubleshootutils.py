@@ -11,6 +11,8 @@ import os
 import yaml
 import json
 import datetime
+import gzip
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, PIPE, run, STDOUT, call, DEVNULL
 import shutil
 from knack.log import get_logger
@@ -127,22 +129,23 @@ def fetch_connected_cluster_resource(filepath_with_timestamp, connected_cluster,
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
-def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available):
+def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available, log_tail_lines=None, max_log_size=None, compress_logs=False):
 
     global diagnoser_output
     try:
         if storage_space_available:
             # To retrieve all of the arc agents pods that are present in the Cluster
             arc_agents_pod_list = corev1_api_instance.list_namespaced_pod(namespace="azure-arc")
+            arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
+            try:
+                os.mkdir(arc_agent_logs_path)
+            except FileExistsError:
+                pass
+            container_logs = []
             # Traversing through all agents
             for each_agent_pod in arc_agents_pod_list.items:
                 # Fetching the current Pod name and creating a folder with that name inside the timestamp folder
                 agent_name = each_agent_pod.metadata.name
-                arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
-                try:
-                    os.mkdir(arc_agent_logs_path)
-                except FileExistsError:
-                    pass
                 agent_name_logs_path = os.path.join(arc_agent_logs_path, agent_name)
                 try:
                     os.mkdir(agent_name_logs_path)
@@ -151,16 +154,19 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
                 # If the agent is not in Running state we wont be able to get logs of the containers
                 if(each_agent_pod.status.phase != "Running"):
                     continue
-                # Traversing through all of the containers present inside each pods
+                # Creating a text file with the name of each container of the pod for its logs
                 for each_container in each_agent_pod.spec.containers:
-                    # Fetching the Container name
-                    container_name = each_container.name
-                    # Creating a text file with the name of the container and adding that containers logs in it
-                    container_log = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc")
-                    # Path to add the arc agents container logs.
-                    arc_agent_container_logs_path = os.path.join(agent_name_logs_path, container_name + ".txt")
-                    with open(arc_agent_container_logs_path, 'w+') as container_file:
-                        container_file.write(str(container_log))
+                    container_logs.append((agent_name, each_container.name, os.path.join(agent_name_logs_path, each_container.name + ".txt")))
+
+            # The container logs are downloaded concurrently and streamed to their files, so that large logs
+            # are never held in memory. The first error is raised once all of the downloads are over.
+            if container_logs:
+                with ThreadPoolExecutor(max_workers=min(consts.Arc_Agent_Logs_Max_Parallel_Downloads, len(container_logs))) as executor:
+                    futures = [executor.submit(_save_container_log, corev1_api_instance, agent_name, container_name, container_log_path, log_tail_lines, max_log_size, compress_logs)
+                               for agent_name, container_name, container_log_path in container_logs]
+                errors = [future.exception() for future in futures if future.exception() is not None]
+                if errors:
+                    raise errors[0]
 
         return consts.Diagnostic_Check_Passed, storage_space_available
 
@@ -184,6 +190,27 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
+def _save_container_log(corev1_api_instance, agent_name, container_name, container_log_path, log_tail_lines, max_log_size, compress_logs):
+
+    # The tail and size caps are applied by the API server, so only the requested part of the log is downloaded
+    optional_args = {}
+    if log_tail_lines:
+        optional_args["tail_lines"] = log_tail_lines
+    if max_log_size:
+        optional_args["limit_bytes"] = max_log_size * 1024 * 1024
+    response = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc", _preload_content=False, **optional_args)
+    try:
+        if compress_logs:
+            container_file = gzip.open(container_log_path + ".gz", 'wb')
+        else:
+            container_file = open(container_log_path, 'wb')
+        with container_file:
+            for chunk in response.stream(consts.Arc_Agent_Logs_Chunk_Size, decode_content=True):
+                container_file.write(chunk)
+    finally:
+        response.release_conn()
+
+
 def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context):
 
     global diagnoser_output
@@ -1093,6 +1120,43 @@ def get_kubeaadproxy_cr_snapshot(corev1_api_instance, kubectl_client_location, k
     return storage_space_available
 
 
+def start_cluster_snapshots(corev1_api_instance, helm_client_location, kubectl_client_location, release_namespace, kube_config, kube_context, filepath_with_timestamp, storage_space_available, include_arc_agents_events, include_kubeaadproxy_cr):
+
+    # The kubectl and helm snapshots don't depend on each other or on the rest of the checks, so they are taken
+    # in the background while the agent logs are captured. Their results are collected by wait_for_cluster_snapshots.
+    executor = ThreadPoolExecutor(max_workers=consts.Troubleshoot_Max_Parallel_Snapshots)
+    snapshot_futures = {}
+    if include_arc_agents_events:
+        snapshot_futures[consts.Retrieve_Arc_Agents_Event_Logs] = executor.submit(retrieve_arc_agents_event_logs, filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context)
+    snapshot_futures["azure_arc_secrets"] = executor.submit(get_secrets_azure_arc, corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+    snapshot_futures["azure_arc_helm_values"] = executor.submit(get_helm_values_azure_arc, corev1_api_instance, helm_client_location, release_namespace, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+    snapshot_futures["metadata_cr_snapshot"] = executor.submit(get_metadata_cr_snapshot, corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+    if include_kubeaadproxy_cr:
+        snapshot_futures["kubeaadproxy_cr_snapshot"] = executor.submit(get_kubeaadproxy_cr_snapshot, corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+    executor.shutdown(wait=False)
+    return snapshot_futures
+
+
+def wait_for_cluster_snapshots(snapshot_futures, storage_space_available):
+
+    global diagnoser_output
+    check_results = {}
+    for snapshot_name, snapshot_future in snapshot_futures.items():
+        try:
+            snapshot_result = snapshot_future.result()
+        # Each snapshot handles its own errors, this only guards against failures while cleaning up after them
+        except Exception as e:
+            logger.warning("An exception has occured while trying to store the {} in diagnostic logs folder. Exception: {}".format(snapshot_name, str(e)) + "\n")
+            diagnoser_output.append("An exception has occured while trying to store the {} in diagnostic logs folder. Exception: {}".format(snapshot_name, str(e)) + "\n")
+            continue
+        # The events snapshot is also one of the diagnostic checks
+        if isinstance(snapshot_result, tuple):
+            check_results[snapshot_name], snapshot_result = snapshot_result
+        storage_space_available = storage_space_available and snapshot_result
+
+    return check_results, storage_space_available
+
+
 def fetching_cli_output_logs(filepath_with_timestamp, storage_space_available, flag):
 
     # This function is used to store the output that is obtained throughout the Diagnoser process
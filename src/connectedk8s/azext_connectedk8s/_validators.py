@@ -6,7 +6,7 @@ import azext_connectedk8s._constants as consts
 
 
 from os import name
-from azure.cli.core.azclierror import ArgumentUsageError
+from azure.cli.core.azclierror import ArgumentUsageError, InvalidArgumentValueError
 
 
 def example_name_or_id_validator(cmd, namespace):
@@ -31,6 +31,13 @@ def validate_private_link_properties(namespace):
         raise ArgumentUsageError("The parameter '--private-link-scope-resource-id' was not provided. It is mandatory to pass this parameter for enabling private link on the connected cluster resource.")
 
 
+def validate_agent_log_limits(namespace):
+    if namespace.log_tail_lines is not None and namespace.log_tail_lines < 1:
+        raise InvalidArgumentValueError("The parameter '--log-tail-lines' should be a positive number of lines.")
+    if namespace.max_log_size is not None and namespace.max_log_size < 1:
+        raise InvalidArgumentValueError("The parameter '--max-log-size' should be a positive size in MB.")
+
+
 def override_client_request_id_header(cmd, namespace):
     if namespace.correlation_id is not None:
         cmd.cli_ctx.data['headers'][consts.Client_Request_Id_Header] = namespace.correlation_id
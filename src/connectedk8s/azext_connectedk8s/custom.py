@@ -19,7 +19,6 @@ import platform
 from xml.dom.pulldom import default_bufsize
 from azure.core.exceptions import ClientAuthenticationError
 import yaml
-import urllib.request
 import shutil
 from _thread import interrupt_main
 from psutil import process_iter, NoSuchProcess, AccessDenied, ZombieProcess, net_connections
@@ -50,6 +49,7 @@ import azext_connectedk8s._utils as utils
 import azext_connectedk8s._clientproxyutils as clientproxyutils
 import azext_connectedk8s._troubleshootutils as troubleshootutils
 import azext_connectedk8s._precheckutils as precheckutils
+import azext_connectedk8s._toolcacheutils as toolcacheutils
 from glob import glob
 from .vendored_sdks.models import ConnectedCluster, ConnectedClusterIdentity, ConnectedClusterPatch, ListClusterUserCredentialProperties
 from .vendored_sdks.preview_2022_10_01.models import ConnectedCluster as ConnectedClusterPreview
@@ -515,56 +515,40 @@ def install_helm_client():
     download_dir = os.path.dirname(download_location)
     install_location = os.path.expanduser(os.path.join('~', install_location_string))
 
-    # Download compressed halm binary if not already present
-    if not os.path.isfile(download_location):
-        # Creating the helm folder if it doesnt exist
-        if not os.path.exists(download_dir):
-            try:
-                os.makedirs(download_dir)
-            except Exception as e:
-                telemetry.set_exception(exception=e, fault_type=consts.Create_Directory_Fault_Type,
-                                        summary='Unable to create helm directory')
-                raise ClientRequestError("Failed to create helm directory." + str(e))
-
+    def install_helm(install_location):
         # Downloading compressed helm client executable
         logger.warning("Downloading helm client for first time. This can take few minutes...")
-        retry_count = 3
-        retry_delay = 5
-        for i in range(retry_count):
-            try:
-                response = urllib.request.urlopen(requestUri)
-                break
-            except Exception as e:
-                if i == retry_count - 1:
-                    if "Connection reset by peer" in str(e):
-                        telemetry.set_user_fault()
-                    telemetry.set_exception(exception=e, fault_type=consts.Download_Helm_Fault_Type,
-                                            summary='Unable to download helm client.')
-                    raise CLIInternalError("Failed to download helm client.", recommendation="Please check your internet connection." + str(e))
-                time.sleep(retry_delay)
-
-        responseContent = response.read()
-        response.close()
-
-        # Creating the compressed helm binaries
         try:
-            with open(download_location, 'wb') as f:
-                f.write(responseContent)
+            toolcacheutils.download_file(requestUri, download_location)
         except Exception as e:
-            telemetry.set_exception(exception=e, fault_type=consts.Create_HelmExe_Fault_Type,
-                                    summary='Unable to create helm executable')
-            raise ClientRequestError("Failed to create helm executable." + str(e), recommendation="Please ensure that you delete the directory '{}' before trying again.".format(download_dir))
+            if "Connection reset by peer" in str(e):
+                telemetry.set_user_fault()
+            telemetry.set_exception(exception=e, fault_type=consts.Download_Helm_Fault_Type,
+                                    summary='Unable to download helm client.')
+            raise CLIInternalError("Failed to download helm client.", recommendation="Please check your internet connection." + str(e))
 
-    # Extract compressed helm binary
-    if not os.path.isfile(install_location):
+        # Extract compressed helm binary in a separate folder and move it to the install location once complete
         try:
-            shutil.unpack_archive(download_location, download_dir)
-            os.chmod(install_location, os.stat(install_location).st_mode | stat.S_IXUSR)
+            extract_dir = tempfile.mkdtemp(dir=download_dir)
+            try:
+                shutil.unpack_archive(download_location, extract_dir)
+                extracted_location = os.path.join(extract_dir, os.path.relpath(install_location, download_dir))
+                os.chmod(extracted_location, os.stat(extracted_location).st_mode | stat.S_IXUSR)
+                os.replace(extracted_location, install_location)
+            finally:
+                shutil.rmtree(extract_dir, ignore_errors=True)
         except Exception as e:
             telemetry.set_exception(exception=e, fault_type=consts.Extract_HelmExe_Fault_Type,
                                     summary='Unable to extract helm executable')
             raise ClientRequestError("Failed to extract helm executable." + str(e), recommendation="Please ensure that you delete the directory '{}' before trying again.".format(download_dir))
 
+    try:
+        toolcacheutils.get_cached_tool(install_location, consts.HELM_VERSION, install_helm)
+    except OSError as e:
+        telemetry.set_exception(exception=e, fault_type=consts.Create_HelmExe_Fault_Type,
+                                summary='Unable to create helm executable')
+        raise ClientRequestError("Failed to create helm executable." + str(e), recommendation="Please ensure that you delete the directory '{}' before trying again.".format(download_dir))
+
     return install_location
 
 
@@ -1845,50 +1829,35 @@ def client_side_proxy_wrapper(cmd,
     args.append(install_location)
     install_dir = os.path.dirname(install_location)
 
-    # If version specified by install location doesnt exist, then download the executable
-    if not os.path.isfile(install_location):
-
+    def install_client_proxy(install_location):
         print("Setting up environment for first time use. This can take few minutes...")
+        # Removing older executables from the directory, keeping a partial download of this version to resume from
+        for f in glob(os.path.expanduser(os.path.join('~', older_version_string))):
+            if f in (install_location, install_location + '.part'):
+                continue
+            try:
+                os.remove(f)
+            except:
+                logger.warning("failed to delete older version files")
+
         # Downloading the executable
         try:
-            response = urllib.request.urlopen(requestUri)
+            toolcacheutils.download_file(requestUri, install_location)
         except Exception as e:
             telemetry.set_exception(exception=e, fault_type=consts.Download_Exe_Fault_Type,
                                     summary='Unable to download clientproxy executable.')
             raise CLIInternalError("Failed to download executable with client.", recommendation="Please check your internet connection." + str(e))
 
-        responseContent = response.read()
-        response.close()
-
-        # Creating the .clientproxy folder if it doesnt exist
-        if not os.path.exists(install_dir):
-            try:
-                os.makedirs(install_dir)
-            except Exception as e:
-                telemetry.set_exception(exception=e, fault_type=consts.Create_Directory_Fault_Type,
-                                        summary='Unable to create installation directory')
-                raise ClientRequestError("Failed to create installation directory." + str(e))
-        else:
-            older_version_string = os.path.expanduser(os.path.join('~', older_version_string))
-            older_version_files = glob(older_version_string)
-
-            # Removing older executables from the directory
-            for f in older_version_files:
-                try:
-                    os.remove(f)
-                except:
-                    logger.warning("failed to delete older version files")
-
-        try:
-            with open(install_location, 'wb') as f:
-                f.write(responseContent)
-        except Exception as e:
-            telemetry.set_exception(exception=e, fault_type=consts.Create_CSPExe_Fault_Type,
-                                    summary='Unable to create proxy executable')
-            raise ClientRequestError("Failed to create proxy executable." + str(e))
-
         os.chmod(install_location, os.stat(install_location).st_mode | stat.S_IXUSR)
 
+    # Download the executable if the version specified by install location isn't installed yet
+    try:
+        toolcacheutils.get_cached_tool(install_location, consts.CLIENT_PROXY_VERSION, install_client_proxy)
+    except OSError as e:
+        telemetry.set_exception(exception=e, fault_type=consts.Create_CSPExe_Fault_Type,
+                                summary='Unable to create proxy executable')
+        raise ClientRequestError("Failed to create proxy executable." + str(e))
+
     # Creating config file to pass config to clientproxy
     config_file_location = os.path.join(install_dir, 'config.yml')
 
@@ -2214,7 +2183,7 @@ def get_custom_locations_oid(cmd, cl_oid):
         return ""
 
 
-def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=None, kube_context=None, no_wait=False, tags=None):
+def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=None, kube_context=None, no_wait=False, tags=None, log_tail_lines=None, max_log_size=None, compress_logs=False):
 
     try:
 
@@ -2279,14 +2248,15 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         # Check if agents have been added to the cluster
         arc_agents_pod_list = corev1_api_instance.list_namespaced_pod(namespace="azure-arc")
 
+        # Saving the arc agents events, the secrets and helm values of azure-arc and the metadata and kube-aad-proxy CR snapshots
+        # in the background. The kube-aad-proxy CR snapshot is only saved in the case private link is disabled.
+        snapshot_futures = troubleshootutils.start_cluster_snapshots(corev1_api_instance, helm_client_location, kubectl_client_location, release_namespace, kube_config, kube_context, filepath_with_timestamp, storage_space_available, bool(arc_agents_pod_list.items), connected_cluster.private_link_state == "Disabled")
+
         # To verify if arc agents have been added to the cluster
         if arc_agents_pod_list.items:
 
             # For storing all the agent logs using the CoreV1Api
-            diagnostic_checks[consts.Retrieve_Arc_Agents_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available)
-
-            # For storing all arc agents events logs
-            diagnostic_checks[consts.Retrieve_Arc_Agents_Event_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context)
+            diagnostic_checks[consts.Retrieve_Arc_Agents_Logs], storage_space_available = troubleshootutils.retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available, log_tail_lines, max_log_size, compress_logs)
 
             # For storing all the deployments logs using the AppsV1Api
             appv1_api_instance = kube_client.AppsV1Api()
@@ -2335,18 +2305,9 @@ def troubleshoot(cmd, client, resource_group_name, cluster_name, kube_config=Non
         # Performing diagnoser container check
         diagnostic_checks[consts.Diagnoser_Check], storage_space_available = troubleshootutils.check_diagnoser_container(corev1_api_instance, batchv1_api_instance, filepath_with_timestamp, storage_space_available, absolute_path, probable_sufficient_resource_for_agents, helm_client_location, kubectl_client_location, release_namespace, diagnostic_checks[consts.KAP_Security_Policy_Check], kube_config, kube_context)
 
-        # saving secrets in azure-arc namespace
-        storage_space_available = troubleshootutils.get_secrets_azure_arc(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
-
-        # saving helm values of azure-arc release
-        storage_space_available = troubleshootutils.get_helm_values_azure_arc(corev1_api_instance, helm_client_location, release_namespace, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
-
-        # saving metadata CR sanpshot
-        storage_space_available = troubleshootutils.get_metadata_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
-
-        # saving kube-aad-proxy CR snapshot only in the case private link is disabled
-        if connected_cluster.private_link_state == "Disabled":
-            storage_space_available = troubleshootutils.get_kubeaadproxy_cr_snapshot(corev1_api_instance, kubectl_client_location, kube_config, kube_context, filepath_with_timestamp, storage_space_available)
+        # Waiting for the snapshots saved in the background
+        snapshot_checks, storage_space_available = troubleshootutils.wait_for_cluster_snapshots(snapshot_futures, storage_space_available)
+        diagnostic_checks.update(snapshot_checks)
 
         # checking cluster connectivity status
         cluster_connectivity_status = connected_cluster.connectivity_status
@@ -2402,17 +2363,20 @@ def install_kubectl_client():
         elif operating_system == 'linux' or operating_system == 'darwin':
             kubectl_path = os.path.join(kubectl_filepath, 'kubectl')
 
-        if os.path.isfile(kubectl_path):
-            return kubectl_path
-
-        # Downloading kubectl executable if its not present in the machine
-        logger.warning("Downloading kubectl client for first time. This can take few minutes...")
-        logging.disable(logging.CRITICAL)
-        get_default_cli().invoke(['aks', 'install-cli', '--install-location', kubectl_path])
-        logging.disable(logging.NOTSET)
-        logger.warning("\n")
-        # Return the path of the kubectl executable
-        return kubectl_path
+        def install_kubectl(kubectl_path):
+            # Downloading kubectl executable next to the install location, and moving it there once complete
+            logger.warning("Downloading kubectl client for first time. This can take few minutes...")
+            download_path = kubectl_path + '.download'
+            logging.disable(logging.CRITICAL)
+            try:
+                get_default_cli().invoke(['aks', 'install-cli', '--install-location', download_path])
+            finally:
+                logging.disable(logging.NOTSET)
+            logger.warning("\n")
+            os.replace(download_path, kubectl_path)
+
+        # Return the path of the kubectl executable, downloading it if its not present in the machine
+        return toolcacheutils.get_cached_tool(kubectl_path, consts.Kubectl_Client_Version, install_kubectl)
 
     except Exception as e:
         telemetry.set_exception(exception=e, fault_type=consts.Download_And_Install_Kubectl_Fault_Type, summary="Failed to download and install kubectl")
@@ -0,0 +1,155 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import argparse
+import gzip
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+
+import azext_connectedk8s._constants as consts
+import azext_connectedk8s._troubleshootutils as troubleshootutils
+from azext_connectedk8s._validators import validate_agent_log_limits
+
+
+def _log_response(chunks):
+    response = mock.Mock()
+    response.stream.return_value = iter(chunks)
+    return response
+
+
+def _agent_pod(name, container_names, phase="Running"):
+    pod = mock.Mock()
+    pod.metadata.name = name
+    pod.status.phase = phase
+    pod.spec.containers = [mock.Mock() for _ in container_names]
+    for container, container_name in zip(pod.spec.containers, container_names):
+        container.name = container_name
+    return pod
+
+
+class TestSaveContainerLog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.log_path = os.path.join(self.temp_dir.name, "container.txt")
+        self.corev1_api_instance = mock.Mock()
+
+    def test_streams_the_whole_log(self):
+        response = _log_response([b"line 1\n", b"line 2\n"])
+        self.corev1_api_instance.read_namespaced_pod_log.return_value = response
+
+        troubleshootutils._save_container_log(self.corev1_api_instance, "agent", "container", self.log_path, None, None, False)
+
+        self.corev1_api_instance.read_namespaced_pod_log.assert_called_once_with(name="agent", container="container", namespace="azure-arc", _preload_content=False)
+        response.stream.assert_called_once_with(consts.Arc_Agent_Logs_Chunk_Size, decode_content=True)
+        response.release_conn.assert_called_once()
+        with open(self.log_path, "rb") as f:
+            self.assertEqual(f.read(), b"line 1\nline 2\n")
+
+    def test_saves_the_log_gzip_compressed(self):
+        self.corev1_api_instance.read_namespaced_pod_log.return_value = _log_response([b"line 1\n", b"line 2\n"])
+
+        troubleshootutils._save_container_log(self.corev1_api_instance, "agent", "container", self.log_path, None, None, True)
+
+        self.assertFalse(os.path.exists(self.log_path))
+        with gzip.open(self.log_path + ".gz", "rb") as f:
+            self.assertEqual(f.read(), b"line 1\nline 2\n")
+
+    def test_maps_the_log_limits_to_the_api_arguments(self):
+        self.corev1_api_instance.read_namespaced_pod_log.return_value = _log_response([])
+
+        troubleshootutils._save_container_log(self.corev1_api_instance, "agent", "container", self.log_path, 100, 2, False)
+
+        kwargs = self.corev1_api_instance.read_namespaced_pod_log.call_args[1]
+        self.assertEqual(kwargs["tail_lines"], 100)
+        self.assertEqual(kwargs["limit_bytes"], 2 * 1024 * 1024)
+
+    def test_releases_the_connection_on_errors(self):
+        response = _log_response([])
+        response.stream.side_effect = IOError("connection reset")
+        self.corev1_api_instance.read_namespaced_pod_log.return_value = response
+
+        self.assertRaises(IOError, troubleshootutils._save_container_log, self.corev1_api_instance, "agent", "container", self.log_path, None, None, False)
+
+        response.release_conn.assert_called_once()
+
+
+class TestRetrieveArcAgentsLogs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        troubleshootutils.diagnoser_output.clear()
+        self.addCleanup(troubleshootutils.diagnoser_output.clear)
+
+    @mock.patch("azext_connectedk8s._troubleshootutils.telemetry.set_exception")
+    @mock.patch("azext_connectedk8s._troubleshootutils._save_container_log")
+    def test_raises_the_first_error_once_all_logs_are_saved(self, mock_save_container_log, mock_set_exception):
+        corev1_api_instance = mock.Mock()
+        corev1_api_instance.list_namespaced_pod.return_value.items = [
+            _agent_pod("agent1", ["first", "second", "third"]),
+            _agent_pod("agent2", ["stopped"], phase="Pending"),
+        ]
+
+        def save_container_log(corev1_api_instance, agent_name, container_name, *args):
+            if container_name == "first":
+                # fails after the second container, the error of the first container is still the one raised
+                time.sleep(0.2)
+                raise ValueError("first error")
+            if container_name == "second":
+                raise ValueError("second error")
+        mock_save_container_log.side_effect = save_container_log
+
+        result, storage_space_available = troubleshootutils.retrieve_arc_agents_logs(corev1_api_instance, self.temp_dir.name, True, 100, 2, True)
+
+        self.assertEqual(result, consts.Diagnostic_Check_Failed)
+        self.assertTrue(storage_space_available)
+        saved_containers = sorted(call[0][2] for call in mock_save_container_log.call_args_list)
+        self.assertEqual(saved_containers, ["first", "second", "third"])
+        self.assertEqual(mock_save_container_log.call_args[0][4:], (100, 2, True))
+        self.assertEqual(len(troubleshootutils.diagnoser_output), 1)
+        self.assertIn("first error", troubleshootutils.diagnoser_output[0])
+        self.assertTrue(os.path.isdir(os.path.join(self.temp_dir.name, consts.Arc_Agents_Logs, "agent2")))
+
+
+class TestClusterSnapshots(unittest.TestCase):
+    def setUp(self):
+        troubleshootutils.diagnoser_output.clear()
+        self.addCleanup(troubleshootutils.diagnoser_output.clear)
+
+    @mock.patch("azext_connectedk8s._troubleshootutils.get_kubeaadproxy_cr_snapshot")
+    @mock.patch("azext_connectedk8s._troubleshootutils.get_metadata_cr_snapshot", return_value=False)
+    @mock.patch("azext_connectedk8s._troubleshootutils.get_helm_values_azure_arc", side_effect=ValueError("helm error"))
+    @mock.patch("azext_connectedk8s._troubleshootutils.get_secrets_azure_arc", return_value=True)
+    @mock.patch("azext_connectedk8s._troubleshootutils.retrieve_arc_agents_event_logs", return_value=(consts.Diagnostic_Check_Passed, True))
+    def test_collects_the_results_of_all_snapshots(self, mock_events, mock_secrets, mock_helm_values, mock_metadata_cr, mock_kubeaadproxy_cr):
+        snapshot_futures = troubleshootutils.start_cluster_snapshots(mock.Mock(), "helm", "kubectl", "azure-arc-release", None, None, "folder", True, True, False)
+
+        check_results, storage_space_available = troubleshootutils.wait_for_cluster_snapshots(snapshot_futures, True)
+
+        self.assertEqual(check_results, {consts.Retrieve_Arc_Agents_Event_Logs: consts.Diagnostic_Check_Passed})
+        # the metadata snapshot ran out of storage space
+        self.assertFalse(storage_space_available)
+        mock_secrets.assert_called_once()
+        mock_kubeaadproxy_cr.assert_not_called()
+        self.assertEqual(len(troubleshootutils.diagnoser_output), 1)
+        self.assertIn("azure_arc_helm_values", troubleshootutils.diagnoser_output[0])
+        self.assertIn("helm error", troubleshootutils.diagnoser_output[0])
+
+
+class TestValidateAgentLogLimits(unittest.TestCase):
+    def test_requires_positive_limits(self):
+        validate_agent_log_limits(argparse.Namespace(log_tail_lines=None, max_log_size=None))
+        validate_agent_log_limits(argparse.Namespace(log_tail_lines=1, max_log_size=1))
+        self.assertRaises(InvalidArgumentValueError, validate_agent_log_limits, argparse.Namespace(log_tail_lines=0, max_log_size=None))
+        self.assertRaises(InvalidArgumentValueError, validate_agent_log_limits, argparse.Namespace(log_tail_lines=None, max_log_size=-1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,9 +5,18 @@
 # pylint: disable=consider-using-f-string, consider-using-with, no-member
 
 import tarfile
+import gzip
+import hashlib
+import io
+import itertools
+import json
 import os
 import re
 import codecs
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import open
 import requests
 from knack.log import get_logger
@@ -18,28 +27,21 @@ from azure.cli.command_modules.acr._constants import TASK_VALID_VSTS_URLS
 
 logger = get_logger(__name__)
 
+ARCHIVE_CHUNK_SIZE = 1024 * 1024  # bytes of tar stream compressed as one gzip member
+ARCHIVE_MAX_WORKERS = min(8, os.cpu_count() or 1)  # threads compressing chunks
+ARCHIVE_COMPRESS_LEVEL = 6
+ARCHIVE_UPLOAD_CONCURRENCY = 4  # parallel block uploads to the registry's blob
+ARCHIVE_CACHE_MIN_FILE_SIZE = 64 * 1024  # files at least this large are cached as their own gzip member
+ARCHIVE_CACHE_MAX_SIZE = 1024 * 1024 * 1024  # default bound of the on-disk cache, in bytes
+
 
 def upload_source_code(cmd, client,
                        registry_name,
                        resource_group_name,
                        source_location,
-                       tar_file_path,
                        docker_file_path,
                        docker_file_in_tar):
-    _pack_source_code(source_location,
-                      tar_file_path,
-                      docker_file_path,
-                      docker_file_in_tar)
-
-    size = os.path.getsize(tar_file_path)
-    unit = 'GiB'
-    for S in ['Bytes', 'KiB', 'MiB', 'GiB']:
-        if size < 1024:
-            unit = S
-            break
-        size = size / 1024.0
-
-    logger.info("Uploading archived source code from '%s'...", tar_file_path)
+    logger.info("Uploading archived source code from '%s'...", source_location)
     upload_url = None
     relative_path = None
     try:
@@ -53,64 +55,305 @@ def upload_source_code(cmd, client,
     if not upload_url:
         raise CLIInternalError("Failed to get a SAS URL to upload context.")
 
+    # The archive is compressed while it is uploaded, so no temporary tarball is written
+    uploaded = [0]
+
+    def _count(chunks):
+        for chunk in chunks:
+            uploaded[0] += len(chunk)
+            yield chunk
+
+    cache = _get_source_archive_cache(cmd, source_location)
+
     BlobClient = get_sdk(cmd.cli_ctx, ResourceType.DATA_STORAGE_BLOB, '_blob_client#BlobClient')
     BlobClient = BlobClient.from_blob_url(upload_url, connection_timeout=300)
-    with open(tar_file_path, "rb") as data:
-        BlobClient.upload_blob(data=data, blob_type="BlockBlob", overwrite=True)
-    logger.info("Sending context ({0:.3f} {1}) to registry: {2}...".format(
-        size, unit, registry_name))
+    BlobClient.upload_blob(data=_count(_stream_source_code(source_location, docker_file_path, docker_file_in_tar, cache=cache)),
+                           blob_type="BlockBlob", overwrite=True, max_concurrency=ARCHIVE_UPLOAD_CONCURRENCY)
+
+    logger.info("Sent context ({}) to registry: {}".format(_format_size(uploaded[0]), registry_name))
+    if cache is not None and cache.reused_bytes:
+        logger.info("Reused %s of compressed source from the local cache (%s uploaded in total)",
+                    _format_size(cache.reused_bytes), _format_size(uploaded[0]))
     return relative_path
 
 
-def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
-    logger.info("Packing source code into tar to upload...")
+def _get_source_archive_cache(cmd, source_location):
+    # 'az config set containerapp.source_cache_max_size_mb=0' turns the cache off
+    max_size_mb = cmd.cli_ctx.config.getint("containerapp", "source_cache_max_size_mb",
+                                            fallback=ARCHIVE_CACHE_MAX_SIZE // (1024 * 1024))
+    if max_size_mb <= 0:
+        return None
+    cache_dir = os.path.join(cmd.cli_ctx.config.config_dir, "containerapp", "source_cache")
+    try:
+        return SourceArchiveCache(cache_dir, source_location, max_size=max_size_mb * 1024 * 1024)
+    except OSError as e:
+        logger.debug("Source archive cache is unavailable: %s", e)
+        return None
 
-    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
-    ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
-    common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
-        # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.info("Excluding '%s' based on default ignore rules", tarinfo.name)
-            return True, parent_matching_rule_index
+def _format_size(size):
+    unit = 'GiB'
+    for S in ['Bytes', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            unit = S
+            break
+        size = size / 1024.0
+    return "{0:.3f} {1}".format(size, unit)
 
-        if ignore_list is None:
-            # if .dockerignore doesn't exists, inherit from parent
-            # eg, it will ignore the files under .git folder.
-            return parent_ignored, parent_matching_rule_index
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if re.match(item.pattern, tarinfo.name):
-                logger.debug(".dockerignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
-                return item.ignore, index
+def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+    with open(tar_file_path, "wb") as f:
+        for chunk in _stream_source_code(source_location, docker_file_path, docker_file_in_tar):
+            f.write(chunk)
 
-        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
-        # inherit from parent
-        return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
+def _stream_source_code(source_location, docker_file_path, docker_file_in_tar,
+                        chunk_size=ARCHIVE_CHUNK_SIZE, max_workers=ARCHIVE_MAX_WORKERS, cache=None):
+    """Yield the gzipped tar of the source directory while it is being built.
 
-        # Add the Dockerfile if it's specified.
-        # In the case of run, there will be no Dockerfile.
-        if docker_file_path:
-            docker_file_tarinfo = tar.gettarinfo(
-                docker_file_path, docker_file_in_tar)
-            with open(docker_file_path, "rb") as f:
-                tar.addfile(docker_file_tarinfo, f)
+    The tar stream is cut into chunk_size pieces that are compressed on a thread pool,
+    each as its own gzip member; concatenated members form a valid gzip stream.
+    With a SourceArchiveCache, files of at least ARCHIVE_CACHE_MIN_FILE_SIZE get a gzip member
+    of their own, which is reused from the cache when the file has not changed.
+    """
+    logger.info("Packing source code into tar to upload...")
+
+    original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
+    ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    # compressed pieces in archive order; bounded so packing can't run far ahead of the upload
+    chunks = queue.Queue(maxsize=max_workers * 2)
+    cancelled = threading.Event()
+    finished = object()
+
+    def _put(item):
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _PackingCancelled()
+
+    sink = _ChunkedCompressor(chunk_size, lambda data: _put(executor.submit(_gzip_chunk, data)))
+
+    def _produce():
+        try:
+            # only used to build headers; the archive bytes are written to the sink by hand so that
+            # single files can be swapped for cached gzip members
+            tar = tarfile.TarFile(fileobj=io.BytesIO(), mode="w")
+            entries = _iter_source_entries(source_location, ignore_list, ignore_list_size)
+            # Add the Dockerfile if it's specified.
+            # In the case of run, there will be no Dockerfile.
+            if docker_file_path:
+                entries = itertools.chain(entries, [(docker_file_path, docker_file_in_tar)])
+
+            offset = 0
+            for path, arcname in entries:
+                tarinfo = tar.gettarinfo(path, arcname)
+                if tarinfo is None:
+                    raise CLIInternalError("tarfile: unsupported type {}".format(path))
+                header = tarinfo.tobuf(tar.format, tar.encoding, tar.errors)
+                data_size = _padded_size(tarinfo.size) if tarinfo.isreg() else 0
+                offset += len(header) + data_size
+
+                if cache is not None and tarinfo.isreg() and tarinfo.size >= ARCHIVE_CACHE_MIN_FILE_SIZE:
+                    sink.close()
+                    _put(executor.submit(cache.get_or_create_member, path, tarinfo.size, header))
+                    continue
+
+                sink.write(header)
+                if tarinfo.isreg():
+                    with open(path, "rb") as f:
+                        for piece in _read_exactly(f, tarinfo.size, path):
+                            sink.write(piece)
+                    sink.write(tarfile.NUL * (data_size - tarinfo.size))
+
+            # end of archive: two zero blocks, then pad to a full record as tarfile does
+            end = tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+            offset += len(end)
+            remainder = offset % tarfile.RECORDSIZE
+            sink.write(end + (tarfile.NUL * (tarfile.RECORDSIZE - remainder) if remainder else b""))
+            sink.close()
+            _put(finished)
+        except _PackingCancelled:
+            pass
+        except Exception as e:  # pylint: disable=broad-except
+            try:
+                _put(e)
+            except _PackingCancelled:
+                pass
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            result = item.result()
+            if isinstance(result, bytes):
+                yield result
+                continue
+            # a cached gzip member on disk
+            with open(result, "rb") as f:
+                while True:
+                    piece = f.read(chunk_size)
+                    if not piece:
+                        break
+                    yield piece
+    finally:
+        cancelled.set()
+        producer.join()
+        executor.shutdown(wait=True)
+        if cache is not None:
+            cache.save()
+
+
+class _PackingCancelled(Exception):
+    pass
+
+
+class _ChunkedCompressor:
+    """Write-only file object handing fixed-size pieces of what is written to a callback."""
+    def __init__(self, chunk_size, on_chunk):
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self.on_chunk(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def close(self):
+        if self.buffer:
+            self.on_chunk(bytes(self.buffer))
+            self.buffer = bytearray()
+
+
+def _gzip_chunk(data):
+    # zlib releases the GIL, so chunks compress in parallel; mtime=0 keeps the output reproducible
+    return gzip.compress(data, compresslevel=ARCHIVE_COMPRESS_LEVEL, mtime=0)
+
+
+def _padded_size(size):
+    blocks, remainder = divmod(size, tarfile.BLOCKSIZE)
+    return (blocks + (1 if remainder else 0)) * tarfile.BLOCKSIZE
+
+
+def _read_exactly(f, size, name):
+    remaining = size
+    while remaining:
+        piece = f.read(min(remaining, ARCHIVE_CHUNK_SIZE))
+        if not piece:
+            raise CLIInternalError("'{}' changed while it was being archived".format(name))
+        remaining -= len(piece)
+        yield piece
+
+
+class SourceArchiveCache:
+    """Local cache of the gzip members of large files from previous source archives.
+
+    A per-source index maps each file path to its size, mtime and sha256, so files whose
+    size and mtime are unchanged are not hashed again. Members are stored under a key derived
+    from the file's tar header and content hash and are evicted least recently used first
+    once the cache grows past max_size bytes.
+    """
+    def __init__(self, cache_dir, source_location, max_size=ARCHIVE_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.members_dir = os.path.join(cache_dir, "members")
+        self.max_size = max_size
+        source_key = hashlib.sha256(os.path.abspath(source_location).encode("utf-8")).hexdigest()[:32]
+        self.index_path = os.path.join(cache_dir, "index_{}.json".format(source_key))
+        self.index = {}
+        self.seen = {}
+        self.reused_bytes = 0
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.members_dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def get_or_create_member(self, path, size, header):
+        st = os.stat(path)
+        known = self.index.get(path)
+        if known and known[0] == size == st.st_size and known[1] == st.st_mtime_ns:
+            content_hash = known[2]
+            member_path = self._member_path(header, content_hash)
+            if os.path.exists(member_path):
+                self._remember(path, st, content_hash)
+                os.utime(member_path)  # keep recently used members from eviction
+                member_size = os.path.getsize(member_path)
+                with self._lock:
+                    self.reused_bytes += member_size
+                    self.total_bytes += member_size
+                return member_path
+
+        # compress header, content and padding into a new member while hashing the content
+        sha = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.members_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, \
+                    gzip.GzipFile(filename="", mode="wb", compresslevel=ARCHIVE_COMPRESS_LEVEL, fileobj=raw, mtime=0) as gz:
+                gz.write(header)
+                with open(path, "rb") as f:
+                    for piece in _read_exactly(f, size, path):
+                        sha.update(piece)
+                        gz.write(piece)
+                gz.write(tarfile.NUL * (_padded_size(size) - size))
+            content_hash = sha.hexdigest()
+            member_path = self._member_path(header, content_hash)
+            os.replace(temp_path, member_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._remember(path, st, content_hash)
+        with self._lock:
+            self.total_bytes += os.path.getsize(member_path)
+        return member_path
+
+    def save(self):
+        # the index only keeps files archived this time, so it does not grow with deleted files
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.seen, f)
+            os.replace(temp_path, self.index_path)
+            self._evict()
+        except OSError as e:
+            logger.debug("Failed to update the source archive cache: %s", e)
+
+    def _remember(self, path, st, content_hash):
+        with self._lock:
+            self.seen[path] = [st.st_size, st.st_mtime_ns, content_hash]
+
+    def _member_path(self, header, content_hash):
+        key = hashlib.sha256(header + content_hash.encode("ascii")).hexdigest()
+        return os.path.join(self.members_dir, key + ".gz")
+
+    def _evict(self):
+        members = []
+        with os.scandir(self.members_dir) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    members.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(m[1] for m in members)
+        for _, member_size, member_path in sorted(members):
+            if total <= self.max_size:
+                break
+            os.remove(member_path)
+            total -= member_size
 
 
 class IgnoreRule:  # pylint: disable=too-few-public-methods
@@ -127,6 +370,10 @@ class IgnoreRule:  # pylint: disable=too-few-public-methods
             if rule.startswith('/'):
                 rule = rule[1:]  # remove beginning '/'
 
+        # the part of the rule before the first wildcard; a path can only match the rule if it is
+        # compatible with this prefix, which lets whole directories be skipped
+        self.literal_prefix = re.split(r"[*?\[\\]", rule, maxsplit=1)[0]
+
         self.pattern = "^"
         tokens = rule.split('/')
         token_length = len(tokens)
@@ -181,31 +428,88 @@ def _load_dockerignore_file(source_location, original_docker_file_name):
     return ignore_list, len(ignore_list)
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
+class _DockerIgnoreMatcher:
+    """Match archive names against .dockerignore rules with one compiled regex.
+
+    Rules are ordered by priority. match(name, limit) returns the index of the first rule
+    below limit that matches name, as the sequential re.match loop did, or None.
+    """
+    def __init__(self, ignore_list):
+        self.ignore_list = ignore_list
+        self._compiled = {}
+
+    def match(self, name, limit):
+        if limit <= 0:
+            return None
+        regex = self._compiled.get(limit)
+        if regex is None:
+            regex = re.compile("|".join("(?P<r{}>{})".format(index, item.pattern)
+                                        for index, item in enumerate(self.ignore_list[:limit])))
+            self._compiled[limit] = regex
+        m = regex.match(name)
+        return int(m.lastgroup[1:]) if m else None
+
+    def can_reinclude(self, dir_name, limit):
+        # Only a "!" rule with higher priority than the one that ignored the directory can
+        # re-include something beneath it, and only if its literal prefix fits the directory.
+        dir_prefix = dir_name + "/" if dir_name else ""
+        for item in self.ignore_list[:limit]:
+            if not item.ignore and (item.literal_prefix.startswith(dir_prefix) or dir_prefix.startswith(item.literal_prefix)):
+                return True
+        return False
+
+
+def _iter_source_entries(source_location, ignore_list, ignore_list_size):
+    """Yield (path, arcname) for each file and directory to archive, in sorted order."""
+    common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
+    matcher = _DockerIgnoreMatcher(ignore_list) if ignore_list is not None else None
+
+    def _ignore_check(arcname, parent_ignored, parent_matching_rule_index):
+        # ignore common vcs dir or file
+        if arcname in common_vcs_ignore_list:
+            logger.info("Excluding '%s' based on default ignore rules", arcname)
+            return True, parent_matching_rule_index
+
+        if matcher is None:
+            # if .dockerignore doesn't exists, inherit from parent
+            # eg, it will ignore the files under .git folder.
+            return parent_ignored, parent_matching_rule_index
+
+        # rules whose priorities are lower than the parent matching rule are not checked;
+        # current item just inherits from parent
+        index = matcher.match(arcname, parent_matching_rule_index)
+        if index is not None:
+            logger.debug(".dockerignore: rule '%s' matches '%s'.",
+                         ignore_list[index].rule, arcname)
+            return ignore_list[index].ignore, index
+
+        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
+                     arcname, parent_ignored)
+        # inherit from parent
+        return parent_ignored, parent_matching_rule_index
+
+    def _walk(path, arcname, is_dir, parent_ignored, parent_matching_rule_index):
+        ignored, matching_rule_index = _ignore_check(arcname, parent_ignored, parent_matching_rule_index)
 
-    if tarinfo is None:
-        raise CLIInternalError("tarfile: unsupported type {}".format(name))
+        if not ignored:
+            yield path, arcname
 
-    # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        if not is_dir:
+            return
+        # even if the dir is ignored, its child items can still be included by a "!" rule;
+        # skip scanning it only when no such rule can apply
+        if ignored and (matcher is None or not matcher.can_reinclude(arcname, matching_rule_index)):
+            logger.debug("Skipping ignored directory '%s'", arcname)
+            return
 
-    if not ignored:
-        # append the tar header and data to the archive
-        if tarinfo.isreg():
-            with open(name, "rb") as f:
-                tar.addfile(tarinfo, f)
-        else:
-            tar.addfile(tarinfo)
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            yield from _walk(entry.path, "{}/{}".format(arcname, entry.name) if arcname else entry.name,
+                             entry.is_dir(follow_symlinks=False), ignored, matching_rule_index)
 
-    # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+    # the archive root has an empty arcname
+    yield from _walk(source_location, "", True, False, ignore_list_size)
 
 
 def check_remote_source_code(source_location):
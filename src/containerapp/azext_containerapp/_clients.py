@@ -5,6 +5,7 @@
 # pylint: disable=line-too-long, super-with-arguments, too-many-instance-attributes, consider-using-f-string, no-else-return, no-self-use
 
 import json
+import random
 import time
 import sys
 
@@ -19,10 +20,16 @@ CURRENT_API_VERSION = "2023-05-01"
 PREVIEW_API_VERSION = "2023-05-02-preview"
 POLLING_TIMEOUT = 600  # how many seconds before exiting
 POLLING_SECONDS = 2  # how many seconds between requests
+POLLING_MAX_SECONDS = 15  # upper bound for the backoff between requests when the service sends no Retry-After
+POLLING_BACKOFF_FACTOR = 1.5
+POLLING_JITTER = 0.2  # +/- fraction applied to each backoff delay
+POLLING_MAX_WORKERS = 16  # how many operation status requests to run at once
 POLLING_TIMEOUT_FOR_MANAGED_CERTIFICATE = 1500  # how many seconds before exiting
 POLLING_INTERVAL_FOR_MANAGED_CERTIFICATE = 4  # how many seconds between requests
 HEADER_AZURE_ASYNC_OPERATION = "azure-asyncoperation"
 HEADER_LOCATION = "location"
+PAGING_MAX_WORKERS = 8  # how many list requests to run at once when fanning out
+PAGING_QUEUE_SIZE = 1000  # how many fetched items may wait for the consumer before workers block
 
 
 class PollingAnimation():
@@ -30,9 +37,9 @@ class PollingAnimation():
         self.tickers = ["/", "|", "\\", "-", "/", "|", "\\", "-"]
         self.currTicker = 0
 
-    def tick(self):
+    def tick(self, status=None):
         sys.stderr.write('\r')
-        sys.stderr.write(self.tickers[self.currTicker] + " Running ..")
+        sys.stderr.write(self.tickers[self.currTicker] + " Running .." + (" " + status if status else ""))
         sys.stderr.flush()
         self.currTicker += 1
         self.currTicker = self.currTicker % len(self.tickers)
@@ -42,17 +49,169 @@ class PollingAnimation():
         sys.stderr.write("\r\033[K")
 
 
+class PollingBackoff():
+    """Compute the wait before the next poll of a long running operation.
+
+    A Retry-After header from the service always wins; otherwise the delay grows
+    exponentially from POLLING_SECONDS up to POLLING_MAX_SECONDS with random jitter,
+    so many operations polled together do not hit the service in lockstep.
+    """
+    def __init__(self, initial=POLLING_SECONDS, maximum=POLLING_MAX_SECONDS, factor=POLLING_BACKOFF_FACTOR, jitter=POLLING_JITTER):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempt = 0
+
+    def next_delay(self, response=None):
+        retry_after = _extract_retry_after(response) if response is not None else None
+        self.attempt += 1
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.maximum, self.initial * (self.factor ** (self.attempt - 1)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class _PollingOperation():  # pylint: disable=too-few-public-methods
+    def __init__(self, key, request_url, kind, deadline):
+        self.key = key
+        self.request_url = request_url
+        self.kind = kind
+        self.deadline = deadline
+        self.backoff = PollingBackoff()
+
+
+class LongRunningOperationPoller():
+    """Poll many Azure-AsyncOperation or Location operation urls at once on a bounded worker pool.
+
+    Operations are scheduled independently: each one is polled again after its own
+    Retry-After or backoff delay, and a single progress line is reported for the batch.
+    wait() returns a dict mapping each key to the operation result, or to the exception
+    raised for it when the operation failed. Operations are polled until they reach a
+    terminal state, unless a timeout in seconds is given.
+    """
+    STATUS = "status"  # Azure-AsyncOperation url, done when the body reports a terminal status
+    RESULTS = "results"  # Location url, done when the service stops answering 202
+
+    def __init__(self, cmd, max_workers=POLLING_MAX_WORKERS, timeout=None, show_progress=True):
+        self.cmd = cmd
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.show_progress = show_progress
+        self._operations = []
+
+    def add(self, key, request_url, kind=STATUS):
+        if not request_url:
+            header = HEADER_AZURE_ASYNC_OPERATION if kind == self.STATUS else HEADER_LOCATION
+            raise AzureResponseError(f"Http response lack of necessary header: '{header}'")
+        deadline = time.time() + self.timeout if self.timeout is not None else None
+        self._operations.append(_PollingOperation(key, request_url, kind, deadline))
+
+    def wait(self):
+        import heapq
+        from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
+
+        results = {}
+        total = len(self._operations)
+        if not total:
+            return results
+
+        # (due time, sequence, operation); the sequence keeps heap ordering stable
+        scheduled = [(time.time(), i, op) for i, op in enumerate(self._operations)]
+        heapq.heapify(scheduled)
+        sequence = total
+        in_flight = {}
+        animation = PollingAnimation() if self.show_progress else None
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+            try:
+                while scheduled or in_flight:
+                    now = time.time()
+                    while scheduled and scheduled[0][0] <= now:
+                        op = heapq.heappop(scheduled)[2]
+                        in_flight[executor.submit(send_raw_request, self.cmd.cli_ctx, "GET", op.request_url)] = op
+
+                    if animation:
+                        animation.tick(f"{len(results)}/{total} operations completed" if total > 1 else None)
+
+                    next_due = scheduled[0][0] if scheduled else None
+                    wait_seconds = max(0, next_due - time.time()) if next_due is not None else None
+                    if not in_flight:
+                        time.sleep(wait_seconds)
+                        continue
+                    done, _ = wait_futures(list(in_flight), timeout=wait_seconds, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        op = in_flight.pop(future)
+                        try:
+                            r = future.result()
+                            finished, result = self._evaluate(op, r)
+                        except Exception as e:  # pylint: disable=broad-except
+                            finished, result = True, e
+                        if finished:
+                            results[op.key] = result
+                            continue
+                        due = time.time() + op.backoff.next_delay(r)
+                        if op.deadline is not None and due > op.deadline:
+                            results[op.key] = AzureResponseError(f"Timed out waiting for operation {op.request_url}")
+                            continue
+                        sequence += 1
+                        heapq.heappush(scheduled, (due, sequence, op))
+            finally:
+                if animation:
+                    animation.flush()
+
+        return results
+
+    def _evaluate(self, op, r):
+        from azure.core.exceptions import HttpResponseError
+
+        if op.kind == self.RESULTS:
+            if r.status_code == 202:
+                return False, None
+            return True, self._body(r)
+
+        if r.status_code != 200:
+            return True, None
+        response_body = json.loads(r.text)
+        status = response_body.get("status")
+        if not status:
+            raise AzureResponseError("Http response body lack of necessary property: status")
+        if status.lower() in ["failed", "canceled"]:
+            message = json.dumps(response_body["error"]) if "error" in response_body else "Operation failed or canceled"
+            return True, HttpResponseError(response=r, message=message)
+        if status.lower() in ["succeeded"]:
+            return True, None
+        return False, None
+
+    @staticmethod
+    def _body(r):
+        if r is not None and r.text:
+            return json.loads(r.text)
+        return None
+
+
+def _wait_for_operation(cmd, request_url, kind):
+    poller = LongRunningOperationPoller(cmd)
+    poller.add(request_url, request_url, kind)
+    result = poller.wait()[request_url]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
 def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-return-statements
     try:
         start = time.time()
         end = time.time() + POLLING_TIMEOUT
         animation = PollingAnimation()
+        backoff = PollingBackoff()
 
         animation.tick()
         r = send_raw_request(cmd.cli_ctx, "GET", request_url)
 
         while r.status_code in [200, 201] and start < end:
-            time.sleep(POLLING_SECONDS)
+            time.sleep(backoff.next_delay(r))
             animation.tick()
 
             r = send_raw_request(cmd.cli_ctx, "GET", request_url)
@@ -74,76 +233,111 @@ def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-retu
 
 
 def poll_status(cmd, request_url):  # pylint: disable=inconsistent-return-statements
-    from azure.core.exceptions import HttpResponseError
-    from ._utils import safe_get
-
     if not request_url:
         raise AzureResponseError(f"Http response lack of necessary header: '{HEADER_AZURE_ASYNC_OPERATION}'")
 
-    start = time.time()
-    end = time.time() + POLLING_TIMEOUT
-    animation = PollingAnimation()
-
-    animation.tick()
-    r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-    while r.status_code in [200] and start < end:
-        time.sleep(_extract_delay(r))
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        response_body = json.loads(r.text)
-        status = safe_get(response_body, "status")
-        if not status:
-            raise AzureResponseError("Http response body lack of necessary property: status")
-        if response_body["status"].lower() in ["failed", "canceled"]:
-            message = json.dumps(response_body["error"]) if "error" in response_body else "Operation failed or canceled"
-            raise HttpResponseError(
-                response=r,
-                message=message
-            )
-        if response_body["status"].lower() in ["succeeded"]:
-            break
-        start = time.time()
-
-    animation.flush()
-    return
+    _wait_for_operation(cmd, request_url, LongRunningOperationPoller.STATUS)
 
 
 def poll_results(cmd, request_url):  # pylint: disable=inconsistent-return-statements
     if not request_url:
         raise AzureResponseError(f"Http response lack of necessary header: '{HEADER_LOCATION}'")
 
-    start = time.time()
-    end = time.time() + POLLING_TIMEOUT
-    animation = PollingAnimation()
-
-    animation.tick()
-    r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-    while r.status_code in [202] and start < end:
-        time.sleep(_extract_delay(r))
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        start = time.time()
-
-    animation.flush()
-    if r.text:
-        return json.loads(r.text)
+    return _wait_for_operation(cmd, request_url, LongRunningOperationPoller.RESULTS)
 
 
-def _extract_delay(response):
+def _extract_retry_after(response):
     try:
         retry_after = response.headers.get("retry-after")
         if retry_after:
-            return int(retry_after)
+            try:
+                return int(retry_after)
+            except ValueError:
+                from email.utils import parsedate_to_datetime
+                return max(0, parsedate_to_datetime(retry_after).timestamp() - time.time())
         for ms_header in ["retry-after-ms", "x-ms-retry-after-ms"]:
             retry_after = response.headers.get(ms_header)
             if retry_after:
                 parsed_retry_after = int(retry_after)
                 return parsed_retry_after / 1000.0
-    except ValueError:
+    except (ValueError, TypeError):
         pass
-    return POLLING_SECONDS
+    return None
+
+
+def _iter_pages(cmd, request_url):
+    """Yield each page of an ARM list response, requesting the next page while the caller consumes the current one."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(send_raw_request, cmd.cli_ctx, "GET", request_url)
+        while future is not None:
+            page = future.result().json()
+            next_link = page.get("nextLink")
+            future = executor.submit(send_raw_request, cmd.cli_ctx, "GET", next_link) if next_link else None
+            yield page
+
+
+def iter_list_results(cmd, request_url, formatter=lambda x: x):
+    for page in _iter_pages(cmd, request_url):
+        for item in page.get("value", []):
+            yield formatter(item)
+
+
+def iter_list_results_concurrently(iterables, max_workers=PAGING_MAX_WORKERS):
+    """Drain several list iterators on a bounded worker pool, yielding items as soon as any of them produces one.
+
+    Items from different iterators are interleaved; items from the same iterator keep their order.
+    """
+    import queue
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    iterables = list(iterables)
+    if not iterables:
+        return
+
+    results = queue.Queue(maxsize=PAGING_QUEUE_SIZE)
+    cancelled = threading.Event()
+    finished = object()
+
+    def _put(entry):
+        while not cancelled.is_set():
+            try:
+                results.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(iterable):
+        if cancelled.is_set():
+            return
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            _put((finished, e))
+            return
+        _put((finished, None))
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(iterables)))
+    try:
+        for iterable in iterables:
+            executor.submit(_drain, iterable)
+        remaining = len(iterables)
+        while remaining:
+            item, error = results.get()
+            if item is finished:
+                if error is not None:
+                    raise error
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=True)
 
 
 class ContainerAppClient():
@@ -151,6 +345,17 @@ class ContainerAppClient():
 
     @classmethod
     def create_or_update(cls, cmd, resource_group_name, name, container_app_envelope, no_wait=False):
+        body, operation_url = cls.begin_create_or_update(cmd, resource_group_name, name, container_app_envelope, no_wait=no_wait)
+
+        if no_wait or not operation_url:
+            return body
+        poll_status(cmd, operation_url)
+        return cls.show(cmd, resource_group_name, name)
+
+    @classmethod
+    def begin_create_or_update(cls, cmd, resource_group_name, name, container_app_envelope, no_wait=False):
+        """Send the PUT without waiting; return the response body and the Azure-AsyncOperation url to poll, if any.
+        The url is only required when the caller is going to poll it, so it may be missing with no_wait."""
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}?api-version={}"
@@ -162,22 +367,12 @@ class ContainerAppClient():
             cls.api_version)
 
         r = send_raw_request(cmd.cli_ctx, "PUT", request_url, body=json.dumps(container_app_envelope))
-
-        if no_wait:
-            return r.json()
-        elif r.status_code == 201:
-            operation_url = r.headers.get(HEADER_AZURE_ASYNC_OPERATION)
-            poll_status(cmd, operation_url)
-            url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}?api-version={}"
-            request_url = url_fmt.format(
-                management_hostname.strip('/'),
-                sub_id,
-                resource_group_name,
-                name,
-                cls.api_version)
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-
-        return r.json()
+        if r.status_code != 201:
+            return r.json(), None
+        operation_url = r.headers.get(HEADER_AZURE_ASYNC_OPERATION)
+        if not operation_url and not no_wait:
+            raise AzureResponseError(f"Http response lack of necessary header: '{HEADER_AZURE_ASYNC_OPERATION}'")
+        return r.json(), operation_url
 
     @classmethod
     def update(cls, cmd, resource_group_name, name, container_app_envelope, no_wait=False):
@@ -245,37 +440,27 @@ class ContainerAppClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        app_list = []
+        return list(cls.iter_by_subscription(cmd, formatter))
 
+    @classmethod
+    def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
+        return list(cls.iter_by_resource_group(cmd, resource_group_name, formatter))
+
+    @classmethod
+    def iter_by_subscription(cls, cmd, formatter=lambda x: x, subscription_id=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
-        sub_id = get_subscription_id(cmd.cli_ctx)
+        sub_id = subscription_id or get_subscription_id(cmd.cli_ctx)
         request_url = "{}/subscriptions/{}/providers/Microsoft.App/containerApps?api-version={}".format(
             management_hostname.strip('/'),
             sub_id,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return iter_list_results(cmd, request_url, formatter)
 
     @classmethod
-    def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        app_list = []
-
+    def iter_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x, subscription_id=None):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
-        sub_id = get_subscription_id(cmd.cli_ctx)
+        sub_id = subscription_id or get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps?api-version={}"
         request_url = url_fmt.format(
             management_hostname.strip('/'),
@@ -283,21 +468,20 @@ class ContainerAppClient():
             resource_group_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
+        return iter_list_results(cmd, request_url, formatter)
 
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
+    @classmethod
+    def iter_by_subscriptions(cls, cmd, subscription_ids, formatter=lambda x: x, max_workers=PAGING_MAX_WORKERS):
+        return iter_list_results_concurrently(
+            [cls.iter_by_subscription(cmd, formatter, subscription_id=sub_id) for sub_id in subscription_ids],
+            max_workers=max_workers)
 
-        return app_list
+    @classmethod
+    def iter_by_resource_groups(cls, cmd, resource_group_names, formatter=lambda x: x, max_workers=PAGING_MAX_WORKERS):
+        sub_id = get_subscription_id(cmd.cli_ctx)
+        return iter_list_results_concurrently(
+            [cls.iter_by_resource_group(cmd, rg, formatter, subscription_id=sub_id) for rg in resource_group_names],
+            max_workers=max_workers)
 
     @classmethod
     def list_secrets(cls, cmd, resource_group_name, name):
@@ -318,8 +502,6 @@ class ContainerAppClient():
     @classmethod
     def list_revisions(cls, cmd, resource_group_name, name, formatter=lambda x: x):
 
-        revisions_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}/revisions?api-version={}"
@@ -330,21 +512,7 @@ class ContainerAppClient():
             name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            revisions_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                revisions_list.append(formatted)
-
-        return revisions_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
     @classmethod
     def show_revision(cls, cmd, resource_group_name, container_app_name, name):
@@ -590,8 +758,6 @@ class ManagedEnvironmentClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         request_url = "{}/subscriptions/{}/providers/Microsoft.App/managedEnvironments?api-version={}".format(
@@ -599,26 +765,10 @@ class ManagedEnvironmentClient():
             sub_id,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/managedEnvironments?api-version={}"
@@ -628,21 +778,7 @@ class ManagedEnvironmentClient():
             resource_group_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
     @classmethod
     def show_certificate(cls, cmd, resource_group_name, name, certificate_name):
@@ -953,8 +1089,6 @@ class ContainerAppsJobClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         request_url = "{}/subscriptions/{}/providers/Microsoft.App/jobs?api-version={}".format(
@@ -962,18 +1096,10 @@ class ContainerAppsJobClient():
             sub_id,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        return app_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/jobs?api-version={}"
@@ -983,13 +1109,7 @@ class ContainerAppsJobClient():
             resource_group_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        return app_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
     @classmethod
     def delete(cls, cmd, resource_group_name, name, no_wait=False):
@@ -1313,8 +1433,6 @@ class DaprComponentClient():
 
     @classmethod
     def list(cls, cmd, resource_group_name, environment_name, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         request_url = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/managedEnvironments/{}/daprComponents?api-version={}".format(
@@ -1324,21 +1442,7 @@ class DaprComponentClient():
             environment_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
 
 class StorageClient():
@@ -1427,8 +1531,6 @@ class StorageClient():
 
     @classmethod
     def list(cls, cmd, resource_group_name, env_name, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/managedEnvironments/{}/storages?api-version={}"
@@ -1439,21 +1541,7 @@ class StorageClient():
             env_name,
             cls.api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
-
-        return env_list
+        return list(iter_list_results(cmd, request_url, formatter))
 
 
 class AuthClient():
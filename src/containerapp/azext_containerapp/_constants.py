@@ -13,6 +13,9 @@ MAXIMUM_CONTAINER_APP_NAME_LENGTH = 32
 
 SHORT_POLLING_INTERVAL_SECS = 3
 LONG_POLLING_INTERVAL_SECS = 10
+DEFAULT_BATCH_MAX_PARALLELISM = 8
+DEFAULT_IMAGE_INSPECTION_PARALLELISM = 10
+IMAGE_INSPECTION_CACHE_TTL_HOURS = 24
 
 ACR_IMAGE_SUFFIX = ".azurecr.io"
 
@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 # pylint: disable=line-too-long, consider-using-f-string, no-else-return, duplicate-string-formatting-argument, expression-not-assigned, too-many-locals, logging-fstring-interpolation, broad-except, pointless-statement, bare-except
+import os
 import sys
 
 from azure.cli.core.azclierror import (ValidationError)
@@ -25,6 +26,37 @@ def load_yaml_file(file_name):
         raise ValidationError('Error parsing {} ({})'.format(file_name, str(ex))) from ex
 
 
+def load_batch_manifest(file_name):
+    """Load a manifest listing container app yaml files.
+
+    The manifest is either a list or a mapping with an "apps" list. Each entry is a path to a
+    container app yaml, or a mapping with "yaml" and optional "name" and "resourceGroup".
+    Relative paths are resolved against the manifest's directory.
+    """
+    manifest = load_yaml_file(file_name)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('apps')
+    if not isinstance(manifest, list) or not manifest:
+        raise ValidationError('Invalid manifest provided. The manifest must contain a non-empty list of container app yaml files under "apps".')
+
+    base_dir = os.path.dirname(os.path.abspath(file_name))
+    entries = []
+    for entry in manifest:
+        if isinstance(entry, str):
+            entry = {"yaml": entry}
+        if not isinstance(entry, dict) or not entry.get('yaml'):
+            raise ValidationError('Invalid manifest entry {}. Each entry must be a yaml path or a mapping with a "yaml" key.'.format(entry))
+        yaml_path = os.path.join(base_dir, os.path.expanduser(entry['yaml']))
+        name = entry.get('name')
+        if not name:
+            yaml_containerapp = load_yaml_file(yaml_path)
+            name = yaml_containerapp.get('name') if isinstance(yaml_containerapp, dict) else None
+        if not name:
+            raise ValidationError('No app name found for {}. Set "name" in the yaml or in the manifest entry.'.format(entry['yaml']))
+        entries.append({"yaml": yaml_path, "name": name, "resource_group_name": entry.get('resourceGroup')})
+    return entries
+
+
 def create_deserializer(models):
     from msrest import Deserializer
     import inspect
@@ -63,6 +63,23 @@ helps['containerapp create'] = """
               --secret-volume-mount "mnt/secrets"
 """
 
+helps['containerapp create-batch'] = """
+    type: command
+    short-summary: Create or replace many container apps from a manifest of container app yaml files.
+    long-summary: Environments referenced by the apps are looked up once and the apps are submitted concurrently. The command fails if any app fails, after all apps have been processed.
+    examples:
+    - name: Create the container apps listed in a manifest, at most 16 at a time.
+      text: |
+          az containerapp create-batch -g MyResourceGroup --manifest apps.yaml --max-parallelism 16
+    - name: Example manifest.
+      text: |
+          apps:
+            - api.yaml
+            - yaml: worker.yaml
+              name: my-worker
+              resourceGroup: MyOtherResourceGroup
+"""
+
 helps['containerapp update'] = """
     type: command
     short-summary: Update a container app. In multiple revisions mode, create a new revision based on the latest revision.
@@ -1726,6 +1743,9 @@ helps['containerapp patch list'] = """
     - name: List patchable and unpatchable container apps by managed environment with the show-all option.
       text: |
           az containerapp patch list -g MyResourceGroup --environment MyContainerAppEnv --show-all
+    - name: List patchable container apps, reading image metadata from the registry without Docker.
+      text: |
+          az containerapp patch list -g MyResourceGroup --inspect-from-registry --max-parallelism 20
 """
 
 helps['containerapp patch apply'] = """
@@ -1879,6 +1899,15 @@ helps['containerapp list'] = """
     - name: List container apps by environment type.
       text: |
           az containerapp list --environment-type connected
+    - name: List container apps of several resource groups concurrently.
+      text: |
+          az containerapp list --resource-groups MyResourceGroup1 MyResourceGroup2
+    - name: List container apps of several subscriptions concurrently.
+      text: |
+          az containerapp list --subscriptions 00000000-0000-0000-0000-000000000000 11111111-1111-1111-1111-111111111111
+    - name: Stream container apps as newline-delimited JSON.
+      text: |
+          az containerapp list --stream > containerapps.ndjson
 """
 
 # Connected Environment Commands
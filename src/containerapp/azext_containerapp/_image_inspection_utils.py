@@ -0,0 +1,212 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+# pylint: disable=line-too-long, consider-using-f-string, broad-except
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from knack.log import get_logger
+
+from ._constants import (IMAGE_INSPECTION_CACHE_TTL_HOURS, DEFAULT_IMAGE_INSPECTION_PARALLELISM)
+
+logger = get_logger(__name__)
+
+UNAUTHORIZED_INSPECTION = 401
+BUILDPACKS_METADATA_LABEL = "io.buildpacks.lifecycle.metadata"
+DOCKER_HUB_REGISTRY = "registry-1.docker.io"
+MANIFEST_MEDIA_TYPES = ", ".join([
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json"])
+REGISTRY_TIMEOUT = 30
+
+
+class ImageInspectionCache:
+    """Inspection results persisted between runs, keyed by image digest. Tags can be pushed again,
+    so images only known by tag are never cached. Entries older than ttl_seconds are dropped."""
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.time() - entry["timestamp"] < self.ttl_seconds:
+            return entry["result"]
+        return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = {"timestamp": time.time(), "result": result}
+
+    def save(self):
+        now = time.time()
+        with self._lock:
+            entries = {k: v for k, v in self._entries.items() if now - v["timestamp"] < self.ttl_seconds}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.debug("Failed to save the image inspection cache: %s", e)
+
+
+def get_image_inspection_cache(cmd):
+    # 'az config set containerapp.image_inspection_cache_ttl_hours=0' turns the cache off
+    ttl_hours = cmd.cli_ctx.config.getint("containerapp", "image_inspection_cache_ttl_hours", fallback=IMAGE_INSPECTION_CACHE_TTL_HOURS)
+    if ttl_hours <= 0:
+        return None
+    return ImageInspectionCache(os.path.join(cmd.cli_ctx.config.config_dir, "containerapp", "image_inspection_cache.json"), ttl_hours * 3600)
+
+
+def inspect_images(image_names, pack_exec_path=None, cache=None, max_parallelism=DEFAULT_IMAGE_INSPECTION_PARALLELISM, from_registry=False):
+    """Inspect every unique image once and return a dict mapping each image name to the
+    `pack inspect-image` style result, to UNAUTHORIZED_INSPECTION when it could not be read,
+    or to None when inspecting it failed for another reason, which is logged as a warning."""
+    unique_images = sorted(set(image_names))
+    if not unique_images:
+        return {}
+
+    def _inspect(image_name):
+        try:
+            return _inspect_image(image_name, pack_exec_path, cache, from_registry)
+        except Exception as e:
+            logger.warning("Failed to inspect image %s: %s", image_name, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_parallelism, len(unique_images))) as executor:
+        results = dict(zip(unique_images, executor.map(_inspect, unique_images)))
+    if cache is not None:
+        cache.save()
+    return results
+
+
+def _inspect_image(image_name, pack_exec_path, cache, from_registry):
+    if (image_name.find("run-dotnet") != -1) and (image_name.find("cbl-mariner") != -1):
+        return {"remote_info": {"run_images": [{"name": "mcr.microsoft.com/oryx/builder:" + image_name.split(":")[-1]}]}}
+
+    digest = image_name.split("@", 1)[1] if "@sha256:" in image_name else None
+    if cache is not None and digest:
+        cached = cache.get(digest)
+        if cached is not None:
+            return cached
+
+    result = None
+    registry_error = None
+    if from_registry:
+        try:
+            digest, result = _inspect_image_from_registry(image_name)
+        except Exception as e:
+            logger.debug("Reading %s from its registry failed, falling back to pack: %s", image_name, e)
+            registry_error = e
+        if result is None and cache is not None and digest:
+            result = cache.get(digest)
+
+    if result is None and pack_exec_path:
+        result = _inspect_image_with_pack(pack_exec_path, image_name)
+
+    if result is None:
+        if registry_error is not None and not _is_unauthorized_error(registry_error):
+            raise registry_error
+        return UNAUTHORIZED_INSPECTION
+    # the result of a tag could be stale the next time, so only results with a known digest are cached
+    if cache is not None and digest and result != UNAUTHORIZED_INSPECTION:
+        cache.put(digest, result)
+    return result
+
+
+def _is_unauthorized_error(error):
+    # missing images are reported like pack does, as images that cannot be read
+    return isinstance(error, requests.HTTPError) and error.response is not None and error.response.status_code in (401, 403, 404)
+
+
+def _inspect_image_with_pack(pack_exec_path, image_name):
+    with subprocess.Popen([pack_exec_path, "inspect-image", image_name, "--output", "json"], stderr=subprocess.PIPE, stdout=subprocess.PIPE) as img_info:
+        img_info_out, img_info_err = img_info.communicate()
+    if img_info_err.find(b"status code 401 Unauthorized") != -1 or img_info_err.find(b"unable to find image") != -1:
+        return UNAUTHORIZED_INSPECTION
+    return json.loads(img_info_out)
+
+
+def _parse_image_reference(image_name):
+    name, digest = (image_name.split("@", 1) + [None])[:2]
+    tag = None
+    if ":" in name.rsplit("/", 1)[-1]:
+        name, tag = name.rsplit(":", 1)
+    parts = name.split("/", 1)
+    if len(parts) == 2 and ("." in parts[0] or ":" in parts[0] or parts[0] == "localhost"):
+        registry, repository = parts
+    else:
+        registry, repository = DOCKER_HUB_REGISTRY, name
+        if "/" not in repository:
+            repository = "library/" + repository
+    if registry == "docker.io":
+        registry = DOCKER_HUB_REGISTRY
+    return registry, repository, digest or tag or "latest"
+
+
+def _registry_get(session, url, headers, tokens):
+    r = session.get(url, headers=headers, timeout=REGISTRY_TIMEOUT)
+    if r.status_code == 401:
+        # anonymous bearer token flow: https://distribution.github.io/distribution/spec/auth/token/
+        challenge = r.headers.get("WWW-Authenticate", "")
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        if not challenge.lower().startswith("bearer") or "realm" not in params:
+            r.raise_for_status()
+        token_key = (params.get("realm"), params.get("service"), params.get("scope"))
+        if token_key not in tokens:
+            token_response = session.get(params["realm"], params={k: v for k, v in params.items() if k in ("service", "scope")}, timeout=REGISTRY_TIMEOUT)
+            token_response.raise_for_status()
+            token_json = token_response.json()
+            tokens[token_key] = token_json.get("token") or token_json.get("access_token")
+        r = session.get(url, headers=dict(headers, Authorization="Bearer " + tokens[token_key]), timeout=REGISTRY_TIMEOUT)
+    r.raise_for_status()
+    return r
+
+
+def _inspect_image_from_registry(image_name):
+    """Read the run images of a buildpacks image from its config blob, without pack or docker.
+    Returns the image digest and the result, in the shape of `pack inspect-image --output json`."""
+    registry, repository, reference = _parse_image_reference(image_name)
+    base_url = "https://{}/v2/{}".format(registry, repository)
+    tokens = {}
+    with requests.Session() as session:
+        r = _registry_get(session, "{}/manifests/{}".format(base_url, reference), {"Accept": MANIFEST_MEDIA_TYPES}, tokens)
+        digest = r.headers.get("Docker-Content-Digest")
+        manifest = r.json()
+        if "manifests" in manifest:
+            # image index: inspect the linux/amd64 image, as pack does by default
+            platform_manifests = [m for m in manifest["manifests"] if m.get("platform", {}).get("os") == "linux" and m.get("platform", {}).get("architecture") == "amd64"]
+            selected = (platform_manifests or manifest["manifests"])[0]
+            r = _registry_get(session, "{}/manifests/{}".format(base_url, selected["digest"]), {"Accept": MANIFEST_MEDIA_TYPES}, tokens)
+            manifest = r.json()
+        config = _registry_get(session, "{}/blobs/{}".format(base_url, manifest["config"]["digest"]), {}, tokens).json()
+
+    labels = (config.get("config") or {}).get("Labels") or {}
+    run_images = None
+    if BUILDPACKS_METADATA_LABEL in labels:
+        metadata = json.loads(labels[BUILDPACKS_METADATA_LABEL])
+        run_image = metadata.get("runImage") or {}
+        stack_run_image = (metadata.get("stack") or {}).get("runImage") or {}
+        names = [run_image.get("image") or stack_run_image.get("image")] + (run_image.get("mirrors") or stack_run_image.get("mirrors") or [])
+        run_images = [{"name": name} for name in dict.fromkeys(n for n in names if n)] or None
+    return digest, {"image_name": image_name, "remote_info": {"run_images": run_images}}
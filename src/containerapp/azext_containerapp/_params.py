@@ -480,6 +480,10 @@ def load_arguments(self, _):
         c.argument('managed_env', options_list=['--environment', '-e'], help='Name or resource id of the Container App environment.')
         c.argument('show_all', action='store_true', help='Show all patchable and unpatchable container apps')
 
+    with self.argument_context('containerapp patch list') as c:
+        c.argument('max_parallelism', type=int, is_preview=True, help='Maximum number of distinct images inspected concurrently.')
+        c.argument('inspect_from_registry', arg_type=get_three_state_flag(), is_preview=True, help='Read image metadata directly from the registry over HTTP instead of with pack and Docker. Falls back to pack for images that cannot be read anonymously.')
+
     # Container App job
     with self.argument_context('containerapp job') as c:
         c.argument('name', name_type, metavar='NAME', id_part='name', help=f"The name of the Container Apps Job. A name must consist of lower case alphanumeric characters or '-', start with a letter, end with an alphanumeric character, cannot have '--', and must be less than {MAXIMUM_CONTAINER_APP_NAME_LENGTH} characters.")
@@ -533,6 +537,16 @@ def load_arguments(self, _):
         c.argument('managed_env', validator=validate_env_name_or_id, options_list=['--environment'], help="Name or resource ID of the container app's environment.")
         c.argument('environment_type', arg_type=get_enum_type(["managed", "connected"]), help="Type of environment.", is_preview=True)
 
+    with self.argument_context('containerapp create-batch') as c:
+        c.argument('manifest', type=file_type, help='Path to a .yaml manifest listing container app yaml files, either as a list or under "apps". Entries are paths, or mappings with "yaml" and optional "name" and "resourceGroup".')
+        c.argument('max_parallelism', type=int, help='Maximum number of container apps to create at the same time.')
+        c.argument('resource_group_name', arg_type=resource_group_name_type, help='Default resource group for manifest entries without "resourceGroup".')
+
+    with self.argument_context('containerapp list') as c:
+        c.argument('resource_group_names', nargs='+', options_list=['--resource-groups'], help="Space-separated resource groups of the current subscription to list container apps from. The resource groups are listed concurrently.", is_preview=True)
+        c.argument('subscriptions', nargs='+', options_list=['--subscriptions'], help="Space-separated subscription ids to list container apps from. The subscriptions are listed concurrently.", is_preview=True)
+        c.argument('stream', arg_type=get_three_state_flag(), help="Write container apps to stdout as newline-delimited JSON while later pages are still being fetched, instead of returning a single list. The output is always newline-delimited JSON whatever --output is, and cannot be filtered with --query.", is_preview=True)
+
     with self.argument_context('containerapp connected-env') as c:
         c.argument('name', name_type, help='Name of the Container Apps connected environment.')
         c.argument('resource_group_name', arg_type=resource_group_name_type)
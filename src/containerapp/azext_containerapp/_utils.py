@@ -1399,7 +1399,6 @@ def _resource_client_factory(cli_ctx, **_):
 def queue_acr_build(cmd, registry_rg, registry_name, img_name, src_dir, dockerfile="Dockerfile", quiet=False):
     import os
     import uuid
-    import tempfile
     from ._archive_utils import upload_source_code
     from azure.cli.command_modules.acr._stream_utils import stream_logs
     from azure.cli.command_modules.acr._client_factory import cf_acr_registries_tasks
@@ -1418,9 +1417,8 @@ def queue_acr_build(cmd, registry_rg, registry_name, img_name, src_dir, dockerfi
     # NOTE: os.path.basename is unable to parse "\" in the file path
     original_docker_file_name = os.path.basename(docker_file_path.replace("\\", "/"))
     docker_file_in_tar = '{}_{}'.format(uuid.uuid4().hex, original_docker_file_name)
-    tar_file_path = os.path.join(tempfile.gettempdir(), 'build_archive_{}.tar.gz'.format(uuid.uuid4().hex))
 
-    source_location = upload_source_code(cmd, client_registries, registry_name, registry_rg, src_dir, tar_file_path, docker_file_path, docker_file_in_tar)
+    source_location = upload_source_code(cmd, client_registries, registry_name, registry_rg, src_dir, docker_file_path, docker_file_in_tar)
 
     # For local source, the docker file is added separately into tar as the new file name (docker_file_in_tar)
     # So we need to update the docker_file_path
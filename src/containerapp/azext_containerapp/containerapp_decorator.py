@@ -82,20 +82,40 @@ class BaseContainerAppDecorator(BaseResource):
         super().__init__(cmd, client, raw_parameters, models)
 
     def list(self):
+        if self.get_argument_resource_group_names() or self.get_argument_subscriptions():
+            return list(self.iter_list())
         containerapps = super().list()
-        managed_env = self.get_argument_managed_env()
-        if managed_env:
-            env_name = parse_resource_id(managed_env)["name"].lower()
-            if "resource_group" in parse_resource_id(managed_env):
-                self.get_environment_client().show(self.cmd, parse_resource_id(managed_env)["resource_group"],
-                                                   parse_resource_id(managed_env)["name"])
-                containerapps = [c for c in containerapps if
-                                 c["properties"]["environmentId"].lower() == managed_env.lower()]
+        list_filter = self.get_list_filter()
+        return [c for c in containerapps if list_filter(c)]
+
+    def iter_list(self):
+        list_filter = self.get_list_filter()
+        try:
+            if self.get_argument_resource_group_names():
+                containerapps = self.client.iter_by_resource_groups(cmd=self.cmd, resource_group_names=self.get_argument_resource_group_names())
+            elif self.get_argument_subscriptions():
+                containerapps = self.client.iter_by_subscriptions(cmd=self.cmd, subscription_ids=self.get_argument_subscriptions())
+            elif self.get_argument_resource_group_name() is None:
+                containerapps = self.client.iter_by_subscription(cmd=self.cmd)
             else:
-                containerapps = [c for c in containerapps if
-                                 parse_resource_id(c["properties"]["environmentId"])["name"].lower() == env_name]
+                containerapps = self.client.iter_by_resource_group(cmd=self.cmd, resource_group_name=self.get_argument_resource_group_name())
+            for c in containerapps:
+                if list_filter(c):
+                    yield c
+        except CLIError as e:
+            handle_raw_exception(e)
+
+    def get_list_filter(self):
+        managed_env = self.get_argument_managed_env()
+        if not managed_env:
+            return lambda c: True
 
-        return containerapps
+        env_name = parse_resource_id(managed_env)["name"].lower()
+        if "resource_group" in parse_resource_id(managed_env):
+            self.get_environment_client().show(self.cmd, parse_resource_id(managed_env)["resource_group"],
+                                               parse_resource_id(managed_env)["name"])
+            return lambda c: c["properties"]["environmentId"].lower() == managed_env.lower()
+        return lambda c: parse_resource_id(c["properties"]["environmentId"])["name"].lower() == env_name
 
     def show(self):
         try:
@@ -127,6 +147,18 @@ class BaseContainerAppDecorator(BaseResource):
     def get_environment_client(self):
         return ManagedEnvironmentClient
 
+    def show_environment(self, resource_group_name, name):
+        # environment_cache lets decorators created for one batch share the environment GETs
+        environment_client = self.get_environment_client()
+        environment_cache = self.get_param("environment_cache")
+        key = "{}/{}".format(resource_group_name, name).lower()
+        if environment_cache is not None and key in environment_cache:
+            return environment_cache[key]
+        env_info = environment_client.show(cmd=self.cmd, resource_group_name=resource_group_name, name=name)
+        if environment_cache is not None:
+            environment_cache[key] = env_info
+        return env_info
+
     def set_up_get_existing_secrets(self, containerapp_def):
         if "secrets" not in containerapp_def["properties"]["configuration"]:
             containerapp_def["properties"]["configuration"]["secrets"] = []
@@ -152,6 +184,12 @@ class BaseContainerAppDecorator(BaseResource):
     def get_argument_resource_group_name(self):
         return self.get_param("resource_group_name")
 
+    def get_argument_resource_group_names(self):
+        return self.get_param("resource_group_names")
+
+    def get_argument_subscriptions(self):
+        return self.get_param("subscriptions")
+
     def get_argument_no_wait(self):
         return self.get_param("no_wait")
 
@@ -668,7 +706,7 @@ class ContainerAppCreateDecorator(BaseContainerAppDecorator):
             raise ValidationError('Invalid environmentId specified. Environment not found')
 
         try:
-            env_info = self.get_environment_client().show(cmd=self.cmd, resource_group_name=env_rg, name=env_name)
+            env_info = self.show_environment(env_rg, env_name)
         except Exception as e:
             handle_non_404_status_code_exception(e)
 
@@ -1348,7 +1386,7 @@ class ContainerAppPreviewCreateDecorator(ContainerAppCreateDecorator):
                 parsed_env = parse_resource_id(env_id)
                 env_name = parsed_env['name']
                 env_rg = parsed_env['resource_group']
-                env_info = self.get_environment_client().show(cmd=self.cmd, resource_group_name=env_rg, name=env_name)
+                env_info = self.show_environment(env_rg, env_name)
                 self.containerapp_def["extendedLocation"] = env_info["extendedLocation"]
 
     def set_up_service_binds(self):
@@ -1594,13 +1632,13 @@ class ContainerAppPreviewListDecorator(BaseContainerAppDecorator):
     ):
         super().__init__(cmd, client, raw_parameters, models)
 
-    def list(self):
-        containerapps = super().list()
+    def get_list_filter(self):
+        env_filter = super().get_list_filter()
         if self.get_argument_environment_type() == CONNECTED_ENVIRONMENT_TYPE:
-            containerapps = [c for c in containerapps if CONNECTED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"]]
+            return lambda c: env_filter(c) and CONNECTED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"]
         if self.get_argument_environment_type() == MANAGED_ENVIRONMENT_TYPE:
-            containerapps = [c for c in containerapps if MANAGED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"]]
-        return containerapps
+            return lambda c: env_filter(c) and MANAGED_ENVIRONMENT_RESOURCE_TYPE in c["properties"]["environmentId"]
+        return env_filter
 
     def get_environment_client(self):
         env = self.get_argument_managed_env()
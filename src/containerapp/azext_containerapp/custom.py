@@ -24,6 +24,7 @@ from azure.cli.core.azclierror import (
     CLIInternalError,
     InvalidArgumentValueError,
     ArgumentUsageError,
+    AzureResponseError,
     MutuallyExclusiveArgumentError)
 from azure.cli.core.commands.client_factory import get_subscription_id
 from azure.cli.core.util import open_page_in_browser
@@ -55,8 +56,10 @@ from ._clients import (
     ManagedEnvironmentPreviewClient,
     ConnectedEnvDaprComponentClient,
     ConnectedEnvironmentClient,
-    ConnectedEnvStorageClient, ConnectedEnvCertificateClient
+    ConnectedEnvStorageClient, ConnectedEnvCertificateClient,
+    LongRunningOperationPoller
 )
+from ._decorator_utils import load_batch_manifest
 from ._dev_service_utils import DevServiceUtils
 from ._github_oauth import get_github_access_token
 from ._models import (
@@ -108,7 +111,9 @@ from ._constants import (MAXIMUM_SECRET_LENGTH, MICROSOFT_SECRET_SETTING_NAME, F
                          MANAGED_CERTIFICATE_RT, PRIVATE_CERTIFICATE_RT, PENDING_STATUS, SUCCEEDED_STATUS, DEV_POSTGRES_IMAGE, DEV_POSTGRES_SERVICE_TYPE,
                          DEV_POSTGRES_CONTAINER_NAME, DEV_REDIS_IMAGE, DEV_REDIS_SERVICE_TYPE, DEV_REDIS_CONTAINER_NAME, DEV_KAFKA_CONTAINER_NAME,
                          DEV_KAFKA_IMAGE, DEV_KAFKA_SERVICE_TYPE, DEV_MARIADB_CONTAINER_NAME, DEV_MARIADB_IMAGE, DEV_MARIADB_SERVICE_TYPE, DEV_QDRANT_IMAGE,
-                         DEV_QDRANT_CONTAINER_NAME, DEV_QDRANT_SERVICE_TYPE, DEV_SERVICE_LIST, CONTAINER_APPS_SDK_MODELS, BLOB_STORAGE_TOKEN_STORE_SECRET_SETTING_NAME)
+                         DEV_QDRANT_CONTAINER_NAME, DEV_QDRANT_SERVICE_TYPE, DEV_SERVICE_LIST, CONTAINER_APPS_SDK_MODELS, BLOB_STORAGE_TOKEN_STORE_SECRET_SETTING_NAME,
+                         DEFAULT_BATCH_MAX_PARALLELISM, DEFAULT_IMAGE_INSPECTION_PARALLELISM)
+from ._image_inspection_utils import UNAUTHORIZED_INSPECTION, get_image_inspection_cache, inspect_images
 
 logger = get_logger(__name__)
 
@@ -504,6 +509,66 @@ def create_containerapp(cmd,
     return r
 
 
+def create_containerapps_batch(cmd, manifest, resource_group_name=None, max_parallelism=DEFAULT_BATCH_MAX_PARALLELISM, no_wait=False, disable_warnings=False):
+    _validate_subscription_registered(cmd, CONTAINER_APPS_RP)
+    if max_parallelism < 1:
+        raise InvalidArgumentValueError("--max-parallelism must be at least 1.")
+
+    # Build every payload first; the decorators share one environment cache so each environment is fetched once
+    environment_cache = {}
+    apps = []
+    for entry in load_batch_manifest(manifest):
+        app_resource_group = entry["resource_group_name"] or resource_group_name
+        if not app_resource_group:
+            raise RequiredArgumentMissingError("No resource group for app '{}'. Use --resource-group or set 'resourceGroup' in the manifest entry.".format(entry["name"]))
+        validate_container_app_name(entry["name"], AppType.ContainerApp.name)
+        decorator = ContainerAppPreviewCreateDecorator(
+            cmd=cmd,
+            client=ContainerAppPreviewClient,
+            raw_parameters={"name": entry["name"], "resource_group_name": app_resource_group, "yaml": entry["yaml"],
+                            "no_wait": no_wait, "disable_warnings": True, "environment_cache": environment_cache},
+            models=CONTAINER_APPS_SDK_MODELS
+        )
+        decorator.set_up_create_containerapp_yaml(name=entry["name"], file_name=entry["yaml"])
+        decorator.set_up_extended_location()
+        apps.append((app_resource_group, decorator.containerapp_def["name"], decorator.containerapp_def))
+
+    def _put(app):
+        app_resource_group, app_name, containerapp_def = app
+        return ContainerAppPreviewClient.begin_create_or_update(cmd, app_resource_group, app_name, containerapp_def, no_wait=no_wait)
+
+    results = {}
+    errors = {}
+    poller = LongRunningOperationPoller(cmd, show_progress=not disable_warnings)
+    with ThreadPoolExecutor(max_workers=min(max_parallelism, len(apps))) as executor:
+        futures = {executor.submit(_put, app): app for app in apps}
+        for future, (app_resource_group, app_name, _) in futures.items():
+            key = (app_resource_group, app_name)
+            try:
+                results[key], operation_url = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                errors[key] = e
+                continue
+            if operation_url and not no_wait:
+                poller.add(key, operation_url)
+
+        if not no_wait:
+            for key, result in poller.wait().items():
+                if isinstance(result, Exception):
+                    errors[key] = result
+            refresh = [key for key in results if key not in errors]
+            for key, r in zip(refresh, executor.map(lambda k: ContainerAppPreviewClient.show(cmd, k[0], k[1]), refresh)):
+                results[key] = r
+
+    for (app_resource_group, app_name), e in errors.items():
+        logger.error("Failed to create container app '%s' in resource group '%s': %s", app_name, app_resource_group, e)
+    if errors:
+        raise AzureResponseError("{} of {} container apps failed: {}".format(
+            len(errors), len(apps), ", ".join(name for _, name in errors)))
+
+    return [results[(app_resource_group, app_name)] for app_resource_group, app_name, _ in apps]
+
+
 def update_containerapp_logic(cmd,
                               name,
                               resource_group_name,
@@ -634,7 +699,11 @@ def show_containerapp(cmd, name, resource_group_name, show_secrets=False):
     return containerapp_base_decorator.show()
 
 
-def list_containerapp(cmd, resource_group_name=None, managed_env=None, environment_type="all"):
+def list_containerapp(cmd, resource_group_name=None, managed_env=None, environment_type="all", stream=False, resource_group_names=None, subscriptions=None):
+    if resource_group_names and (resource_group_name or subscriptions):
+        raise MutuallyExclusiveArgumentError("--resource-groups cannot be used with --resource-group or --subscriptions.")
+    if subscriptions and resource_group_name:
+        raise MutuallyExclusiveArgumentError("--subscriptions cannot be used with --resource-group.")
     raw_parameters = locals()
     containerapp_list_decorator = ContainerAppPreviewListDecorator(
         cmd=cmd,
@@ -644,6 +713,16 @@ def list_containerapp(cmd, resource_group_name=None, managed_env=None, environme
     )
     containerapp_list_decorator.validate_subscription_registered(CONTAINER_APPS_RP)
 
+    if stream:
+        # The container apps are written as they arrive, bypassing the output pipeline of the CLI
+        if cmd.cli_ctx.invocation.data.get('query_active'):
+            raise MutuallyExclusiveArgumentError("--stream cannot be used with --query.",
+                                                 "Filter the output of --stream with a JSON tool such as jq instead.")
+        for containerapp in containerapp_list_decorator.iter_list():
+            sys.stdout.write(json.dumps(containerapp) + "\n")
+            sys.stdout.flush()
+        return None
+
     return containerapp_list_decorator.list()
 
 
@@ -4919,12 +4998,15 @@ def delete_workload_profile(cmd, resource_group_name, env_name, workload_profile
         handle_raw_exception(e)
 
 
-def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
-    if is_docker_running() is False:
+def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False, max_parallelism=DEFAULT_IMAGE_INSPECTION_PARALLELISM, inspect_from_registry=False):
+    if max_parallelism < 1:
+        raise InvalidArgumentValueError("--max-parallelism must be at least 1.")
+    if not inspect_from_registry and is_docker_running() is False:
         logger.error("Please install or start Docker and try again.")
         return
+    # when reading from the registry, pack is only used for the images that cannot be read anonymously
     pack_exec_path = get_pack_exec_path()
-    if pack_exec_path is None:
+    if pack_exec_path is None and not inspect_from_registry:
         return
     logger.warning("Listing container apps...")
     ca_list = list_containerapp(cmd, resource_group_name, managed_env)
@@ -4945,24 +5027,43 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
                     targetContainerAppEnvironmentName=managed_env_name,
                     targetResourceGroup=resource_group_name)
                 imgs.append(result)
-    # Inspect the images
-    results = []
-    inspect_results = []
-    # Multi-worker
+    # Inspect each distinct image once, then fan the result out to every container using it
     logger.warning("Inspecting container apps images...")
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        [executor.submit(patch_get_image_inspection, pack_exec_path, img, inspect_results) for img in imgs]
+    image_inspections = inspect_images([img["imageName"] for img in imgs],
+                                       pack_exec_path=pack_exec_path,
+                                       cache=get_image_inspection_cache(cmd),
+                                       max_parallelism=max_parallelism,
+                                       from_registry=inspect_from_registry)
+    inspect_results = []
+    for img in imgs:
+        inspection = image_inspections[img["imageName"]]
+        if inspection is None:
+            # the error was logged by inspect_images
+            inspect_result = dict(remote_info=None)
+        elif inspection == UNAUTHORIZED_INSPECTION:
+            inspect_result = dict(remote_info=UNAUTHORIZED_INSPECTION)
+        else:
+            inspect_result = dict(inspection)
+        inspect_result.update({
+            "image_name": img["imageName"],
+            "targetContainerName": img["targetContainerName"],
+            "targetContainerAppName": img["targetContainerAppName"],
+            "targetContainerAppEnvironmentName": img["targetContainerAppEnvironmentName"],
+            "targetResourceGroup": img["targetResourceGroup"]
+        })
+        inspect_results.append(inspect_result)
 
     # Get the current tags of Dotnet Mariners
     oryx_run_img_tags = get_current_mariner_tags()
     failed_reason = "Failed to inspect the image. Please make sure that you are authenticated to the container registry and that the image exists."
+    error_reason = "Failed to inspect the image. See the warnings above for the error."
     not_based_mariner_reason = "Image not based on Mariner"
     mcr_check_reason = "Image not from mcr.microsoft.com/oryx/builder"
     results = []
     # Start checking if the images are based on Mariner
     logger.warning("Checking for patches...")
     for inspect_result in inspect_results:
-        if inspect_result["remote_info"] == 401:
+        if inspect_result["remote_info"] in (UNAUTHORIZED_INSPECTION, None):
             results.append(dict(
                 targetContainerName=inspect_result["targetContainerName"],
                 targetContainerAppName=inspect_result["targetContainerAppName"],
@@ -4972,7 +5073,7 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
                 oldRunImage=None,
                 newRunImage=None,
                 id=None,
-                reason=failed_reason))
+                reason=failed_reason if inspect_result["remote_info"] == UNAUTHORIZED_INSPECTION else error_reason))
         else:
             # Divide run-images into different parts by "/"
             run_images_props = inspect_result["remote_info"]["run_images"]
@@ -5025,38 +5126,6 @@ def patch_list(cmd, resource_group_name=None, managed_env=None, show_all=False):
     return results
 
 
-def patch_get_image_inspection(pack_exec_path, img, info_list):
-    if (img["imageName"].find("run-dotnet") != -1) and (img["imageName"].find("cbl-mariner") != -1):
-        inspect_result = {
-            "remote_info":
-            {
-                "run_images":
-                [{
-                    "name": "mcr.microsoft.com/oryx/builder:" + img["imageName"].split(":")[-1]
-                }]
-            },
-            "image_name": img["imageName"],
-            "targetContainerName": img["targetContainerName"],
-            "targetContainerAppName": img["targetContainerAppName"],
-            "targetContainerAppEnvironmentName": img["targetContainerAppEnvironmentName"],
-            "targetResourceGroup": img["targetResourceGroup"]
-        }
-    else:
-        with subprocess.Popen(pack_exec_path + " inspect-image " + img["imageName"] + " --output json", shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE) as img_info:
-            img_info_out, img_info_err = img_info.communicate()
-            if img_info_err.find(b"status code 401 Unauthorized") != -1 or img_info_err.find(b"unable to find image") != -1:
-                inspect_result = dict(remote_info=401, image_name=img["imageName"])
-            else:
-                inspect_result = json.loads(img_info_out)
-            inspect_result.update({
-                "targetContainerName": img["targetContainerName"],
-                "targetContainerAppName": img["targetContainerAppName"],
-                "targetContainerAppEnvironmentName": img["targetContainerAppEnvironmentName"],
-                "targetResourceGroup": img["targetResourceGroup"]
-            })
-    info_list.append(inspect_result)
-
-
 def patch_interactive(cmd, resource_group_name=None, managed_env=None, show_all=False):
     if is_docker_running() is False:
         logger.error("Please install or start Docker and try again.")
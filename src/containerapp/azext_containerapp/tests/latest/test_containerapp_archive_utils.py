@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import gzip
+import io
+import os
+import re
+import tarfile
+import tempfile
+import unittest
+
+from ..._archive_utils import _stream_source_code, _DockerIgnoreMatcher, IgnoreRule, SourceArchiveCache
+
+
+class ContainerappArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.source = self.temp_dir.name
+
+    def _write(self, relative_path, content="content"):
+        path = os.path.join(self.source, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _archive_names(self, **kwargs):
+        data = b"".join(_stream_source_code(self.source, os.path.join(self.source, "Dockerfile"), "df_Dockerfile", **kwargs))
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+            return {m.name for m in tar.getmembers() if m.isfile()}, tar
+
+    def test_containerapp_archive_honors_dockerignore(self):
+        self._write("Dockerfile", "FROM scratch")
+        self._write(".dockerignore", "node_modules\n*.log\nbuild/**\n!build/keep.txt\n")
+        self._write("app.py")
+        self._write("debug.log")
+        self._write("node_modules/pkg/index.js")
+        self._write("build/out.bin")
+        self._write("build/keep.txt")
+        self._write(".git/HEAD")
+
+        names, _ = self._archive_names()
+
+        self.assertEqual(names, {"Dockerfile", ".dockerignore", "app.py", "build/keep.txt", "df_Dockerfile"})
+
+    def test_containerapp_archive_multiple_gzip_members(self):
+        self._write("Dockerfile", "FROM scratch")
+        for i in range(20):
+            self._write("src/file{}.txt".format(i), os.urandom(4096).hex())
+
+        names, _ = self._archive_names(chunk_size=8192, max_workers=4)
+
+        self.assertEqual(len([n for n in names if n.startswith("src/")]), 20)
+
+    def test_containerapp_archive_reuses_cached_members(self):
+        self._write("Dockerfile", "FROM scratch")
+        self._write("small.txt")
+        self._write("large.bin", os.urandom(200 * 1024).hex())
+        cache_temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_temp_dir.cleanup)
+        cache_dir = os.path.join(cache_temp_dir.name, "cache")
+        dockerfile = os.path.join(self.source, "Dockerfile")
+
+        def _archive():
+            cache = SourceArchiveCache(cache_dir, self.source)
+            data = b"".join(_stream_source_code(self.source, dockerfile, "df_Dockerfile", cache=cache))
+            return gzip.decompress(data), cache
+
+        first, first_cache = _archive()
+        second, second_cache = _archive()
+        uncached = gzip.decompress(b"".join(_stream_source_code(self.source, dockerfile, "df_Dockerfile")))
+
+        self.assertEqual(first_cache.reused_bytes, 0)
+        self.assertGreater(second_cache.reused_bytes, 0)
+        self.assertEqual(first, second)
+        self.assertEqual(first, uncached)
+        with tarfile.open(fileobj=io.BytesIO(second), mode="r:") as tar:
+            self.assertEqual(len(tar.extractfile("large.bin").read()), 400 * 1024)
+
+    def test_containerapp_dockerignore_matcher_matches_sequential_rules(self):
+        rules = ["!src/keep", "src/**", "*.md", "!README.md", "docs"]
+        ignore_list = [IgnoreRule(r) for r in reversed(rules)]
+        matcher = _DockerIgnoreMatcher(ignore_list)
+        for name in ["src/a.py", "src/keep", "README.md", "CHANGES.md", "docs", "other"]:
+            for limit in range(len(ignore_list) + 1):
+                expected = next((i for i, item in enumerate(ignore_list[:limit]) if re.match(item.pattern, name)), None)
+                self.assertEqual(matcher.match(name, limit), expected)
+
+        self.assertTrue(matcher.can_reinclude("src", len(ignore_list)))
+        self.assertFalse(matcher.can_reinclude("docs", len(ignore_list)))
+
+
+if __name__ == '__main__':
+    unittest.main()
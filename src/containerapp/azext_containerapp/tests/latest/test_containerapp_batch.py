@@ -0,0 +1,53 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+
+from azure.cli.core.azclierror import ValidationError
+
+from ..._decorator_utils import load_batch_manifest
+
+
+class ContainerappBatchManifestTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def _write(self, file_name, content):
+        path = os.path.join(self.temp_dir.name, file_name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_containerapp_batch_manifest_entries(self):
+        self._write("api.yaml", "name: api\nproperties: {}\n")
+        self._write("worker.yaml", "properties: {}\n")
+        manifest = self._write("apps.yaml", "apps:\n  - api.yaml\n  - yaml: worker.yaml\n    name: worker\n    resourceGroup: other-rg\n")
+
+        entries = load_batch_manifest(manifest)
+
+        self.assertEqual([e["name"] for e in entries], ["api", "worker"])
+        self.assertEqual(entries[0]["yaml"], os.path.join(self.temp_dir.name, "api.yaml"))
+        self.assertIsNone(entries[0]["resource_group_name"])
+        self.assertEqual(entries[1]["resource_group_name"], "other-rg")
+
+    def test_containerapp_batch_manifest_requires_name(self):
+        self._write("noname.yaml", "properties: {}\n")
+        manifest = self._write("apps.yaml", "- noname.yaml\n")
+
+        with self.assertRaises(ValidationError):
+            load_batch_manifest(manifest)
+
+    def test_containerapp_batch_manifest_requires_apps(self):
+        manifest = self._write("apps.yaml", "apps: []\n")
+
+        with self.assertRaises(ValidationError):
+            load_batch_manifest(manifest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import AzureResponseError
+
+from ..._clients import (iter_list_results, iter_list_results_concurrently, ContainerAppClient, PollingBackoff,
+                         LongRunningOperationPoller)
+
+
+def _response(page, status_code=200, headers=None):
+    r = mock.MagicMock()
+    r.json.return_value = page
+    r.text = json.dumps(page) if page is not None else ""
+    r.status_code = status_code
+    r.headers = headers or {}
+    return r
+
+
+class ContainerappListPagingTests(unittest.TestCase):
+    def test_containerapp_iter_list_results_follows_next_link(self):
+        pages = {
+            "https://page1": {"value": [{"name": "a"}, {"name": "b"}], "nextLink": "https://page2"},
+            "https://page2": {"value": [{"name": "c"}], "nextLink": "https://page3"},
+            "https://page3": {"value": []},
+        }
+        cmd = mock.MagicMock()
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=lambda _, __, url: _response(pages[url])) as send:
+            names = list(iter_list_results(cmd, "https://page1", formatter=lambda x: x["name"]))
+
+        self.assertEqual(names, ["a", "b", "c"])
+        self.assertEqual(send.call_count, 3)
+
+    def test_containerapp_iter_list_results_concurrently(self):
+        results = list(iter_list_results_concurrently([iter(range(0, 50)), iter(range(50, 60)), iter([])], max_workers=2))
+        self.assertEqual(sorted(results), list(range(0, 60)))
+
+    def test_containerapp_iter_list_results_concurrently_raises(self):
+        def failing():
+            yield 1
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            list(iter_list_results_concurrently([failing(), iter(range(10))]))
+
+    def test_containerapp_iter_list_results_concurrently_stops_early(self):
+        results = iter_list_results_concurrently([iter(range(100000)), iter(range(100000))], max_workers=2)
+        self.assertEqual(len([next(results) for _ in range(5)]), 5)
+        results.close()
+
+    @mock.patch("azext_containerapp._clients.get_subscription_id", return_value="sub")
+    def test_containerapp_iter_by_resource_groups(self, _):
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com/"
+
+        def send(_, __, url):
+            resource_group = url.split("/resourceGroups/")[1].split("/")[0]
+            return _response({"value": [{"name": resource_group + "-app"}]})
+
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=send):
+            names = list(ContainerAppClient.iter_by_resource_groups(cmd, ["rg1", "rg2"], formatter=lambda x: x["name"]))
+
+        self.assertEqual(sorted(names), ["rg1-app", "rg2-app"])
+
+
+class ContainerappListScopesTests(unittest.TestCase):
+    def _list(self, **raw_parameters):
+        from ...containerapp_decorator import ContainerAppPreviewListDecorator
+        client = mock.MagicMock()
+        client.iter_by_resource_groups.return_value = iter([{"name": "a"}, {"name": "b"}])
+        client.iter_by_subscriptions.return_value = iter([{"name": "c"}])
+        decorator = ContainerAppPreviewListDecorator(cmd=mock.MagicMock(), client=client, raw_parameters=raw_parameters,
+                                                     models="azext_containerapp._sdk_models")
+        return client, decorator.list()
+
+    def test_containerapp_list_resource_groups_fans_out(self):
+        client, containerapps = self._list(resource_group_names=["rg1", "rg2"])
+        self.assertEqual(containerapps, [{"name": "a"}, {"name": "b"}])
+        self.assertEqual(client.iter_by_resource_groups.call_args[1]["resource_group_names"], ["rg1", "rg2"])
+
+        client, containerapps = self._list(subscriptions=["sub1", "sub2"])
+        self.assertEqual(containerapps, [{"name": "c"}])
+        self.assertEqual(client.iter_by_subscriptions.call_args[1]["subscription_ids"], ["sub1", "sub2"])
+
+
+class ContainerappOperationPollingTests(unittest.TestCase):
+    def test_containerapp_polling_backoff_honors_retry_after(self):
+        backoff = PollingBackoff()
+        self.assertEqual(backoff.next_delay(_response({}, headers={"retry-after": "7"})), 7)
+        self.assertEqual(backoff.next_delay(_response({}, headers={"retry-after-ms": "500"})), 0.5)
+
+    def test_containerapp_polling_backoff_grows_with_jitter(self):
+        backoff = PollingBackoff(initial=1, maximum=4, factor=2, jitter=0.1)
+        delays = [backoff.next_delay(_response({})) for _ in range(5)]
+        self.assertTrue(0.9 <= delays[0] <= 1.1)
+        self.assertTrue(1.8 <= delays[1] <= 2.2)
+        self.assertTrue(all(d <= 4.4 for d in delays))
+
+    def test_containerapp_poller_tracks_many_operations(self):
+        responses = {
+            "https://op/ok": [_response({"status": "InProgress"}), _response({"status": "Succeeded"})],
+            "https://op/failed": [_response({"status": "Failed", "error": {"code": "Boom"}})],
+            "https://op/location": [_response(None, status_code=202), _response({"name": "app"})],
+        }
+
+        def send(_, __, url):
+            return responses[url].pop(0)
+
+        poller = LongRunningOperationPoller(mock.MagicMock(), show_progress=False)
+        poller.add("ok", "https://op/ok")
+        poller.add("failed", "https://op/failed")
+        poller.add("location", "https://op/location", LongRunningOperationPoller.RESULTS)
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=send), \
+                mock.patch("azext_containerapp._clients.PollingBackoff.next_delay", return_value=0):
+            results = poller.wait()
+
+        self.assertIsNone(results["ok"])
+        self.assertIsInstance(results["failed"], Exception)
+        self.assertEqual(results["location"], {"name": "app"})
+
+    def test_containerapp_poller_timeout_is_an_error(self):
+        poller = LongRunningOperationPoller(mock.MagicMock(), timeout=0, show_progress=False)
+        poller.add("slow", "https://op/slow")
+        with mock.patch("azext_containerapp._clients.send_raw_request", return_value=_response({"status": "InProgress"})), \
+                mock.patch("azext_containerapp._clients.PollingBackoff.next_delay", return_value=1):
+            results = poller.wait()
+
+        self.assertIsInstance(results["slow"], AzureResponseError)
+
+
+class ContainerappCreateOrUpdateTests(unittest.TestCase):
+    @mock.patch("azext_containerapp._clients.get_subscription_id", return_value="sub")
+    def test_containerapp_create_or_update_requires_operation_header_only_when_waiting(self, _):
+        cmd = mock.MagicMock()
+        cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com/"
+        with mock.patch("azext_containerapp._clients.send_raw_request", return_value=_response({"name": "app"}, status_code=201)):
+            self.assertEqual(ContainerAppClient.create_or_update(cmd, "rg", "app", {}, no_wait=True), {"name": "app"})
+            with self.assertRaises(AzureResponseError):
+                ContainerAppClient.create_or_update(cmd, "rg", "app", {})
+
+
+if __name__ == '__main__':
+    unittest.main()
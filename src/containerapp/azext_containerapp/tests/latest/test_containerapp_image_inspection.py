@@ -0,0 +1,93 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from ..._image_inspection_utils import (ImageInspectionCache, UNAUTHORIZED_INSPECTION, inspect_images,
+                                        _parse_image_reference)
+
+PACK_RESULT = {"remote_info": {"run_images": [{"name": "mcr.microsoft.com/oryx/builder:debian-1"}]}}
+
+
+class ContainerappImageInspectionTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cache_path = os.path.join(self.temp_dir.name, "cache.json")
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_with_pack", return_value=PACK_RESULT)
+    def test_containerapp_inspect_images_dedupes(self, inspect_mock):
+        images = ["myacr.azurecr.io/app:1", "myacr.azurecr.io/app:1", "myacr.azurecr.io/app:2"]
+        results = inspect_images(images, pack_exec_path="pack")
+        self.assertEqual(inspect_mock.call_count, 2)
+        self.assertEqual(set(results), {"myacr.azurecr.io/app:1", "myacr.azurecr.io/app:2"})
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_with_pack")
+    def test_containerapp_inspect_images_mariner_shortcut(self, inspect_mock):
+        results = inspect_images(["mcr.microsoft.com/oryx/run-dotnet:7.0-cbl-mariner2.0"], pack_exec_path="pack")
+        inspect_mock.assert_not_called()
+        self.assertEqual(results["mcr.microsoft.com/oryx/run-dotnet:7.0-cbl-mariner2.0"]["remote_info"]["run_images"][0]["name"],
+                         "mcr.microsoft.com/oryx/builder:7.0-cbl-mariner2.0")
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_with_pack", return_value=PACK_RESULT)
+    def test_containerapp_inspect_images_cache(self, inspect_mock):
+        image = "myacr.azurecr.io/app@sha256:" + "a" * 64
+        inspect_images([image], pack_exec_path="pack", cache=ImageInspectionCache(self.cache_path, 3600))
+        results = inspect_images([image], pack_exec_path="pack", cache=ImageInspectionCache(self.cache_path, 3600))
+        self.assertEqual(inspect_mock.call_count, 1)
+        self.assertEqual(results[image], PACK_RESULT)
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_with_pack", return_value=PACK_RESULT)
+    def test_containerapp_inspect_images_cache_skips_tags(self, inspect_mock):
+        # the tag may point to another image the next time
+        for _ in range(2):
+            inspect_images(["myacr.azurecr.io/app:1"], pack_exec_path="pack", cache=ImageInspectionCache(self.cache_path, 3600))
+        self.assertEqual(inspect_mock.call_count, 2)
+        with open(self.cache_path) as f:
+            self.assertEqual(json.load(f), {})
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_with_pack", return_value=UNAUTHORIZED_INSPECTION)
+    def test_containerapp_inspect_images_cache_skips_failures_and_expired(self, inspect_mock):
+        image = "myacr.azurecr.io/app@sha256:" + "a" * 64
+        with open(self.cache_path, "w") as f:
+            json.dump({"sha256:" + "a" * 64: {"timestamp": 0, "result": PACK_RESULT}}, f)
+        cache = ImageInspectionCache(self.cache_path, 3600)
+        results = inspect_images([image], pack_exec_path="pack", cache=cache)
+        self.assertEqual(results[image], UNAUTHORIZED_INSPECTION)
+        with open(self.cache_path) as f:
+            self.assertEqual(json.load(f), {})
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_with_pack", return_value=PACK_RESULT)
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_from_registry")
+    def test_containerapp_inspect_images_from_registry_falls_back_to_pack(self, registry_mock, pack_mock):
+        response = requests.Response()
+        response.status_code = 401
+        registry_mock.side_effect = requests.HTTPError(response=response)
+        results = inspect_images(["myacr.azurecr.io/app:1"], pack_exec_path="pack", from_registry=True)
+        pack_mock.assert_called_once_with("pack", "myacr.azurecr.io/app:1")
+        self.assertEqual(results["myacr.azurecr.io/app:1"], PACK_RESULT)
+
+        # without pack, images that cannot be read anonymously are reported as unauthorized
+        results = inspect_images(["myacr.azurecr.io/app:1"], from_registry=True)
+        self.assertEqual(results["myacr.azurecr.io/app:1"], UNAUTHORIZED_INSPECTION)
+
+    @mock.patch("azext_containerapp._image_inspection_utils._inspect_image_from_registry")
+    def test_containerapp_inspect_images_reports_other_errors(self, registry_mock):
+        registry_mock.side_effect = requests.ConnectionError("connection refused")
+        with mock.patch("azext_containerapp._image_inspection_utils.logger") as logger_mock:
+            results = inspect_images(["myacr.azurecr.io/app:1"], from_registry=True)
+        self.assertIsNone(results["myacr.azurecr.io/app:1"])
+        logger_mock.warning.assert_called_once()
+
+    def test_containerapp_parse_image_reference(self):
+        self.assertEqual(_parse_image_reference("nginx"), ("registry-1.docker.io", "library/nginx", "latest"))
+        self.assertEqual(_parse_image_reference("myacr.azurecr.io/team/app:v1"), ("myacr.azurecr.io", "team/app", "v1"))
+        self.assertEqual(_parse_image_reference("localhost:5000/app@sha256:abc"), ("localhost:5000", "app", "sha256:abc"))
@@ -3,8 +3,10 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import hashlib
 import json
 import os
+import tempfile
 import yaml  # pylint: disable=import-error
 
 from azure.cli.core import MainCommandsLoader
@@ -16,6 +18,11 @@ from knack.log import get_logger
 
 logger = get_logger(__name__)
 
+# bump when the layout of the dumped command table changes, to invalidate existing shards
+HELP_SHARD_FORMAT_VERSION = '1'
+# libyaml parses help entries an order of magnitude faster than the pure Python loader
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class AzInteractiveCommandsLoader(MainCommandsLoader):  # pylint: disable=too-few-public-methods
 
@@ -91,50 +98,77 @@ class FreshTable(object):
         shell_ctx.cli_ctx.raise_event(events.EVENT_INVOKER_POST_CMD_TBL_CREATE, commands_loader=main_loader)
         cmd_table = main_loader.command_table
 
+        # the dump is sharded per command module and extension, only the shards of modules
+        # that changed since the last dump are regenerated
+        shard_dir = get_shard_dir(shell_ctx)
+        module_commands, module_helps, unassigned_helps = group_by_module(cmd_table, helps)
+        core_version, extension_versions = get_module_versions()
         cmd_table_data = {}
-        for command_name, cmd in cmd_table.items():
-
-            try:
-                command_description = cmd.description
-                if callable(command_description):
-                    command_description = command_description()
-
-                # checking all the parameters for a single command
-                parameter_metadata = {}
-                for arg in cmd.arguments.values():
-                    options = {
-                        'name': [name for name in arg.options_list],
-                        'required': REQUIRED_TAG if arg.type.settings.get('required') else '',
-                        'help': arg.type.settings.get('help') or ''
-                    }
-                    # the key is the first alias option
-                    if arg.options_list:
-                        parameter_metadata[arg.options_list[0]] = options
-
-                cmd_table_data[command_name] = {
-                    'parameters': parameter_metadata,
-                    'help': command_description,
-                    'examples': ''
-                }
-            except (ImportError, ValueError):
-                pass
+        dumped_modules = []
+        for module_name, command_names in module_commands.items():
+            module_version = extension_versions.get(module_name.split('.')[0], core_version)
+            command_signatures = {name: get_command_signature(cmd_table[name]) for name in command_names}
+            shard_key = get_shard_key(module_name, module_version, command_signatures,
+                                      module_helps.get(module_name, []))
+            shard_data = load_shard(shard_dir, module_name, shard_key)
+            if shard_data is None:
+                shard_data = {}
+                for command_name in command_names:
+                    command_data = dump_command(cmd_table[command_name])
+                    if command_data:
+                        shard_data[command_name] = command_data
+                load_help_files(shard_data, module_helps.get(module_name, []))
+                write_shard(shard_dir, module_name, shard_key, shard_data)
+                dumped_modules.append(module_name)
+            cmd_table_data.update(shard_data)
+        load_help_files(cmd_table_data, unassigned_helps)
+        remove_stale_shards(shard_dir, module_commands)
 
-        load_help_files(cmd_table_data)
         elapsed = timeit.default_timer() - start_time
-        logger.debug('Command table dumped: %s sec', elapsed)
+        logger.debug('Command table dumped: %s sec, regenerated %s of %s modules: %s',
+                     elapsed, len(dumped_modules), len(module_commands), dumped_modules)
         FreshTable.loader = main_loader
 
         # dump into the cache file
         command_file = shell_ctx.config.get_help_files()
         with open(os.path.join(get_cache_dir(shell_ctx), command_file), 'w') as help_file:
-            json.dump(cmd_table_data, help_file, default=lambda x: x.target or '', skipkeys=True)
-
-
-def load_help_files(data):
+            # json.dumps encodes in C, json.dump falls back to the pure Python encoder
+            help_file.write(json.dumps(cmd_table_data, default=lambda x: x.target or '', skipkeys=True))
+
+
+def dump_command(cmd):
+    """ dumps the description and the parameters of a single command """
+    try:
+        command_description = cmd.description
+        if callable(command_description):
+            command_description = command_description()
+
+        # checking all the parameters for a single command
+        parameter_metadata = {}
+        for arg in cmd.arguments.values():
+            options = {
+                'name': [name for name in arg.options_list],
+                'required': REQUIRED_TAG if arg.type.settings.get('required') else '',
+                'help': arg.type.settings.get('help') or ''
+            }
+            # the key is the first alias option
+            if arg.options_list:
+                parameter_metadata[arg.options_list[0]] = options
+
+        return {
+            'parameters': parameter_metadata,
+            'help': command_description,
+            'examples': ''
+        }
+    except (ImportError, ValueError):
+        return None
+
+
+def load_help_files(data, help_entries=None):
     """ loads all the extra information from help files """
-    for command_name, help_yaml in helps.items():
+    for command_name, help_yaml in (helps.items() if help_entries is None else help_entries):
 
-        help_entry = yaml.safe_load(help_yaml)
+        help_entry = yaml.load(help_yaml, Loader=YAML_LOADER)
         try:
             help_type = help_entry['type']
         except KeyError:
@@ -170,6 +204,135 @@ def load_help_files(data):
                                               for example in help_entry['examples']]
 
 
+def group_by_module(cmd_table, help_entries):
+    """
+    groups the command names and help entries by the module that loads the commands
+    help entries of command groups belong to the module of the first command in the group,
+    help entries that match no command are returned separately
+    """
+    module_commands = {}
+    group_modules = {}
+    for command_name in sorted(cmd_table):
+        loader = getattr(cmd_table[command_name], 'loader', None)
+        module_name = loader.__module__ if loader else ''
+        module_commands.setdefault(module_name, []).append(command_name)
+        words = command_name.split()
+        for index in range(1, len(words)):
+            group_modules.setdefault(' '.join(words[:index]), module_name)
+
+    module_helps = {}
+    unassigned_helps = []
+    for help_name, help_yaml in help_entries.items():
+        command = cmd_table.get(help_name)
+        if command is not None:
+            loader = getattr(command, 'loader', None)
+            module_name = loader.__module__ if loader else ''
+        else:
+            module_name = group_modules.get(help_name)
+        if module_name is None:
+            unassigned_helps.append((help_name, help_yaml))
+        else:
+            module_helps.setdefault(module_name, []).append((help_name, help_yaml))
+    return module_commands, module_helps, unassigned_helps
+
+
+def get_module_versions():
+    """ gets the version of the CLI and of each installed extension, by extension module name """
+    from azure.cli.core import __version__ as core_version
+    extension_versions = {}
+    try:
+        from azure.cli.core.extension import get_extensions, get_extension_modname
+        for extension in get_extensions():
+            extension_versions[get_extension_modname(ext_dir=extension.path)] = extension.version
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.debug('Unable to get the extension versions: %s', ex)
+    return core_version, extension_versions
+
+
+def _get_stable_value(value):
+    """ gets a representation of an argument setting that is the same across processes """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        values = [_get_stable_value(item) for item in value]
+        return values if isinstance(value, (list, tuple)) else sorted(values, key=str)
+    # the repr of arbitrary objects includes their address, which changes on every run
+    return type(value).__name__
+
+
+def get_command_signature(cmd):
+    """ gets the argument definitions of a command, the options, choices and defaults that end up in the dump """
+    signature = []
+    for dest, arg in sorted(cmd.arguments.items()):
+        settings = arg.type.settings
+        signature.append([dest, list(arg.options_list), bool(settings.get('required')), settings.get('help') or '',
+                          _get_stable_value(settings.get('choices')), _get_stable_value(settings.get('default'))])
+    return json.dumps(signature, default=str)
+
+
+def get_shard_key(module_name, module_version, command_signatures, help_entries):
+    """ computes the key a shard is valid for """
+    shard_key = hashlib.sha1()
+    for part in [HELP_SHARD_FORMAT_VERSION, module_name, str(module_version)]:
+        shard_key.update(part.encode('utf-8'))
+        shard_key.update(b'\0')
+    for command_name, signature in sorted(command_signatures.items()):
+        shard_key.update('{}\0{}\0'.format(command_name, signature).encode('utf-8'))
+    for help_name, help_yaml in sorted(help_entries, key=lambda entry: entry[0]):
+        shard_key.update('{}\0{}\0'.format(help_name, help_yaml).encode('utf-8'))
+    return shard_key.hexdigest()
+
+
+def get_shard_path(shard_dir, module_name):
+    return os.path.join(shard_dir, (module_name or '_') + '.json')
+
+
+def load_shard(shard_dir, module_name, shard_key):
+    """ loads the dumped commands of a module, returns None if the shard is missing or out of date """
+    try:
+        with open(get_shard_path(shard_dir, module_name), 'r') as shard_file:
+            shard = json.load(shard_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if shard.get('key') != shard_key:
+        return None
+    return shard.get('data')
+
+
+def write_shard(shard_dir, module_name, shard_key, shard_data):
+    """ writes the dumped commands of a module """
+    fd, temp_path = tempfile.mkstemp(dir=shard_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as shard_file:
+            shard_file.write(json.dumps({'key': shard_key, 'data': shard_data},
+                                        default=lambda x: x.target or '', skipkeys=True))
+        os.replace(temp_path, get_shard_path(shard_dir, module_name))
+    except (IOError, OSError) as ex:
+        logger.debug('Unable to write the command table shard of %s: %s', module_name, ex)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def remove_stale_shards(shard_dir, module_names):
+    """ removes the shards of modules that are no longer installed """
+    current_shards = {os.path.basename(get_shard_path(shard_dir, module_name)) for module_name in module_names}
+    for file_name in os.listdir(shard_dir):
+        if file_name not in current_shards:
+            try:
+                os.remove(os.path.join(shard_dir, file_name))
+            except OSError:
+                pass
+
+
+def get_shard_dir(shell_ctx):
+    """ gets the location of the command table shards """
+    help_file_name = os.path.splitext(shell_ctx.config.get_help_files())[0]
+    shard_dir = os.path.join(get_cache_dir(shell_ctx), help_file_name + '_shards')
+    if not os.path.exists(shard_dir):
+        os.makedirs(shard_dir)
+    return shard_dir
+
+
 def get_cache_dir(shell_ctx):
     """ gets the location of the cache """
     azure_folder = shell_ctx.config.get_config_dir()
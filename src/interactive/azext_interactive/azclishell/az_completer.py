@@ -336,11 +336,10 @@ class AzCompleter(Completer):
                 if self.validate_param_completion(param, self.leftover_args):
                     yield self.yield_param_completion(param, self.unfinished_word)
         elif not self.leftover_args:
-            for child_command in self.subtree.children:
-                if self.validate_completion(child_command):
-                    full_command = f'{self.current_command} {child_command}'.strip()
-                    yield Completion(child_command, -len(self.unfinished_word),
-                                     display_meta=self.command_description.get(full_command))
+            for child_command in self.subtree.get_children_with_prefix(self.unfinished_word):
+                full_command = f'{self.current_command} {child_command}'.strip()
+                yield Completion(child_command, -len(self.unfinished_word),
+                                 display_meta=self.command_description.get(full_command))
 
     def gen_global_params_and_arg_completions(self):
         # global parameters
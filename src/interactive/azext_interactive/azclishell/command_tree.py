@@ -3,6 +3,8 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from bisect import bisect_left
+
 
 class CommandTree(object):
     """ a command tree """
@@ -12,6 +14,8 @@ class CommandTree(object):
             self.children = {}
         else:
             self.children = children
+        # sorted (lower case name, insertion position, name) entries of the children, built on the first prefix lookup
+        self._prefix_index = None
 
     def get_child(self, child_name):  # pylint: disable=no-self-use
         """ returns the object with the name supplied """
@@ -24,11 +28,26 @@ class CommandTree(object):
         """ adds a child to this branch """
         # TODO allow adding child_name
         self.children[child.data] = child
+        self._prefix_index = None
 
     def has_child(self, name):
         """ whether this has a child """
         return self.children.get(name, None) is not None
 
+    def get_children_with_prefix(self, prefix):
+        """ returns the names of the children starting with the prefix (case insensitive), in insertion order """
+        if self._prefix_index is None or len(self._prefix_index) != len(self.children):
+            self._prefix_index = sorted((str(name).lower(), position, name)
+                                        for position, name in enumerate(self.children))
+        prefix = prefix.lower()
+        matches = []
+        for index in range(bisect_left(self._prefix_index, (prefix,)), len(self._prefix_index)):
+            lower_name, position, name = self._prefix_index[index]
+            if not lower_name.startswith(prefix):
+                break
+            matches.append((position, name))
+        return [name for _, name in sorted(matches)]
+
     def in_tree(self, cmd_args):
         """ if a command is in the tree """
         if not cmd_args:
@@ -6,6 +6,8 @@
 import math
 import os
 import json
+import sys
+from collections.abc import MutableMapping
 from knack.log import get_logger
 
 from .command_tree import CommandBranch, CommandHead
@@ -68,21 +70,110 @@ def add_new_lines(long_phrase, line_min=None, tolerance=TOLERANCE):
     return long_phrase.strip()
 
 
+class LazyHelpText(MutableMapping):
+    """ help text that is only formatted for display when it is first looked up """
+    def __init__(self, formatter):
+        self._formatter = formatter
+        self._raw = {}
+        self._formatted = {}
+
+    def set_raw(self, key, value):
+        """ stores a value that still has to be formatted """
+        self._raw[key] = value
+        self._formatted.pop(key, None)
+
+    def __getitem__(self, key):
+        try:
+            return self._formatted[key]
+        except KeyError:
+            value = self._formatted[key] = self._formatter(self._raw[key])
+            return value
+
+    def __setitem__(self, key, value):
+        self._raw[key] = value
+        self._formatted[key] = value
+
+    def __delitem__(self, key):
+        del self._raw[key]
+        self._formatted.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._raw
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+
+class LazyParamHelpText(LazyHelpText):
+    """
+    parameter help text keyed by command + " " + parameter
+    stored per command so that the combined keys are only built when they are looked up
+    """
+    @staticmethod
+    def _split_key(key):
+        command, _, param = key.rpartition(' ')
+        return command, param
+
+    def set_raw(self, key, value):
+        command, param = self._split_key(key)
+        self._raw.setdefault(command, {})[param] = value
+        self._formatted.pop(key, None)
+
+    def __getitem__(self, key):
+        try:
+            return self._formatted[key]
+        except KeyError:
+            command, param = self._split_key(key)
+            value = self._formatted[key] = self._formatter(self._raw[command][param])
+            return value
+
+    def __setitem__(self, key, value):
+        command, param = self._split_key(key)
+        self._raw.setdefault(command, {})[param] = value
+        self._formatted[key] = value
+
+    def __delitem__(self, key):
+        command, param = self._split_key(key)
+        del self._raw[command][param]
+        self._formatted.pop(key, None)
+
+    def __contains__(self, key):
+        command, param = self._split_key(key)
+        return param in self._raw.get(command, ())
+
+    def __iter__(self):
+        for command, params in self._raw.items():
+            for param in params:
+                yield command + ' ' + param
+
+    def __len__(self):
+        return sum(len(params) for params in self._raw.values())
+
+
 # pylint: disable=too-many-instance-attributes
 class GatherCommands(object):
     """ grabs all the cached commands from files """
     def __init__(self, config):
+        # help text is wrapped to the window width when it is first displayed
+        line_min = int(_get_window_columns()) - 2 * TOLERANCE
+
         # everything that is completable
         self.completable = []
         # a completable to the description of what is does
-        self.descrip = {}
+        self.descrip = LazyHelpText(lambda description: add_new_lines(description, line_min=line_min))
         # from a command to a list of parameters
         self.command_param = {}
 
         self.completable_param = []
-        self.command_example = {}
+        self.command_example = LazyHelpText(lambda examples: [
+            [add_new_lines(example[0], line_min=line_min), add_new_lines(example[1], line_min=line_min)]
+            for example in examples])
         self.command_tree = CommandHead()
-        self.param_descript = {}
+        self.param_descript = LazyParamHelpText(lambda param: add_new_lines(
+            param[0] + " " + param[1], line_min=line_min))
         self.completer = None
         self.command_param_info = {}
 
@@ -114,47 +205,47 @@ class GatherCommands(object):
         """ gathers from the files in a way that is convienent to use """
         command_file = config.get_help_files()
         cache_path = os.path.join(config.get_config_dir(), 'cache')
-        cols = _get_window_columns()
 
         with open(os.path.join(cache_path, command_file), 'r') as help_file:
             data = json.load(help_file)
         self.add_exit()
         commands = data.keys()
+        completable = set(self.completable)
+        completable_param = set(self.completable_param)
+        # many parameters share the same help text, keep a single copy of each
+        param_help_texts = {}
 
         for command in commands:
             branch = self.command_tree
+            # the same words and parameter names repeat across thousands of commands
             for word in command.split():
-                if word not in self.completable:
+                word = sys.intern(word)
+                if word not in completable:
+                    completable.add(word)
                     self.completable.append(word)
                 if not branch.has_child(word):
                     branch.add_child(CommandBranch(word))
                 branch = branch.get_child(word)
 
-            description = data[command]['help']
-            self.descrip[command] = add_new_lines(description, line_min=int(cols) - 2 * TOLERANCE)
+            self.descrip.set_raw(command, data[command]['help'])
 
             if 'examples' in data[command]:
-                examples = []
-                for example in data[command]['examples']:
-                    examples.append([
-                        add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
-                        add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)])
-                self.command_example[command] = examples
+                self.command_example.set_raw(command, data[command]['examples'])
 
             command_params = data[command].get('parameters', {})
             for param in command_params:
                 if '==SUPPRESS==' not in command_params[param]['help']:
                     param_aliases = set()
+                    param_help = tuple(param_help_texts.setdefault(text, text) for text in
+                                       (command_params[param]['required'], command_params[param]['help']))
 
                     for par in command_params[param]['name']:
+                        par = sys.intern(par)
                         param_aliases.add(par)
 
-                        self.param_descript[command + " " + par] = \
-                            add_new_lines(
-                                command_params[param]['required'] +
-                                " " + command_params[param]['help'],
-                                line_min=int(cols) - 2 * TOLERANCE)
-                        if par not in self.completable_param:
+                        self.param_descript.set_raw(command + " " + par, param_help)
+                        if par not in completable_param:
+                            completable_param.add(par)
                             self.completable_param.append(par)
 
                     param_doubles = self.command_param_info.get(command, {})
@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_interactive.azclishell._dump_commands import (
+    group_by_module, get_command_signature, get_shard_key, load_shard, write_shard, remove_stale_shards,
+    load_help_files)
+
+VM_HELP = """
+type: command
+short-summary: Create a VM.
+examples:
+  - name: Create a VM.
+    text: az vm create -n MyVm
+"""
+
+
+class VmLoader(object):
+    __module__ = 'azure.cli.command_modules.vm'
+
+
+class AliasLoader(object):
+    __module__ = 'azext_alias'
+
+
+class DumpCommandsTest(unittest.TestCase):
+    def setUp(self):
+        self.shard_dir = tempfile.mkdtemp()
+        self.cmd_table = {
+            'vm create': mock.Mock(loader=VmLoader()),
+            'vm list': mock.Mock(loader=VmLoader()),
+            'alias create': mock.Mock(loader=AliasLoader()),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.shard_dir)
+
+    def test_group_by_module(self):
+        helps = {'vm': 'type: group', 'vm create': VM_HELP, 'alias': 'type: group', 'orphan': 'type: group'}
+        module_commands, module_helps, unassigned_helps = group_by_module(self.cmd_table, helps)
+        self.assertEqual({'azure.cli.command_modules.vm': ['vm create', 'vm list'],
+                          'azext_alias': ['alias create']}, module_commands)
+        self.assertEqual([('vm', 'type: group'), ('vm create', VM_HELP)], module_helps['azure.cli.command_modules.vm'])
+        self.assertEqual([('alias', 'type: group')], module_helps['azext_alias'])
+        self.assertEqual([('orphan', 'type: group')], unassigned_helps)
+
+    def test_shard_key(self):
+        helps = [('alias', 'type: group')]
+        key = get_shard_key('azext_alias', '0.5.2', {'alias create': '[]'}, helps)
+        self.assertEqual(key, get_shard_key('azext_alias', '0.5.2', {'alias create': '[]'}, helps))
+        self.assertNotEqual(key, get_shard_key('azext_alias', '0.5.3', {'alias create': '[]'}, helps))
+        commands = {'alias create': '[]', 'alias list': '[]'}
+        self.assertNotEqual(key, get_shard_key('azext_alias', '0.5.2', commands, helps))
+        self.assertNotEqual(key, get_shard_key('azext_alias', '0.5.2', {'alias create': '[["name"]]'}, helps))
+        self.assertNotEqual(key, get_shard_key('azext_alias', '0.5.2', {'alias create': '[]'},
+                                               [('alias', 'type: command')]))
+
+    def test_command_signature(self):
+        def _command(**settings):
+            argument = mock.Mock(options_list=['--name', '-n'])
+            argument.type.settings = dict({'help': 'Name'}, **settings)
+            return mock.Mock(arguments={'name': argument})
+
+        signature = get_command_signature(_command(choices=['a', 'b'], default='a'))
+        self.assertEqual(signature, get_command_signature(_command(choices=['a', 'b'], default='a')))
+        self.assertNotEqual(signature, get_command_signature(_command(choices=['a', 'b', 'c'], default='a')))
+        self.assertNotEqual(signature, get_command_signature(_command(choices=['a', 'b'], default='b')))
+        self.assertNotEqual(signature, get_command_signature(_command(choices=['a', 'b'], default='a', required=True)))
+        # defaults without a stable repr don't change the signature between runs
+        self.assertEqual(get_command_signature(_command(default=object())),
+                         get_command_signature(_command(default=object())))
+
+    def test_shard_round_trip(self):
+        data = {'vm create': {'parameters': {'--name': {'name': ['--name', '-n'], 'required': '', 'help': 'Name'}},
+                              'help': 'Create a VM.', 'examples': ''}}
+        load_help_files(data, [('vm create', VM_HELP)])
+        self.assertEqual([['Create a VM.', 'az vm create -n MyVm']], data['vm create']['examples'])
+
+        write_shard(self.shard_dir, 'azure.cli.command_modules.vm', 'key1', data)
+        self.assertEqual(data, load_shard(self.shard_dir, 'azure.cli.command_modules.vm', 'key1'))
+        self.assertIsNone(load_shard(self.shard_dir, 'azure.cli.command_modules.vm', 'key2'))
+        self.assertIsNone(load_shard(self.shard_dir, 'azext_alias', 'key1'))
+
+        remove_stale_shards(self.shard_dir, ['azext_alias'])
+        self.assertIsNone(load_shard(self.shard_dir, 'azure.cli.command_modules.vm', 'key1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
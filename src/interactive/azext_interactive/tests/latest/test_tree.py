@@ -11,6 +11,8 @@ from unittest import mock
 from azure.cli.core.mock import DummyCli
 from azext_interactive.azclishell.configuration import Configuration
 from azext_interactive.azclishell.app import AzInteractiveShell
+from azext_interactive.azclishell.command_tree import CommandBranch
+from azext_interactive.azclishell.gather_commands import LazyParamHelpText
 
 
 TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
@@ -71,6 +73,32 @@ class CommandTreeTest(unittest.TestCase):
         self.assertEqual(current_command, 'storage account create')
         self.assertEqual(leftover_args, ['--name', 'MyStorageAccount'])
 
+    def test_children_with_prefix(self):
+        self.init_tree()
+
+        self.assertEqual(self.command_tree.get_children_with_prefix('v'), ['vm', 'vmss'])
+        self.assertEqual(self.command_tree.get_children_with_prefix('VMS'), ['vmss'])
+        self.assertEqual(self.command_tree.get_children_with_prefix('x'), [])
+        self.assertEqual(self.command_tree.get_children_with_prefix(''), list(self.command_tree.children))
+
+        # completions keep the order the commands were added in
+        self.command_tree.add_child(CommandBranch('vma'))
+        self.assertEqual(self.command_tree.get_children_with_prefix('vm'), ['vm', 'vmss', 'vma'])
+
+    def test_lazy_help_text(self):
+        self.init_tree()
+
+        param_help_text = LazyParamHelpText(lambda param: param[0] + ' ' + param[1].upper())
+        param_help_text.set_raw('vm create --name', ('[Required]', 'name of the vm'))
+        param_help_text.set_raw('vm create -n', ('[Required]', 'name of the vm'))
+        self.assertIn('vm create --name', param_help_text)
+        self.assertIn('vm create --name', param_help_text.keys())
+        self.assertNotIn('vm create --size', param_help_text)
+        self.assertNotIn('vm', param_help_text)
+        self.assertEqual(param_help_text['vm create -n'], '[Required] NAME OF THE VM')
+        self.assertEqual(param_help_text.get('vm list -g', ''), '')
+        self.assertEqual(sorted(param_help_text), ['vm create --name', 'vm create -n'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,7 +6,7 @@
 import os
 from azext_load.data_plane.utils.utils import (
     create_or_update_test_run_body,
-    download_file,
+    download_files,
     get_testrun_data_plane_client,
 )
 from azure.cli.core.azclierror import InvalidArgumentValueError
@@ -135,6 +135,7 @@ def download_test_run_files(
     test_run_results=False,
     resource_group_name=None,
     force=False,  # pylint: disable=unused-argument
+    skip_existing=False,
 ):
     logger.info("Downloading test run files for test run %s", test_run_id)
     client = get_testrun_data_plane_client(cmd, load_test_resource, resource_group_name)
@@ -142,52 +143,40 @@ def download_test_run_files(
     if test_run_data.get("testArtifacts") is None:
         logger.warning("No test artifacts found for test run %s", test_run_id)
 
+    # the artifacts are collected first, so that they can all be downloaded at the same time
+    files_to_download = []
+    messages = []
+    output_artifacts = test_run_data.get("testArtifacts", {}).get("outputArtifacts")
+
     if test_run_input:
         logger.info("Downloading input artifacts for test run %s", test_run_id)
         if test_run_data.get("testArtifacts", {}).get("inputArtifacts") is not None:
             input_artifacts = test_run_data.get("testArtifacts", {}).get(
                 "inputArtifacts", {}
             )
-            files_to_download = []
+            input_files = []
             for item in input_artifacts.values():
                 if isinstance(item, list):
-                    files_to_download.extend(item)
+                    input_files.extend(item)
                 else:
-                    files_to_download.append(item)
-            for artifact_data in files_to_download:
+                    input_files.append(item)
+            for artifact_data in input_files:
                 if artifact_data.get("url") is not None:
                     url = artifact_data.get("url")
                     file_name = artifact_data.get("fileName")
-                    file_path = os.path.join(path, file_name)
-                    download_file(url, file_path)
-            logger.warning("Input artifacts downloaded to %s", path)
+                    files_to_download.append((url, os.path.join(path, file_name)))
+            messages.append(("Input artifacts downloaded to %s", path))
         else:
             logger.warning("No input artifacts found for test run %s", test_run_id)
 
     if test_run_log:
         logger.info("Downloading log file for test run %s", test_run_id)
-        if test_run_data.get("testArtifacts", {}).get("outputArtifacts") is not None:
-            if (
-                test_run_data.get("testArtifacts", {})
-                .get("outputArtifacts", {})
-                .get("logsFileInfo")
-                is not None
-            ):
-                url = (
-                    test_run_data.get("testArtifacts", {})
-                    .get("outputArtifacts", {})
-                    .get("logsFileInfo")
-                    .get("url")
-                )
-                file_name = (
-                    test_run_data.get("testArtifacts", {})
-                    .get("outputArtifacts", {})
-                    .get("logsFileInfo", {})
-                    .get("fileName")
-                )
-                file_path = os.path.join(path, file_name)
-                download_file(url, file_path)
-                logger.warning("Log file downloaded to %s", file_path)
+        if output_artifacts is not None:
+            logs_file_info = output_artifacts.get("logsFileInfo")
+            if logs_file_info is not None:
+                file_path = os.path.join(path, logs_file_info.get("fileName"))
+                files_to_download.append((logs_file_info.get("url"), file_path))
+                messages.append(("Log file downloaded to %s", file_path))
             else:
                 logger.info("No log file found for test run %s", test_run_id)
         else:
@@ -198,28 +187,12 @@ def download_test_run_files(
 
     if test_run_results:
         logger.info("Downloading results file for test run %s", test_run_id)
-        if test_run_data.get("testArtifacts", {}).get("outputArtifacts") is not None:
-            if (
-                test_run_data.get("testArtifacts", {})
-                .get("outputArtifacts", {})
-                .get("resultFileInfo")
-                is not None
-            ):
-                url = (
-                    test_run_data.get("testArtifacts", {})
-                    .get("outputArtifacts", {})
-                    .get("resultFileInfo")
-                    .get("url")
-                )
-                file_name = (
-                    test_run_data.get("testArtifacts", {})
-                    .get("outputArtifacts", {})
-                    .get("resultFileInfo", {})
-                    .get("fileName")
-                )
-                file_path = os.path.join(path, file_name)
-                download_file(url, file_path)
-                logger.warning("Results file downloaded to %s", file_path)
+        if output_artifacts is not None:
+            result_file_info = output_artifacts.get("resultFileInfo")
+            if result_file_info is not None:
+                file_path = os.path.join(path, result_file_info.get("fileName"))
+                files_to_download.append((result_file_info.get("url"), file_path))
+                messages.append(("Results file downloaded to %s", file_path))
             else:
                 logger.info("No results file found for test run %s", test_run_id)
         else:
@@ -228,6 +201,10 @@ def download_test_run_files(
                 test_run_id,
             )
 
+    download_files(files_to_download, skip_existing=skip_existing)
+    for message in messages:
+        logger.warning(*message)
+
 
 # app components
 def add_test_run_app_component(
@@ -91,6 +91,9 @@ examples:
     - name: Download input and log files for a test run by creating the directory if it does not exist.
       text: |
         az load test-run download-files --load-test-resource sample-alt-resource --resource-group sample-rg --test-run-id sample-test-run-id --path ~/Downloads/OutputArtifacts --input --log --force
+    - name: Download the result files of a test run, skipping the files already downloaded to the directory.
+      text: |
+        az load test-run download-files --load-test-resource sample-alt-resource --resource-group sample-rg --test-run-id sample-test-run-id --path ~/Downloads/OutputArtifacts --result --skip-existing
 """
 
 helps[
@@ -31,6 +31,7 @@ def load_arguments(self, _):
         c.argument("test_run_log", argtypes.test_run_log)
         c.argument("test_run_results", argtypes.test_run_results)
         c.argument("force", argtypes.force)
+        c.argument("skip_existing", argtypes.skip_existing)
 
     with self.argument_context("load test-run list") as c:
         c.argument("test_id", argtypes.test_id)
@@ -219,6 +219,14 @@ test_run_results = CLIArgumentType(
     help="Download the results files zip.",
 )
 
+skip_existing = CLIArgumentType(
+    options_list=["--skip-existing"],
+    action="store_true",
+    default=False,
+    help="Skip the files that already exist in the directory with the same size and MD5 as the test run files. "
+    "Files without an MD5 are skipped if they were downloaded from the same version of the test run file.",
+)
+
 app_component_id = CLIArgumentType(
     validator=validators.validate_app_component_id,
     options_list=["--app-component-id"],
@@ -3,8 +3,12 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import base64
+import hashlib
 import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from enum import EnumMeta
 
 import requests
@@ -24,6 +28,11 @@ from .models import IdentityType, AllowedFileTypes
 
 logger = get_logger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+DOWNLOAD_MAX_RETRIES = 3
+DOWNLOAD_TIMEOUT_IN_SECONDS = 60
+MAX_PARALLEL_DOWNLOADS = 4
+
 
 def get_load_test_resource_endpoint(
     cred, load_test_resource, resource_group=None, subscription_id=None
@@ -115,34 +124,145 @@ def get_enum_values(enum):
     return [item.value for item in enum]
 
 
-def download_file(url, file_path):
+def download_file(url, file_path, skip_existing=False):
+    """Streams url to file_path through a .part file. Failed attempts are retried and resume from the bytes
+    already received with a range request, and file_path is only replaced once the whole file was received.
+    With skip_existing, nothing is downloaded if file_path already has the size and MD5 of the remote file, or
+    its size and the ETag recorded when file_path was downloaded for files without an MD5."""
+    if skip_existing and _is_file_downloaded(url, file_path):
+        logger.info("Skipping the download of %s, it already exists", file_path)
+        return
+
     logger.debug("Downloading file started")
-    response = None
-    retries = 3
-    ex = None
-    while retries > 0:
+    part_path = file_path + ".part"
+    for attempt in range(DOWNLOAD_MAX_RETRIES):
         try:
-            response = requests.get(url, stream=True, allow_redirects=True, timeout=60)
+            _download_to_part_file(url, part_path)
             break
-        except Exception as e:  # pylint: disable=broad-except
-            ex = e
-            retries -= 1
+        except requests.RequestException as e:
+            status_code = e.response.status_code if e.response is not None else None
+            retriable = status_code is None or status_code >= 500 or status_code == 429
+            if not retriable or attempt == DOWNLOAD_MAX_RETRIES - 1:
+                msg = f"Request for {url} failed after all retries: {str(e)}"
+                logger.debug(msg)
+                raise FileOperationError(msg)
             logger.debug(
                 "Exception occurred while downloading file: %s. Retrying the request. Retries remaining: %d",
-                str(ex),
-                retries,
+                str(e),
+                DOWNLOAD_MAX_RETRIES - attempt - 1,
             )
-    if retries == 0:
-        msg = f"Request for {url} failed after all retries: {str(ex)}"
-        logger.debug(msg)
-        raise FileOperationError(msg)
-
-    if response:
-        with open(file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=1024):
+            time.sleep(2**attempt)
+    os.replace(part_path, file_path)
+    # the ETag is kept next to the file to tell whether it's still up to date when it has no MD5
+    _write_etag(file_path + ".etag", _read_etag(part_path + ".etag"))
+    _write_etag(part_path + ".etag", None)
+    logger.debug("Downloading file completed")
+
+
+def download_files(files, skip_existing=False):
+    """Downloads the (url, file_path) pairs of files concurrently, and raises the first error once all the
+    downloads are done. When several urls have the same file_path, the last one is downloaded."""
+    # concurrent downloads to the same path would write to the same .part file
+    urls_by_path = {file_path: url for url, file_path in files}
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_DOWNLOADS) as executor:
+        futures = [
+            executor.submit(download_file, url, file_path, skip_existing)
+            for file_path, url in urls_by_path.items()
+        ]
+    for future in futures:
+        future.result()
+
+
+def _download_to_part_file(url, part_path):
+    # the ETag of the file the .part file was downloaded from is kept next to it, so that only the same file
+    # is resumed: artifacts of different test runs have the same names, and would otherwise be mixed up
+    etag_path = part_path + ".etag"
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    etag = _read_etag(etag_path) if offset else None
+    # the size and range of compressed responses wouldn't match the file, so it's requested as is
+    headers = {"Accept-Encoding": "identity"}
+    if offset and etag:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = etag
+    else:
+        offset = 0
+    with requests.get(
+        url, headers=headers, stream=True, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT_IN_SECONDS
+    ) as response:
+        if response.status_code == 416 and offset:
+            # the part file is already complete, or belongs to another file and has to be downloaded again
+            if (
+                response.headers.get("Content-Range") == f"bytes */{offset}"
+                and response.headers.get("ETag") == etag
+            ):
+                return
+            os.remove(part_path)
+            _download_to_part_file(url, part_path)
+            return
+        response.raise_for_status()
+        if offset and response.status_code == 206 and response.headers.get("ETag") != etag:
+            # the file changed and the server ignored If-Range, the range doesn't continue the part file
+            os.remove(part_path)
+            _download_to_part_file(url, part_path)
+            return
+        if offset and response.status_code != 206:
+            offset = 0
+        if not offset:
+            _write_etag(etag_path, response.headers.get("ETag"))
+        expected_size = response.headers.get("Content-Length")
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 if chunk:  # ignore keep-alive new chunks
                     f.write(chunk)
-    logger.debug("Downloading file completed")
+            received_size = f.tell() - offset
+    if expected_size is not None and received_size != int(expected_size):
+        raise requests.ConnectionError(
+            f"The connection was closed after {received_size} of {expected_size} bytes"
+        )
+
+
+def _read_etag(etag_path):
+    try:
+        with open(etag_path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_etag(etag_path, etag):
+    # files without an ETag can't be told apart, so their downloads are never resumed by another invocation
+    if etag:
+        with open(etag_path, "w", encoding="utf-8") as f:
+            f.write(etag)
+    elif os.path.isfile(etag_path):
+        os.remove(etag_path)
+
+
+def _is_file_downloaded(url, file_path):
+    if not os.path.isfile(file_path):
+        return False
+    try:
+        response = requests.head(
+            url, headers={"Accept-Encoding": "identity"}, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT_IN_SECONDS
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.debug("Could not get the properties of %s: %s", url, str(e))
+        return False
+    if response.headers.get("Content-Length") != str(os.path.getsize(file_path)):
+        return False
+    # artifacts uploaded in a single request have the MD5 of their content
+    content_md5 = response.headers.get("Content-MD5")
+    if content_md5:
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                md5.update(chunk)
+        return base64.b64encode(md5.digest()).decode("ascii") == content_md5
+    # otherwise only a file downloaded from the same version of the remote file is up to date, since
+    # artifacts of different test runs can have the same size
+    etag = response.headers.get("ETag")
+    return etag is not None and etag == _read_etag(file_path + ".etag")
 
 
 def upload_file_to_test(client, test_id, file_path, file_type=None, wait=False):
@@ -0,0 +1,130 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from azext_load.data_plane.utils import utils
+from azure.cli.core.azclierror import FileOperationError
+
+
+def _response(content, status_code=200, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = mock.MagicMock()
+    response.iter_content = mock.MagicMock(return_value=iter([content]))
+    response.headers.update({"Content-Length": str(len(content))})
+    response.headers.update(headers or {})
+    return response
+
+
+class LoadDownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.file_path = os.path.join(self.temp_dir.name, "results.zip")
+
+    def _read(self, file_path):
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    @mock.patch("azext_load.data_plane.utils.utils.time.sleep")
+    @mock.patch("requests.get")
+    def test_download_file_resumes_interrupted_download(self, mock_get, mock_sleep):
+        truncated = _response(b"abc", headers={"Content-Length": "6", "ETag": '"1"'})
+        mock_get.side_effect = [truncated, _response(b"def", status_code=206, headers={"ETag": '"1"'})]
+
+        utils.download_file("https://host/results.zip", self.file_path)
+
+        self.assertEqual(mock_get.call_args[1]["headers"]["Range"], "bytes=3-")
+        self.assertEqual(mock_get.call_args[1]["headers"]["If-Range"], '"1"')
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+        self.assertFalse(os.path.exists(self.file_path + ".part"))
+        self.assertFalse(os.path.exists(self.file_path + ".part.etag"))
+        with open(self.file_path + ".etag") as f:
+            self.assertEqual(f.read(), '"1"')
+        mock_sleep.assert_called_once_with(1)
+
+        mock_get.side_effect = [_response(b"", status_code=403)]
+        self.assertRaises(FileOperationError, utils.download_file, "https://host/results.zip", self.file_path)
+
+    @mock.patch("requests.get")
+    def test_download_file_does_not_resume_another_file(self, mock_get):
+        # left by the failed download of the artifact of another test run
+        with open(self.file_path + ".part", "wb") as f:
+            f.write(b"xyz")
+        with open(self.file_path + ".part.etag", "w") as f:
+            f.write('"other"')
+        mock_get.side_effect = [_response(b"def", status_code=206, headers={"ETag": '"1"'}),
+                                _response(b"abcdef", headers={"ETag": '"1"'})]
+
+        utils.download_file("https://host/results.zip", self.file_path)
+
+        self.assertEqual(mock_get.call_args_list[0][1]["headers"]["If-Range"], '"other"')
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+
+        # part files without the ETag of their file aren't resumed at all
+        with open(self.file_path + ".part", "wb") as f:
+            f.write(b"xyz")
+        mock_get.side_effect = [_response(b"abcdef")]
+        utils.download_file("https://host/results.zip", self.file_path)
+        self.assertNotIn("Range", mock_get.call_args[1]["headers"])
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+
+    @mock.patch("requests.head")
+    @mock.patch("requests.get")
+    def test_download_files_skips_existing_files(self, mock_get, mock_head):
+        with open(self.file_path, "wb") as f:
+            f.write(b"abcdef")
+        log_path = os.path.join(self.temp_dir.name, "logs.zip")
+        with open(log_path, "wb") as f:
+            f.write(b"old")
+        content_md5 = base64.b64encode(hashlib.md5(b"abcdef").digest()).decode("ascii")
+        mock_head.side_effect = lambda url, **_: _response(
+            b"abcdef", headers={"Content-MD5": content_md5} if url.endswith("results.zip") else {}
+        )
+        mock_get.return_value = _response(b"abcdef")
+
+        utils.download_files(
+            [("https://host/results.zip", self.file_path), ("https://host/logs.zip", log_path)],
+            skip_existing=True,
+        )
+
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args[0][0], "https://host/logs.zip")
+        self.assertEqual(self._read(log_path), b"abcdef")
+
+    @mock.patch("requests.head")
+    @mock.patch("requests.get")
+    def test_download_file_without_md5_compares_recorded_etag(self, mock_get, mock_head):
+        mock_get.return_value = _response(b"abcdef", headers={"ETag": '"1"'})
+        utils.download_file("https://host/results.zip", self.file_path)
+
+        # same size and ETag as the previous download
+        mock_head.return_value = _response(b"abcdef", headers={"ETag": '"1"'})
+        utils.download_file("https://host/results.zip", self.file_path, skip_existing=True)
+        mock_get.assert_called_once()
+
+        # same size as the previous download, but another version of the file
+        mock_head.return_value = _response(b"ghijkl", headers={"ETag": '"2"'})
+        mock_get.side_effect = lambda url, **_: _response(b"ghijkl", headers={"ETag": '"2"'})
+        utils.download_file("https://host/results.zip", self.file_path, skip_existing=True)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(self._read(self.file_path), b"ghijkl")
+
+        # files without an MD5 or a recorded ETag are downloaded again
+        os.remove(self.file_path + ".etag")
+        mock_head.return_value = _response(b"ghijkl", headers={"ETag": '"2"'})
+        utils.download_file("https://host/results.zip", self.file_path, skip_existing=True)
+        self.assertEqual(mock_get.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
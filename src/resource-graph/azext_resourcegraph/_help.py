@@ -41,6 +41,29 @@ helps['graph query'] = """
         - name: --allow-partial-scopes -a
           type: bool
           short-summary: Indicates if query should succeed when only partial number of subscription underneath can be processed by server.
+        - name: --all
+          type: bool
+          short-summary: Return every page of the results.
+          long-summary: >
+            Skip tokens are followed automatically. More than 1000 subscriptions or 10 management groups are split into shards that are queried concurrently,
+            so aggregations such as summarize are computed per shard, and resources under overlapping management groups can be returned more than once.
+        - name: --stream-format
+          type: string
+          short-summary: Write the rows as they arrive, as newline delimited JSON (ndjson) or CSV, instead of returning the results. Requires --all.
+        - name: --cache-ttl
+          type: int
+          short-summary: Return the cached results of the same query and scope when they are newer than this many seconds, and cache the results otherwise.
+          long-summary: >
+            The results are cached under the Azure CLI configuration directory. The least recently used results are evicted once the cache
+            grows beyond 'az config set graph.query_cache_max_size_mb=<size>', 100 MB by default.
+        - name: --incremental
+          type: bool
+          short-summary: Refresh expired cached results by querying only the resources whose properties.changedTime is newer than the cached results, merged in by id.
+          long-summary: >
+            Only supported for queries made of a table followed by where, project and extend operators. Changed resources which no longer
+            match the query are removed from the results. Deleted resources are not detected by incremental refreshes, so the full query
+            is rerun when the cached results are older than a day. Queries which do not return an id column, and queries run without --all,
+            are always rerun in full.
     examples:
         - name: Query resources requesting a subset of resource fields.
           text: >
@@ -60,6 +83,12 @@ helps['graph query'] = """
         - name: Query with the skip token.
           text: >
             az graph query -q "where type =~ "Microsoft.Compute" | project name, tags" --skip-token skip_token_value_from_previous_query_response
+        - name: Reuse the results of the query for a minute, and only query the resources changed since then afterwards.
+          text: >
+            az graph query -q "project id, name, type, location" --all --cache-ttl 60 --incremental
+        - name: Stream every resource of all accessible subscriptions to a CSV file.
+          text: >
+            az graph query -q "project id, name, type, location" --all --stream-format csv --output-file resources.csv
 """
 
 
@@ -6,6 +6,7 @@
 # pylint: disable=line-too-long, unused-import
 
 
+from azure.cli.core.commands.parameters import get_enum_type
 from azure.cli.core.commands.parameters import get_generic_completion_list
 from azure.cli.core.commands.parameters import get_three_state_flag
 from azure.cli.core.commands.parameters import tags_type
@@ -42,6 +43,18 @@ def load_arguments(self, _):
         c.argument('allow_partial_scopes', options_list=['--allow-partial-scopes', '-a'],
                    arg_type=get_three_state_flag(), required=False, default=False,
                    help='Indicates if query should succeed when only partial number of subscription underneath can be processed by server.')
+        c.argument('query_all', options_list=['--all'], action='store_true',
+                   help='Return every page of the results. More than 1000 subscriptions or 10 management groups are split into shards that are queried concurrently.')
+        c.argument('stream_format', options_list=['--stream-format'], arg_type=get_enum_type(['ndjson', 'csv']),
+                   help='Write the rows as they arrive in this format instead of returning the results. Requires --all. The rows bypass --output and cannot be filtered with --query.')
+        c.argument('output_file', options_list=['--output-file'], type=str,
+                   help='File to stream the rows to. Defaults to stdout. Requires --all.')
+        c.argument('max_parallelism', options_list=['--max-parallelism'], type=int,
+                   help='Maximum number of shards queried at the same time with --all.')
+        c.argument('cache_ttl', options_list=['--cache-ttl'], type=int,
+                   help='Return the cached results of the same query and scope when they are newer than this many seconds, and cache the results otherwise.')
+        c.argument('incremental', options_list=['--incremental'], action='store_true',
+                   help='Refresh expired cached results by querying only the resources changed since they were cached. Requires --cache-ttl. Only applies with --all, pages requested with --first or --skip are queried again in full.')
 
     with self.argument_context('graph shared-query') as c:
         c.argument('graph_query', options_list=['--graph-query', '--q', '-q'],
@@ -0,0 +1,165 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+
+from knack.log import get_logger
+
+QUERY_CACHE_MAX_SIZE_MB = 100
+# resources changed shortly before a snapshot may not be indexed yet, so incremental refreshes look back further
+CHANGED_TIME_SKEW_SECONDS = 300
+# incremental refreshes cannot see deleted resources, so the full query is rerun at least this often
+FULL_REFRESH_INTERVAL_SECONDS = 24 * 3600
+_KQL_OPERATORS = {'where', 'project', 'project-away', 'project-keep', 'project-rename', 'extend', 'summarize', 'order',
+                  'sort', 'top', 'take', 'limit', 'distinct', 'count', 'join', 'mv-expand', 'union', 'parse'}
+_INCREMENTAL_OPERATORS = ['where', 'project', 'extend']
+
+logger = get_logger(__name__)
+
+
+class QueryResultCache:
+    """Query results stored as one file per query and scope. Files are touched when read and the least
+    recently used ones are evicted once the cache grows beyond max_size_bytes."""
+
+    def __init__(self, cache_dir, max_size_bytes):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+
+    @staticmethod
+    def get_key(graph_query, subscriptions, management_groups, **options):
+        scope = {'subscriptions': sorted(subscriptions) if subscriptions is not None else None,
+                 'management_groups': sorted(management_groups) if management_groups is not None else None}
+        key = json.dumps([normalize_query(graph_query), scope, options], sort_keys=True)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def load(self, key):
+        path = self._get_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def save(self, key, entry):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(entry))
+            os.replace(temp_path, self._get_path(key))
+        except OSError as e:
+            logger.debug("Failed to save the query result cache: %s", e)
+            return
+        self.evict()
+
+    def evict(self):
+        try:
+            files = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+
+def get_query_result_cache(cli_ctx):
+    max_size_mb = cli_ctx.config.getint('graph', 'query_cache_max_size_mb', fallback=QUERY_CACHE_MAX_SIZE_MB)
+    return QueryResultCache(os.path.join(cli_ctx.config.config_dir, 'graph', 'query_cache'), max_size_mb * 1024 * 1024)
+
+
+def normalize_query(graph_query):
+    """Collapses whitespace outside of string literals, so reformatted queries share cache entries."""
+    parts = re.split(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')''', graph_query.strip())
+    return ''.join(part if index % 2 else re.sub(r'\s+', ' ', part) for index, part in enumerate(parts))
+
+
+def _split_query(graph_query):
+    """Splits the query into its pipe separated parts, ignoring the pipes and semicolons of string literals.
+    Returns None when the query has several statements."""
+    parts = re.split(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')''', graph_query.strip())
+    if any(';' in part for part in parts[::2]):
+        return None
+    pipes = ['']
+    for index, part in enumerate(parts):
+        if index % 2:
+            pipes[-1] += part
+            continue
+        pieces = part.split('|')
+        pipes[-1] += pieces[0]
+        pipes.extend(pieces[1:])
+    return [pipe.strip() for pipe in pipes]
+
+
+def _get_table_and_operators(graph_query):
+    pipes = _split_query(graph_query)
+    if not pipes or not pipes[0]:
+        return None, None
+    match = re.match(r'[A-Za-z_][\w-]*$', pipes[0])
+    if match and pipes[0].lower() not in _KQL_OPERATORS:
+        return pipes[0], pipes[1:]
+    return None, pipes
+
+
+def is_incremental_query(graph_query):
+    """Incremental refreshes replace the cached rows of the changed resources, which is only correct when every
+    row maps to a single resource and doesn't depend on the other rows: a table followed by where, project and
+    extend operators."""
+    _, operators = _get_table_and_operators(graph_query)
+    if operators is None:
+        return False
+    return all(re.match(r'({})(\s|$)'.format('|'.join(_INCREMENTAL_OPERATORS)), operator) for operator in operators)
+
+
+def _get_changed_filter(since):
+    return "where todatetime(properties.changedTime) > datetime({})".format(
+        datetime.fromtimestamp(since - CHANGED_TIME_SKEW_SECONDS, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+
+def add_changed_time_filter(graph_query, since):
+    """Restricts the query to resources changed after the since timestamp. The filter goes right
+    after the table name, or first when the query runs on the default Resources table."""
+    table, operators = _get_table_and_operators(graph_query)
+    return ' | '.join(([table] if table else []) + [_get_changed_filter(since)] + operators)
+
+
+def get_changed_ids_query(graph_query, since):
+    """The ids of all the resources of the table of the query changed after the since timestamp, including the ones
+    the query filters out."""
+    table, _ = _get_table_and_operators(graph_query)
+    return '{} | {} | project id'.format(table or 'Resources', _get_changed_filter(since))
+
+
+def merge_changed_rows(result, changed_rows, changed_ids):
+    """Replaces the rows of the cached result with their changed version, matched by resource id,
+    and appends the rows of new resources. The rows of changed resources which no longer match the
+    query are removed. Returns None when the rows cannot be matched by id."""
+    data = result['data']
+    if any('id' not in row for row in data) or any('id' not in row for row in changed_rows):
+        return None
+    changed = {row['id'].lower(): row for row in changed_rows}
+    removed = {resource_id.lower() for resource_id in changed_ids} - set(changed)
+    data = [changed.pop(row['id'].lower(), row) for row in data if row['id'].lower() not in removed]
+    data.extend(changed.values())
+    return dict(result, data=data, count=len(data), total_records=len(data))
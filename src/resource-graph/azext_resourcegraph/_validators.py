@@ -3,7 +3,9 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-from azure.cli.core.azclierror import InvalidArgumentValueError
+from azure.cli.core.azclierror import InvalidArgumentValueError, MutuallyExclusiveArgumentError, RequiredArgumentMissingError
+
+from ._query_cache import is_incremental_query
 
 
 __ROWS_PER_PAGE = 1000
@@ -23,6 +25,31 @@ def validate_query_args(namespace):
         recommendation = 'Try to pass --subscriptions param only or --management-groups param only.'
         raise InvalidArgumentValueError(error_msg, recommendation)
 
+    if namespace.cache_ttl is not None and namespace.cache_ttl < 0:
+        raise InvalidArgumentValueError("Value of --cache-ttl cannot be negative.")
+
+    if namespace.incremental and not namespace.cache_ttl:
+        raise RequiredArgumentMissingError('--incremental requires --cache-ttl.')
+
+    if namespace.incremental and not is_incremental_query(namespace.graph_query):
+        raise InvalidArgumentValueError('--incremental can only be used with queries made of a table followed by '
+                                        'where, project and extend operators.',
+                                        'Remove --incremental to cache the results of the query for --cache-ttl.')
+
+    if namespace.cache_ttl and (namespace.stream_format is not None or namespace.output_file is not None):
+        raise MutuallyExclusiveArgumentError('--cache-ttl cannot be used with --stream-format or --output-file.')
+
+    if namespace.query_all:
+        if namespace.first is not None or namespace.skip is not None or namespace.skip_token is not None:
+            raise MutuallyExclusiveArgumentError('--all cannot be used with --first, --skip or --skip-token.',
+                                                 'Every page of the results is returned with --all.')
+        if namespace.max_parallelism < 1:
+            raise InvalidArgumentValueError("Value of --max-parallelism has to be at least 1.")
+        return
+
+    if namespace.stream_format is not None or namespace.output_file is not None:
+        raise RequiredArgumentMissingError('--stream-format and --output-file can only be used with --all.')
+
     if namespace.first is not None:
         namespace.first = min(namespace.first, __ROWS_PER_PAGE)
     elif namespace.skip_token is None:
@@ -5,9 +5,14 @@
 
 # pylint: disable=unused-import, broad-except
 
+import csv
 import json
 import os
+import sys
+import threading
+import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import requests
@@ -16,22 +21,81 @@ from azure.cli.core._profile import Profile
 from azure.cli.core._session import SESSION
 from azure.core.exceptions import HttpResponseError
 from azure.mgmt.core.exceptions import ARMErrorFormat
-from azure.cli.core.azclierror import BadRequestError, AzureInternalError
+from azure.cli.core.azclierror import BadRequestError, AzureInternalError, MutuallyExclusiveArgumentError
 from knack.log import get_logger
 from knack.util import todict
 
 from azext_resourcegraph.vendored_sdks.resourcegraph.models import ResultTruncated
+from ._query_cache import (get_query_result_cache, add_changed_time_filter, get_changed_ids_query,
+                           merge_changed_rows, FULL_REFRESH_INTERVAL_SECONDS)
 from .vendored_sdks.resourcegraph import ResourceGraphClient
 from .vendored_sdks.resourcegraph.models import \
     QueryRequest, QueryRequestOptions, QueryResponse, ResultFormat, ErrorResponse, Error
 
 __SUBSCRIPTION_LIMIT = 1000
 __MANAGEMENT_GROUP_LIMIT = 10
+__ROWS_PER_PAGE = 1000
+__MAX_THROTTLED_RETRIES = 5
+__MAX_BACKOFF_SECONDS = 60
 __logger = get_logger(__name__)
 
 
-def execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token):
-    # type: (ResourceGraphClient, str, int, int, list[str], list[str], bool, str) -> object
+def execute_query(cmd, client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes,
+                  skip_token, query_all=False, stream_format=None, output_file=None, max_parallelism=4,
+                  cache_ttl=None, incremental=False):
+    # type: (AzCliCommand, ResourceGraphClient, str, int, int, list[str], list[str], bool, str, bool, str, str, int, int, bool) -> object
+    if (stream_format is not None or output_file is not None) and cmd.cli_ctx.invocation.data.get('query_active'):
+        # the rows are written as they arrive, bypassing the output pipeline of the CLI
+        raise MutuallyExclusiveArgumentError('--stream-format and --output-file cannot be used with --query.',
+                                             'Filter the rows in the Resource Graph query instead.')
+    if not cache_ttl or stream_format is not None or output_file is not None:
+        return _execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes,
+                              skip_token, query_all, stream_format, output_file, max_parallelism)
+
+    if management_groups is None:
+        subscriptions = subscriptions or _get_cached_subscriptions()
+    cache = get_query_result_cache(cmd.cli_ctx)
+    key = cache.get_key(graph_query, subscriptions if management_groups is None else None, management_groups,
+                        first=first, skip=skip, skip_token=skip_token, allow_partial_scopes=allow_partial_scopes,
+                        query_all=query_all)
+    entry = cache.load(key)
+    now = time.time()
+    if entry is not None and now - entry['snapshot_time'] < cache_ttl:
+        __logger.info("Returning the cached results of the query from %s.", datetime.fromtimestamp(entry['snapshot_time']))
+        return entry['result']
+
+    result = None
+    full_refresh_time = now
+    # a page requested with --first or --skip can't be refreshed from the changed rows of the whole result set:
+    # rows from outside the page would be merged in, and removed rows would not be backfilled
+    if incremental and query_all and entry is not None and entry['result']['skip_token'] is None and \
+            now - entry['full_refresh_time'] < FULL_REFRESH_INTERVAL_SECONDS:
+        changed = _execute_query(client, add_changed_time_filter(graph_query, entry['snapshot_time']), None, None,
+                                 subscriptions, management_groups, allow_partial_scopes, None, True, None, None,
+                                 max_parallelism)
+        # the changed resources the query filters out now have to be removed from the cached rows
+        changed_ids = _execute_query(client, get_changed_ids_query(graph_query, entry['snapshot_time']), None, None,
+                                     subscriptions, management_groups, allow_partial_scopes, None, True, None, None,
+                                     max_parallelism)
+        result = merge_changed_rows(entry['result'], changed['data'], [row['id'] for row in changed_ids['data']])
+        if result is None:
+            __logger.warning("The rows of the query have no id column to merge changes by, rerunning the full query.")
+        else:
+            full_refresh_time = entry['full_refresh_time']
+    if result is None:
+        result = _execute_query(client, graph_query, first, skip, subscriptions, management_groups,
+                                allow_partial_scopes, skip_token, query_all, None, None, max_parallelism)
+
+    cache.save(key, {'snapshot_time': now, 'full_refresh_time': full_refresh_time, 'result': result})
+    return result
+
+
+def _execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token,
+                   query_all, stream_format, output_file, max_parallelism):
+    if query_all:
+        return _execute_query_all(client, graph_query, subscriptions, management_groups, allow_partial_scopes,
+                                  stream_format, output_file, max_parallelism)
+
     mgs_list = management_groups
     if mgs_list is not None and len(mgs_list) > __MANAGEMENT_GROUP_LIMIT:
         mgs_list = mgs_list[:__MANAGEMENT_GROUP_LIMIT]
@@ -82,10 +146,7 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
                              "see the docs for an example: https://aka.ms/arg-results-truncated")
 
     except HttpResponseError as ex:
-        if ex.model.error.code == 'BadRequest':
-            raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
-
-        raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+        _raise_query_error(ex)
 
     result_dict = dict()
     result_dict['data'] = response.data
@@ -96,6 +157,190 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
     return result_dict
 
 
+def _execute_query_all(client, graph_query, subscriptions, management_groups, allow_partial_scopes,
+                       stream_format, output_file, max_parallelism):
+    # Scopes beyond the per request limits are split into shards which are queried concurrently,
+    # each shard following its own skip tokens until its last page.
+    if management_groups is not None:
+        shards = [{'management_groups': management_groups[i:i + __MANAGEMENT_GROUP_LIMIT]}
+                  for i in range(0, len(management_groups), __MANAGEMENT_GROUP_LIMIT)]
+    else:
+        subs_list = subscriptions or _get_cached_subscriptions()
+        shards = [{'subscriptions': subs_list[i:i + __SUBSCRIPTION_LIMIT]}
+                  for i in range(0, len(subs_list), __SUBSCRIPTION_LIMIT)] or [{'subscriptions': subs_list}]
+
+    if stream_format is None and output_file is None:
+        shard_rows = [[] for _ in shards]
+
+        def collect_rows(shard_index, page):
+            shard_rows[shard_index].extend(page.data)
+
+        total_records = _query_shards(client, graph_query, shards, allow_partial_scopes, ResultFormat.object_array,
+                                      collect_rows, max_parallelism)
+        data = [row for rows in shard_rows for row in rows]
+        return {'data': data, 'count': len(data), 'total_records': total_records, 'skip_token': None}
+
+    stream = open(output_file, 'w', encoding='utf-8', newline='') if output_file else sys.stdout  # pylint: disable=consider-using-with
+    try:
+        writer = _QueryResultWriter(stream, stream_format or 'ndjson')
+        _query_shards(client, graph_query, shards, allow_partial_scopes,
+                      ResultFormat.table if writer.stream_format == 'csv' else ResultFormat.object_array,
+                      lambda _, page: writer.write_page(page.data), max_parallelism)
+    finally:
+        if output_file:
+            stream.close()
+        else:
+            stream.flush()
+    __logger.info("Wrote %d rows.", writer.rows_written)
+    return None
+
+
+def _query_shards(client, graph_query, shards, allow_partial_scopes, result_format, on_page, max_parallelism):
+    throttle = _QueryThrottle(max_parallelism)
+
+    def query_shard(shard_index):
+        shard_total_records = None
+        skip_token = None
+        while True:
+            request = QueryRequest(
+                query=graph_query,
+                options=QueryRequestOptions(top=__ROWS_PER_PAGE, skip_token=skip_token, result_format=result_format,
+                                            allow_partial_scopes=allow_partial_scopes),
+                **shards[shard_index])
+            page = _query_page(client, request, throttle)
+            if shard_total_records is None:
+                shard_total_records = page.total_records
+            if page.result_truncated == ResultTruncated.true:
+                __logger.warning("Unable to paginate the results of the query. "
+                                 "Some resources may be missing from the results. "
+                                 "To rewrite the query and enable paging, "
+                                 "see the docs for an example: https://aka.ms/arg-results-truncated")
+            on_page(shard_index, page)
+            skip_token = page.skip_token
+            if not skip_token:
+                return shard_total_records or 0
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallelism, len(shards)))) as executor:
+        return sum(executor.map(query_shard, range(len(shards))))
+
+
+def _query_page(client, request, throttle):
+    attempt = 0
+    while True:
+        throttle.wait()
+        try:
+            response, headers = client.resources(
+                request, cls=lambda pipeline_response, deserialized, _: (deserialized,
+                                                                         pipeline_response.http_response.headers))
+        except HttpResponseError as ex:
+            if ex.status_code == 429 and attempt < __MAX_THROTTLED_RETRIES:
+                attempt += 1
+                delay = _get_throttled_retry_delay(attempt, ex.response.headers if ex.response is not None else {})
+                __logger.warning("Resource Graph throttled the query, retrying in %.1f seconds.", delay)
+                throttle.defer(delay)
+                continue
+            _raise_query_error(ex)
+        throttle.update(headers)
+        return response
+
+
+class _QueryThrottle:
+    """Spaces out the requests of all shard workers using the quota headers returned by Resource Graph:
+    https://learn.microsoft.com/azure/governance/resource-graph/concepts/guidance-for-throttled-requests"""
+
+    def __init__(self, parallelism):
+        self._parallelism = max(1, parallelism)
+        self._lock = threading.Lock()
+        self._not_before = 0
+
+    def wait(self):
+        with self._lock:
+            delay = self._not_before - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, headers):
+        remaining = headers.get('x-ms-user-quota-remaining')
+        resets_after = _parse_quota_resets_after(headers.get('x-ms-user-quota-resets-after'))
+        if remaining is None or resets_after is None:
+            return
+        remaining = int(remaining)
+        if remaining >= self._parallelism:
+            return
+        # spread the remaining quota of the window over the requests still to come
+        self.defer(resets_after if remaining <= 0 else resets_after / (remaining + 1))
+
+    def defer(self, delay):
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + delay)
+
+
+class _QueryResultWriter:
+    """Writes pages of query results as newline delimited JSON, or as CSV for pages in table format.
+    Pages come from concurrent shard workers, so each page is written as one unit."""
+
+    def __init__(self, stream, stream_format):
+        self.stream_format = stream_format
+        self.rows_written = 0
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._csv_writer = csv.writer(stream) if stream_format == 'csv' else None
+        self._columns = None
+
+    def write_page(self, data):
+        with self._lock:
+            if self._csv_writer is None:
+                self._stream.write(''.join(json.dumps(row) + '\n' for row in data))
+                self.rows_written += len(data)
+                return
+            columns = [column['name'] for column in data['columns']]
+            if self._columns is None:
+                self._columns = columns
+                self._csv_writer.writerow(columns)
+            rows = data['rows']
+            if columns != self._columns:
+                rows = [[dict(zip(columns, row)).get(column) for column in self._columns] for row in rows]
+            self._csv_writer.writerows([_to_csv_cell(cell) for cell in row] for row in rows)
+            self.rows_written += len(rows)
+
+
+def _get_throttled_retry_delay(attempt, headers):
+    delay = _parse_quota_resets_after(headers.get('x-ms-user-quota-resets-after'))
+    if delay is None:
+        try:
+            delay = float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            delay = 2 ** attempt
+    return min(delay, __MAX_BACKOFF_SECONDS)
+
+
+def _to_csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _parse_quota_resets_after(value):
+    # the quota window is returned as hh:mm:ss
+    if not value:
+        return None
+    try:
+        hours, minutes, seconds = value.split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+def _raise_query_error(ex):
+    if ex.model is None or ex.model.error is None:
+        raise AzureInternalError(str(ex)) from ex
+
+    if ex.model.error.code == 'BadRequest':
+        raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+
+    raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+
+
 def create_shared_query(client, resource_group_name,
                         resource_name, description,
                         graph_query, location='global', tags=None):
@@ -0,0 +1,110 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import MutuallyExclusiveArgumentError
+
+from azext_resourcegraph.custom import execute_query, _QueryThrottle, _parse_quota_resets_after
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import QueryResponse, ResultFormat
+
+
+class FakeResourceGraphClient:
+    """Serves two pages per request scope, and records the requests it received."""
+
+    def __init__(self):
+        self.requests = []
+
+    def resources(self, request, cls=None):
+        self.requests.append(request)
+        scope = (request.subscriptions or request.management_groups)[0]
+        page = 1 if request.options.skip_token else 0
+        ids = ['{}/r{}'.format(scope, page * 2 + i) for i in range(2)]
+        if request.options.result_format == ResultFormat.table:
+            data = {'columns': [{'name': 'id', 'type': 'string'}, {'name': 'tags', 'type': 'object'}],
+                    'rows': [[i, {'env': 'test'}] for i in ids]}
+        else:
+            data = [{'id': i} for i in ids]
+        response = QueryResponse(total_records=4, count=2, result_truncated='false', data=data,
+                                 skip_token=None if page else 'next')
+        headers = {'x-ms-user-quota-remaining': '14', 'x-ms-user-quota-resets-after': '00:00:05'}
+        return cls(mock.Mock(http_response=mock.Mock(headers=headers)), response, {})
+
+
+class ResourceGraphQueryAllTests(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeResourceGraphClient()
+        self.subscriptions = ['sub{}'.format(i) for i in range(2500)]
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.invocation.data = {}
+
+    def _execute(self, **kwargs):
+        return execute_query(self.cmd, self.client, 'project id', None, None, self.subscriptions, None, False, None,
+                             query_all=True, **kwargs)
+
+    def test_query_all_shards_and_follows_skip_tokens(self):
+        result = self._execute()
+
+        self.assertEqual(len(self.client.requests), 6)
+        self.assertEqual(sorted(len(r.subscriptions) for r in self.client.requests), [500, 500, 1000, 1000, 1000, 1000])
+        self.assertEqual(result['count'], 12)
+        self.assertEqual(result['total_records'], 12)
+        self.assertIsNone(result['skip_token'])
+        self.assertEqual([row['id'] for row in result['data']][:4], ['sub0/r0', 'sub0/r1', 'sub0/r2', 'sub0/r3'])
+        self.assertEqual(result['data'][-1]['id'], 'sub2000/r3')
+
+    def test_query_all_management_groups(self):
+        management_groups = ['mg{}'.format(i) for i in range(12)]
+        execute_query(None, self.client, 'project id', None, None, None, management_groups, False, None, query_all=True)
+        self.assertEqual(sorted(len(r.management_groups) for r in self.client.requests), [2, 2, 10, 10])
+
+    def test_query_all_stream_ndjson(self):
+        stream = io.StringIO()
+        with mock.patch('azext_resourcegraph.custom.sys.stdout', stream):
+            self.assertIsNone(self._execute(stream_format='ndjson'))
+        rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(rows), 12)
+        self.assertIn({'id': 'sub1000/r2'}, rows)
+
+    def test_query_all_stream_rejects_query(self):
+        self.cmd.cli_ctx.invocation.data['query_active'] = True
+        with self.assertRaises(MutuallyExclusiveArgumentError):
+            self._execute(stream_format='ndjson')
+        with self.assertRaises(MutuallyExclusiveArgumentError):
+            self._execute(output_file='resources.ndjson')
+        self.assertEqual(self.client.requests, [])
+
+    def test_query_all_stream_csv(self):
+        stream = io.StringIO()
+        with mock.patch('azext_resourcegraph.custom.sys.stdout', stream):
+            self._execute(stream_format='csv')
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], 'id,tags')
+        self.assertEqual(len(lines), 13)
+        self.assertIn('sub0/r0,"{""env"": ""test""}"', lines)
+        self.assertTrue(all(request.options.result_format == ResultFormat.table for request in self.client.requests))
+
+    def test_query_throttle(self):
+        self.assertEqual(_parse_quota_resets_after('00:01:05'), 65)
+        self.assertIsNone(_parse_quota_resets_after('soon'))
+
+        throttle = _QueryThrottle(4)
+        with mock.patch('azext_resourcegraph.custom.time.monotonic', return_value=100.0):
+            throttle.update({'x-ms-user-quota-remaining': '10', 'x-ms-user-quota-resets-after': '00:00:05'})
+            self.assertEqual(throttle._not_before, 0)
+            throttle.update({'x-ms-user-quota-remaining': '1', 'x-ms-user-quota-resets-after': '00:00:04'})
+            self.assertEqual(throttle._not_before, 102.0)
+            throttle.update({'x-ms-user-quota-remaining': '0', 'x-ms-user-quota-resets-after': '00:00:05'})
+            self.assertEqual(throttle._not_before, 105.0)
+            with mock.patch('azext_resourcegraph.custom.time.sleep') as sleep_mock:
+                throttle.wait()
+            sleep_mock.assert_called_once_with(5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_resourcegraph._query_cache import (QueryResultCache, normalize_query, add_changed_time_filter,
+                                              get_changed_ids_query, is_incremental_query, merge_changed_rows)
+from azext_resourcegraph.custom import execute_query
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import QueryResponse
+
+SINCE = 1700000000  # 2023-11-14T22:13:20Z
+
+
+class ResourceGraphQueryCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cache_dir = os.path.join(self.temp_dir.name, 'query_cache')
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  where name  == 'a  b'\n| project   id "), "where name == 'a  b' | project id")
+        self.assertEqual(QueryResultCache.get_key('project  id', ['s2', 's1'], None, first=100),
+                         QueryResultCache.get_key('project id', ['s1', 's2'], None, first=100))
+        self.assertNotEqual(QueryResultCache.get_key('project id', ['s1'], None, first=100),
+                            QueryResultCache.get_key('project id', ['s1'], None, first=10))
+
+    def test_add_changed_time_filter(self):
+        changed_filter = 'where todatetime(properties.changedTime) > datetime(2023-11-14T22:08:20Z)'
+        self.assertEqual(add_changed_time_filter('project id, name', SINCE), changed_filter + ' | project id, name')
+        self.assertEqual(add_changed_time_filter('Resources | project id', SINCE),
+                         'Resources | ' + changed_filter + ' | project id')
+        self.assertEqual(add_changed_time_filter('resourcecontainers', SINCE), 'resourcecontainers | ' + changed_filter)
+        self.assertEqual(add_changed_time_filter("where name == 'a|b'", SINCE), changed_filter + " | where name == 'a|b'")
+        self.assertEqual(get_changed_ids_query('resourcecontainers | project name', SINCE),
+                         'resourcecontainers | ' + changed_filter + ' | project id')
+
+    def test_is_incremental_query(self):
+        for query in ['Resources', 'project id, name', "Resources | where name == 'a|take 1;' | extend x = 1",
+                      'resourcecontainers | project id, name']:
+            self.assertTrue(is_incremental_query(query), query)
+        for query in ['Resources | take 5', 'where a | order by name', 'project id | distinct id',
+                      'Resources | summarize count()', 'let t = Resources; t | project id', 'project-away tags']:
+            self.assertFalse(is_incremental_query(query), query)
+
+    def test_merge_changed_rows(self):
+        result = {'data': [{'id': 'A', 'v': 1}, {'id': 'b', 'v': 1}], 'count': 2, 'total_records': 2, 'skip_token': None}
+        merged = merge_changed_rows(result, [{'id': 'a', 'v': 2}, {'id': 'c', 'v': 2}], ['a', 'c'])
+        self.assertEqual(merged['data'], [{'id': 'a', 'v': 2}, {'id': 'b', 'v': 1}, {'id': 'c', 'v': 2}])
+        self.assertEqual(merged['count'], 3)
+        # b changed and doesn't match the query anymore
+        merged = merge_changed_rows(result, [{'id': 'a', 'v': 2}], ['a', 'B'])
+        self.assertEqual(merged['data'], [{'id': 'a', 'v': 2}])
+        self.assertIsNone(merge_changed_rows({'data': [{'count_': 2}]}, [], []))
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = QueryResultCache(self.cache_dir, 3500)
+        for index, key in enumerate(['k1', 'k2', 'k3']):
+            cache.save(key, {'result': 'x' * 1000})
+            os.utime(os.path.join(self.cache_dir, key + '.json'), (index, index))
+        cache.load('k1')
+        cache.save('k4', {'result': 'x' * 1000})
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['k1.json', 'k3.json', 'k4.json'])
+
+    @mock.patch('azext_resourcegraph.custom.time.time')
+    def test_execute_query_cached_and_incremental(self, time_mock):
+        def page(data):
+            def resources(request, cls=None):
+                response = QueryResponse(total_records=len(data), count=len(data), result_truncated='false', data=data)
+                return cls(mock.Mock(http_response=mock.Mock(headers={})), response, {}) if cls else response
+            return resources
+
+        client = mock.Mock()
+        client.resources.side_effect = page([{'id': 'r1', 'v': 1}])
+        cmd = mock.Mock()
+        cmd.cli_ctx.config.config_dir = self.temp_dir.name
+        cmd.cli_ctx.config.getint.return_value = 1
+
+        def run_query(**kwargs):
+            kwargs = kwargs or {'query_all': True}
+            return execute_query(cmd, client, 'project id, v', kwargs.pop('first', None), kwargs.pop('skip', None),
+                                 ['s1'], None, False, None, cache_ttl=60, incremental=True, **kwargs)
+
+        time_mock.return_value = SINCE
+        self.assertEqual(run_query()['data'], [{'id': 'r1', 'v': 1}])
+        time_mock.return_value = SINCE + 30
+        self.assertEqual(run_query()['data'], [{'id': 'r1', 'v': 1}])
+        self.assertEqual(client.resources.call_count, 1)
+
+        def changed_page(request, cls=None):
+            if request.query.startswith('Resources | where todatetime(properties.changedTime) > datetime('):
+                data = [{'id': 'r2'}, {'id': 'r3'}]
+            else:
+                self.assertTrue(request.query.startswith('where todatetime(properties.changedTime) > datetime('))
+                data = [{'id': 'r2', 'v': 2}]
+            return page(data)(request, cls)
+
+        client.resources.side_effect = changed_page
+        time_mock.return_value = SINCE + 90
+        result = run_query()
+        self.assertEqual(result['data'], [{'id': 'r1', 'v': 1}, {'id': 'r2', 'v': 2}])
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(client.resources.call_count, 3)
+
+    @mock.patch('azext_resourcegraph.custom.time.time')
+    def test_execute_query_pages_are_not_incremental(self, time_mock):
+        client = mock.Mock()
+        client.resources.return_value = QueryResponse(total_records=2, count=1, result_truncated='false',
+                                                      data=[{'id': 'r1'}])
+        cmd = mock.Mock()
+        cmd.cli_ctx.config.config_dir = self.temp_dir.name
+        cmd.cli_ctx.config.getint.return_value = 1
+
+        for now in [SINCE, SINCE + 90]:
+            time_mock.return_value = now
+            execute_query(cmd, client, 'project id', 1, 1, ['s1'], None, False, None, cache_ttl=60, incremental=True)
+        # the expired page is queried again as is, without a changedTime filter
+        self.assertEqual([c[0][0].query for c in client.resources.call_args_list], ['project id', 'project id'])
+        self.assertEqual(client.resources.call_args[0][0].options.skip, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
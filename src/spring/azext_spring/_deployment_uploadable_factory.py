@@ -5,19 +5,124 @@
 
 # pylint: disable=wrong-import-order
 import os
-from re import L
-import tempfile
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from time import sleep
 from azure.cli.core.azclierror import InvalidArgumentValueError
 from azure.cli.core.profiles import ResourceType, get_sdk
+from knack.log import get_logger
 from ._utils import (get_azure_files_info, _pack_source_code)
 
+logger = get_logger(__name__)
+
+# Azure Files accepts ranges of at most 4 MiB
+UPLOAD_RANGE_SIZE = 4 * 1024 * 1024
+# can be changed with `az config set spring.upload_max_connections=<count>`
+DEFAULT_UPLOAD_MAX_CONNECTIONS = 8
+UPLOAD_RANGE_RETRY_COUNT = 3
+
 
 class Empty:
     def upload_and_build(self, **_):
         pass
 
 
+class _ParallelRangeUpload:
+    '''
+    Upload the ranges of a file in Azure Files concurrently. At most max_connections ranges are sent at the same
+    time and as many are buffered, failed ranges are retried on their own, and progress_callback(current, total) is
+    called with the number of bytes uploaded so far.
+    '''
+    def __init__(self, file_service, share_name, file_name, max_connections, progress_callback=None, total=None):
+        self.file_service = file_service
+        self.share_name = share_name
+        self.file_name = file_name
+        self.progress_callback = progress_callback
+        self.total = total
+        self.uploaded = 0
+        self.errors = []
+        self._lock = Lock()
+        self._slots = BoundedSemaphore(max_connections * 2)
+        self._executor = ThreadPoolExecutor(max_workers=max_connections)
+
+    def upload_range(self, data, offset):
+        self._raise_if_failed()
+        self._slots.acquire()
+        self._executor.submit(self._upload_range, data, offset)
+
+    def wait(self):
+        self.wait_for_pending()
+        self._raise_if_failed()
+
+    def wait_for_pending(self):
+        self._executor.shutdown(wait=True)
+
+    def _raise_if_failed(self):
+        if self.errors:
+            self.wait_for_pending()
+            raise self.errors[0]
+
+    def _upload_range(self, data, offset):
+        try:
+            for attempt in range(UPLOAD_RANGE_RETRY_COUNT):
+                try:
+                    self.file_service.update_range(self.share_name, None, self.file_name, data,
+                                                   offset, offset + len(data) - 1)
+                    break
+                except Exception as e:  # pylint: disable=broad-except
+                    if attempt == UPLOAD_RANGE_RETRY_COUNT - 1:
+                        raise
+                    logger.debug('Failed to upload range {}-{}, retrying: {}'.format(
+                        offset, offset + len(data) - 1, str(e)))
+                    sleep(2 ** attempt)
+            with self._lock:
+                self.uploaded += len(data)
+                if self.progress_callback:
+                    self.progress_callback(self.uploaded, self.total)
+        except Exception as e:  # pylint: disable=broad-except
+            self.errors.append(e)
+        finally:
+            self._slots.release()
+
+
+class _StreamingRangeWriter:
+    '''
+    File-like object uploading what is written to it to a file in Azure Files as soon as a whole range is available.
+    The file is created with the estimated size and truncated to the actual size once closed.
+    '''
+    def __init__(self, file_service, share_name, file_name, estimated_size, range_upload):
+        self.file_service = file_service
+        self.share_name = share_name
+        self.file_name = file_name
+        self.allocated_size = max(estimated_size, 1)
+        self.range_upload = range_upload
+        self.offset = 0
+        self.buffer = bytearray()
+        self.file_service.create_file(share_name, None, file_name, self.allocated_size)
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= UPLOAD_RANGE_SIZE:
+            self._upload(bytes(self.buffer[:UPLOAD_RANGE_SIZE]))
+            del self.buffer[:UPLOAD_RANGE_SIZE]
+        return len(data)
+
+    def close(self):
+        if self.buffer:
+            self._upload(bytes(self.buffer))
+            self.buffer.clear()
+        self.range_upload.wait()
+        self.file_service.resize_file(self.share_name, None, self.file_name, self.offset)
+
+    def _upload(self, data):
+        if self.offset + len(data) > self.allocated_size:
+            # the archive grew over the estimate, which can only happen if files grew while being compressed
+            self.allocated_size = max(self.allocated_size * 2, self.offset + len(data))
+            self.file_service.resize_file(self.share_name, None, self.file_name, self.allocated_size)
+        self.range_upload.upload_range(data, self.offset)
+        self.offset += len(data)
+
+
 class FileUpload:
     '''
     Upload a file in local file system to upload url
@@ -30,6 +135,7 @@ class FileUpload:
         self.relative_name = relative_name
         self.sas_token = sas_token
         self.cli_ctx = cli_ctx
+        self.progress_bar = None
 
     def upload_and_build(self, artifact_path, **_):
         if not artifact_path:
@@ -41,25 +147,79 @@ class FileUpload:
             raise InvalidArgumentValueError('Unexpected artifact file type, must be one of .zip, .tar.gz, .tar, .jar, .war.')
 
     def _upload(self, artifact_path):
+        file_service = self._get_file_service()
+        size = os.path.getsize(artifact_path)
+        file_service.create_file(self.share_name, None, self.relative_name, size)
+        range_upload = self._get_range_upload(file_service, total=size)
+        try:
+            with open(artifact_path, 'rb') as f:
+                for offset in range(0, size, UPLOAD_RANGE_SIZE):
+                    range_upload.upload_range(f.read(UPLOAD_RANGE_SIZE), offset)
+            range_upload.wait()
+        finally:
+            self._end_progress(range_upload)
+
+    def _get_file_service(self):
         FileService = get_sdk(self.cli_ctx, ResourceType.DATA_STORAGE, 'file#FileService')
-        file_service = FileService(self.account_name, sas_token=self.sas_token, endpoint_suffix=self.endpoint_suffix)
-        file_service.create_file_from_path(self.share_name, None, self.relative_name, artifact_path)
+        return FileService(self.account_name, sas_token=self.sas_token, endpoint_suffix=self.endpoint_suffix)
+
+    def _get_range_upload(self, file_service, total=None):
+        max_connections = self.cli_ctx.config.getint('spring', 'upload_max_connections',
+                                                     fallback=DEFAULT_UPLOAD_MAX_CONNECTIONS)
+        self.progress_bar = self.cli_ctx.get_progress_controller(det=total is not None)
+
+        def report_progress(current, total):
+            message = 'Uploading {:.1f} MB'.format(current / 1024 / 1024)
+            if total:
+                message += ' of {:.1f} MB'.format(total / 1024 / 1024)
+            self.progress_bar.add(message=message, value=current, total_val=total)
+
+        return _ParallelRangeUpload(file_service, self.share_name, self.relative_name, max(max_connections, 1),
+                                    progress_callback=report_progress, total=total)
+
+    def _end_progress(self, range_upload):
+        range_upload.wait_for_pending()
+        self.progress_bar.end()
 
 
 class FolderUpload(FileUpload):
     '''
-    Compress and upload a folder in local file system to upload url
+    Compress and upload a folder in local file system to upload url. The compressed archive is uploaded while it's
+    being written, without going through a temporary file.
     '''
     def upload_and_build(self, source_path, **kwargs):
         if not source_path:
             raise InvalidArgumentValueError('--source-path is not set.')
-        artifact_path = self._compress_folder(source_path)
-        self._upload(artifact_path)
+        self._compress_and_upload(source_path)
+
+    def _compress_and_upload(self, folder):
+        folder = os.path.abspath(folder)
+        file_service = self._get_file_service()
+        range_upload = self._get_range_upload(file_service)
+        try:
+            writer = _StreamingRangeWriter(file_service, self.share_name, self.relative_name,
+                                           _get_max_archive_size(folder), range_upload)
+            _pack_source_code(folder, None, fileobj=writer)
+            writer.close()
+        finally:
+            self._end_progress(range_upload)
 
-    def _compress_folder(self, folder):
-        file_path = os.path.join(tempfile.gettempdir(), 'build_archive_{}.tar.gz'.format(uuid.uuid4().hex))
-        _pack_source_code(os.path.abspath(folder), file_path)
-        return file_path
+
+def _get_max_archive_size(folder):
+    '''
+    Upper bound of the size of the .tar.gz archive of the folder: every entry takes a header and long name records of
+    a few 512 bytes blocks, file contents are padded to 512 bytes, and gzip adds a few bytes per 16 KiB block of data
+    it can't compress.
+    '''
+    size = 10 * 1024
+    for root, dirs, files in os.walk(folder):
+        size += 3 * 512 * (len(dirs) + len(files))
+        for name in files:
+            try:
+                size += (os.path.getsize(os.path.join(root, name)) + 511) // 512 * 512
+            except OSError:
+                pass
+    return size + size // 1024 + 1024
 
 
 def uploader_selector(cli_ctx, source_path=None, artifact_path=None, upload_url=None, **_):
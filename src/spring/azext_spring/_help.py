@@ -369,6 +369,12 @@ helps['spring app log'] = """
 helps['spring app logs'] = """
     type: command
     short-summary: Show logs of an app instance, logs will be streamed when setting '-f/--follow'.
+    long-summary: When the deployment has several instances and no instance is specified, or with '--all-apps', the logs of all the instances are shown together, in timestamp order and prefixed with the name of their instance.
+    examples:
+    - name: Stream the logs of all the instances of an app.
+      text: az spring app logs -n MyApp -s MyService -g MyResourceGroup -f
+    - name: Stream the logs of all the apps in the Azure Spring Apps instance.
+      text: az spring app logs --all-apps -s MyService -g MyResourceGroup -f
 """
 
 helps['spring app connect'] = """
@@ -8,7 +8,7 @@ from knack.arguments import CLIArgumentType
 from azure.cli.core.commands.parameters import get_enum_type, get_three_state_flag, tags_type
 from azure.cli.core.commands.parameters import (name_type, get_location_type, resource_group_name_type)
 from ._validators import (validate_env, validate_cosmos_type, validate_resource_id, validate_location,
-                          validate_name, validate_app_name, validate_deployment_name, validate_log_lines,
+                          validate_name, validate_app_name, validate_deployment_name, validate_log_app_name, validate_log_lines,
                           validate_log_limit, validate_log_since, validate_sku, normalize_sku, validate_jvm_options,
                           validate_vnet, validate_vnet_required_parameters, validate_node_resource_group,
                           validate_tracing_parameters_asc_create, validate_tracing_parameters_asc_update,
@@ -406,7 +406,9 @@ def load_arguments(self, _):
 
     def prepare_logs_argument(c):
         '''`app log tail` is deprecated. `app logs` is the new choice. They share the same command processor.'''
-        c.argument('instance', options_list=['--instance', '-i'], help='Name of an existing instance of the deployment.')
+        c.argument('name', name_type, validator=validate_log_app_name, help='The name of app running in the specified Azure Spring Apps instance. Required unless --all-apps is specified.')
+        c.argument('instance', options_list=['--instance', '-i'], help='Name of an existing instance of the deployment. Logs of all the instances are shown if not specified.')
+        c.argument('all_apps', action='store_true', help='Show logs of all the instances of the production deployment of every app in the Azure Spring Apps instance.')
         c.argument('lines', type=int, help='Number of lines to show. Maximum is 10000', validator=validate_log_lines)
         c.argument('follow', options_list=['--follow ', '-f'], help='Specify if the logs should be streamed.', action='store_true')
         c.argument('since', help='Only return logs newer than a relative duration like 5s, 2m, or 1h. Maximum is 1h', validator=validate_log_since)
@@ -73,7 +73,7 @@ def _java_runtime_in_number():
     return [8, 11, 17]
 
 
-def _pack_source_code(source_location, tar_file_path):
+def _pack_source_code(source_location, tar_file_path, fileobj=None):
     logger.info("Packing source code into tar to upload...")
 
     ignore_list, ignore_list_size = _load_gitignore_file(source_location)
@@ -107,7 +107,8 @@ def _pack_source_code(source_location, tar_file_path):
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
+    # with a fileobj, the archive is written as a stream so that it can be consumed while being compressed
+    with tarfile.open(tar_file_path, "w|gz" if fileobj else "w:gz", fileobj=fileobj) as tar:
         # need to set arcname to empty string as the archive root path
         _archive_file_recursively(tar,
                                   source_location,
@@ -12,7 +12,7 @@ import zipfile
 from azure.cli.core import telemetry
 from azure.cli.core.commands.client_factory import get_subscription_id
 from azure.cli.core.commands.validators import validate_tag
-from azure.cli.core.azclierror import ArgumentUsageError, InvalidArgumentValueError
+from azure.cli.core.azclierror import ArgumentUsageError, InvalidArgumentValueError, RequiredArgumentMissingError
 from knack.validators import DefaultStr
 from azure.mgmt.core.tools import is_valid_resource_id
 from azure.mgmt.core.tools import parse_resource_id
@@ -192,6 +192,16 @@ def validate_log_limit(namespace):
     namespace.limit = temp_limit * 1024
 
 
+def validate_log_app_name(namespace):
+    if namespace.all_apps:
+        if namespace.name or namespace.instance or namespace.deployment:
+            raise ArgumentUsageError('--all-apps cannot be used with --name, --deployment or --instance')
+        return
+    if not namespace.name:
+        raise RequiredArgumentMissingError('Please specify the app with -n/--name, or use --all-apps')
+    validate_name(namespace)
+
+
 def validate_log_lines(namespace):
     temp_lines = None
     try:
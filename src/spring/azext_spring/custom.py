@@ -4,7 +4,9 @@
 # --------------------------------------------------------------------------------------------
 
 # pylint: disable=unused-argument, logging-format-interpolation, protected-access, wrong-import-order, too-many-lines
+import heapq
 import logging
+import queue
 import requests
 import re
 import os
@@ -30,7 +32,7 @@ from azure.mgmt.applicationinsights import ApplicationInsightsManagementClient
 from azure.cli.core.commands import cached_put
 from ._resource_quantity import validate_cpu, validate_memory
 from six.moves.urllib import parse
-from threading import Thread
+from threading import BoundedSemaphore, Thread
 import sys
 import json
 import base64
@@ -42,6 +44,10 @@ logger = get_logger(__name__)
 DEFAULT_DEPLOYMENT_NAME = "default"
 DEPLOYMENT_CREATE_OR_UPDATE_SLEEP_INTERVAL = 5
 APP_CREATE_OR_UPDATE_SLEEP_INTERVAL = 2
+# when streaming the logs of several instances, lines are held this many seconds to be printed in timestamp order,
+# and each instance can have at most this many lines waiting to be printed
+LOG_STREAM_MERGE_WINDOW = 0.5
+LOG_STREAM_MAX_BUFFERED_LINES = 1000
 
 # pylint: disable=line-too-long
 NO_PRODUCTION_DEPLOYMENT_ERROR = "No production deployment found, use --deployment to specify deployment or create deployment with: az spring app deployment create"
@@ -488,37 +494,70 @@ def app_get_build_log(cmd, client, resource_group, service, name, deployment=Non
     return stream_logs(client.deployments, resource_group, service, name, deployment.name)
 
 
-def app_tail_log(cmd, client, resource_group, service, name,
-                 deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048, format_json=None):
-    app_tail_log_internal(cmd, client, resource_group, service, name, deployment, instance, follow, lines, since, limit,
-                          format_json, get_app_log=_get_app_log)
+def app_tail_log(cmd, client, resource_group, service, name=None,
+                 deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048, format_json=None,
+                 all_apps=False):
+    if all_apps:
+        return app_tail_log_all_apps(cmd, client, resource_group, service, follow, lines, since, limit, format_json)
+    return app_tail_log_internal(cmd, client, resource_group, service, name, deployment, instance, follow, lines,
+                                 since, limit, format_json, get_app_log=_get_app_log)
+
+
+def app_tail_log_all_apps(cmd, client, resource_group, service, follow=False, lines=50, since=None, limit=2048,
+                          format_json=None):
+    build_url, auth, format_json = _get_log_stream_endpoint(cmd, client, resource_group, service,
+                                                            follow, lines, since, limit, format_json)
+    streams = []
+    for app in client.apps.list(resource_group, service):
+        deployment = next(iter(x for x in client.deployments.list(resource_group, service, app.name)
+                               if x.properties.active), None)
+        if not deployment or not deployment.properties.instances:
+            logger.warning("No running instances found for app '{}', skipping it.".format(app.name))
+            continue
+        for instance in deployment.properties.instances:
+            streams.append(("{}/{}".format(app.name, instance.name), build_url(app.name, deployment.name, instance.name)))
+    if not streams:
+        raise CLIError("No running app instances found in '{}'".format(service))
+    _wait_for_app_log(_get_multiplexed_app_log, (streams, auth, format_json))
 
 
 def app_tail_log_internal(cmd, client, resource_group, service, name,
                           deployment=None, instance=None, follow=False, lines=50, since=None, limit=2048,
                           format_json=None, timeout=None, get_app_log=None):
-    if not instance:
+    if instance:
+        instances = [instance]
+    else:
         if not deployment.properties.instances:
             raise CLIError("No instances found for deployment '{0}' in app '{1}'".format(
                 deployment.name, name))
-        instances = deployment.properties.instances
-        if len(instances) > 1:
-            logger.warning("Multiple app instances found:")
-            for temp_instance in instances:
-                logger.warning("{}".format(temp_instance.name))
-            logger.warning("Please use '-i/--instance' parameter to specify the instance name")
-            return None
-        instance = instances[0].name
+        instances = [x.name for x in deployment.properties.instances]
+
+    build_url, auth, format_json = _get_log_stream_endpoint(cmd, client, resource_group, service,
+                                                            follow, lines, since, limit, format_json)
+    if len(instances) == 1:
+        _wait_for_app_log(get_app_log, (build_url(name, deployment.name, instances[0]), auth, format_json),
+                          timeout=timeout)
+    else:
+        # one stream per instance, merged into a single output
+        streams = [(x, build_url(name, deployment.name, x)) for x in instances]
+        _wait_for_app_log(_get_multiplexed_app_log, (streams, auth, format_json), timeout=timeout)
 
+
+def _get_log_stream_endpoint(cmd, client, resource_group, service, follow, lines, since, limit, format_json):
+    '''
+    Returns a function building the log stream url of an app instance, the auth of the log streams, and the
+    format_json supported by them.
+    '''
     resource = client.services.get(resource_group, service)
-    if resource.sku.tier.upper() == 'STANDARDGEN2':
+    is_standard_gen2 = resource.sku.tier.upper() == 'STANDARDGEN2'
+    if is_standard_gen2:
         profile = Profile(cli_ctx=cmd.cli_ctx)
         creds, _, tenant = profile.get_raw_token()
         token = creds[1]
         subscriptionId = get_subscription_id(cmd.cli_ctx)
         hostname = get_proxy_api_endpoint(cmd.cli_ctx, resource)
-        streaming_url = "https://{}/proxy/logstream/subscriptions/{}/resourceGroups/{}/providers/Microsoft.AppPlatform/Spring/{}/apps/{}/deployments/{}/instances/{}".format(
-            hostname, subscriptionId, resource_group, service, name, deployment.name, instance)
+        streaming_url = "https://{}/proxy/logstream/subscriptions/{}/resourceGroups/{}/providers/Microsoft.AppPlatform/Spring/{}/apps/{{}}/deployments/{{}}/instances/{{}}".format(
+            hostname, subscriptionId, resource_group, service)
         params = {}
         params["tailLines"] = lines
         params["tenantId"] = tenant
@@ -530,8 +569,7 @@ def app_tail_log_internal(cmd, client, resource_group, service, name,
         log_stream = LogStream(client, resource_group, service)
         if not log_stream:
             raise CLIError("To use the log streaming feature, please enable the test endpoint by running 'az spring test-endpoint enable -n {0} -g {1}'".format(service, resource_group))
-        streaming_url = "https://{0}/api/logstream/apps/{1}/instances/{2}".format(
-            log_stream.base_url, name, instance)
+        streaming_url = "https://{0}/api/logstream/apps/{{}}/instances/{{}}".format(log_stream.base_url)
         params = {}
         params["tailLines"] = lines
         params["limitBytes"] = limit
@@ -541,10 +579,19 @@ def app_tail_log_internal(cmd, client, resource_group, service, name,
             params["follow"] = True
         auth = HTTPBasicAuth("primary", log_stream.primary_key)
 
+    query = "?{}".format(parse.urlencode(params)) if params else ""
+
+    def build_url(app, deployment, instance):
+        if is_standard_gen2:
+            return streaming_url.format(app, deployment, instance) + query
+        return streaming_url.format(app, instance) + query
+
+    return build_url, auth, format_json
+
+
+def _wait_for_app_log(get_app_log, args, timeout=None):
     exceptions = []
-    streaming_url += "?{}".format(parse.urlencode(params)) if params else ""
-    t = Thread(target=get_app_log, args=(
-        streaming_url, auth, format_json, exceptions))
+    t = Thread(target=get_app_log, args=args + (exceptions,))
     t.daemon = True
     t.start()
 
@@ -552,7 +599,7 @@ def app_tail_log_internal(cmd, client, resource_group, service, name,
         t.join(timeout=timeout)
     else:
         while t.is_alive():
-            sleep(5)  # so that ctrl+c can stop the command
+            t.join(timeout=1)  # so that ctrl+c can stop the command
 
     if exceptions:
         raise exceptions[0]
@@ -1146,128 +1193,138 @@ def _get_redis_primary_key(cli_ctx, resource_id):
     return keys.primary_key
 
 
-# pylint: disable=bare-except, too-many-statements
-def _get_app_log(url, auth, format_json, exceptions, chunk_size=None, stderr=False):
-    logger_seg_regex = re.compile(r'([^\.])[^\.]+\.')
-
-    def build_log_shortener(length):
-        if length <= 0:
-            raise InvalidArgumentValueError('Logger length in `logger{length}` should be positive')
-
-        def shortener(record):
-            '''
-            Try shorten the logger property to the specified length before feeding it to the formatter.
-            '''
-            logger_name = record.get('logger', None)
-            if logger_name is None:
-                return record
-
-            # first, try to shorten the package name to one letter, e.g.,
-            #     org.springframework.cloud.netflix.eureka.config.DiscoveryClientOptionalArgsConfiguration
-            # to: o.s.c.n.e.c.DiscoveryClientOptionalArgsConfiguration
-            while len(logger_name) > length:
-                logger_name, count = logger_seg_regex.subn(r'\1.', logger_name, 1)
-                if count < 1:
-                    break
-
-            # then, cut off the leading packages if necessary
-            logger_name = logger_name[-length:]
-            record['logger'] = logger_name
-            return record
+_LOGGER_SEG_REGEX = re.compile(r'([^\.])[^\.]+\.')
+
 
-        return shortener
+def _build_log_shortener(length):
+    if length <= 0:
+        raise InvalidArgumentValueError('Logger length in `logger{length}` should be positive')
 
-    def build_formatter():
+    def shortener(record):
         '''
-        Build the log line formatter based on the format_json argument.
+        Try shorten the logger property to the specified length before feeding it to the formatter.
         '''
-        nonlocal format_json
+        logger_name = record.get('logger', None)
+        if logger_name is None:
+            return record
 
-        def identity(o):
-            return o
+        # first, try to shorten the package name to one letter, e.g.,
+        #     org.springframework.cloud.netflix.eureka.config.DiscoveryClientOptionalArgsConfiguration
+        # to: o.s.c.n.e.c.DiscoveryClientOptionalArgsConfiguration
+        while len(logger_name) > length:
+            logger_name, count = _LOGGER_SEG_REGEX.subn(r'\1.', logger_name, 1)
+            if count < 1:
+                break
 
-        if format_json is None or len(format_json) == 0:
-            return identity
+        # then, cut off the leading packages if necessary
+        logger_name = logger_name[-length:]
+        record['logger'] = logger_name
+        return record
 
-        logger_regex = re.compile(r'\blogger\{(\d+)\}')
-        match = logger_regex.search(format_json)
-        pre_processor = identity
-        if match:
-            length = int(match[1])
-            pre_processor = build_log_shortener(length)
-            format_json = logger_regex.sub('logger', format_json, 1)
+    return shortener
 
-        first_exception = True
 
-        def format_line(line):
-            nonlocal first_exception
-            try:
-                log_record = json.loads(line)
-                # Add n=\n so that in Windows CMD it's easy to specify customized format with line ending
-                # e.g., "{timestamp} {message}{n}"
-                # (Windows CMD does not escape \n in string literal.)
-                return format_json.format_map(pre_processor(defaultdict(str, n="\n", **log_record)))
-            except:
-                if first_exception:
-                    # enable this format error logging only with --verbose
-                    logger.info("Failed to format log line '{}'".format(line), exc_info=sys.exc_info())
-                    first_exception = False
-                return line
-
-        return format_line
-
-    def iter_lines(response, limit=2 ** 20, chunk_size=None):
-        '''
-        Returns a line iterator from the response content. If no line ending was found and the buffered content size is
-        larger than the limit, the buffer will be yielded directly.
-        '''
-        buffer = []
-        total = 0
-        for content in response.iter_content(chunk_size=chunk_size):
-            if not content:
-                if len(buffer) > 0:
-                    yield b''.join(buffer)
-                break
+# pylint: disable=bare-except
+def _build_log_formatter(format_json):
+    '''
+    Build the log line formatter based on the format_json argument.
+    '''
+    def identity(o):
+        return o
 
-            start = 0
-            while start < len(content):
-                line_end = content.find(b'\n', start)
-                should_print = False
-                if line_end < 0:
-                    next = (content if start == 0 else content[start:])
-                    buffer.append(next)
-                    total += len(next)
-                    start = len(content)
-                    should_print = total >= limit
-                else:
-                    buffer.append(content[start:line_end + 1])
-                    start = line_end + 1
-                    should_print = True
+    if format_json is None or len(format_json) == 0:
+        return identity
+
+    logger_regex = re.compile(r'\blogger\{(\d+)\}')
+    match = logger_regex.search(format_json)
+    pre_processor = identity
+    if match:
+        length = int(match[1])
+        pre_processor = _build_log_shortener(length)
+        format_json = logger_regex.sub('logger', format_json, 1)
+
+    first_exception = True
+
+    def format_line(line):
+        nonlocal first_exception
+        try:
+            log_record = json.loads(line)
+            # Add n=\n so that in Windows CMD it's easy to specify customized format with line ending
+            # e.g., "{timestamp} {message}{n}"
+            # (Windows CMD does not escape \n in string literal.)
+            return format_json.format_map(pre_processor(defaultdict(str, n="\n", **log_record)))
+        except:
+            if first_exception:
+                # enable this format error logging only with --verbose
+                logger.info("Failed to format log line '{}'".format(line), exc_info=sys.exc_info())
+                first_exception = False
+            return line
+
+    return format_line
+
+
+def _iter_lines(response, limit=2 ** 20, chunk_size=None):
+    '''
+    Returns a line iterator from the response content. If no line ending was found and the buffered content size is
+    larger than the limit, the buffer will be yielded directly.
+    '''
+    buffer = []
+    total = 0
+    for content in response.iter_content(chunk_size=chunk_size):
+        if not content:
+            if len(buffer) > 0:
+                yield b''.join(buffer)
+            break
+
+        start = 0
+        while start < len(content):
+            line_end = content.find(b'\n', start)
+            should_print = False
+            if line_end < 0:
+                next = (content if start == 0 else content[start:])
+                buffer.append(next)
+                total += len(next)
+                start = len(content)
+                should_print = total >= limit
+            else:
+                buffer.append(content[start:line_end + 1])
+                start = line_end + 1
+                should_print = True
+
+            if should_print:
+                yield b''.join(buffer)
+                buffer.clear()
+                total = 0
+
+
+def _raise_for_log_stream_status(response):
+    if response.status_code != 200:
+        failure_reason = response.reason
+        if response.content:
+            if isinstance(response.content, bytes):
+                failure_reason = "{}:{}".format(failure_reason, response.content.decode('utf-8'))
+            else:
+                failure_reason = "{}:{}".format(failure_reason, response.content)
+        raise CLIError("Failed to connect to the server with status code '{}' and reason '{}'".format(
+            response.status_code, failure_reason))
+
+
+def _decode_log_line(line):
+    std_encoding = sys.stdout.encoding
+    return (line.decode(encoding='utf-8', errors='replace')
+            .encode(std_encoding, errors='replace')
+            .decode(std_encoding, errors='replace'))
 
-                if should_print:
-                    yield b''.join(buffer)
-                    buffer.clear()
-                    total = 0
 
+def _get_app_log(url, auth, format_json, exceptions, chunk_size=None, stderr=False):
     with requests.get(url, stream=True, auth=auth) as response:
         try:
-            if response.status_code != 200:
-                failure_reason = response.reason
-                if response.content:
-                    if isinstance(response.content, bytes):
-                        failure_reason = "{}:{}".format(failure_reason, response.content.decode('utf-8'))
-                    else:
-                        failure_reason = "{}:{}".format(failure_reason, response.content)
-                raise CLIError("Failed to connect to the server with status code '{}' and reason '{}'".format(
-                    response.status_code, failure_reason))
-            std_encoding = sys.stdout.encoding
-
-            formatter = build_formatter()
-
-            for line in iter_lines(response, chunk_size=chunk_size):
-                decoded = (line.decode(encoding='utf-8', errors='replace')
-                           .encode(std_encoding, errors='replace')
-                           .decode(std_encoding, errors='replace'))
+            _raise_for_log_stream_status(response)
+
+            formatter = _build_log_formatter(format_json)
+
+            for line in _iter_lines(response, chunk_size=chunk_size):
+                decoded = _decode_log_line(line)
                 if stderr:
                     print(formatter(decoded), end='', file=sys.stderr)
                 else:
@@ -1276,6 +1333,91 @@ def _get_app_log(url, auth, format_json, exceptions, chunk_size=None, stderr=Fal
             exceptions.append(e)
 
 
+_LOG_TIMESTAMP_REGEX = re.compile(r'^\W*(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)')
+
+
+def _get_log_line_timestamp(line):
+    '''
+    Returns the timestamp of a log line, from the `timestamp` field of structured logs or from the start of the line,
+    normalized so that timestamps of the same format compare in time order. Returns None if there is none.
+    '''
+    if line.startswith('{'):
+        try:
+            timestamp = json.loads(line).get('timestamp')
+            if isinstance(timestamp, str):
+                return timestamp.replace(' ', 'T').replace(',', '.')
+        except (ValueError, AttributeError):
+            pass
+    match = _LOG_TIMESTAMP_REGEX.match(line)
+    if match:
+        return match[1].replace(' ', 'T').replace(',', '.')
+    return None
+
+
+def _read_log_stream(session, index, url, auth, lines, slots, exceptions, chunk_size=None):
+    try:
+        with session.get(url, stream=True, auth=auth) as response:
+            _raise_for_log_stream_status(response)
+            for line in _iter_lines(response, chunk_size=chunk_size):
+                # blocks once this stream has LOG_STREAM_MAX_BUFFERED_LINES lines waiting to be printed,
+                # so that a noisy instance doesn't grow the buffers of the others
+                slots[index].acquire()
+                lines.put((index, line))
+    except (CLIError, requests.RequestException) as e:
+        exceptions.append(e)
+    finally:
+        lines.put((index, None))
+
+
+# pylint: disable=too-many-locals
+def _get_multiplexed_app_log(streams, auth, format_json, exceptions, chunk_size=None):
+    '''
+    Prints the logs of several log streams, given as (name, url) pairs, with the name of the stream as the prefix of
+    every line. Lines are held for up to LOG_STREAM_MERGE_WINDOW seconds and printed in timestamp order across the
+    streams. Lines without timestamp, like the lines of a stack trace, keep the timestamp of the previous line of
+    their stream so that they aren't separated from it.
+    '''
+    formatter = _build_log_formatter(format_json)
+    prefixes = ['[{}] '.format(name) for name, _ in streams]
+    slots = [BoundedSemaphore(LOG_STREAM_MAX_BUFFERED_LINES) for _ in streams]
+    last_timestamps = [''] * len(streams)
+    lines = queue.Queue()
+    pending = []
+    sequence = 0
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=len(streams))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        readers = [Thread(target=_read_log_stream,
+                          args=(session, index, url, auth, lines, slots, exceptions, chunk_size), daemon=True)
+                   for index, (_, url) in enumerate(streams)]
+        for reader in readers:
+            reader.start()
+
+        open_streams = len(streams)
+        while open_streams or pending:
+            try:
+                index, line = lines.get(timeout=LOG_STREAM_MERGE_WINDOW if open_streams else 0)
+            except queue.Empty:
+                index, line = None, None
+            if index is not None:
+                if line is None:
+                    open_streams -= 1
+                else:
+                    decoded = _decode_log_line(line)
+                    last_timestamps[index] = _get_log_line_timestamp(decoded) or last_timestamps[index]
+                    heapq.heappush(pending, (last_timestamps[index], index, sequence, time.monotonic(), decoded))
+                    sequence += 1
+
+            # print the lines that have waited long enough for the lines of other streams to be sorted before them
+            now = time.monotonic()
+            while pending and (not open_streams or now - pending[0][3] >= LOG_STREAM_MERGE_WINDOW):
+                _, index, _, _, decoded = heapq.heappop(pending)
+                print(prefixes[index] + formatter(decoded), end='')
+                slots[index].release()
+
+
 def storage_callback(pipeline_response, deserialized, headers):
     return models.StorageResource.deserialize(json.loads(pipeline_response.http_response.text()))
 
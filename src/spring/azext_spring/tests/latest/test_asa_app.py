@@ -14,7 +14,8 @@ from ...custom import (app_set_deployment, app_unset_deployment,
                        deployment_enable_remote_debugging,
                        deployment_disable_remote_debugging,
                        deployment_get_remote_debugging,
-                       domain_update, domain_unbind)
+                       domain_update, domain_unbind,
+                       app_tail_log_internal, _get_multiplexed_app_log)
 try:
     import unittest.mock as mock
 except ImportError:
@@ -978,3 +979,67 @@ class CustomDomainTests(BasicTest):
         self.assertIsNone(resource.properties.cert_name)
         app_args = client.apps.begin_update.call_args_list
         self.assertEqual(1, len(app_args))
+
+
+class _LogResponse:
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        # split the content in the middle of the lines, like the chunks of a real stream
+        for i in range(0, len(self.content), 7):
+            yield self.content[i:i + 7]
+
+
+class LogsTest(BasicTest):
+    @mock.patch('azext_spring.custom.LOG_STREAM_MERGE_WINDOW', 0.05)
+    @mock.patch('azext_spring.custom.requests.Session')
+    def test_multiplexed_logs_are_merged_in_timestamp_order(self, session_mock):
+        contents = {
+            'https://host/instance-1': (b'2023-10-01 10:00:01.000 first\n'
+                                        b'2023-10-01 10:00:03.000 error\n'
+                                        b'\tat com.example.Main\n'),
+            'https://host/instance-2': (b'2023-10-01 10:00:02.000 second\n'
+                                        b'2023-10-01 10:00:04.000 last\n'),
+        }
+        session_mock.return_value.__enter__.return_value.get.side_effect = \
+            lambda url, **_: _LogResponse(contents[url])
+        exceptions = []
+        with mock.patch('builtins.print') as print_mock:
+            _get_multiplexed_app_log([('instance-1', 'https://host/instance-1'),
+                                      ('instance-2', 'https://host/instance-2')], None, None, exceptions)
+
+        self.assertEqual([], exceptions)
+        self.assertEqual(['[instance-1] 2023-10-01 10:00:01.000 first\n',
+                          '[instance-2] 2023-10-01 10:00:02.000 second\n',
+                          '[instance-1] 2023-10-01 10:00:03.000 error\n',
+                          '[instance-1] \tat com.example.Main\n',
+                          '[instance-2] 2023-10-01 10:00:04.000 last\n'],
+                         [x[0][0] for x in print_mock.call_args_list])
+
+    @mock.patch('azext_spring.custom._get_multiplexed_app_log')
+    @mock.patch('azext_spring.custom.LogStream')
+    def test_logs_of_all_instances_are_streamed(self, log_stream_mock, multiplexed_mock):
+        log_stream_mock.return_value.base_url = 'host'
+        log_stream_mock.return_value.primary_key = 'key'
+        deployment = self._get_deployment()
+        instance_1, instance_2 = mock.MagicMock(), mock.MagicMock()
+        instance_1.name, instance_2.name = 'instance-1', 'instance-2'
+        deployment.properties.instances = [instance_1, instance_2]
+        get_app_log = mock.MagicMock()
+
+        app_tail_log_internal(_get_test_cmd(), self._get_basic_mock_client(), 'rg', 'asc', 'app', deployment,
+                              lines=10, get_app_log=get_app_log)
+
+        get_app_log.assert_not_called()
+        streams = multiplexed_mock.call_args[0][0]
+        self.assertEqual(['instance-1', 'instance-2'], [x[0] for x in streams])
+        self.assertEqual('https://host/api/logstream/apps/app/instances/instance-2?tailLines=10&limitBytes=2048',
+                         streams[1][1])
@@ -0,0 +1,94 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import unittest
+from ..._deployment_uploadable_factory import FileUpload, FolderUpload
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+UPLOAD_URL = 'https://account.file.core.windows.net/share/resources/app.jar?sv=2021&sig=abc'
+
+
+class FakeFileService:
+    def __init__(self, failures=0):
+        self.content = bytearray()
+        self.size = None
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def create_file(self, share_name, directory_name, file_name, content_length):
+        self.size = content_length
+
+    def resize_file(self, share_name, directory_name, file_name, content_length):
+        self.size = content_length
+
+    def update_range(self, share_name, directory_name, file_name, data, start_range, end_range):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError('connection reset')
+            assert end_range < self.size
+            if len(self.content) <= end_range:
+                self.content.extend(b'\0' * (end_range + 1 - len(self.content)))
+            self.content[start_range:end_range + 1] = data
+
+
+class UploadTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cli_ctx = mock.MagicMock()
+        self.cli_ctx.config.getint.return_value = 4
+
+    def _upload(self, uploader_type, file_service, **kwargs):
+        uploader = uploader_type(UPLOAD_URL, self.cli_ctx)
+        with mock.patch('azext_spring._deployment_uploadable_factory.UPLOAD_RANGE_SIZE', 1024), \
+                mock.patch('azext_spring._deployment_uploadable_factory.sleep'), \
+                mock.patch.object(uploader, '_get_file_service', return_value=file_service):
+            uploader.upload_and_build(**kwargs)
+        return uploader
+
+    def test_upload_file_in_parallel_ranges(self):
+        artifact_path = os.path.join(self.temp_dir.name, 'app.jar')
+        content = os.urandom(10 * 1024 + 100)
+        with open(artifact_path, 'wb') as f:
+            f.write(content)
+        # failed ranges are retried on their own
+        file_service = FakeFileService(failures=2)
+
+        uploader = self._upload(FileUpload, file_service, artifact_path=artifact_path)
+
+        self.assertEqual(len(content), file_service.size)
+        self.assertEqual(content, bytes(file_service.content))
+        last_progress = uploader.progress_bar.add.call_args[1]
+        self.assertEqual((len(content), len(content)), (last_progress['value'], last_progress['total_val']))
+
+    def test_upload_folder_while_compressing(self):
+        source_path = os.path.join(self.temp_dir.name, 'src')
+        os.makedirs(os.path.join(source_path, 'main'))
+        files = {'pom.xml': b'<project/>', os.path.join('main', 'App.java'): os.urandom(5000)}
+        for name, content in files.items():
+            with open(os.path.join(source_path, name), 'wb') as f:
+                f.write(content)
+        file_service = FakeFileService()
+
+        self._upload(FolderUpload, file_service, source_path=source_path)
+
+        # the file is truncated to the size of the archive once it's complete
+        self.assertEqual(len(file_service.content), file_service.size)
+        with tarfile.open(fileobj=io.BytesIO(bytes(file_service.content)), mode='r:gz') as tar:
+            for name, content in files.items():
+                self.assertEqual(content, tar.extractfile(name.replace(os.sep, '/')).read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,7 +14,7 @@ helps['ssh'] = """
 helps['ssh vm'] = """
     type: command
     short-summary: SSH into Azure VMs or Arc Servers.
-    long-summary: Users can login using AAD issued certificates or using local user credentials. We recommend login using AAD issued certificates. To SSH using local user credentials, you must provide the local user name using the --local-user parameter.
+    long-summary: Users can login using AAD issued certificates or using local user credentials. We recommend login using AAD issued certificates. To SSH using local user credentials, you must provide the local user name using the --local-user parameter. When you provide your own key pair, AAD issued certificates are cached and reused until shortly before they expire. Run 'az config set ssh.credential_cache=false' to turn this off. Arc relay credentials are only cached after 'az config set ssh.relay_credential_cache=true'.
     examples:
         - name: Give a resource group name and machine name to SSH using AAD issued certificates
           text: |
@@ -61,7 +61,7 @@ helps['ssh vm'] = """
 helps['ssh config'] = """
     type: command
     short-summary: Create an SSH config for resources (Azure VMs, Arc Servers, etc) which can then be used by clients that support OpenSSH configs and certificates
-    long-summary: Other software (git/rsync/etc) that support setting an SSH command can be set to use the config file by setting the command to 'ssh -F /path/to/config' e.g. rsync -e 'ssh -F /path/to/config'.  Users can create ssh config files that use AAD issued certificates or local user credentials.
+    long-summary: Other software (git/rsync/etc) that support setting an SSH command can be set to use the config file by setting the command to 'ssh -F /path/to/config' e.g. rsync -e 'ssh -F /path/to/config'.  Users can create ssh config files that use AAD issued certificates or local user credentials. Give only a --resource-group, a --tag filter or a --graph-query to add all the matching Azure VMs to the config at once.
     examples:
         - name: Give the resource group and machine name for which to create a config using AAD issued certificates, save in a local file, and then ssh into that resource
           text: |
@@ -103,6 +103,16 @@ helps['ssh config'] = """
         - name: Give the Resource Type of the target. Useful when there is an Azure VM and an Arc Server with the same name in the same resource group. Resource type can be either "Microsoft.HybridCompute" for Arc Servers or "Microsoft.Compute" for Azure Virtual Machines.
           text: |
             az ssh config --resource-type [Microsoft.Compute/virtualMachines|Microsoft.HybridCompute/machines] --resource-group myResourceGroup --name myVM --file ./myconfig
+
+        - name: Create a config for all the Azure VMs in a resource group, sharing a single AAD issued certificate, and then ssh into one of them
+          text: |
+            az ssh config --resource-group myResourceGroup --file ./sshconfig
+            ssh -F ./sshconfig myResourceGroup-myVM
+
+        - name: Create a config for all the Azure VMs tagged with env=prod, or returned by a Resource Graph query
+          text: |
+            az ssh config --tag env=prod --file ./sshconfig --overwrite
+            az ssh config --graph-query "Resources | where type =~ 'Microsoft.Compute/virtualMachines' and location == 'westus2' | project id" --file ./sshconfig
 """
 
 helps['ssh cert'] = """
@@ -72,6 +72,12 @@ def load_arguments(self, _):
                    'Default to ssh pre-installed if not provided.')
         c.argument('yes_without_prompt', options_list=['--yes-without-prompt', '--yes', '-y'],
                    help='Update service configuration without prompting user')
+        c.argument('tags', options_list=['--tag'], nargs='+',
+                   help='Create the config for all the Azure VMs with these tags, in the resource group if given. '
+                   'Space-separated tags: key[=value].')
+        c.argument('graph_query', options_list=['--graph-query'],
+                   help='Create the config for all the Azure VMs returned by this Resource Graph query. '
+                   'The query must return an id column.')
 
     with self.argument_context('ssh cert') as c:
         c.argument('cert_path', options_list=['--file', '-f'],
@@ -0,0 +1,165 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Resolves the targets of 'az ssh config' for many Azure VMs at once. VMs, network interfaces and public IPs
+# are listed once per resource group instead of being read one at a time for each VM.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.cli.core import azclierror
+from azure.cli.core.util import send_raw_request
+from azure.cli.core.commands.client_factory import get_subscription_id
+from knack import log
+from msrestazure import tools
+
+logger = log.get_logger(__name__)
+
+NETWORK_API_VERSION = "2022-01-01"
+RESOURCE_GRAPH_API_VERSION = "2021-03-01"
+MAX_PARALLEL_LIST_CALLS = 8
+
+
+class TargetVM():
+    # pylint: disable=too-few-public-methods
+    def __init__(self, resource_group_name, vm_name, os_type, ip):
+        self.resource_group_name = resource_group_name
+        self.vm_name = vm_name
+        self.os_type = os_type
+        self.ip = ip
+
+
+def get_target_vms(cmd, resource_group_name, tags, graph_query, use_private_ip):
+    """Returns the Azure VMs selected by resource group, tag and/or Resource Graph query, with their OS type
+    and the IP address 'az ssh config' would use for each of them (None when the VM has no usable IP)."""
+    vms = _list_vms(cmd, resource_group_name, graph_query)
+    if tags:
+        vms = [vm for vm in vms if _matches_tags(vm.tags, tags)]
+    if not vms:
+        return []
+
+    nics = _list_by_resource_group(cmd, [nic.id for vm in vms for nic in _get_nic_refs(vm)],
+                                   "Microsoft.Network/networkInterfaces")
+    public_ip_ids = [ip_config["properties"]["publicIPAddress"]["id"] for nic in nics.values()
+                     for ip_config in nic["properties"].get("ipConfigurations", [])
+                     if ip_config["properties"].get("publicIPAddress", {}).get("id")]
+    public_ips = _list_by_resource_group(cmd, public_ip_ids, "Microsoft.Network/publicIPAddresses")
+
+    targets = []
+    private_ip_fallbacks = []
+    for vm in vms:
+        ip, is_private_fallback = _get_vm_ip(vm, nics, public_ips, use_private_ip)
+        if is_private_fallback:
+            private_ip_fallbacks.append(vm.name)
+        os_type = vm.storage_profile.os_disk.os_type if vm.storage_profile and vm.storage_profile.os_disk else None
+        targets.append(TargetVM(tools.parse_resource_id(vm.id)["resource_group"], vm.name,
+                                getattr(os_type, "value", os_type), ip))
+    if private_ip_fallbacks:
+        logger.warning("No public IP detected for %s, using private IPs (you must bring your own connectivity). "
+                       "Use --prefer-private-ip to avoid this message.", ", ".join(private_ip_fallbacks))
+    return targets
+
+
+def _list_vms(cmd, resource_group_name, graph_query):
+    from azure.cli.core.commands import client_factory
+    from azure.cli.core import profiles
+    compute_client = client_factory.get_mgmt_service_client(cmd.cli_ctx, profiles.ResourceType.MGMT_COMPUTE)
+    if not graph_query:
+        if resource_group_name:
+            return list(compute_client.virtual_machines.list(resource_group_name))
+        return list(compute_client.virtual_machines.list_all())
+
+    vm_ids = {vm_id.lower() for vm_id in _query_resource_graph(cmd, graph_query)}
+    resource_groups = {tools.parse_resource_id(vm_id)["resource_group"].lower() for vm_id in vm_ids}
+    if resource_group_name:
+        resource_groups &= {resource_group_name.lower()}
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_LIST_CALLS) as executor:
+        vm_lists = executor.map(lambda rg: list(compute_client.virtual_machines.list(rg)), sorted(resource_groups))
+    return [vm for vms in vm_lists for vm in vms if vm.id.lower() in vm_ids]
+
+
+def _query_resource_graph(cmd, graph_query):
+    """Returns the ids of the VMs returned by graph_query in the current subscription."""
+    vm_ids = []
+    skip_token = None
+    while True:
+        options = {"resultFormat": "objectArray"}
+        if skip_token:
+            options["$skipToken"] = skip_token
+        body = {"subscriptions": [get_subscription_id(cmd.cli_ctx)], "query": graph_query, "options": options}
+        response = send_raw_request(cmd.cli_ctx, "POST", "/providers/Microsoft.ResourceGraph/resources",
+                                    uri_parameters=[f"api-version={RESOURCE_GRAPH_API_VERSION}"],
+                                    body=json.dumps(body)).json()
+        for row in response.get("data", []):
+            if "id" not in row:
+                raise azclierror.InvalidArgumentValueError("The Resource Graph query must return an id column.")
+            parsed_id = tools.parse_resource_id(row["id"])
+            if parsed_id.get("namespace", "").lower() == "microsoft.compute" and \
+               parsed_id.get("type", "").lower() == "virtualmachines":
+                vm_ids.append(row["id"])
+        skip_token = response.get("$skipToken")
+        if not skip_token:
+            return vm_ids
+
+
+def _list_by_resource_group(cmd, resource_ids, resource_type):
+    """Lists the resources of resource_type in every resource group referenced by resource_ids, and returns
+    the listed resources among resource_ids by lower case id."""
+    wanted_ids = {resource_id.lower() for resource_id in resource_ids}
+    scopes = {resource_id.lower().split("/providers/", 1)[0] for resource_id in wanted_ids}
+
+    def list_scope(scope):
+        resources = []
+        url = f"{scope}/providers/{resource_type}?api-version={NETWORK_API_VERSION}"
+        while url:
+            response = send_raw_request(cmd.cli_ctx, "GET", url).json()
+            resources.extend(response.get("value", []))
+            url = response.get("nextLink")
+        return resources
+
+    if not scopes:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_LIST_CALLS, len(scopes))) as executor:
+        listed = executor.map(list_scope, sorted(scopes))
+    return {resource["id"].lower(): resource for resources in listed for resource in resources
+            if resource["id"].lower() in wanted_ids}
+
+
+def _get_vm_ip(vm, nics, public_ips, use_private_ip):
+    # Same preference as ip_utils.get_ssh_ip: the first public IP, or the first private IP otherwise.
+    private_ips = []
+    for nic_ref in _get_nic_refs(vm):
+        nic = nics.get(nic_ref.id.lower())
+        if not nic:
+            continue
+        for ip_config in nic["properties"].get("ipConfigurations", []):
+            private_ip = ip_config["properties"].get("privateIPAddress")
+            if use_private_ip and private_ip:
+                return private_ip, False
+            public_ip_id = ip_config["properties"].get("publicIPAddress", {}).get("id")
+            public_ip = public_ips.get(public_ip_id.lower()) if public_ip_id else None
+            if public_ip and public_ip["properties"].get("ipAddress"):
+                return public_ip["properties"]["ipAddress"], False
+            if private_ip:
+                private_ips.append(private_ip)
+    if private_ips:
+        return private_ips[0], True
+    return None, False
+
+
+def _get_nic_refs(vm):
+    if not vm.network_profile or not vm.network_profile.network_interfaces:
+        return []
+    return vm.network_profile.network_interfaces
+
+
+def _matches_tags(vm_tags, tags):
+    vm_tags = {key.lower(): value for key, value in (vm_tags or {}).items()}
+    for tag in tags:
+        key, _, value = tag.partition("=")
+        if key.lower() not in vm_tags or ("=" in tag and vm_tags[key.lower()] != value):
+            return False
+    return True
+
@@ -6,7 +6,6 @@
 import time
 import stat
 import os
-import urllib.request
 import json
 import base64
 from glob import glob
@@ -23,6 +22,8 @@ from knack import log
 from knack.prompting import prompt_y_n
 
 from . import file_utils
+from . import credential_cache
+from . import tool_cache
 from . import constants as consts
 
 logger = log.get_logger(__name__)
@@ -40,6 +41,17 @@ def get_relay_information(cmd, resource_group, vm_name, resource_type,
     resource_uri = resource_id(subscription=get_subscription_id(cmd.cli_ctx), resource_group=resource_group,
                                namespace=namespace, type=arc_type, name=vm_name)
 
+    cache_key = None
+    if credential_cache.is_relay_cache_enabled(cmd):
+        from azure.cli.core._profile import Profile
+        account = Profile(cli_ctx=cmd.cli_ctx).get_subscription()
+        cache_key = credential_cache.get_relay_cache_key(cmd.cli_ctx.cloud.name.lower(), account["tenantId"],
+                                                         account["user"]["name"], resource_uri, port)
+        cred = credential_cache.load_relay_info(cmd, cache_key)
+        # reading the service configuration also confirms the user can still access the machine
+        if cred and _check_service_configuration(cmd, resource_uri, port, ignore_errors=False):
+            return (cred, False)
+
     cred = None
     new_service_config = False
     try:
@@ -69,10 +81,12 @@ def get_relay_information(cmd, resource_group, vm_name, resource_type,
             except Exception as e:
                 raise azclierror.UnclassifiedUserFault(f"Unable to get relay information. Failed with error: {str(e)}")
             _handle_relay_connection_delay(cmd, "Setting up service configuration")
+    if cache_key:
+        credential_cache.save_relay_info(cmd, cache_key, cred)
     return (cred, new_service_config)
 
 
-def _check_service_configuration(cmd, resource_uri, port):
+def _check_service_configuration(cmd, resource_uri, port, ignore_errors=True):
     from .aaz.latest.hybrid_connectivity.endpoint.service_configuration import Show as ShowServiceConfig
     show_service_config_args = {
         'endpoint_name': 'default',
@@ -89,7 +103,7 @@ def _check_service_configuration(cmd, resource_uri, port):
         # is not setup correctly, the connection will fail.
         # The more likely scenario is that the request failed with a "Authorization Error",
         # in case the user isn't an owner/contributor.
-        return True
+        return ignore_errors
     if port:
         return serviceConfig['port'] == int(port)
 
@@ -189,19 +203,15 @@ def _list_credentials(cmd, resource_uri, certificate_validity_in_seconds):
 def get_client_side_proxy(arc_proxy_folder):
 
     request_uri, install_location, older_version_location = _get_proxy_filename_and_url(arc_proxy_folder)
-    install_dir = os.path.dirname(install_location)
 
-    # Only download new proxy if it doesn't exist already
-    if not os.path.isfile(install_location):
+    def install_client_side_proxy(install_location):
+        # delete any older versions of the proxy, keeping a partial download of this version to resume from
+        for f in glob(older_version_location):
+            if f not in (install_location, install_location + ".part"):
+                file_utils.delete_file(f, f"failed to delete older version file {f}", warning=True)
+
         t0 = time.time()
-        # download the executable
-        try:
-            with urllib.request.urlopen(request_uri) as response:
-                response_content = response.read()
-                response.close()
-        except Exception as e:
-            raise azclierror.ClientRequestError(f"Failed to download client proxy executable from {request_uri}. "
-                                                "Error: " + str(e)) from e
+        tool_cache.download_file(request_uri, install_location)
         time_elapsed = time.time() - t0
 
         proxy_data = {
@@ -210,21 +220,14 @@ def get_client_side_proxy(arc_proxy_folder):
         }
         telemetry.add_extension_event('ssh', proxy_data)
 
-        # if directory doesn't exist, create it
-        if not os.path.isdir(install_dir):
-            file_utils.create_directory(install_dir, f"Failed to create client proxy directory '{install_dir}'. ")
-        # if directory exists, delete any older versions of the proxy
-        else:
-            older_version_files = glob(older_version_location)
-            for f in older_version_files:
-                file_utils.delete_file(f, f"failed to delete older version file {f}", warning=True)
-
-        # write executable in the install location
-        file_utils.write_to_file(install_location, 'wb', response_content, "Failed to create client proxy file. ")
         os.chmod(install_location, os.stat(install_location).st_mode | stat.S_IXUSR)
         print_styled_text((Style.SUCCESS, f"SSH Client Proxy saved to {install_location}"))
 
-    return install_location
+    try:
+        return tool_cache.get_cached_tool(install_location, consts.CLIENT_PROXY_VERSION, install_client_side_proxy)
+    except OSError as e:
+        raise azclierror.FileOperationError(f"Failed to create client proxy file '{install_location}'. "
+                                            "Error: " + str(e)) from e
 
 
 def _get_proxy_filename_and_url(arc_proxy_folder):
@@ -22,6 +22,9 @@ RECOMMENDATION_SSH_CLIENT_NOT_FOUND = (Fore.YELLOW + "Ensure OpenSSH is installe
 RECOMMENDATION_RESOURCE_NOT_FOUND = (Fore.YELLOW + "Please ensure the active subscription is set properly "
                                      "and resource exists." + Style.RESET_ALL)
 RDP_TERMINATE_SSH_WAIT_TIME_IN_SECONDS = 30
+SSH_RSA_CERT_TYPE = "ssh-rsa-cert-v01@openssh.com"
+# Cached certificates and relay credentials are only reused while they stay valid for longer than this.
+CREDENTIAL_CACHE_EXPIRY_MARGIN_IN_SECONDS = 300
 
 ARC_RESOURCE_TYPE_PLACEHOLDER = "arc_resource_type_placeholder"
 
@@ -0,0 +1,106 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Certificates and relay credentials reused across invocations, so repeated connections to the same
+# machines don't request new ones every time. Each entry is a json file written atomically, so parallel
+# invocations can read and update the cache at the same time. Turn it off with
+# 'az config set ssh.credential_cache=false'. Relay credentials include the access key of the hybrid
+# connection, so they are only cached after 'az config set ssh.relay_credential_cache=true'.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import oschmod
+from knack import log
+
+from . import constants as const
+
+logger = log.get_logger(__name__)
+
+
+def is_enabled(cmd):
+    return cmd.cli_ctx.config.getboolean('ssh', 'credential_cache', fallback=True)
+
+
+def is_relay_cache_enabled(cmd):
+    return is_enabled(cmd) and cmd.cli_ctx.config.getboolean('ssh', 'relay_credential_cache', fallback=False)
+
+
+def get_certificate_cache_key(cloud_name, tenant_id, user_name, key_id):
+    return _get_key('cert', cloud_name, tenant_id, user_name, key_id)
+
+
+def get_relay_cache_key(cloud_name, tenant_id, user_name, resource_uri, port):
+    return _get_key('relay', cloud_name, tenant_id, user_name, resource_uri.lower(), str(port or ''))
+
+
+def load_certificate(cmd, key):
+    """Returns the certificate and principals cached for key, if the certificate is still valid."""
+    entry = _load_entry(cmd, key)
+    if entry and entry['valid_before'] - time.time() > const.CREDENTIAL_CACHE_EXPIRY_MARGIN_IN_SECONDS:
+        logger.debug("Reusing cached certificate valid until %s", time.ctime(entry['valid_before']))
+        return entry['certificate'], entry['principals']
+    return None
+
+
+def save_certificate(cmd, key, certificate, principals, valid_before):
+    _save_entry(cmd, key, {'certificate': certificate, 'principals': principals, 'valid_before': valid_before})
+
+
+def load_relay_info(cmd, key):
+    """Returns the relay credentials cached for key, if they don't expire soon."""
+    entry = _load_entry(cmd, key)
+    if entry and entry['relay_info']['expiresOn'] - time.time() > const.CREDENTIAL_CACHE_EXPIRY_MARGIN_IN_SECONDS:
+        logger.debug("Reusing cached relay information valid until %s", time.ctime(entry['relay_info']['expiresOn']))
+        return entry['relay_info']
+    return None
+
+
+def save_relay_info(cmd, key, relay_info):
+    if not relay_info or not isinstance(relay_info.get('expiresOn'), int):
+        return
+    _save_entry(cmd, key, {'relay_info': dict(relay_info)})
+
+
+def _get_key(*parts):
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _get_cache_folder(cmd):
+    return os.path.join(cmd.cli_ctx.config.config_dir, 'ssh', 'credential_cache')
+
+
+def _load_entry(cmd, key):
+    # pylint: disable=broad-except
+    try:
+        with open(os.path.join(_get_cache_folder(cmd), key + '.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug("Couldn't read credential cache entry %s. Error: %s", key, str(e))
+        return None
+
+
+def _save_entry(cmd, key, entry):
+    cache_folder = _get_cache_folder(cmd)
+    temp_path = None
+    # pylint: disable=broad-except
+    try:
+        if not os.path.isdir(cache_folder):
+            os.makedirs(cache_folder, exist_ok=True)
+            oschmod.set_mode(cache_folder, 0o700)
+        fd, temp_path = tempfile.mkstemp(dir=cache_folder, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        oschmod.set_mode(temp_path, 0o600)
+        os.replace(temp_path, os.path.join(cache_folder, key + '.json'))
+    except Exception as e:
+        logger.debug("Couldn't write credential cache entry %s. Error: %s", key, str(e))
+        if temp_path and os.path.isfile(temp_path):
+            os.remove(temp_path)
@@ -16,11 +16,13 @@ from azure.cli.core import azclierror
 from azure.cli.core import telemetry
 from azure.cli.core.style import Style, print_styled_text
 
+from . import bulk_config_utils
 from . import ip_utils
 from . import rdp_utils
 from . import rsa_parser
 from . import ssh_utils
 from . import connectivity_utils
+from . import credential_cache
 from . import ssh_info
 from . import file_utils
 from . import constants as const
@@ -69,12 +71,20 @@ def ssh_vm(cmd, resource_group_name=None, vm_name=None, ssh_ip=None, public_key_
 def ssh_config(cmd, config_path, resource_group_name=None, vm_name=None, ssh_ip=None,
                public_key_file=None, private_key_file=None, overwrite=False, use_private_ip=False,
                local_user=None, cert_file=None, port=None, resource_type=None, credentials_folder=None,
-               ssh_proxy_folder=None, ssh_client_folder=None, yes_without_prompt=False):
+               ssh_proxy_folder=None, ssh_client_folder=None, yes_without_prompt=False, tags=None, graph_query=None):
 
     # If user provides their own key pair, certificate will be written in the same folder as public key.
     if (public_key_file or private_key_file) and credentials_folder:
         raise azclierror.ArgumentUsageError("--keys-destination-folder can't be used in conjunction with "
                                             "--public-key-file/-p or --private-key-file/-i.")
+
+    # A resource group without a VM name, tags or a Resource Graph query select many VMs at once.
+    if tags or graph_query or (resource_group_name and not vm_name and not ssh_ip):
+        _ssh_config_bulk(cmd, config_path, resource_group_name, vm_name, ssh_ip, public_key_file, private_key_file,
+                         overwrite, use_private_ip, local_user, cert_file, port, resource_type, credentials_folder,
+                         ssh_client_folder, tags, graph_query)
+        return
+
     _assert_args(resource_group_name, vm_name, ssh_ip, resource_type, cert_file, local_user)
 
     config_session = ssh_info.ConfigSession(config_path, resource_group_name, vm_name, ssh_ip,
@@ -107,6 +117,69 @@ def ssh_config(cmd, config_path, resource_group_name=None, vm_name=None, ssh_ip=
     _do_ssh_op(cmd, config_session, op_call)
 
 
+def _ssh_config_bulk(cmd, config_path, resource_group_name, vm_name, ssh_ip, public_key_file, private_key_file,
+                     overwrite, use_private_ip, local_user, cert_file, port, resource_type, credentials_folder,
+                     ssh_client_folder, tags, graph_query):
+    if vm_name or ssh_ip:
+        raise azclierror.MutuallyExclusiveArgumentError(
+            "--tag and --graph-query can't be used with --vm-name/--name or --ip.")
+    if resource_type and resource_type.lower() not in ("microsoft.compute/virtualmachines", "microsoft.compute"):
+        raise azclierror.InvalidArgumentValueError(
+            "Config for many machines at once is only supported for Azure VMs (Microsoft.Compute/virtualMachines).")
+    if cert_file and not local_user:
+        raise azclierror.MutuallyExclusiveArgumentError(
+            "To authenticate with a certificate you need to provide a --local-user")
+
+    config_path = os.path.abspath(config_path)
+    config_folder = os.path.dirname(config_path)
+    if not os.path.isdir(config_folder):
+        raise azclierror.InvalidArgumentValueError(f"Config file destination folder {config_folder} "
+                                                   "does not exist.")
+    if not credentials_folder and not (public_key_file or private_key_file):
+        folder_name = resource_group_name or "all_vms"
+        if platform.system() == "Windows":
+            folder_name = file_utils.remove_invalid_characters_foldername(folder_name) or "all_vms"
+        credentials_folder = os.path.join(config_folder, "az_ssh_config", folder_name)
+
+    targets = bulk_config_utils.get_target_vms(cmd, resource_group_name, tags, graph_query, use_private_ip)
+    if not targets:
+        raise azclierror.ResourceNotFoundError("No Azure VMs matched the given resource group, tags or query.",
+                                               const.RECOMMENDATION_RESOURCE_NOT_FOUND)
+
+    # A single key pair and certificate are shared by all the hosts in the config.
+    delete_keys = False
+    delete_cert = False
+    if not local_user:
+        delete_cert = True
+        public_key_file, private_key_file, delete_keys = \
+            _check_or_create_public_private_files(public_key_file, private_key_file, credentials_folder,
+                                                  ssh_client_folder)
+        cert_file, local_user = _get_and_write_certificate(cmd, public_key_file, None, ssh_client_folder,
+                                                           use_cache=not delete_keys)
+
+    config_text = []
+    skipped = []
+    for target in targets:
+        # AAD login is not supported for Windows, see target_os_utils.handle_target_os_type
+        if not target.ip or (delete_cert and (target.os_type or "").lower() == "windows"):
+            skipped.append(target.vm_name)
+            continue
+        config_session = ssh_info.ConfigSession(config_path, target.resource_group_name, target.vm_name, target.ip,
+                                                public_key_file, private_key_file, overwrite, use_private_ip,
+                                                local_user, cert_file, port, "Microsoft.Compute/virtualMachines",
+                                                credentials_folder, None, ssh_client_folder, True)
+        config_text.extend(config_session.get_config_text(delete_cert))
+    if skipped:
+        logger.warning("Skipped %d VMs without a reachable IP address or, for AAD login, running Windows: %s",
+                       len(skipped), ", ".join(skipped))
+    if not config_text:
+        raise azclierror.ResourceNotFoundError("None of the matched VMs can be added to the config.")
+
+    ssh_utils.write_bulk_ssh_config(config_path, config_text, overwrite, delete_keys, delete_cert, cert_file,
+                                    ssh_client_folder)
+    print_styled_text((Style.SUCCESS, f"Added {len(targets) - len(skipped)} VMs to {config_path}."))
+
+
 def ssh_cert(cmd, cert_path=None, public_key_file=None, ssh_client_folder=None):
     if not cert_path and not public_key_file:
         raise azclierror.RequiredArgumentMissingError("--file or --public-key-file must be provided.")
@@ -176,8 +249,10 @@ def _do_ssh_op(cmd, op_info, op_call):
         op_info.public_key_file, op_info.private_key_file, delete_keys = \
             _check_or_create_public_private_files(op_info.public_key_file, op_info.private_key_file,
                                                   op_info.credentials_folder, op_info.ssh_client_folder)
-        op_info.cert_file, op_info.local_user = _get_and_write_certificate(cmd, op_info.public_key_file,
-                                                                           None, op_info.ssh_client_folder)
+        # Certificates for generated keys can't be reused, since the keys are deleted after the operation.
+        op_info.cert_file, op_info.local_user = _get_and_write_certificate(
+            cmd, op_info.public_key_file, None, op_info.ssh_client_folder,
+            use_cache=not delete_keys and not op_info.delete_credentials)
         if op_info.is_arc():
             # pylint: disable=broad-except
             try:
@@ -205,7 +280,7 @@ def _do_ssh_op(cmd, op_info, op_call):
     op_call(op_info, delete_keys, delete_cert)
 
 
-def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folder):
+def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folder, use_cache=False):
     cloudtoscope = {
         "azurecloud": "https://pas.windows.net/CheckMyAccess/Linux/.default",
         "azurechinacloud": "https://pas.chinacloudapi.cn/CheckMyAccess/Linux/.default",
@@ -222,28 +297,53 @@ def _get_and_write_certificate(cmd, public_key_file, cert_file, ssh_client_folde
     from azure.cli.core._profile import Profile
     profile = Profile(cli_ctx=cmd.cli_ctx)
 
-    t0 = time.time()
-    # We currently are using the presence of get_msal_token to detect if we are running on an older azure cli client
-    # TODO: Remove when adal has been deprecated for a while
-    if hasattr(profile, "get_msal_token"):
-        # we used to use the username from the token but now we throw it away
-        _, certificate = profile.get_msal_token(scopes, data)
+    cache_key = None
+    cached_certificate = None
+    if use_cache and credential_cache.is_enabled(cmd):
+        account = profile.get_subscription()
+        cache_key = credential_cache.get_certificate_cache_key(cmd.cli_ctx.cloud.name.lower(), account["tenantId"],
+                                                               account["user"]["name"], data["key_id"])
+        cached_certificate = credential_cache.load_certificate(cmd, cache_key)
+
+    if cached_certificate:
+        certificate, principals = cached_certificate
     else:
-        credential, _, _ = profile.get_login_credentials(subscription_id=profile.get_subscription()["id"])
-        certificatedata = credential.get_token(*scopes, data=data)
-        certificate = certificatedata.token
+        t0 = time.time()
+        # We currently are using the presence of get_msal_token to detect if we are running on an older azure cli
+        # client
+        # TODO: Remove when adal has been deprecated for a while
+        if hasattr(profile, "get_msal_token"):
+            # we used to use the username from the token but now we throw it away
+            _, certificate = profile.get_msal_token(scopes, data)
+        else:
+            credential, _, _ = profile.get_login_credentials(subscription_id=profile.get_subscription()["id"])
+            certificatedata = credential.get_token(*scopes, data=data)
+            certificate = certificatedata.token
 
-    time_elapsed = time.time() - t0
-    telemetry.add_extension_event('ssh', {'Context.Default.AzureCLI.SSHGetCertificateTime': time_elapsed})
+        time_elapsed = time.time() - t0
+        telemetry.add_extension_event('ssh', {'Context.Default.AzureCLI.SSHGetCertificateTime': time_elapsed})
 
     if not cert_file:
         cert_file = public_key_file + "-aadcert.pub"
 
     logger.debug("Generating certificate %s", cert_file)
     _write_cert_file(certificate, cert_file)
-    # instead we use the validprincipals from the cert due to mismatched upn and email in guest scenarios
-    username = ssh_utils.get_ssh_cert_principals(cert_file, ssh_client_folder)[0]
-    return cert_file, username.lower()
+    if not cached_certificate:
+        # instead we use the validprincipals from the cert due to mismatched upn and email in guest scenarios
+        principals = ssh_utils.get_ssh_cert_principals(cert_file, ssh_client_folder)
+        if cache_key:
+            _cache_certificate(cmd, cache_key, certificate, principals, cert_file, ssh_client_folder)
+    return cert_file, principals[0].lower()
+
+
+def _cache_certificate(cmd, cache_key, certificate, principals, cert_file, ssh_client_folder):
+    # pylint: disable=broad-except
+    try:
+        valid_before = ssh_utils.get_certificate_start_and_end_times(cert_file, ssh_client_folder)[1].timestamp()
+    except Exception as e:
+        logger.debug("Couldn't determine certificate expiration, it won't be cached. Error: %s", str(e))
+        return
+    credential_cache.save_certificate(cmd, cache_key, certificate, principals, valid_before)
 
 
 def _prepare_jwk_data(public_key_file):
@@ -2,14 +2,20 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import base64
+import binascii
 import os
 import platform
+import shutil
+import struct
 import subprocess
+import tempfile
 import time
 import datetime
 import re
 import sys
 import colorama
+import oschmod
 
 from knack import log
 from azure.cli.core import azclierror
@@ -112,6 +118,29 @@ def write_ssh_config(config_info, delete_keys, delete_cert):
         f.write('\n'.join(config_text))
 
 
+def write_bulk_ssh_config(config_path, config_text, overwrite, delete_keys, delete_cert, cert_file,
+                          ssh_client_folder):
+    # The entries of all hosts are written at once, through a temporary file renamed over the config file,
+    # so readers never see a partially written config.
+    _issue_config_cleanup_warning(delete_cert, delete_keys, False, cert_file, None, ssh_client_folder)
+    existing_text = ""
+    if not overwrite and os.path.isfile(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            existing_text = f.read()
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(config_path), prefix=".az_ssh_config")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(existing_text + '\n'.join(config_text))
+        if os.path.isfile(config_path):
+            shutil.copymode(config_path, temp_path)
+        else:
+            oschmod.set_mode(temp_path, 0o644)
+        os.replace(temp_path, config_path)
+    except OSError as e:
+        file_utils.delete_file(temp_path, f"Couldn't delete temporary file {temp_path}. ", True)
+        raise azclierror.FileOperationError(f"Couldn't write SSH config {config_path}. Error: {str(e)}") from e
+
+
 def _check_ssh_logs_for_common_errors(ssh_sub, op_info, delete_cert, delete_keys):
     log_list = []
     connection_established = False
@@ -184,6 +213,61 @@ def get_ssh_cert_info(cert_file, ssh_client_folder=None):
                                          const.RECOMMENDATION_SSH_CLIENT_NOT_FOUND)
 
 
+def parse_ssh_cert(cert_file):
+    # Reads the principals and validity of an OpenSSH RSA certificate without running ssh-keygen -L.
+    # Format: https://cvsweb.openbsd.org/src/usr.bin/ssh/PROTOCOL.certkeys
+    with open(cert_file, 'r', encoding='utf-8') as f:
+        cert_text = f.read().split()
+    if len(cert_text) < 2 or cert_text[0] != const.SSH_RSA_CERT_TYPE:
+        raise ValueError("Certificate is not an ssh-rsa-cert-v01@openssh.com certificate")
+    blob = base64.b64decode(cert_text[1])
+
+    offset = 0
+
+    def read_string():
+        nonlocal offset
+        length = struct.unpack('>L', blob[offset:offset + 4])[0]
+        offset += 4 + length
+        if offset > len(blob):
+            raise ValueError("Certificate is truncated")
+        return blob[offset - length:offset]
+
+    def read_uint64():
+        nonlocal offset
+        value = struct.unpack('>Q', blob[offset:offset + 8])[0]
+        offset += 8
+        return value
+
+    if read_string().decode('ascii') != const.SSH_RSA_CERT_TYPE:
+        raise ValueError("Encoded certificate is not an ssh-rsa-cert-v01@openssh.com certificate")
+    read_string()  # nonce
+    read_string()  # e
+    read_string()  # n
+    read_uint64()  # serial
+    offset += 4  # type
+    read_string()  # key id
+    principals_blob = read_string()
+    valid_after = read_uint64()
+    valid_before = read_uint64()
+
+    principals = []
+    principals_offset = 0
+    while principals_offset < len(principals_blob):
+        length = struct.unpack('>L', principals_blob[principals_offset:principals_offset + 4])[0]
+        principals_offset += 4 + length
+        principals.append(principals_blob[principals_offset - length:principals_offset].decode('utf-8'))
+    # ssh-keygen -L prints the validity in local time
+    return principals, (datetime.datetime.fromtimestamp(valid_after), datetime.datetime.fromtimestamp(valid_before))
+
+
+def _parse_ssh_cert_or_none(cert_file):
+    try:
+        return parse_ssh_cert(cert_file)
+    except (OSError, ValueError, OverflowError, struct.error, binascii.Error) as e:
+        logger.debug("Couldn't parse certificate %s, falling back to ssh-keygen. Error: %s", cert_file, str(e))
+        return None
+
+
 def _get_ssh_cert_validity(cert_file, ssh_client_folder=None):
     if cert_file:
         info = get_ssh_cert_info(cert_file, ssh_client_folder)
@@ -194,6 +278,9 @@ def _get_ssh_cert_validity(cert_file, ssh_client_folder=None):
 
 
 def get_certificate_start_and_end_times(cert_file, ssh_client_folder=None):
+    parsed_cert = _parse_ssh_cert_or_none(cert_file) if cert_file else None
+    if parsed_cert:
+        return parsed_cert[1]
     validity_str = _get_ssh_cert_validity(cert_file, ssh_client_folder)
     times = None
     if validity_str and "Valid: from " in validity_str and " to " in validity_str:
@@ -213,6 +300,9 @@ def get_certificate_lifetime(cert_file, ssh_client_folder=None):
 
 
 def get_ssh_cert_principals(cert_file, ssh_client_folder=None):
+    parsed_cert = _parse_ssh_cert_or_none(cert_file)
+    if parsed_cert:
+        return parsed_cert[0]
     info = get_ssh_cert_info(cert_file, ssh_client_folder)
     principals = []
     in_principal = False
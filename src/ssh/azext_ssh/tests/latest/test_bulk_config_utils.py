@@ -0,0 +1,127 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_ssh import bulk_config_utils
+from azext_ssh import custom
+
+from azure.cli.core import azclierror
+
+SUB = "/subscriptions/00000000-0000-0000-0000-000000000000"
+
+
+def _vm(rg, name, nic_ids, os_type="Linux", tags=None):
+    vm = mock.Mock()
+    vm.id = f"{SUB}/resourceGroups/{rg}/providers/Microsoft.Compute/virtualMachines/{name}"
+    vm.name = name
+    vm.tags = tags
+    vm.storage_profile.os_disk.os_type = os_type
+    vm.network_profile.network_interfaces = [mock.Mock(id=nic_id) for nic_id in nic_ids]
+    return vm
+
+
+def _nic(rg, name, private_ip, public_ip_name=None):
+    ip_config = {"properties": {"privateIPAddress": private_ip}}
+    if public_ip_name:
+        ip_config["properties"]["publicIPAddress"] = {
+            "id": f"{SUB}/resourceGroups/{rg}/providers/Microsoft.Network/publicIPAddresses/{public_ip_name}"}
+    return {"id": f"{SUB}/resourceGroups/{rg}/providers/Microsoft.Network/networkInterfaces/{name}",
+            "properties": {"ipConfigurations": [ip_config]}}
+
+
+def _public_ip(rg, name, address):
+    return {"id": f"{SUB}/resourceGroups/{rg}/providers/Microsoft.Network/publicIPAddresses/{name}",
+            "properties": {"ipAddress": address}}
+
+
+class BulkConfigUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.vms = [
+            _vm("rg1", "web", [f"{SUB}/resourceGroups/rg1/providers/Microsoft.Network/networkInterfaces/web-nic"],
+                tags={"Env": "prod"}),
+            _vm("rg1", "db", [f"{SUB}/resourceGroups/rg1/providers/Microsoft.Network/networkInterfaces/db-nic"],
+                tags={"env": "test"}),
+            _vm("rg1", "win", [f"{SUB}/resourceGroups/rg1/providers/Microsoft.Network/networkInterfaces/win-nic"],
+                os_type="Windows", tags={"env": "prod"}),
+        ]
+        self.responses = {
+            "networkInterfaces": [_nic("rg1", "web-nic", "10.0.0.4", "web-ip"), _nic("rg1", "db-nic", "10.0.0.5"),
+                                  _nic("rg1", "win-nic", "10.0.0.6", "win-ip"), _nic("rg1", "other-nic", "10.0.0.7")],
+            "publicIPAddresses": [_public_ip("rg1", "web-ip", "1.1.1.1"), _public_ip("rg1", "win-ip", "2.2.2.2")]
+        }
+        self.urls = []
+
+    def _send_raw_request(self, _, method, url, **kwargs):
+        self.urls.append((method, url))
+        response = mock.Mock()
+        response.json.return_value = {"value": self.responses[url.split("/")[-1].split("?")[0]]}
+        return response
+
+    def _get_target_vms(self, tags=None, use_private_ip=False):
+        with mock.patch('azure.cli.core.commands.client_factory.get_mgmt_service_client') as mock_client, \
+                mock.patch('azext_ssh.bulk_config_utils.send_raw_request', side_effect=self._send_raw_request):
+            mock_client.return_value.virtual_machines.list.return_value = self.vms
+            return bulk_config_utils.get_target_vms(mock.Mock(), "rg1", tags, None, use_private_ip)
+
+    def test_get_target_vms_lists_once_per_resource_group(self):
+        targets = self._get_target_vms()
+
+        self.assertEqual([(t.vm_name, t.ip, t.os_type) for t in targets],
+                         [("web", "1.1.1.1", "Linux"), ("db", "10.0.0.5", "Linux"), ("win", "2.2.2.2", "Windows")])
+        self.assertEqual(len(self.urls), 2)
+
+    def test_get_target_vms_private_ip_and_tags(self):
+        targets = self._get_target_vms(tags=["env=prod"], use_private_ip=True)
+        self.assertEqual([(t.vm_name, t.ip) for t in targets], [("web", "10.0.0.4"), ("win", "10.0.0.6")])
+
+        self.assertTrue(bulk_config_utils._matches_tags({"Env": "prod"}, ["env"]))
+        self.assertFalse(bulk_config_utils._matches_tags({"env": "prod"}, ["env=test"]))
+        self.assertFalse(bulk_config_utils._matches_tags(None, ["env"]))
+
+    @mock.patch('azext_ssh.custom._get_and_write_certificate')
+    @mock.patch('azext_ssh.custom._check_or_create_public_private_files')
+    @mock.patch('azext_ssh.bulk_config_utils.get_target_vms')
+    def test_ssh_config_bulk(self, mock_get_targets, mock_check_files, mock_get_cert):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        config_path = os.path.join(temp_dir.name, "config")
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write("Host existing")
+        mock_get_targets.return_value = [
+            bulk_config_utils.TargetVM("rg1", "web", "Linux", "1.1.1.1"),
+            bulk_config_utils.TargetVM("rg1", "win", "Windows", "2.2.2.2"),
+            bulk_config_utils.TargetVM("rg1", "noip", "Linux", None)]
+        mock_check_files.return_value = "/keys/id_rsa.pub", "/keys/id_rsa", True
+        mock_get_cert.return_value = "/keys/id_rsa.pub-aadcert.pub", "user@contoso.com"
+        cmd = mock.Mock()
+
+        with mock.patch('azext_ssh.ssh_utils._issue_config_cleanup_warning'):
+            custom.ssh_config(cmd, config_path, resource_group_name="rg1")
+
+        mock_get_targets.assert_called_once_with(cmd, "rg1", None, None, False)
+        mock_check_files.assert_called_once_with(None, None, os.path.join(temp_dir.name, "az_ssh_config", "rg1"),
+                                                 None)
+        mock_get_cert.assert_called_once_with(cmd, "/keys/id_rsa.pub", None, None, use_cache=False)
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = f.read()
+        self.assertTrue(config.startswith("Host existing\n"))
+        self.assertIn("Host rg1-web\n\tUser user@contoso.com\n\tHostName 1.1.1.1\n", config)
+        self.assertIn("Host 1.1.1.1\n", config)
+        self.assertNotIn("win", config)
+        self.assertNotIn("noip", config)
+
+    def test_ssh_config_bulk_invalid_args(self):
+        self.assertRaises(azclierror.MutuallyExclusiveArgumentError, custom.ssh_config, mock.Mock(), "config",
+                          vm_name="vm", tags=["env=prod"])
+        self.assertRaises(azclierror.InvalidArgumentValueError, custom.ssh_config, mock.Mock(), "config",
+                          resource_group_name="rg", resource_type="Microsoft.HybridCompute/machines")
+
+
+if __name__ == '__main__':
+    unittest.main()
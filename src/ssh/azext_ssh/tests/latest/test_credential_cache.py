@@ -0,0 +1,144 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import datetime
+import os
+import struct
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from azext_ssh import connectivity_utils
+from azext_ssh import credential_cache
+from azext_ssh import custom
+from azext_ssh import ssh_utils
+
+
+def _ssh_string(value):
+    value = value.encode('utf-8') if isinstance(value, str) else value
+    return struct.pack('>L', len(value)) + value
+
+
+def _build_certificate(principals, valid_after, valid_before):
+    blob = (_ssh_string("ssh-rsa-cert-v01@openssh.com") + _ssh_string(b"nonce") + _ssh_string(b"\x01\x00\x01") +
+            _ssh_string(b"\x00modulus") + struct.pack('>Q', 1) + struct.pack('>L', 1) + _ssh_string("key id") +
+            _ssh_string(b"".join(_ssh_string(p) for p in principals)) + struct.pack('>QQ', valid_after, valid_before) +
+            _ssh_string(b"") + _ssh_string(b"") + _ssh_string(b"") + _ssh_string(b"ca key") + _ssh_string(b"signature"))
+    return base64.b64encode(blob).decode('ascii')
+
+
+class CredentialCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.config.config_dir = self.temp_dir.name
+        self.cmd.cli_ctx.config.getboolean.return_value = True
+        self.cmd.cli_ctx.cloud.name = "AzureCloud"
+
+    def test_parse_ssh_cert(self):
+        cert_file = os.path.join(self.temp_dir.name, "id_rsa.pub-aadcert.pub")
+        custom._write_cert_file(_build_certificate(["user@contoso.com", "user2"], 1700000000, 1700003600), cert_file)
+
+        self.assertEqual(ssh_utils.get_ssh_cert_principals(cert_file), ["user@contoso.com", "user2"])
+        self.assertEqual(ssh_utils.get_certificate_start_and_end_times(cert_file),
+                         (datetime.datetime.fromtimestamp(1700000000), datetime.datetime.fromtimestamp(1700003600)))
+        self.assertEqual(ssh_utils.get_certificate_lifetime(cert_file), datetime.timedelta(seconds=3600))
+
+    @mock.patch('azext_ssh.ssh_utils.get_ssh_cert_info')
+    def test_parse_ssh_cert_falls_back_to_ssh_keygen(self, mock_cert_info):
+        cert_file = os.path.join(self.temp_dir.name, "cert.pub")
+        with open(cert_file, 'w', encoding='utf-8') as f:
+            f.write("ssh-ed25519-cert-v01@openssh.com AAAA")
+        mock_cert_info.return_value = ["        Principals: ", "                user"]
+
+        self.assertEqual(ssh_utils.get_ssh_cert_principals(cert_file, "client"), ["user"])
+        mock_cert_info.assert_called_once_with(cert_file, "client")
+
+    @mock.patch('azext_ssh.custom._prepare_jwk_data')
+    @mock.patch('azure.cli.core._profile.Profile')
+    def test_get_and_write_certificate_reuses_cached_certificate(self, mock_profile, mock_jwk):
+        mock_jwk.return_value = {"key_id": "kid"}
+        profile = mock_profile.return_value
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "user@contoso.com"}}
+        now = int(time.time())
+        profile.get_msal_token.return_value = "user", _build_certificate(["User@contoso.com"], now, now + 3600)
+        public_key_file = os.path.join(self.temp_dir.name, "id_rsa.pub")
+
+        for _ in range(2):
+            cert_file, username = custom._get_and_write_certificate(self.cmd, public_key_file, None, None,
+                                                                    use_cache=True)
+            self.assertEqual(cert_file, public_key_file + "-aadcert.pub")
+            self.assertEqual(username, "user@contoso.com")
+            os.remove(cert_file)
+        profile.get_msal_token.assert_called_once()
+
+        # certificates close to their expiration are requested again
+        profile.get_msal_token.return_value = "user", _build_certificate(["user@contoso.com"], now, now + 60)
+        key = credential_cache.get_certificate_cache_key("azurecloud", "tenant", "user@contoso.com", "kid")
+        credential_cache.save_certificate(self.cmd, key, "certificate", ["user@contoso.com"], now + 60)
+        custom._get_and_write_certificate(self.cmd, public_key_file, None, None, use_cache=True)
+        self.assertEqual(profile.get_msal_token.call_count, 2)
+
+        custom._get_and_write_certificate(self.cmd, public_key_file, None, None)
+        self.assertEqual(profile.get_msal_token.call_count, 3)
+
+    @mock.patch('azure.cli.core._profile.Profile')
+    @mock.patch('azext_ssh.connectivity_utils._check_service_configuration')
+    @mock.patch('azext_ssh.connectivity_utils._list_credentials')
+    @mock.patch('azext_ssh.connectivity_utils.get_subscription_id')
+    def test_get_relay_information_reuses_cached_credentials(self, mock_sub_id, mock_list_cred, mock_check_config,
+                                                             mock_profile):
+        mock_sub_id.return_value = "00000000-0000-0000-0000-000000000000"
+        mock_check_config.return_value = True
+        mock_list_cred.return_value = {"namespaceName": "ns", "accessKey": "key", "expiresOn": int(time.time()) + 3600}
+        profile = mock_profile.return_value
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "user@contoso.com"}}
+
+        def _get_relay_information(port="22"):
+            return connectivity_utils.get_relay_information(self.cmd, "rg", "vm", "Microsoft.HybridCompute/machines",
+                                                            3600, port, False)
+
+        for _ in range(2):
+            relay_info, new_service_config = _get_relay_information()
+            self.assertEqual(relay_info, mock_list_cred.return_value)
+            self.assertFalse(new_service_config)
+        mock_list_cred.assert_called_once()
+        # the service configuration is checked on cache hits too
+        self.assertEqual(mock_check_config.call_count, 2)
+        self.assertFalse(mock_check_config.call_args[1]["ignore_errors"])
+
+        _get_relay_information("2222")
+        self.assertEqual(mock_list_cred.call_count, 2)
+
+        # credentials cached for another identity aren't reused
+        profile.get_subscription.return_value = {"tenantId": "tenant", "user": {"name": "other@contoso.com"}}
+        _get_relay_information()
+        self.assertEqual(mock_list_cred.call_count, 3)
+
+        # nor when the service configuration can't be read or doesn't match anymore
+        mock_check_config.side_effect = [False, True]
+        _get_relay_information()
+        self.assertEqual(mock_list_cred.call_count, 4)
+
+    @mock.patch('azext_ssh.connectivity_utils._check_service_configuration', return_value=True)
+    @mock.patch('azext_ssh.connectivity_utils._list_credentials')
+    @mock.patch('azext_ssh.connectivity_utils.get_subscription_id')
+    def test_get_relay_information_doesnt_cache_by_default(self, mock_sub_id, mock_list_cred, _):
+        mock_sub_id.return_value = "00000000-0000-0000-0000-000000000000"
+        mock_list_cred.return_value = {"namespaceName": "ns", "accessKey": "key", "expiresOn": int(time.time()) + 3600}
+        self.cmd.cli_ctx.config.getboolean.side_effect = lambda section, option, fallback: fallback
+
+        for _ in range(2):
+            connectivity_utils.get_relay_information(self.cmd, "rg", "vm", "Microsoft.HybridCompute/machines", 3600,
+                                                     "22", False)
+        self.assertEqual(mock_list_cred.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, 'ssh', 'credential_cache')))
+
+
+if __name__ == '__main__':
+    unittest.main()
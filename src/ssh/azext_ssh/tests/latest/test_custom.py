@@ -359,6 +359,7 @@ class SshCustomCommandTest(unittest.TestCase):
         cmd.cli_ctx = mock.Mock()
         cmd.cli_ctx.cloud = mock.Mock()
         cmd.cli_ctx.cloud.name = "azurecloud"
+        cmd.cli_ctx.config.getboolean.return_value = False
 
         op_info = ssh_info.SSHSession(None, None, "1.2.3.4", None, None, False, None, None, None, None, None, None, "Microsoft.Compute/virtualMachines", None, None, False, False)
         op_info.public_key_file = "publicfile"
@@ -460,6 +461,7 @@ class SshCustomCommandTest(unittest.TestCase):
         cmd.cli_ctx = mock.Mock()
         cmd.cli_ctx.cloud = mock.Mock()
         cmd.cli_ctx.cloud.name = "azurecloud"
+        cmd.cli_ctx.config.getboolean.return_value = False
         mock_check_files.return_value = "public", "private", False
         mock_principal.return_value = ["username"]
         mock_get_mod_exp.return_value = "modulus", "exponent"
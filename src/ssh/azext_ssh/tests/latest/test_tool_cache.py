@@ -0,0 +1,121 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_ssh import tool_cache
+
+from azure.cli.core import azclierror
+
+
+class _Response(io.BytesIO):
+    def __init__(self, content, status=200, etag=None):
+        super().__init__(content)
+        self.status = status
+        self.headers = {"Content-Length": str(len(content))}
+        if etag:
+            self.headers["ETag"] = etag
+
+
+class ToolCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.file_path = os.path.join(self.temp_dir.name, "tool")
+
+    def _read(self, file_path):
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    @mock.patch('urllib.request.urlopen')
+    def test_download_file_resumes_partial_download(self, mock_urlopen):
+        with open(self.file_path + ".part", 'wb') as f:
+            f.write(b"abc")
+        with open(self.file_path + ".part.etag", 'w', encoding='utf-8') as f:
+            f.write('"1"')
+        mock_urlopen.return_value = _Response(b"def", status=206, etag='"1"')
+
+        tool_cache.download_file("https://host/tool", self.file_path)
+
+        self.assertEqual(mock_urlopen.call_args[0][0].get_header("Range"), "bytes=3-")
+        self.assertEqual(mock_urlopen.call_args[0][0].get_header("If-range"), '"1"')
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+        self.assertFalse(os.path.exists(self.file_path + ".part"))
+        self.assertFalse(os.path.exists(self.file_path + ".part.etag"))
+
+    @mock.patch('urllib.request.urlopen')
+    def test_download_file_does_not_resume_another_file(self, mock_urlopen):
+        # left by the download of another version of the tool
+        with open(self.file_path + ".part", 'wb') as f:
+            f.write(b"xyz")
+        with open(self.file_path + ".part.etag", 'w', encoding='utf-8') as f:
+            f.write('"old"')
+        mock_urlopen.side_effect = [_Response(b"def", status=206, etag='"1"'), _Response(b"abcdef", etag='"1"')]
+
+        tool_cache.download_file("https://host/tool", self.file_path)
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+
+        # part files without the ETag of their file aren't resumed at all
+        with open(self.file_path + ".part", 'wb') as f:
+            f.write(b"xyz")
+        mock_urlopen.side_effect = [_Response(b"abcdef")]
+        tool_cache.download_file("https://host/tool", self.file_path)
+        self.assertIsNone(mock_urlopen.call_args[0][0].get_header("Range"))
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_download_file_retries_truncated_download_and_verifies_sha256(self, mock_urlopen, mock_sleep):
+        truncated = _Response(b"ab", etag='"1"')
+        truncated.headers["Content-Length"] = "6"
+        mock_urlopen.side_effect = [truncated, _Response(b"cdef", status=206, etag='"1"')]
+        sha256 = "bef57ec7f53a6d40beb640a780a639c83bc29ac8a9816f1fc6c5c6dcd93c4721"
+
+        tool_cache.download_file("https://host/tool", self.file_path, sha256=sha256)
+
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+        mock_sleep.assert_called_once_with(1)
+
+        mock_urlopen.side_effect = [_Response(b"abcdeg")]
+        self.assertRaises(azclierror.FileOperationError, tool_cache.download_file, "https://host/tool",
+                          self.file_path, sha256=sha256)
+        self.assertFalse(os.path.exists(self.file_path + ".part"))
+        self.assertEqual(self._read(self.file_path), b"abcdef")
+
+    def test_get_cached_tool_installs_once_per_version(self):
+        def install(destination):
+            with open(destination, 'w', encoding='utf-8') as f:
+                f.write("tool")
+        mock_install = mock.Mock(side_effect=install)
+
+        # a lock left behind by a process that died doesn't block the install
+        with open(os.path.join(self.temp_dir.name, ".lock"), 'w', encoding='utf-8') as f:
+            f.write("0")
+        os.utime(os.path.join(self.temp_dir.name, ".lock"), (0, 0))
+
+        for _ in range(2):
+            self.assertEqual(tool_cache.get_cached_tool(self.file_path, "1.0", mock_install), self.file_path)
+        mock_install.assert_called_once_with(self.file_path)
+        with open(os.path.join(self.temp_dir.name, "manifest.json"), 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["tool"]["version"], "1.0")
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, ".lock")))
+
+        tool_cache.get_cached_tool(self.file_path, "2.0", mock_install)
+        self.assertEqual(mock_install.call_count, 2)
+
+        # incomplete files are installed again
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            f.write("to")
+        tool_cache.get_cached_tool(self.file_path, "2.0", mock_install)
+        self.assertEqual(mock_install.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
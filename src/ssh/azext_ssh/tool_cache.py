@@ -0,0 +1,235 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# Cache for the tools downloaded by the extension, safe to use from concurrent az processes. Installed tools
+# are recorded with their version, size and sha256 in a manifest.json in their folder, so finding an installed
+# tool only takes reading the manifest and a stat. Downloads are streamed to a .part file that later attempts
+# resume from as long as the file has the same ETag, and are moved into place only once they are complete and
+# verified.
+
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from azure.cli.core import azclierror
+from knack import log
+
+logger = log.get_logger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+LOCK_FILE_NAME = ".lock"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRY_COUNT = 4
+DOWNLOAD_TIMEOUT_IN_SECONDS = 60
+LOCK_TIMEOUT_IN_SECONDS = 600
+LOCK_POLL_INTERVAL_IN_SECONDS = 0.5
+STALE_LOCK_AGE_IN_SECONDS = 900
+
+
+def get_cached_tool(destination, version, install):
+    """Returns destination once the given version of the tool is installed there. Otherwise install(destination)
+    is called while holding the lock of the folder, and the installed file is recorded in the manifest."""
+    cache_folder = os.path.dirname(destination)
+    if _is_installed(cache_folder, destination, version):
+        return destination
+
+    os.makedirs(cache_folder, exist_ok=True)
+    with _FolderLock(cache_folder):
+        # Another process may have installed it while we were waiting for the lock
+        if not _is_installed(cache_folder, destination, version):
+            install(destination)
+            _record_installed(cache_folder, destination, version)
+    return destination
+
+
+def download_file(url, file_path, sha256=None):
+    """Streams url to file_path. Failed attempts are retried with an exponential backoff and resume where the
+    previous one stopped. file_path is only replaced once the whole file was received and matches sha256."""
+    part_path = file_path + ".part"
+    for attempt in range(DOWNLOAD_RETRY_COUNT):
+        try:
+            _download_to_part_file(url, part_path)
+            break
+        except urllib.error.HTTPError as e:
+            if (e.code < 500 and e.code != 429) or attempt == DOWNLOAD_RETRY_COUNT - 1:
+                raise azclierror.ClientRequestError(f"Failed to download {url}. Error: {str(e)}") from e
+            _wait_for_retry(url, attempt, e)
+        except (OSError, http.client.HTTPException) as e:
+            if attempt == DOWNLOAD_RETRY_COUNT - 1:
+                raise azclierror.ClientRequestError(f"Failed to download {url}. Error: {str(e)}") from e
+            _wait_for_retry(url, attempt, e)
+
+    if sha256:
+        actual_sha256 = get_file_sha256(part_path)
+        if actual_sha256.lower() != sha256.lower():
+            os.remove(part_path)
+            _write_etag(part_path + ".etag", None)
+            raise azclierror.FileOperationError(f"The file downloaded from {url} has sha256 {actual_sha256} instead "
+                                                f"of the expected {sha256}.")
+    os.replace(part_path, file_path)
+    _write_etag(part_path + ".etag", None)
+
+
+def get_file_sha256(file_path):
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _download_to_part_file(url, part_path):
+    # The ETag of the file the .part file comes from is kept next to it, so that a .part file left by the
+    # download of another version of the tool is never completed with the bytes of this one
+    etag_path = part_path + ".etag"
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    etag = _read_etag(etag_path) if offset else None
+    request = urllib.request.Request(url)
+    if offset and etag:
+        request.add_header("Range", f"bytes={offset}-")
+        request.add_header("If-Range", etag)
+    else:
+        offset = 0
+    try:
+        response = urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT_IN_SECONDS)
+    except urllib.error.HTTPError as e:
+        if e.code != 416 or not offset:
+            raise
+        # The range starts at or after the end of the file: either the part file is already complete,
+        # or it belongs to a different file and the download has to start over.
+        if e.headers.get("Content-Range") == f"bytes */{offset}" and e.headers.get("ETag") == etag:
+            return
+        os.remove(part_path)
+        _download_to_part_file(url, part_path)
+        return
+
+    with response:
+        if offset and response.status == 206 and response.headers.get("ETag") != etag:
+            logger.debug("%s changed since the download started, starting over.", url)
+            response.close()
+            os.remove(part_path)
+            _download_to_part_file(url, part_path)
+            return
+        if offset and response.status != 206:
+            logger.debug("The server doesn't support resuming the download of %s, starting over.", url)
+            offset = 0
+        if not offset:
+            _write_etag(etag_path, response.headers.get("ETag"))
+        expected_size = response.headers.get("Content-Length")
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b''):
+                f.write(chunk)
+            received_size = f.tell() - offset
+    if expected_size is not None and received_size != int(expected_size):
+        raise ConnectionError(f"The connection was closed after {received_size} of {expected_size} bytes.")
+
+
+def _read_etag(etag_path):
+    try:
+        with open(etag_path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_etag(etag_path, etag):
+    # Files without an ETag can't be told apart, so their downloads are only ever started over
+    if etag:
+        with open(etag_path, 'w', encoding='utf-8') as f:
+            f.write(etag)
+    elif os.path.isfile(etag_path):
+        os.remove(etag_path)
+
+
+def _wait_for_retry(url, attempt, error):
+    delay = 2 ** attempt
+    logger.debug("Failed to download %s, retrying in %d seconds. Error: %s", url, delay, str(error))
+    time.sleep(delay)
+
+
+def _is_installed(cache_folder, destination, version):
+    entry = _read_manifest(cache_folder).get(os.path.basename(destination))
+    if not entry or entry.get('version') != version:
+        return False
+    try:
+        return os.stat(destination).st_size == entry.get('size')
+    except OSError:
+        return False
+
+
+def _record_installed(cache_folder, destination, version):
+    manifest = _read_manifest(cache_folder)
+    manifest[os.path.basename(destination)] = {
+        'version': version,
+        'size': os.path.getsize(destination),
+        'sha256': get_file_sha256(destination)
+    }
+    fd, temp_path = tempfile.mkstemp(dir=cache_folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, os.path.join(cache_folder, MANIFEST_FILE_NAME))
+    except OSError:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _read_manifest(cache_folder):
+    # pylint: disable=broad-except
+    try:
+        with open(os.path.join(cache_folder, MANIFEST_FILE_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.debug("Couldn't read the manifest of %s, its tools will be installed again. Error: %s",
+                     cache_folder, str(e))
+        return {}
+
+
+class _FolderLock():
+    def __init__(self, cache_folder):
+        self.lock_path = os.path.join(cache_folder, LOCK_FILE_NAME)
+
+    def __enter__(self):
+        deadline = time.time() + LOCK_TIMEOUT_IN_SECONDS
+        waiting = False
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode('ascii'))
+                os.close(fd)
+                return self
+            except FileExistsError:
+                pass
+            try:
+                # The process holding the lock most likely died without releasing it
+                if time.time() - os.path.getmtime(self.lock_path) > STALE_LOCK_AGE_IN_SECONDS:
+                    logger.debug("Removing stale lock %s", self.lock_path)
+                    os.remove(self.lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise azclierror.FileOperationError(f"Timed out waiting for another process to release "
+                                                    f"{self.lock_path}. If no other az command is running, "
+                                                    "delete the file and try again.")
+            if not waiting:
+                logger.warning("Waiting for another process to finish downloading to %s",
+                               os.path.dirname(self.lock_path))
+                waiting = True
+            time.sleep(LOCK_POLL_INTERVAL_IN_SECONDS)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
@@ -477,6 +477,9 @@ examples:
   - name: Copy all files in a file share to another storage account. with sas token.
     text: |
         az storage file copy start-batch --source-uri "https://srcaccount.file.core.windows.net/myshare?<sastoken>" --destination-path <destpath-to-directory> --destination-share destshare --account-name destaccount --sas-token <destination-sas>
+  - name: Copy all files in a file share to another storage account, and wait for the copies to complete.
+    text: |
+        az storage file copy start-batch --source-account-name srcaccount --source-account-key 00000000 --source-share srcshare --destination-share destshare --account-name destaccount --account-key 00000000 --wait
 """
 
 helps['storage file delete-batch'] = """
@@ -698,6 +701,9 @@ examples:
   - name: Upload files from a local directory to an Azure Storage File Share with url in a batch operation.
     text: |
         az storage file upload-batch --destination https://myaccount.file.core.windows.net/myshare --source . --account-key 00000000
+  - name: Upload the files of a local directory that changed since the last upload to an Azure Storage File Share.
+    text: |
+        az storage file upload-batch --destination myshare --source . --skip-unchanged --account-name myaccount --account-key 00000000
 """
 
 helps['storage file url'] = """
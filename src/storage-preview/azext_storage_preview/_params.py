@@ -708,6 +708,8 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
     with self.argument_context('storage file copy start-batch') as c:
         c.argument('share_name', share_name_type, options_list=('--destination-share'),
                    help='Name of the destination share. The share must exist.')
+        c.argument('wait', action='store_true',
+                   help='Wait for the server-side copies to complete, and fail if any of them failed.')
 
     with self.argument_context('storage file copy start-batch', arg_group='Copy Source') as c:
         from ._validators import get_source_file_or_blob_service_client_track2
@@ -872,6 +874,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('validate_content', action='store_true', min_api='2016-05-31')
         c.register_content_settings_argument(t_file_content_settings, update=False, arg_group='Content Settings')
         c.extra('no_progress', progress_type, validator=add_progress_callback)
+        c.argument('skip_unchanged', action='store_true',
+                   help='Skip the files whose size and MD5 match the files already in the share. The MD5 of the '
+                        'uploaded files is stored in their properties, so that the next upload can compare them.')
 
     with self.argument_context('storage file download-batch') as c:
         from ._validators import process_file_download_batch_parameters
@@ -7,10 +7,16 @@
 Commands for storage file share operations
 """
 
+import contextlib
+import copy
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from knack.log import get_logger
 
-from azure.cli.command_modules.storage.util import (filter_none, collect_blobs, collect_files_track2,
+from azure.cli.command_modules.storage.util import (filter_none, collect_blob_objects, collect_files_track2,
                                                     guess_content_type)
 from azure.cli.core.profiles import get_sdk
 from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ResourceExistsError
@@ -18,6 +24,36 @@ from ..profiles import CUSTOM_DATA_STORAGE_FILESHARE, CUSTOM_DATA_STORAGE_BLOB
 
 logger = get_logger(__name__)
 
+# number of files transferred at the same time by the batch commands
+FILE_BATCH_MAX_WORKERS = 16
+# the status of pending server-side copies is polled with an interval doubling from the min to the max
+FILE_COPY_POLL_MIN_INTERVAL_IN_SECONDS = 2
+FILE_COPY_POLL_MAX_INTERVAL_IN_SECONDS = 60
+
+
+class _ExistingDirectories:
+    """
+    Thread-safe cache of the directories known to exist in a file share. Workers creating the same directory
+    wait for each other, so that every directory is created at most once.
+    """
+
+    def __init__(self):
+        self._dirs = set()
+        self._dir_locks = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, dir_name):
+        with self._lock:
+            return dir_name in self._dirs
+
+    def add(self, dir_name):
+        with self._lock:
+            self._dirs.add(dir_name)
+
+    def lock(self, dir_name):
+        with self._lock:
+            return self._dir_locks.setdefault(dir_name, threading.Lock())
+
 
 def _get_client(client, kwargs):
     directory_path = kwargs.pop("directory_name", None)
@@ -101,7 +137,7 @@ def storage_file_upload(client, local_file_path, content_settings=None,
 
 def storage_file_upload_batch(cmd, client, destination, source, destination_path=None, pattern=None, dryrun=False,
                               validate_content=False, content_settings=None, max_connections=1, metadata=None,
-                              progress_callback=None):
+                              progress_callback=None, skip_unchanged=False):
     """ Upload local files to Azure Storage File Share in batch """
 
     from azure.cli.command_modules.storage.util import glob_files_locally, normalize_blob_file_path
@@ -126,26 +162,116 @@ def storage_file_upload_batch(cmd, client, destination, source, destination_path
             res.append({'File': file, 'Type': guessed_type})
         return res
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
+    existing_dirs = _ExistingDirectories()
+    if progress_callback:
+        progress_callback.reuse = True
+    progress = _BatchProgress(sum(os.path.getsize(src) for src, _ in source_files), progress_callback)
+
     def _upload_action(src, dst2):
         dst2 = normalize_blob_file_path(destination_path, dst2)
         dir_name = os.path.dirname(dst2)
         file_name = os.path.basename(dst2)
-
-        _make_directory_in_files_share(client, destination, dir_name, V2=True)
-
-        logger.warning('uploading %s', src)
-        storage_file_upload(client.get_file_client(dst2), src, content_settings, metadata, validate_content,
-                            progress_callback, max_connections)
-
+        file_client = client.get_file_client(dst2)
         args = {
             'directory_name': dir_name,
             'file_name': file_name
         }
+
+        _make_directory_in_files_share(client, destination, dir_name, existing_dirs, V2=True)
+
+        file_content_settings = content_settings
+        if skip_unchanged:
+            local_md5 = _get_file_md5(src)
+            if _is_file_unchanged(file_client, os.path.getsize(src), local_md5):
+                logger.info('skipping unchanged %s', src)
+                progress.skip(os.path.getsize(src))
+                return create_file_url(client, **args)
+            # store the MD5 of the content, so that the next upload can tell whether the file changed
+            file_content_settings = copy.copy(content_settings) if content_settings else settings_class()
+            file_content_settings.content_md5 = bytearray(local_md5)
+
+        logger.warning('uploading %s', src)
+        storage_file_upload(file_client, src, file_content_settings, metadata, validate_content,
+                            progress.get_file_callback(src), max_connections)
+        progress.complete(src, os.path.getsize(src))
+
         return create_file_url(client, **args)
 
-    return list(_upload_action(src, dst) for src, dst in source_files)
+    results = _run_batch(lambda pair: _upload_action(*pair), source_files)
+    progress.end()
+    return results
+
+
+def _get_file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(4 * 1024 * 1024), b''):
+            md5.update(chunk)
+    return md5.digest()
+
+
+def _is_file_unchanged(file_client, size, md5):
+    try:
+        properties = file_client.get_file_properties()
+    except ResourceNotFoundError:
+        return False
+    remote_md5 = properties.content_settings.content_md5
+    return properties.size == size and remote_md5 is not None and bytes(remote_md5) == md5
+
+
+class _BatchProgress:
+    """
+    Aggregates the progress of the files of a batch transferred concurrently into a single progress report, and
+    logs the overall throughput once the batch is done.
+    """
+
+    def __init__(self, total_bytes, progress_callback=None):
+        self.total_bytes = total_bytes
+        self.progress_callback = progress_callback
+        self.start_time = time.time()
+        self.transferred_files = 0
+        self.transferred_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self._in_progress = {}
+        self._lock = threading.Lock()
+
+    def get_file_callback(self, path):
+        def _file_progress(current, _total):
+            with self._lock:
+                self._in_progress[path] = current
+                self._report()
+        return _file_progress
+
+    def complete(self, path, size):
+        with self._lock:
+            self._in_progress.pop(path, None)
+            self.transferred_files += 1
+            self.transferred_bytes += size
+            self._report()
+
+    def skip(self, size):
+        with self._lock:
+            self.skipped_files += 1
+            self.skipped_bytes += size
+            self._report()
+
+    def end(self):
+        elapsed = max(time.time() - self.start_time, 0.001)
+        megabytes = self.transferred_bytes / 1024 / 1024
+        logger.warning('transferred %d files (%.1f MB) in %.1f seconds (%.1f MB/s), skipped %d unchanged files',
+                       self.transferred_files, megabytes, elapsed, megabytes / elapsed, self.skipped_files)
+        if self.progress_callback and hasattr(self.progress_callback, 'hook'):
+            self.progress_callback.hook.end()
+
+    def _report(self):
+        if not self.progress_callback or not self.total_bytes:
+            return
+        transferred = self.transferred_bytes + sum(self._in_progress.values())
+        elapsed = max(time.time() - self.start_time, 0.001)
+        self.progress_callback.message = '{} files, {:.1f} MB/s'.format(
+            self.transferred_files + self.skipped_files, transferred / 1024 / 1024 / elapsed)
+        self.progress_callback(min(transferred + self.skipped_bytes, self.total_bytes), self.total_bytes)
 
 
 def download_file(client, destination_path=None, timeout=None, max_connections=2, open_mode='wb', **kwargs):
@@ -223,7 +349,7 @@ def storage_file_copy(client, copy_source, **kwargs):
 
 def storage_file_copy_batch(cmd, client, source_client, share_name=None, destination_path=None,
                             source_container=None, source_share=None, source_sas=None, pattern=None, dryrun=False,
-                            metadata=None, timeout=None, **kwargs):
+                            metadata=None, timeout=None, wait=False, **kwargs):
     """
     Copy a group of files asynchronously
     """
@@ -238,46 +364,50 @@ def storage_file_copy_batch(cmd, client, source_client, share_name=None, destina
         logger.warning('    pattern %s', pattern)
         logger.warning(' operations')
 
+    # the cache of existing directories in the destination file share. the cache helps to avoid
+    # repeatedly create existing directory so as to optimize the performance.
+    existing_dirs = _ExistingDirectories()
+    pending_copies = _PendingCopies(client)
+
     if source_container:
         # copy blobs to file share
+        source_blobs = (blob_name for blob_name, _ in collect_blob_objects(source_client, source_container, pattern))
+        if dryrun:
+            for blob_name in source_blobs:
+                logger.warning('  - copy blob %s', blob_name)
+            return []
 
-        # the cache of existing directories in the destination file share. the cache helps to avoid
-        # repeatedly create existing directory so as to optimize the performance.
-        existing_dirs = set([])
-
-        # pylint: disable=inconsistent-return-statements
         def action_blob_copy(blob_name):
-            if dryrun:
-                logger.warning('  - copy blob %s', blob_name)
-            else:
-                return _create_file_and_directory_from_blob(cmd, client, source_client, share_name, source_container,
-                                                            source_sas, blob_name, destination_dir=destination_path,
-                                                            metadata=metadata, timeout=timeout,
-                                                            existing_dirs=existing_dirs)
+            return _create_file_and_directory_from_blob(cmd, client, source_client, share_name, source_container,
+                                                        source_sas, blob_name, destination_dir=destination_path,
+                                                        metadata=metadata, timeout=timeout,
+                                                        existing_dirs=existing_dirs, pending_copies=pending_copies)
 
-        return list(
-            filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client, source_container, pattern)))
+        results = _run_batch(action_blob_copy, source_blobs)
+        if wait:
+            pending_copies.wait()
+        return results
 
     if source_share:
         # copy files from share to share
+        source_files = collect_files_track2(source_client, source_share, pattern)
+        if dryrun:
+            for dir_name, file_name in source_files:
+                logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
+            return []
 
-        # the cache of existing directories in the destination file share. the cache helps to avoid
-        # repeatedly create existing directory so as to optimize the performance.
-        existing_dirs = set([])
-
-        # pylint: disable=inconsistent-return-statements
         def action_file_copy(file_info):
             dir_name, file_name = file_info
-            if dryrun:
-                logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
-            else:
-                return _create_file_and_directory_from_file(cmd, client, source_client, share_name, source_share,
-                                                            source_sas, dir_name, file_name,
-                                                            destination_dir=destination_path, metadata=metadata,
-                                                            timeout=timeout, existing_dirs=existing_dirs)
-
-        return list(filter_none(
-            action_file_copy(file) for file in collect_files_track2(source_client, source_share, pattern)))
+            return _create_file_and_directory_from_file(cmd, client, source_client, share_name, source_share,
+                                                        source_sas, dir_name, file_name,
+                                                        destination_dir=destination_path, metadata=metadata,
+                                                        timeout=timeout, existing_dirs=existing_dirs,
+                                                        pending_copies=pending_copies)
+
+        results = _run_batch(action_file_copy, source_files)
+        if wait:
+            pending_copies.wait()
+        return results
     # won't happen, the validator should ensure either source_container or source_share is set
     raise ValueError('Fail to find source. Neither blob container or file share is specified.')
 
@@ -293,9 +423,10 @@ def storage_file_delete_batch(client, source, pattern=None, dryrun=False, timeou
         return file_client.delete_file(timeout=timeout)
 
     from azure.cli.command_modules.storage.util import glob_files_remotely_track2
-    source_files = list(glob_files_remotely_track2(client, source, pattern, is_share_client=True))
+    source_files = glob_files_remotely_track2(client, source, pattern, is_share_client=True)
 
     if dryrun:
+        source_files = list(source_files)
         logger.warning('delete files from %s', source)
         logger.warning('    pattern %s', pattern)
         logger.warning('      share %s', source)
@@ -305,12 +436,82 @@ def storage_file_delete_batch(client, source, pattern=None, dryrun=False, timeou
             logger.warning('  - %s/%s', f[0], f[1])
         return []
 
-    for f in source_files:
-        delete_action(f)
+    _run_batch(delete_action, source_files)
+
+
+def _run_batch(action, items, max_workers=FILE_BATCH_MAX_WORKERS):
+    """
+    Call action on every item with a pool of workers, and return the results that aren't None in the order of the
+    items. The items are read as the workers become available, so that listings of millions of files are consumed
+    as a stream. No more items are started once an action failed, and its error is raised.
+    """
+    results = {}
+    errors = []
+    slots = threading.BoundedSemaphore(2 * max_workers)
+
+    def _run(index, item):
+        try:
+            result = action(item)
+            if result is not None:
+                results[index] = result
+        except Exception as ex:  # pylint: disable=broad-except
+            errors.append(ex)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, item in enumerate(items):
+            slots.acquire()  # pylint: disable=consider-using-with
+            if errors:
+                break
+            executor.submit(_run, index, item)
+
+    if errors:
+        raise errors[0]
+    return [results[index] for index in sorted(results)]
+
+
+class _PendingCopies:
+    """
+    The server-side copies started by a batch that are still pending, whose status is polled until they complete.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._paths = []
+        self._lock = threading.Lock()
+
+    def add(self, path, copy_status):
+        if copy_status == 'pending':
+            with self._lock:
+                self._paths.append(path)
+
+    def wait(self):
+        def _get_copy_status(path):
+            properties = self._client.get_file_client(path).get_file_properties()
+            return path, properties.copy.status, properties.copy.status_description
+
+        failed = []
+        interval = FILE_COPY_POLL_MIN_INTERVAL_IN_SECONDS
+        while self._paths:
+            logger.warning('waiting for %d pending copies', len(self._paths))
+            time.sleep(interval)
+            # every round only gets the properties of the copies still pending, all at the same time
+            statuses = _run_batch(_get_copy_status, self._paths)
+            self._paths = [path for path, status, _ in statuses if status == 'pending']
+            failed.extend((path, description) for path, status, description in statuses
+                          if status not in ('pending', 'success'))
+            interval = min(2 * interval, FILE_COPY_POLL_MAX_INTERVAL_IN_SECONDS)
+
+        if failed:
+            from knack.util import CLIError
+            raise CLIError('Failed to copy {} files: {}'.format(
+                len(failed), ', '.join('{} ({})'.format(path, description) for path, description in failed)))
 
 
 def _create_file_and_directory_from_blob(cmd, file_service, blob_service, share, container, sas, blob_name,
-                                         destination_dir=None, metadata=None, timeout=None, existing_dirs=None):
+                                         destination_dir=None, metadata=None, timeout=None, existing_dirs=None,
+                                         pending_copies=None):
     """
     Copy a blob to file share and create the directory if needed.
     """
@@ -328,7 +529,9 @@ def _create_file_and_directory_from_blob(cmd, file_service, blob_service, share,
 
     try:
         file_client = file_service.get_file_client(full_path)
-        file_client.start_copy_from_url(source_url=blob_url, metadata=metadata, timeout=timeout)
+        copy_props = file_client.start_copy_from_url(source_url=blob_url, metadata=metadata, timeout=timeout)
+        if pending_copies is not None:
+            pending_copies.add(full_path, copy_props['copy_status'])
         return file_client.url
     except AzureException:
         error_template = 'Failed to copy blob {} to file share {}. Please check if you have permission to read ' \
@@ -339,7 +542,7 @@ def _create_file_and_directory_from_blob(cmd, file_service, blob_service, share,
 
 def _create_file_and_directory_from_file(cmd, file_service, source_file_service, share, source_share, sas,
                                          source_file_dir, source_file_name, destination_dir=None, metadata=None,
-                                         timeout=None, existing_dirs=None):
+                                         timeout=None, existing_dirs=None, pending_copies=None):
     """
     Copy a file from one file share to another
     """
@@ -361,7 +564,9 @@ def _create_file_and_directory_from_file(cmd, file_service, source_file_service,
 
     try:
         file_client = file_service.get_file_client(full_path)
-        file_client.start_copy_from_url(source_url=file_url, metadata=metadata, timeout=timeout)
+        copy_props = file_client.start_copy_from_url(source_url=file_url, metadata=metadata, timeout=timeout)
+        if pending_copies is not None:
+            pending_copies.add(full_path, copy_props['copy_status'])
         return file_client.url
     except AzureException:
         error_template = 'Failed to copy file {} from share {} to file share {}. Please check if ' \
@@ -389,22 +594,26 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
         p = os.path.dirname(p)
 
     for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+        if existing_dirs is not None and dir_name in existing_dirs:
             continue
 
-        try:
-            if V2:
-                file_service.create_directory(directory_name=dir_name)
-            else:
-                file_service.create_directory(share_name=file_share, directory_name=dir_name, fail_on_exist=False)
-        except ResourceExistsError:
-            pass
-        except AzureHttpError:
-            from knack.util import CLIError
-            raise CLIError('Failed to create directory {}'.format(dir_name))
-
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+        # the lock makes the workers creating the same directory wait for the first one instead of creating it again
+        with existing_dirs.lock(dir_name) if existing_dirs is not None else contextlib.nullcontext():
+            if existing_dirs is not None and dir_name in existing_dirs:
+                continue
+            try:
+                if V2:
+                    file_service.create_directory(directory_name=dir_name)
+                else:
+                    file_service.create_directory(share_name=file_share, directory_name=dir_name, fail_on_exist=False)
+            except ResourceExistsError:
+                pass
+            except AzureHttpError:
+                from knack.util import CLIError
+                raise CLIError('Failed to create directory {}'.format(dir_name))
+
+            if existing_dirs is not None:
+                existing_dirs.add(dir_name)
 
 
 def _file_share_exists(client, resource_group_name, account_name, share_name):
@@ -0,0 +1,131 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from ...operations.file import storage_file_copy_batch, storage_file_delete_batch, storage_file_upload_batch
+
+
+class _ContentSettings(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, content_type=None, content_md5=None, **_):
+        self.content_type = content_type
+        self.content_md5 = content_md5
+
+
+class StorageFileUploadBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        for path in ['a/b/one.txt', 'a/b/two.txt', 'a/three.txt', 'four.txt']:
+            os.makedirs(os.path.join(self.temp_dir.name, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(self.temp_dir.name, path), 'w') as f:
+                f.write(path)
+
+        self.cmd = mock.MagicMock()
+        self.cmd.get_models.return_value = _ContentSettings
+        self.client = mock.MagicMock()
+        self.client.url = 'https://myaccount.file.core.windows.net/myshare'
+        self.file_clients = {}
+        self.client.get_file_client.side_effect = lambda path: self.file_clients.setdefault(path, mock.MagicMock())
+
+    def test_upload_batch_creates_every_directory_once(self):
+        storage_file_upload_batch(self.cmd, self.client, 'myshare', self.temp_dir.name)
+
+        created = sorted(c[1]['directory_name'] for c in self.client.create_directory.call_args_list)
+        self.assertEqual(created, ['a', 'a/b'])
+        self.assertEqual(sorted(self.file_clients), ['a/b/one.txt', 'a/b/two.txt', 'a/three.txt', 'four.txt'])
+        for file_client in self.file_clients.values():
+            file_client.upload_file.assert_called_once()
+
+    def test_upload_batch_skips_unchanged_files(self):
+        def _get_file_properties(path):
+            properties = mock.MagicMock()
+            properties.size = len(path)
+            properties.content_settings.content_md5 = bytearray(hashlib.md5(path.encode()).digest())
+            return properties
+
+        for path in ['a/b/one.txt', 'a/three.txt']:
+            self.file_clients[path] = mock.MagicMock()
+            self.file_clients[path].get_file_properties.return_value = _get_file_properties(path)
+        self.file_clients['four.txt'] = mock.MagicMock()
+        self.file_clients['four.txt'].get_file_properties.side_effect = ResourceNotFoundError()
+
+        storage_file_upload_batch(self.cmd, self.client, 'myshare', self.temp_dir.name, skip_unchanged=True)
+
+        uploaded = sorted(path for path, c in self.file_clients.items() if c.upload_file.called)
+        self.assertEqual(uploaded, ['a/b/two.txt', 'four.txt'])
+        content_settings = self.file_clients['four.txt'].upload_file.call_args[1]['content_settings']
+        self.assertEqual(bytes(content_settings.content_md5), hashlib.md5(b'four.txt').digest())
+
+
+class StorageFileCopyDeleteBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.MagicMock()
+        self.file_clients = {}
+        self.client.get_file_client.side_effect = lambda path: self.file_clients.setdefault(path, mock.MagicMock())
+
+    def test_delete_batch_deletes_every_listed_file(self):
+        files = (('dir', 'file{}'.format(index)) for index in range(100))
+
+        with mock.patch('azure.cli.command_modules.storage.util.glob_files_remotely_track2', return_value=files):
+            storage_file_delete_batch(self.client, 'myshare')
+
+        self.assertEqual(len(self.file_clients), 100)
+        for file_client in self.file_clients.values():
+            file_client.delete_file.assert_called_once_with(timeout=None)
+
+    def test_delete_batch_stops_after_failure(self):
+        self.client.get_file_client.side_effect = ResourceNotFoundError('gone')
+        files = (('dir', 'file{}'.format(index)) for index in range(1000))
+
+        with mock.patch('azure.cli.command_modules.storage.util.glob_files_remotely_track2', return_value=files):
+            with self.assertRaises(ResourceNotFoundError):
+                storage_file_delete_batch(self.client, 'myshare')
+        # the listing is consumed as a stream, and the files after the failure aren't deleted
+        self.assertLess(self.client.get_file_client.call_count, 100)
+        self.assertIsNotNone(next(files, None))
+
+    @mock.patch('azext_storage_preview.operations.file.time.sleep')
+    @mock.patch('azext_storage_preview.operations.file.collect_files_track2')
+    def test_copy_batch_waits_for_pending_copies(self, mock_collect_files, mock_sleep):
+        mock_collect_files.return_value = iter([('', 'one.txt'), ('dir', 'two.txt'), ('dir', 'three.txt')])
+        copy_statuses = {'one.txt': 'success', 'dir/two.txt': 'pending', 'dir/three.txt': 'pending'}
+        polled_statuses = {'dir/two.txt': ['pending', 'success'], 'dir/three.txt': ['success']}
+
+        def _get_file_client(path):
+            if path not in self.file_clients:
+                file_client = mock.MagicMock()
+                file_client.url = 'https://myaccount.file.core.windows.net/share/' + path
+                file_client.start_copy_from_url.return_value = {'copy_status': copy_statuses[path]}
+
+                def _get_file_properties(path=path):
+                    properties = mock.MagicMock()
+                    properties.copy.status = polled_statuses[path].pop(0)
+                    return properties
+                file_client.get_file_properties.side_effect = _get_file_properties
+                self.file_clients[path] = file_client
+            return self.file_clients[path]
+        self.client.get_file_client.side_effect = _get_file_client
+
+        results = storage_file_copy_batch(mock.MagicMock(), self.client, mock.MagicMock(), share_name='share',
+                                          source_share='source', wait=True)
+
+        self.assertEqual(results, ['https://myaccount.file.core.windows.net/share/one.txt',
+                                   'https://myaccount.file.core.windows.net/share/dir/two.txt',
+                                   'https://myaccount.file.core.windows.net/share/dir/three.txt'])
+        self.assertEqual(self.client.create_directory.call_count, 1)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.file_clients['one.txt'].get_file_properties.assert_not_called()
+        self.assertEqual(self.file_clients['dir/two.txt'].get_file_properties.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()